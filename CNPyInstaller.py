@@ -85,12 +85,929 @@ import time
 from pathlib import Path
 from datetime import datetime
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 import webbrowser
 import re
 import logging
 import ast  # <--- 确保导入 ast 模块
 import sys  # <--- 确保导入 sys 模块 (如果尚未导入)
+import select # 监视模式下等待 inotify 事件
+import struct
+import marshal # 读取 PYZ 归档目录表
+import signal
+import shutil
+import tempfile
+import importlib.util # 构建后分析缺失模块时检查模块是否已安装
+import importlib.metadata # 声明的依赖: 发行包名到导入名的映射
+import hashlib # 共享分析缓存的内容哈希键
+import fnmatch # 数据文件夹的包含/排除规则
+import glob # 数据文件清单中的通配符源路径
+import csv # 数据文件清单导入
+import platform # 构建代理报告自身平台
+import argparse # 构建代理的命令行参数
+import uuid
+import hmac # 构建代理令牌比较
+import zipfile # 构建代理产物打包
+import random # 扫描器基准测试的合成项目
+import statistics
+import tracemalloc # 扫描器基准测试的内存峰值
+import cProfile # 剖析扫描/构建线程
+import bisect # 日志行索引中按偏移定位行号
+import pstats
+import codecs # 构建输出的增量解码
+import tokenize # 大文件的导入头部流式分词
+import urllib.parse
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict, deque
+
+# --------------------------------------------------------------------------
+#  源码导入解析: 导入语句与动态导入的提取 (依赖扫描、依赖图和排除模块推荐共用)
+# --------------------------------------------------------------------------
+def _collect_import_statements(statements, inside_optional_block: bool, records: list):
+    """递归遍历语句列表收集导入；try/except ImportError 和 if TYPE_CHECKING 中的导入标记为可选。"""
+    for statement in statements:
+        if isinstance(statement, ast.Import):
+            records.extend([alias_node.name, 0, None, inside_optional_block] for alias_node in statement.names)
+        elif isinstance(statement, ast.ImportFrom):
+            records.append([statement.module, statement.level, [alias_node.name for alias_node in statement.names], inside_optional_block])
+        elif isinstance(statement, ast.Try):
+            catches_import_error = any(
+                handler.type is None or any(isinstance(node, ast.Name) and node.id in ("ImportError", "ModuleNotFoundError", "Exception", "BaseException")
+                                            for node in ast.walk(handler.type))
+                for handler in statement.handlers)
+            _collect_import_statements(statement.body, inside_optional_block or catches_import_error, records)
+            for handler in statement.handlers:
+                _collect_import_statements(handler.body, inside_optional_block, records)
+            _collect_import_statements(statement.orelse + statement.finalbody, inside_optional_block, records)
+        elif isinstance(statement, ast.If):
+            test_node = statement.test # 直接匹配节点 (TYPE_CHECKING / typing.TYPE_CHECKING)，不把每个条件都转换回源码
+            is_type_checking_block = ((isinstance(test_node, ast.Name) and test_node.id == "TYPE_CHECKING")
+                                      or (isinstance(test_node, ast.Attribute) and test_node.attr == "TYPE_CHECKING"))
+            _collect_import_statements(statement.body, inside_optional_block or is_type_checking_block, records)
+            _collect_import_statements(statement.orelse, inside_optional_block, records)
+        else: # 函数体、类体、with/for/while/match 等：其中的导入仍可能执行
+            nested_statements = []
+            for child_node in ast.iter_child_nodes(statement):
+                if isinstance(child_node, ast.stmt):
+                    nested_statements.append(child_node)
+                elif isinstance(child_node, (ast.excepthandler, ast.match_case)):
+                    nested_statements.extend(child_node.body)
+            if nested_statements:
+                _collect_import_statements(nested_statements, inside_optional_block, records)
+
+
+# 动态导入的检测 (与导入语句在同一次解析中完成)
+# 只遍历语法树中包含这些片段所在行的部分；源码中完全不含它们的文件 (绝大多数) 不需要再遍历语法树
+_DYNAMIC_IMPORT_MARKER_PATTERN = re.compile(rb"import_module|__import__|find_spec|import_string|import_from_string|load_object|locate|resolve_name|"
+                                            rb"iter_modules|walk_packages|entry_point|INSTALLED_APPS|MIDDLEWARE|_BACKEND|_CLASS|_APPLICATION|"
+                                            rb"ROOT_URLCONF|ENGINE|CELERY_IMPORTS|Celery|[\"']BACKEND[\"']|[\"']class[\"']")
+_DYNAMIC_IMPORT_CALLS = { # 调用名 -> (类型, 参数是否为 "模块.属性" 形式, 精确字符串的置信度)
+    "import_module": ("import_module", False, "high"),
+    "__import__": ("__import__", False, "high"),
+    "find_spec": ("find_spec", False, "medium"), # 通常用于探测可选模块
+    "import_string": ("import_string", True, "medium"), # Django / Werkzeug
+    "import_from_string": ("import_string", True, "medium"), # Starlette / Uvicorn
+    "load_object": ("import_string", True, "medium"), # Scrapy
+    "resolve_name": ("import_string", True, "medium"), # pkgutil.resolve_name("a.b:c")
+    "locate": ("import_string", True, "medium"), # pydoc.locate (只识别 pydoc.locate 的写法)
+}
+_FRAMEWORK_SETTING_NAMES = {"INSTALLED_APPS", "MIDDLEWARE", "MIDDLEWARE_CLASSES", "AUTHENTICATION_BACKENDS", "ROOT_URLCONF",
+                            "WSGI_APPLICATION", "ASGI_APPLICATION", "CELERY_IMPORTS", "TEST_RUNNER"}
+_FRAMEWORK_SETTING_SUFFIXES = ("_BACKEND", "_BACKENDS", "_CLASS", "_CLASSES", "_APPLICATION")
+_FRAMEWORK_DICT_KEYS = {"BACKEND", "ENGINE", "class"} # TEMPLATES/DATABASES/CACHES 的 BACKEND/ENGINE，logging 配置的 class
+_DOTTED_NAME_PATTERN = re.compile(r"^[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*(?::[A-Za-z_][\w.]*)?$")
+
+
+DYNAMIC_IMPORT_CONFIDENCE_LABELS = {"high": "置信度高", "medium": "置信度中", "low": "置信度低"}
+
+
+def _static_string_prefix(node) -> tuple[str, bool] | None:
+    """
+    求字符串表达式的静态值：常量返回 (值, True)；f-string、"前缀" + 变量、"前缀%s" % x、"前缀{}".format(x)
+    返回 (常量前缀, False)；无法静态确定时返回 None。
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value, True
+    if isinstance(node, ast.JoinedStr):
+        prefix_parts = []
+        for value_node in node.values:
+            if not (isinstance(value_node, ast.Constant) and isinstance(value_node.value, str)):
+                return ("".join(prefix_parts), False) if prefix_parts else None
+            prefix_parts.append(value_node.value)
+        return "".join(prefix_parts), True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left_value = _static_string_prefix(node.left)
+        if left_value is None:
+            return None
+        if left_value[1]:
+            right_value = _static_string_prefix(node.right)
+            if right_value is not None:
+                return left_value[0] + right_value[0], right_value[1]
+        return (left_value[0], False) if left_value[0] else None
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod) and isinstance(node.left, ast.Constant) and isinstance(node.left.value, str):
+        prefix = node.left.value.split("%", 1)[0]
+        return (prefix, False) if prefix else None
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format"
+            and isinstance(node.func.value, ast.Constant) and isinstance(node.func.value.value, str)):
+        prefix = node.func.value.value.split("{", 1)[0]
+        return (prefix, False) if prefix else None
+    return None
+
+
+def _dotted_module_from_object_path(object_path: str) -> str:
+    """"a.b:C" 或 "a.b.C" (指向模块中的对象) -> 模块名 "a.b"。"""
+    if ":" in object_path:
+        return object_path.split(":", 1)[0]
+    return object_path.rsplit(".", 1)[0] if "." in object_path else object_path
+
+
+def _dynamic_record_from_string(string_node, kind: str, object_path: bool, exact_confidence: str, line_number: int, package=None) -> list | None:
+    """把动态导入调用的字符串参数转换为记录 [module, line, kind, confidence, detail]；无法确定时返回 None。"""
+    string_value = _static_string_prefix(string_node)
+    if string_value is None:
+        return [None, line_number, kind, "low", "模块名在运行时计算"]
+    module_text, is_exact = string_value
+    if not is_exact: # 只知道前缀，例如 f"plugins.{name}"：对应包下的子模块都可能被导入
+        package_prefix = module_text.rsplit(".", 1)[0] if "." in module_text else ""
+        if not package_prefix or not _DOTTED_NAME_PATTERN.match(package_prefix):
+            return [None, line_number, kind, "low", f"模块名以 {module_text!r} 开头"]
+        return [package_prefix, line_number, kind, "low", f"{package_prefix} 下的子模块 (模块名以 {module_text!r} 开头)"]
+    if module_text.startswith("."): # 相对导入: import_module(".x", package="a.b")
+        if not package:
+            return [None, line_number, kind, "low", f"相对模块 {module_text!r} (package 非常量)"]
+        level = len(module_text) - len(module_text.lstrip("."))
+        base_parts = package.split(".")[:len(package.split(".")) - (level - 1)] if level > 1 else package.split(".")
+        module_text = ".".join(base_parts + ([module_text[level:]] if module_text[level:] else []))
+    if not _DOTTED_NAME_PATTERN.match(module_text):
+        return None
+    module_name = _dotted_module_from_object_path(module_text) if object_path else module_text.split(":", 1)[0]
+    return [module_name, line_number, kind, exact_confidence, module_text]
+
+
+def _find_marker_lines(source_bytes: bytes) -> list[int]:
+    """返回包含动态导入特征片段的行号 (从 1 开始，升序)。"""
+    marker_lines, line_number, scanned_offset = [], 1, 0
+    for marker_match in _DYNAMIC_IMPORT_MARKER_PATTERN.finditer(source_bytes):
+        line_number += source_bytes.count(b"\n", scanned_offset, marker_match.start())
+        scanned_offset = marker_match.start()
+        if not marker_lines or marker_lines[-1] != line_number:
+            marker_lines.append(line_number)
+    return marker_lines
+
+
+def _iter_marked_nodes(tree: ast.AST, marker_lines: list[int]):
+    """遍历语法树，但跳过行范围内不含任何特征行的子树 (没有行号的节点总是进入)。"""
+    pending_nodes = [tree]
+    while pending_nodes:
+        node = pending_nodes.pop()
+        yield node
+        for child_node in ast.iter_child_nodes(node):
+            start_line = getattr(child_node, "lineno", None)
+            if start_line is None:
+                pending_nodes.append(child_node)
+                continue
+            marker_index = bisect.bisect_left(marker_lines, start_line)
+            if marker_index < len(marker_lines) and marker_lines[marker_index] <= (child_node.end_lineno or start_line):
+                pending_nodes.append(child_node)
+
+
+def _collect_dynamic_imports(tree: ast.AST, marker_lines: list[int], records: list):
+    """
+    遍历语法树中包含特征行的部分，收集 importlib.import_module / __import__ / find_spec / import_string 类调用、pkgutil 子模块枚举、
+    入口点插件加载，以及框架配置 (Django INSTALLED_APPS/MIDDLEWARE 等) 中以字符串给出的模块。
+    每条记录为 [module (无法确定时为 None), line, kind, confidence ("high"/"medium"/"low"), detail]，按源码顺序排列。
+    """
+    first_record_index = len(records)
+    for node in _iter_marked_nodes(tree, marker_lines):
+        if isinstance(node, ast.Call):
+            function_node = node.func
+            function_name = function_node.attr if isinstance(function_node, ast.Attribute) else function_node.id if isinstance(function_node, ast.Name) else None
+            keyword_values = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+            if function_name in _DYNAMIC_IMPORT_CALLS:
+                if function_name == "locate" and not (isinstance(function_node, ast.Attribute) and isinstance(function_node.value, ast.Name) and function_node.value.id == "pydoc"):
+                    continue
+                kind, object_path, exact_confidence = _DYNAMIC_IMPORT_CALLS[function_name]
+                name_node = node.args[0] if node.args else keyword_values.get("name") or keyword_values.get("dotted_path")
+                if name_node is None:
+                    continue
+                package_node = node.args[1] if function_name == "import_module" and len(node.args) > 1 else keyword_values.get("package")
+                package_value = _static_string_prefix(package_node) if package_node is not None else None
+                dynamic_record = _dynamic_record_from_string(name_node, kind, object_path, exact_confidence, node.lineno,
+                                                             package=package_value[0] if package_value and package_value[1] else None)
+                if dynamic_record is not None:
+                    records.append(dynamic_record)
+            elif function_name in ("iter_modules", "walk_packages"): # pkgutil.iter_modules(pkg.__path__) 等插件发现
+                prefix_node = keyword_values.get("prefix") or (node.args[1] if len(node.args) > 1 else None)
+                prefix_value = _static_string_prefix(prefix_node) if prefix_node is not None else None
+                path_node = node.args[0] if node.args else keyword_values.get("path")
+                if prefix_value and prefix_value[1] and prefix_value[0].strip("."):
+                    package_name = prefix_value[0].strip(".")
+                elif isinstance(path_node, ast.Attribute) and path_node.attr == "__path__":
+                    package_name = ast.unparse(path_node.value)
+                else:
+                    package_name = None
+                if package_name is not None and not _DOTTED_NAME_PATTERN.match(package_name):
+                    package_name = None
+                records.append([package_name, node.lineno, "pkgutil", "medium" if package_name else "low",
+                                f"枚举 {package_name} 的子模块" if package_name else "枚举子模块 (路径非静态)"])
+            elif function_name in ("entry_points", "iter_entry_points", "load_entry_point", "select"):
+                group_node = keyword_values.get("group")
+                if group_node is None and node.args:
+                    group_node = node.args[1] if function_name == "load_entry_point" and len(node.args) > 1 else node.args[0] if function_name == "iter_entry_points" else None
+                if function_name == "select" and group_node is None:
+                    continue
+                group_value = _static_string_prefix(group_node) if group_node is not None else None
+                if function_name == "entry_points" and group_node is None:
+                    continue # entry_points().select(group=...) 在 select 调用处记录
+                records.append([None, node.lineno, "entry_points", "low",
+                                f"入口点组 {group_value[0]!r} (插件模块由已安装包的元数据决定)" if group_value and group_value[1] else "入口点插件"])
+            elif function_name == "Celery" and "include" in keyword_values:
+                _collect_setting_strings(keyword_values["include"], node.lineno, records, strip_object=False, allow_plain_names=True)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target_node in targets:
+                setting_name = target_node.id if isinstance(target_node, ast.Name) else None
+                if setting_name and node.value is not None and (setting_name in _FRAMEWORK_SETTING_NAMES or setting_name.endswith(_FRAMEWORK_SETTING_SUFFIXES)):
+                    _collect_setting_strings(node.value, node.lineno, records, strip_object=True if setting_name.endswith("_APPLICATION") else None,
+                                             allow_plain_names=setting_name in ("INSTALLED_APPS", "CELERY_IMPORTS"))
+        elif isinstance(node, ast.Dict):
+            for key_node, value_node in zip(node.keys, node.values):
+                if isinstance(key_node, ast.Constant) and key_node.value in _FRAMEWORK_DICT_KEYS:
+                    _collect_setting_strings(value_node, getattr(value_node, "lineno", node.lineno), records)
+    records[first_record_index:] = sorted(records[first_record_index:], key=lambda record: record[1])
+
+
+def _collect_setting_strings(value_node, line_number: int, records: list, strip_object=None, allow_plain_names: bool = False):
+    """
+    收集配置值 (字符串，或列表/元组/集合中的字符串) 中的模块路径，记录到 records。
+
+    Args:
+        strip_object (bool, optional): 是否去掉最后一段 (指向模块中的对象)；为 None 时按命名习惯判断：
+                                       含冒号或最后一段以大写字母开头 (类，例如中间件、AppConfig) 时去掉。
+        allow_plain_names (bool): 是否接受不含点号的名称 (INSTALLED_APPS 中的 "myapp")；否则视为普通字符串忽略。
+    """
+    string_nodes = value_node.elts if isinstance(value_node, (ast.List, ast.Tuple, ast.Set)) else [value_node]
+    for string_node in string_nodes:
+        if not (isinstance(string_node, ast.Constant) and isinstance(string_node.value, str) and _DOTTED_NAME_PATTERN.match(string_node.value)):
+            continue
+        setting_value = string_node.value
+        if "." not in setting_value and ":" not in setting_value and not allow_plain_names:
+            continue
+        last_part = setting_value.split(":", 1)[0].rsplit(".", 1)[-1]
+        should_strip = strip_object if strip_object is not None else (":" in setting_value or last_part[:1].isupper())
+        module_name = _dotted_module_from_object_path(setting_value) if should_strip else setting_value.split(":", 1)[0]
+        records.append([module_name, getattr(string_node, "lineno", line_number), "setting", "medium", setting_value])
+
+
+LARGE_SOURCE_FILE_BYTES = 1024 * 1024 # 超过此大小的源文件不整体读入内存 (见 _parse_large_source_imports)
+_LARGE_SOURCE_LIMITS = { # 单位为字节 (trailing_statements 除外)
+    "header": {"line": 64 * 1024, "statement": 64 * 1024, "total": 4 * 1024 * 1024, "trailing_statements": 20},
+    "full": {"line": 1024 * 1024, "chunk": 256 * 1024, "max_chunk": 1024 * 1024},
+}
+_IMPORT_HEADER_KEYWORDS = {"import", "from", "try", "if"} # 这些语句可能包含导入 (try/except ImportError 等)
+_COMPOUND_CONTINUATION_KEYWORDS = {"except", "else", "elif", "finally"} # 复合语句的后续子句，不是新语句
+_COMPOUND_CONTINUATION_PREFIXES = tuple(keyword.encode() for keyword in _COMPOUND_CONTINUATION_KEYWORDS)
+_GENERATED_FILE_MARKER_PATTERN = re.compile(
+    r"@generated\b|\bdo not edit\b|\bauto-?generated\b|\bautomatically generated\b|\b(?:code )?generated (?:by|from)\b|generated protocol buffer code"
+    r"|\bresource object code\b|\bresource compiler\b|all changes made in this file will be lost|自动生成|请勿(?:手动)?(?:修改|编辑)".encode("utf-8"), re.IGNORECASE)
+
+
+class _ImportHeaderEnd(Exception):
+    """(内部) 读取导入头部时超过长度限制，停止分词。"""
+
+
+def find_generated_file_marker(head_bytes: bytes, max_lines: int = 40) -> str | None:
+    """
+    在源文件开头的注释和文档字符串中查找“自动生成”标记 (protoc、Qt rcc/uic、Thrift、"@generated"、"DO NOT EDIT" 等)。
+
+    Args:
+        head_bytes (bytes): 文件开头的内容 (几 KB 即可)。
+        max_lines (int): 最多检查的行数。
+
+    Returns:
+        str | None: 包含标记的那一行 (截断到 100 个字符)；不是生成的文件时为 None。
+    """
+    for line in head_bytes.splitlines()[:max_lines]:
+        stripped_line = line.strip()
+        if stripped_line.startswith((b"#", b'"', b"'")) and _GENERATED_FILE_MARKER_PATTERN.search(stripped_line):
+            return stripped_line.decode("utf-8", errors="replace")[:100]
+    return None
+
+
+def read_generated_file_marker(source_path: Path) -> str | None:
+    """读取文件开头的 8 KB 并查找自动生成标记 (见 find_generated_file_marker)；文件无法读取时为 None。"""
+    try:
+        with open(source_path, "rb") as f:
+            return find_generated_file_marker(f.read(8192))
+    except OSError:
+        return None
+
+
+def _read_import_header(source_path: Path) -> bytes:
+    """
+    用流式分词器读取自动生成的大文件开头的“导入头部”：文档字符串、导入语句、可能包含导入的 try/if 语句，以及夹在导入之间的
+    少量短语句 (例如 protobuf 生成代码中两组导入之间的 "_sym_db = ...")。连续 trailing_statements 条语句中没有导入，
+    或单行、单条语句超过长度限制 (巨大的字节串/字典字面量) 时停止，之后的内容不会被读取。
+    每次最多读取一行 (且不超过行长度限制)，内存占用与文件大小无关。
+
+    Returns:
+        bytes: 由完整的顶层语句组成的头部源码 (可以直接交给 ast.parse)，行号与原文件一致。
+
+    Raises:
+        OSError: 文件无法读取。
+    """
+    limits = _LARGE_SOURCE_LIMITS["header"]
+    header_lines = []
+    read_state = {"total_bytes": 0, "statement_bytes": 0}
+    header_row_count = 0 # 头部包含的行数 (到最后一条已结束的头部语句为止)
+
+    with open(source_path, "rb") as f:
+        def _read_limited_line() -> bytes:
+            line = f.readline(limits["line"])
+            read_state["total_bytes"] += len(line)
+            read_state["statement_bytes"] += len(line)
+            if ((len(line) >= limits["line"] and not line.endswith(b"\n"))
+                    or read_state["statement_bytes"] > limits["statement"] or read_state["total_bytes"] > limits["total"]):
+                raise _ImportHeaderEnd()
+            header_lines.append(line)
+            return line
+
+        indent_depth, at_statement_start = 0, True
+        previous_statement_is_header, trailing_statement_count = False, 0
+        try:
+            for token in tokenize.tokenize(_read_limited_line):
+                if token.type in (tokenize.ENCODING, tokenize.NL, tokenize.COMMENT):
+                    continue
+                if token.type == tokenize.INDENT:
+                    indent_depth += 1
+                elif token.type == tokenize.DEDENT:
+                    indent_depth -= 1
+                elif token.type == tokenize.NEWLINE:
+                    at_statement_start = True
+                elif token.type == tokenize.ENDMARKER: # 整个文件都读完了
+                    header_row_count = len(header_lines) if previous_statement_is_header else header_row_count
+                    break
+                elif at_statement_start:
+                    at_statement_start = False
+                    if indent_depth != 0 or (token.type == tokenize.NAME and token.string in _COMPOUND_CONTINUATION_KEYWORDS):
+                        continue
+                    # 新的顶层语句开始时，之前的语句 (包括复合语句的语句体) 都已完整
+                    read_state["statement_bytes"] = len(header_lines[-1])
+                    if previous_statement_is_header:
+                        header_row_count = token.start[0] - 1
+                    previous_statement_is_header = token.type == tokenize.STRING or (token.type == tokenize.NAME and token.string in _IMPORT_HEADER_KEYWORDS)
+                    trailing_statement_count = 0 if previous_statement_is_header else trailing_statement_count + 1
+                    if trailing_statement_count > limits["trailing_statements"]:
+                        break
+        except _ImportHeaderEnd:
+            # 超长的行之前的语句通常已经结束 (例如 protobuf 中紧跟在导入后面的 DESCRIPTOR = ...AddSerializedFile(b'...'))
+            if at_statement_start and previous_statement_is_header:
+                try:
+                    ast.parse(b"".join(header_lines))
+                    header_row_count = len(header_lines)
+                except SyntaxError:
+                    pass
+        except (tokenize.TokenError, SyntaxError): # 头部之后的内容无法分词
+            pass
+    return b"".join(header_lines[:header_row_count])
+
+
+def _iter_parsed_source_chunks(source_path: Path, stream_state: dict):
+    """
+    分块读取并解析大文件，内存占用只取决于块的大小。在“可能的顶层语句边界” (行首不是空白、注释、右括号或 except/else 等子句，
+    且不在三引号字符串中) 累积到约 chunk 字节时解析已读取的行；边界判断有误 (实际在字符串或括号中) 时解析失败，继续累积，
+    等长度加倍后再试。单行超过长度限制，或块超过 max_chunk (巨大的数据字面量) 时，解析到最后一个可能的边界为止，之后的内容不再读取。
+
+    Args:
+        source_path (Path): 源文件路径。
+        stream_state (dict): 结束后 stream_state["complete"] 表示是否解析了全部内容。
+
+    Yields:
+        tuple[ast.Module, int, bytes]: (语法树 (行号与原文件一致), 块的第一行行号, 块的源码)。
+
+    Raises:
+        OSError: 文件无法读取。
+        SyntaxError: 文件末尾的语句有语法错误。
+    """
+    limits = _LARGE_SOURCE_LIMITS["full"]
+    stream_state["complete"] = False
+    with open(source_path, "rb") as f:
+        source_encoding, _ = tokenize.detect_encoding(f.readline)
+        f.seek(0)
+        pending_lines, pending_bytes, first_row = [], 0, 1
+        next_attempt_bytes, last_boundary_index, open_triple_quote = limits["chunk"], 0, None
+
+        def _parse_pending_lines(line_count: int) -> tuple:
+            chunk_bytes = b"".join(pending_lines[:line_count]) # 块前补空行，使行号与原文件一致 (utf-8-sig 解码时会去掉 BOM)
+            return ast.parse("\n" * (first_row - 1) + chunk_bytes.decode(source_encoding), filename=str(source_path)), chunk_bytes
+
+        def _try_parse_pending_lines(line_count: int) -> tuple | None:
+            try:
+                return _parse_pending_lines(line_count)
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                return None
+
+        while True:
+            line = f.readline(limits["line"])
+            if not line: # 文件末尾：剩余的行必须能够解析，否则是真正的语法错误
+                if pending_lines:
+                    chunk_tree, chunk_bytes = _parse_pending_lines(len(pending_lines))
+                    yield chunk_tree, first_row, chunk_bytes
+                stream_state["complete"] = True
+                return
+            line_too_long = len(line) >= limits["line"] and not line.endswith(b"\n") # 例如一行几十 MB 的字节串
+            is_boundary = (open_triple_quote is None and line[:1] not in b" \t\r\n#)]}" and not line.startswith(_COMPOUND_CONTINUATION_PREFIXES)
+                           and not (pending_lines and pending_lines[-1].startswith(b"@"))) # 装饰器与其后的 def/class 是同一条语句
+            if pending_lines and (line_too_long or (is_boundary and pending_bytes >= next_attempt_bytes)):
+                parsed_chunk = _try_parse_pending_lines(len(pending_lines))
+                if parsed_chunk is not None:
+                    yield parsed_chunk[0], first_row, parsed_chunk[1]
+                    first_row += len(pending_lines)
+                    pending_lines, pending_bytes, next_attempt_bytes, last_boundary_index = [], 0, limits["chunk"], 0
+                else:
+                    next_attempt_bytes = pending_bytes * 2
+            if line_too_long or pending_bytes + len(line) > limits["max_chunk"]:
+                # 停止读取；能解析的话，保留到最后一个可能的语句边界为止的内容 (例如巨大字面量之前的导入)
+                parsed_chunk = _try_parse_pending_lines(last_boundary_index) if last_boundary_index else None
+                if parsed_chunk is not None:
+                    yield parsed_chunk[0], first_row, parsed_chunk[1]
+                return
+            if is_boundary and pending_lines:
+                last_boundary_index = len(pending_lines)
+            pending_lines.append(line)
+            pending_bytes += len(line)
+            open_triple_quote = _track_triple_quote(line, open_triple_quote)
+
+
+def _track_triple_quote(line: bytes, open_triple_quote: bytes | None) -> bytes | None:
+    """返回读完这一行后仍未关闭的三引号 (b'\"\"\"' 或 b"'''")，不考虑转义和注释 (边界判断有误时由 ast.parse 发现)。"""
+    if b'"""' not in line and b"'''" not in line:
+        return open_triple_quote
+    search_position = 0
+    while True:
+        if open_triple_quote is not None:
+            close_position = line.find(open_triple_quote, search_position)
+            if close_position < 0:
+                return open_triple_quote
+            open_triple_quote, search_position = None, close_position + 3
+        else:
+            open_positions = [(line.find(quote, search_position), quote) for quote in (b'"""', b"'''")]
+            open_positions = [(position, quote) for position, quote in open_positions if position >= 0]
+            if not open_positions:
+                return None
+            open_position, open_triple_quote = min(open_positions)
+            search_position = open_position + 3
+
+
+def parse_source_imports(source_path: Path, analysis_cache=None) -> dict:
+    """
+    解析源文件一次，同时提取导入语句 (包括函数体、类体等嵌套位置) 和动态导入。结果只取决于源码内容，不涉及模块的查找，
+    因此可以按源码哈希缓存，并由依赖扫描、依赖图和排除模块推荐等分析器共享。
+    超过 LARGE_SOURCE_FILE_BYTES 的文件 (通常是 protobuf、Qt 资源等生成代码) 不整体读入内存，见 _parse_large_source_imports。
+
+    Args:
+        source_path (Path): 源文件路径。
+        analysis_cache (SharedAnalysisCache, optional): 共享缓存；命中时不再解析源码。
+
+    Returns:
+        dict: {"imports": 导入语句记录, "dynamic": 动态导入记录, "partial": 是否只解析了文件的一部分 (大文件的导入头部等),
+               "generated": 自动生成标记所在的行 (见 find_generated_file_marker)，不是生成的文件时为 None}。
+            导入语句记录为 [module, level, names, optional]：
+                module   - "import a.b" 时为 "a.b"；"from x import y" 时为 "x" ("from . import y" 时为 None)
+                level    - 相对导入的层级 (绝对导入为 0)
+                names    - from 导入的名称列表；import 语句为 None
+                optional - 是否位于 try/except ImportError 或 if TYPE_CHECKING 中
+            动态导入记录为 [module, line, kind, confidence, detail] (见 _collect_dynamic_imports)。
+
+    Raises:
+        OSError, SyntaxError, ValueError: 文件无法读取或解析 (解析失败的结果不会被缓存)。
+    """
+    if os.path.getsize(source_path) > LARGE_SOURCE_FILE_BYTES:
+        return _parse_large_source_imports(source_path, analysis_cache)
+    with open(source_path, "rb") as f:
+        source_bytes = f.read()
+    cache_key = analysis_cache.make_key("source-imports", source_bytes) if analysis_cache is not None else None
+    if cache_key is not None:
+        cached_result = analysis_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+    syntax_tree = ast.parse(source_bytes, filename=str(source_path))
+    parse_result = {"imports": [], "dynamic": [], "partial": False, "generated": find_generated_file_marker(source_bytes[:8192])}
+    _collect_import_statements(syntax_tree.body, False, parse_result["imports"])
+    marker_lines = _find_marker_lines(source_bytes)
+    if marker_lines:
+        _collect_dynamic_imports(syntax_tree, marker_lines, parse_result["dynamic"])
+    if cache_key is not None:
+        analysis_cache.put(cache_key, parse_result)
+    return parse_result
+
+
+def _parse_large_source_imports(source_path: Path, analysis_cache=None) -> dict:
+    """
+    parse_source_imports 对大文件的处理，内存占用与文件大小无关：带自动生成标记的文件只解析流式读取的导入头部 (见 _read_import_header)，
+    只需几毫秒，不使用缓存；其他文件按顶层语句分块解析全部内容 (见 _iter_parsed_source_chunks)，按分块计算的内容哈希缓存。
+    """
+    generated_marker = read_generated_file_marker(source_path)
+    cache_key = None
+    if analysis_cache is not None and generated_marker is None:
+        cache_key = analysis_cache.make_file_key("source-imports:streamed", source_path)
+        cached_result = analysis_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+    parse_result = {"imports": [], "dynamic": [], "partial": True, "generated": generated_marker}
+    if generated_marker is not None:
+        header_bytes = _read_import_header(source_path)
+        parsed_chunks = [(ast.parse(header_bytes, filename=str(source_path)), 1, header_bytes)]
+        stream_state = {"complete": False}
+    else:
+        stream_state = {}
+        parsed_chunks = _iter_parsed_source_chunks(source_path, stream_state)
+    for chunk_tree, first_row, chunk_bytes in parsed_chunks:
+        _collect_import_statements(chunk_tree.body, False, parse_result["imports"])
+        marker_lines = [line_number + first_row - 1 for line_number in _find_marker_lines(chunk_bytes)]
+        if marker_lines:
+            _collect_dynamic_imports(chunk_tree, marker_lines, parse_result["dynamic"])
+    parse_result["partial"] = not stream_state["complete"]
+    if cache_key is not None:
+        analysis_cache.put(cache_key, parse_result)
+    return parse_result
+
+
+def parse_import_statements(source_path: Path, analysis_cache=None) -> list[list]:
+    """
+    返回源文件中的全部导入语句记录 (格式见 parse_source_imports)。
+
+    Raises:
+        OSError, SyntaxError, ValueError: 文件无法读取或解析。
+    """
+    return parse_source_imports(source_path, analysis_cache)["imports"]
+
+
+# --------------------------------------------------------------------------
+#  SharedAnalysisCache: 同一项目各配置共享的源码分析缓存
+# --------------------------------------------------------------------------
+class SharedAnalysisCache:
+    """
+    项目级的源码分析结果缓存，同一项目的多个配置 (不同应用名/输出目录) 共用。
+    缓存键为 分析类型 + 解释器标签 (sys.implementation.cache_tag) + 源码内容的 SHA-256，
+    因此文件内容未变时无论路径、mtime 或由哪个配置触发都能命中；解释器升级后自动失效。
+    每个条目是一个 JSON 文件，索引 (大小、最后访问时间) 保存在 index.json 中；
+    总大小超过上限时按最近最少使用 (LRU) 的顺序淘汰。
+    """
+    FORMAT_VERSION = 1
+    INDEX_FILE_NAME = "index.json"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 128 * 1024 * 1024, logger_func=None):
+        """
+        Args:
+            cache_dir (Path): 缓存目录 (不存在时在首次写入时创建)。
+            max_bytes (int): 缓存条目的总大小上限。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.logger = logger_func if logger_func else print
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = None # {键: [字节数, 最后访问时间]}，首次使用时加载
+        self._total_bytes = 0
+        self._evicted_keys = set()
+        self._index_dirty = False
+
+    def make_key(self, analysis_kind: str, source_bytes: bytes) -> str:
+        """由分析类型、解释器标签和源码内容计算缓存键。"""
+        key_hash = hashlib.sha256(f"{analysis_kind}:{self.FORMAT_VERSION}:{sys.implementation.cache_tag}:".encode())
+        key_hash.update(source_bytes)
+        return key_hash.hexdigest()
+
+    def make_file_key(self, analysis_kind: str, file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+        """
+        与 make_key(analysis_kind, 文件内容) 相同，但分块读取文件，不把大文件整体读入内存。
+
+        Raises:
+            OSError: 文件无法读取。
+        """
+        key_hash = hashlib.sha256(f"{analysis_kind}:{self.FORMAT_VERSION}:{sys.implementation.cache_tag}:".encode())
+        with open(file_path, "rb") as f:
+            for file_chunk in iter(lambda: f.read(chunk_size), b""):
+                key_hash.update(file_chunk)
+        return key_hash.hexdigest()
+
+    def get(self, cache_key: str):
+        """读取缓存条目；未命中或条目已损坏时返回 None。"""
+        with self._lock:
+            self._ensure_index_loaded()
+            if cache_key not in self._index:
+                self.misses += 1
+                return None
+        try:
+            with open(self._entry_path(cache_key), "r", encoding="utf-8") as f:
+                cached_value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop_entry(cache_key)
+                self.misses += 1
+            return None
+        with self._lock:
+            if cache_key in self._index:
+                self._index[cache_key][1] = time.time()
+                self._index_dirty = True
+            self.hits += 1
+        return cached_value
+
+    def put(self, cache_key: str, value):
+        """写入缓存条目 (先写临时文件再替换，多个进程同时写入同一条目也是安全的)，必要时淘汰旧条目。"""
+        serialized_value = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry_path = self._entry_path(cache_key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temporary_path.write_bytes(serialized_value)
+            os.replace(temporary_path, entry_path)
+        except OSError as e_write:
+            self.logger(f"[分析缓存] 写入缓存条目失败: {e_write}", "DEBUG")
+            return
+        with self._lock:
+            self._ensure_index_loaded()
+            previous_entry = self._index.get(cache_key)
+            if previous_entry:
+                self._total_bytes -= previous_entry[0]
+            self._index[cache_key] = [len(serialized_value), time.time()]
+            self._total_bytes += len(serialized_value)
+            self._evicted_keys.discard(cache_key)
+            self._index_dirty = True
+            if self._total_bytes > self.max_bytes:
+                self._evict_least_recently_used(int(self.max_bytes * 0.9)) # 留出余量，避免每次写入都触发淘汰
+
+    def flush(self):
+        """
+        将索引写回磁盘。写入前与磁盘上的索引合并 (其他配置的构建可能同时使用了该缓存)，
+        最后访问时间取两者中较新的一个。
+        """
+        with self._lock:
+            if not self._index_dirty:
+                return
+            for cache_key, (entry_bytes, last_access) in self._read_index_file().items():
+                if cache_key in self._evicted_keys:
+                    continue
+                if cache_key not in self._index:
+                    if self._entry_path(cache_key).is_file():
+                        self._index[cache_key] = [entry_bytes, last_access]
+                        self._total_bytes += entry_bytes
+                elif last_access > self._index[cache_key][1]:
+                    self._index[cache_key][1] = last_access
+            if self._total_bytes > self.max_bytes:
+                self._evict_least_recently_used(int(self.max_bytes * 0.9))
+            index_path = self.cache_dir / self.INDEX_FILE_NAME
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                temporary_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+                temporary_path.write_text(json.dumps({"version": self.FORMAT_VERSION, "entries": self._index}), encoding="utf-8")
+                os.replace(temporary_path, index_path)
+                self._index_dirty = False
+                self._evicted_keys.clear()
+            except OSError as e_write:
+                self.logger(f"[分析缓存] 保存缓存索引失败: {e_write}", "DEBUG")
+
+    def stats(self) -> dict:
+        """返回 {"entries", "total_bytes", "hits", "misses"}。"""
+        with self._lock:
+            self._ensure_index_loaded()
+            return {"entries": len(self._index), "total_bytes": self._total_bytes, "hits": self.hits, "misses": self.misses}
+
+    def _entry_path(self, cache_key: str) -> Path:
+        return self.cache_dir / "entries" / cache_key[:2] / f"{cache_key}.json"
+
+    def _read_index_file(self) -> dict:
+        try:
+            with open(self.cache_dir / self.INDEX_FILE_NAME, "r", encoding="utf-8") as f:
+                index_data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index_data, dict) or index_data.get("version") != self.FORMAT_VERSION:
+            return {}
+        return {cache_key: list(entry) for cache_key, entry in index_data.get("entries", {}).items()}
+
+    def _ensure_index_loaded(self):
+        """(需持有锁) 首次使用时从磁盘加载索引。"""
+        if self._index is None:
+            self._index = self._read_index_file()
+            self._total_bytes = sum(entry[0] for entry in self._index.values())
+
+    def _drop_entry(self, cache_key: str):
+        """(需持有锁) 从索引中移除条目并删除其文件。"""
+        removed_entry = self._index.pop(cache_key, None)
+        if removed_entry:
+            self._total_bytes -= removed_entry[0]
+        self._evicted_keys.add(cache_key)
+        self._index_dirty = True
+        try:
+            self._entry_path(cache_key).unlink()
+        except OSError:
+            pass
+
+    def _evict_least_recently_used(self, target_bytes: int):
+        """(需持有锁) 按最后访问时间从旧到新淘汰条目，直到总大小不超过 target_bytes。"""
+        evicted_count = 0
+        for cache_key in sorted(self._index, key=lambda key: self._index[key][1]):
+            if self._total_bytes <= target_bytes:
+                break
+            self._drop_entry(cache_key)
+            evicted_count += 1
+        self.logger(f"[分析缓存] 缓存超过 {format_byte_size(self.max_bytes)} 上限，已淘汰 {evicted_count} 个最久未使用的条目。", "DEBUG")
+
+
+# --------------------------------------------------------------------------
+#  DeclaredDependencyReader: 读取依赖清单中声明的第三方依赖
+# --------------------------------------------------------------------------
+class DeclaredDependencyReader:
+    """
+    从项目的依赖清单中读取声明的第三方依赖 (发行包名)，并映射为导入名 (例如 PyYAML → yaml)：
+      - pyproject.toml：[project] 的 dependencies / optional-dependencies、[dependency-groups]、[tool.poetry] 的各组依赖 (需要 tomllib)；
+      - Pipfile：[packages] / [dev-packages]；
+      - requirements*.txt / requirements*.in / requirements/ 目录中的文件 (跟随 -r 引用)；
+      - 锁定文件 poetry.lock、uv.lock、pdm.lock、Pipfile.lock：其中包含间接依赖，只用来判断模块是否“已声明”。
+    只读取项目根目录及其下两层目录中的清单，不解析源码，大型项目中也只需几十毫秒。
+    """
+    MANIFEST_FILE_PATTERNS = ("pyproject.toml", "Pipfile", "requirements*.txt", "requirements*.in", "requirements.lock")
+    LOCKFILE_NAMES = ("poetry.lock", "uv.lock", "pdm.lock", "Pipfile.lock")
+    MAX_MANIFEST_DEPTH = 2 # monorepo 中各子项目的清单通常位于 <根目录>/<子项目>/ 或 <根目录>/packages/<子项目>/
+    DECLARATION_KIND_LABELS = {"runtime": "运行时", "optional": "可选", "dev": "开发", "locked": "锁定"}
+    DEV_NAME_TOKENS = {"dev", "develop", "test", "tests", "testing", "doc", "docs", "lint", "ci", "typing", "build"} # requirements 文件名中表示开发依赖的部分
+    REQUIREMENT_NAME_PATTERN = re.compile(r"^([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:$|[\[<>=!~;@(,\s])")
+    # 常见的发行包名与导入名不一致的包 (发行包未安装在构建用解释器中时使用)
+    KNOWN_IMPORT_NAMES = {
+        "pillow": ["PIL"], "pyyaml": ["yaml"], "beautifulsoup4": ["bs4"], "scikit-learn": ["sklearn"], "scikit-image": ["skimage"],
+        "opencv-python": ["cv2"], "opencv-python-headless": ["cv2"], "opencv-contrib-python": ["cv2"], "python-dateutil": ["dateutil"],
+        "python-dotenv": ["dotenv"], "pywin32": ["win32api", "win32con", "win32com", "pythoncom", "pywintypes"], "pyserial": ["serial"],
+        "pyzmq": ["zmq"], "attrs": ["attr", "attrs"], "protobuf": ["google"], "psycopg2-binary": ["psycopg2"], "psycopg-binary": ["psycopg"],
+        "pyjwt": ["jwt"], "pycryptodome": ["Crypto"], "pycryptodomex": ["Cryptodome"], "pyopenssl": ["OpenSSL"], "dnspython": ["dns"],
+        "python-magic": ["magic"], "typing-extensions": ["typing_extensions"], "setuptools": ["setuptools", "pkg_resources"],
+        "pymupdf": ["fitz"], "python-docx": ["docx"], "python-pptx": ["pptx"], "msgpack-python": ["msgpack"], "pyqt5": ["PyQt5"],
+        "pyqt6": ["PyQt6"], "pyside6": ["PySide6"], "wxpython": ["wx"], "mysqlclient": ["MySQLdb"], "pyusb": ["usb"], "pygobject": ["gi"],
+        "google-api-python-client": ["googleapiclient"], "faiss-cpu": ["faiss"], "tensorflow-cpu": ["tensorflow"], "ruamel-yaml": ["ruamel"],
+    }
+
+    def __init__(self, project_root_path: Path, distribution_import_names: dict | None = None, logger_func=None):
+        """
+        Args:
+            project_root_path (Path): 项目根目录。
+            distribution_import_names (dict, optional): {规范化的发行包名: [顶层导入名, ...]}，即构建用解释器中已安装的包
+                                                        (见 InterpreterRegistry 的 "distribution_modules")；为 None 时读取运行本程序的解释器。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.project_root = Path(project_root_path).resolve()
+        self.logger = logger_func if logger_func else print
+        if distribution_import_names is None:
+            distribution_import_names = {}
+            try:
+                for import_name, distribution_names in importlib.metadata.packages_distributions().items(): # Python 3.10+
+                    for distribution_name in distribution_names:
+                        distribution_import_names.setdefault(self.normalize_distribution_name(distribution_name), []).append(import_name)
+            except AttributeError:
+                pass
+        self.distribution_import_names = distribution_import_names
+        self.manifest_paths = [] # 读取过的清单文件
+        self.project_names = set() # 清单所属项目自身的名称 (pyproject.toml 的 [project].name 等)，不属于外部依赖
+
+    @staticmethod
+    def normalize_distribution_name(distribution_name: str) -> str:
+        """按 PEP 503 规范化发行包名 (例如 "Foo_Bar.baz" → "foo-bar-baz")。"""
+        return re.sub(r"[-_.]+", "-", distribution_name).lower()
+
+    def import_names_for(self, distribution_name: str) -> tuple[list[str], str]:
+        """
+        返回发行包提供的顶层导入名。
+
+        Returns:
+            tuple[list[str], str]: (导入名列表, 来源)；来源为 "installed" (读取自已安装包的元数据)、
+                                   "known" (内置对照表) 或 "guess" (按包名推测，例如 "foo-bar" → "foo_bar")。
+        """
+        normalized_name = self.normalize_distribution_name(distribution_name)
+        if self.distribution_import_names.get(normalized_name):
+            return sorted(set(self.distribution_import_names[normalized_name])), "installed"
+        if normalized_name in self.KNOWN_IMPORT_NAMES:
+            return list(self.KNOWN_IMPORT_NAMES[normalized_name]), "known"
+        return [normalized_name.replace("-", "_")], "guess"
+
+    def find_manifests(self) -> list[Path]:
+        """查找项目根目录及其下 MAX_MANIFEST_DEPTH 层目录中的依赖清单和锁定文件 (跳过隐藏目录、虚拟环境和构建输出)。"""
+        manifest_paths, pending_dirs = [], [(self.project_root, 0)]
+        while pending_dirs:
+            current_dir, depth = pending_dirs.pop(0)
+            try: # 每个目录只列出一次
+                dir_entries = sorted(os.scandir(current_dir), key=lambda entry: entry.name)
+            except OSError:
+                continue
+            for dir_entry in dir_entries:
+                if dir_entry.is_file():
+                    if any(fnmatch.fnmatchcase(dir_entry.name, file_pattern) for file_pattern in self.MANIFEST_FILE_PATTERNS + self.LOCKFILE_NAMES):
+                        manifest_paths.append(Path(dir_entry.path))
+                elif not dir_entry.is_dir(follow_symlinks=False):
+                    continue
+                elif dir_entry.name == "requirements": # requirements/base.txt、requirements/dev.txt ...
+                    manifest_paths.extend(sorted(path for path in Path(dir_entry.path).iterdir() if path.suffix in (".txt", ".in") and path.is_file()))
+                elif depth < self.MAX_MANIFEST_DEPTH and not dir_entry.name.startswith(".") and dir_entry.name.lower() not in DependencyScanner.IGNORE_DIR_KEYWORDS:
+                    pending_dirs.append((Path(dir_entry.path), depth + 1))
+        return manifest_paths
+
+    def read(self) -> dict:
+        """
+        读取全部清单。
+
+        Returns:
+            dict: {规范化的发行包名: {"name": 清单中写的包名, "kinds": 声明类型集合, "sources": [清单相对路径, ...]}}；
+                  声明类型为 "runtime" (运行时依赖)、"optional" (extras)、"dev" (开发/测试依赖组) 或 "locked" (只出现在锁定文件中)。
+        """
+        declared = {}
+        self.manifest_paths = self.find_manifests()
+        for manifest_path in self.manifest_paths:
+            relative_path = manifest_path.relative_to(self.project_root).as_posix()
+            try:
+                for distribution_name, declaration_kind in self._read_manifest(manifest_path):
+                    declared_entry = declared.setdefault(self.normalize_distribution_name(distribution_name), {"name": distribution_name, "kinds": set(), "sources": []})
+                    declared_entry["kinds"].add(declaration_kind)
+                    if relative_path not in declared_entry["sources"]:
+                        declared_entry["sources"].append(relative_path)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e_manifest: # 清单格式错误时跳过该文件
+                self.logger(f"[依赖清单] 无法读取 {relative_path}: {e_manifest}", "WARNING")
+        for project_name in self.project_names:
+            declared.pop(self.normalize_distribution_name(project_name), None)
+        return declared
+
+    def _read_manifest(self, manifest_path: Path):
+        """按文件类型读取一个清单，逐个产生 (发行包名, 声明类型)。"""
+        if manifest_path.name == "Pipfile.lock":
+            lock_data = json.loads(manifest_path.read_text(encoding="utf-8"))
+            for section_name in ("default", "develop"):
+                yield from ((package_name, "locked") for package_name in lock_data.get(section_name, {}))
+        elif manifest_path.name in self.LOCKFILE_NAMES: # poetry.lock / uv.lock / pdm.lock: [[package]] name = "..."
+            yield from ((package_entry["name"], "locked") for package_entry in self._load_toml(manifest_path).get("package", []))
+        elif manifest_path.name == "pyproject.toml":
+            yield from self._read_pyproject(self._load_toml(manifest_path))
+        elif manifest_path.name == "Pipfile":
+            pipfile_data = self._load_toml(manifest_path)
+            yield from ((package_name, "runtime") for package_name in pipfile_data.get("packages", {}))
+            yield from ((package_name, "dev") for package_name in pipfile_data.get("dev-packages", {}))
+        else:
+            # pip-tools 由 requirements.in 生成的 requirements.txt 与 .lock 文件一样包含间接依赖
+            is_lockfile = manifest_path.suffix == ".lock" or (manifest_path.suffix == ".txt" and manifest_path.with_suffix(".in").is_file())
+            declaration_kind = "locked" if is_lockfile else "dev" if set(re.split(r"[-_.]+", manifest_path.stem.lower())) & self.DEV_NAME_TOKENS else "runtime"
+            yield from ((requirement_name, declaration_kind) for requirement_name in self._read_requirements_file(manifest_path))
+
+    def _read_pyproject(self, pyproject_data: dict):
+        """读取 pyproject.toml 中 PEP 621、PEP 735 与 Poetry 格式的依赖声明。"""
+        project_table = pyproject_data.get("project", {})
+        if project_table.get("name"):
+            self.project_names.add(project_table["name"])
+        yield from ((requirement_name, "runtime") for requirement_name in self._requirement_names(project_table.get("dependencies", [])))
+        for extra_requirements in project_table.get("optional-dependencies", {}).values():
+            yield from ((requirement_name, "optional") for requirement_name in self._requirement_names(extra_requirements))
+        for group_requirements in pyproject_data.get("dependency-groups", {}).values(): # 组中可能有 {include-group = "..."}，_requirement_names 会跳过
+            yield from ((requirement_name, "dev") for requirement_name in self._requirement_names(group_requirements))
+        poetry_table = pyproject_data.get("tool", {}).get("poetry", {})
+        if poetry_table.get("name"):
+            self.project_names.add(poetry_table["name"])
+        poetry_groups = [("runtime", poetry_table.get("dependencies", {})), ("dev", poetry_table.get("dev-dependencies", {}))]
+        poetry_groups.extend(("dev", group_table.get("dependencies", {})) for group_table in poetry_table.get("group", {}).values())
+        for declaration_kind, dependency_table in poetry_groups:
+            yield from ((package_name, declaration_kind) for package_name in dependency_table if package_name.lower() != "python")
+
+    def _read_requirements_file(self, requirements_path: Path) -> list[str]:
+        """读取 requirements 格式文件 (包括通过 -r 引用的文件) 中的包名；跳过选项、可编辑安装和直接写 URL/路径的条目。"""
+        requirement_names = []
+        for requirement_file in IsolatedBuildEnvironmentStore.read_requirement_files(requirements_path):
+            requirement_lines = requirement_file.read_text(encoding="utf-8", errors="replace").splitlines()
+            requirement_names.extend(self._requirement_names(line.split(" #", 1)[0].strip() for line in requirement_lines))
+        return requirement_names
+
+    def _requirement_names(self, requirement_strings) -> list[str]:
+        """从 PEP 508 依赖字符串中取出包名 (例如 "requests[socks]>=2.31; python_version>'3.8'" → "requests")。"""
+        requirement_names = []
+        for requirement_string in requirement_strings:
+            if not isinstance(requirement_string, str) or requirement_string.startswith(("-", "#")) or "://" in requirement_string.split("@", 1)[0]:
+                continue
+            name_match = self.REQUIREMENT_NAME_PATTERN.match(requirement_string.strip())
+            if name_match:
+                requirement_names.append(name_match.group(1))
+        return requirement_names
+
+    @staticmethod
+    def _load_toml(toml_path: Path) -> dict:
+        """
+        Raises:
+            ValueError: 当前 Python 没有 tomllib (3.11 以下)，或文件不是有效的 TOML。
+        """
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("读取 TOML 格式的清单需要 Python 3.11 及以上版本 (tomllib)。")
+        with open(toml_path, "rb") as f:
+            return tomllib.load(f)
+
 
 # --------------------------------------------------------------------------
 #  DependencyScanner 类的完整定义 
@@ -100,7 +1017,10 @@ class DependencyScanner:
     一个用于扫描Python项目文件以查找潜在外部依赖项（可能被PyInstaller遗漏）的类。
     它使用 ast 模块解析Python代码，提取导入语句，并进行过滤。
     """
-    def __init__(self, project_root_path: Path, existing_hidden_imports: list[str], logger_func=None):
+    BUILD_TOOL_DISTRIBUTIONS = {"pyinstaller", "pyinstaller-hooks-contrib", "pip", "setuptools", "wheel"} # 声明了但不会被导入的构建工具
+
+    def __init__(self, project_root_path: Path, existing_hidden_imports: list[str], logger_func=None, analysis_cache=None,
+                 stdlib_module_names=None, distribution_import_names=None, skip_generated_files: bool = False):
         """
         初始化扫描器。
 
@@ -110,13 +1030,32 @@ class DependencyScanner:
             logger_func (callable, optional): 用于记录日志的回调函数。
                                               如果为None，则默认使用 print。
                                               期望的函数签名: logger_func(message: str, level: str = "INFO")
+            analysis_cache (SharedAnalysisCache, optional): 共享分析缓存，内容未变的文件不再重新解析。
+            stdlib_module_names (iterable[str], optional): 构建用解释器的标准库模块列表 (见 InterpreterRegistry)；
+                                                           为 None 时使用运行本程序的解释器的列表。
+            distribution_import_names (dict, optional): 构建用解释器中已安装的发行包到导入名的映射 (只用于 scan_declared)；
+                                                        为 None 时读取运行本程序的解释器。
+            skip_generated_files (bool): 是否跳过带有自动生成标记的文件 (*_pb2.py、Qt 资源文件等，见 find_generated_file_marker)；
+                                         为 False 时仍然解析它们 (超过 LARGE_SOURCE_FILE_BYTES 的只解析导入头部)。
         """
         self.project_root = project_root_path.resolve() # 项目根目录的绝对路径
+        self.analysis_cache = analysis_cache
         self.existing_hidden_imports = set(existing_hidden_imports) # 已配置的隐藏导入 (集合去重)
         self.found_potential_dependencies = set() # 存储扫描到的潜在依赖 (集合去重)
+        self.dynamic_import_sites = [] # 动态导入位置 [{"module", "file", "line", "kind", "confidence", "detail"}]
+        self._static_module_names = set() # 以导入语句静态导入的完整模块名 (PyInstaller 能找到它们)
+        self.imported_third_party_modules = set() # 导入语句中的第三方顶层模块 (scan 的过滤阶段之后)
+        self.distribution_import_names = distribution_import_names
+        self.skip_generated_files = skip_generated_files
+        self.generated_files = [] # 带有自动生成标记的文件 [(相对路径, 标记所在的行), ...]
+        self.partially_parsed_files = [] # 只解析了一部分的大文件 (相对路径)
         self.logger = logger_func if logger_func else print # 日志记录函数
 
         # 获取Python标准库模块列表
+        if stdlib_module_names is not None:
+            self.std_lib_modules = frozenset(stdlib_module_names)
+            self.logger(f"[依赖扫描器] 使用构建用解释器的标准库列表 ({len(self.std_lib_modules)} 个模块)。", "DEBUG")
+            return
         try:
             self.std_lib_modules = sys.stdlib_module_names # Python 3.10+
             if self.logger and callable(self.logger):
@@ -169,44 +1108,41 @@ class DependencyScanner:
 
         return False # 如果以上都不是，则认为不是项目内部模块
 
-    def _extract_imports_from_file(self, file_path: Path):
+    def _extract_imports_from_file(self, file_path: Path) -> set[str]:
         """
-        解析单个Python文件，使用 ast 模块提取其中的导入语句，并识别潜在的外部依赖。
-        会将找到的依赖添加到 self.found_potential_dependencies 集合中。
+        解析单个Python文件，使用 ast 模块提取其中绝对导入的顶层模块名；
+        同一次解析中找到的动态导入 (import_module、__import__、框架配置字符串等) 记录到 self.dynamic_import_sites。
 
         Args:
             file_path (Path): 要解析的Python文件的路径。
+
+        Returns:
+            set[str]: 顶层模块名集合；文件无法解析时为空集合。
         """
+        imported_top_level_modules = set()
+        relative_file_path = file_path.relative_to(self.project_root).as_posix() if file_path.is_relative_to(self.project_root) else file_path.name
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f: # 以UTF-8编码读取
-                content = f.read()
-            tree = ast.parse(content, filename=str(file_path)) # 解析为抽象语法树
-
-            # 遍历AST中的所有节点
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import): # 处理 'import foo' 或 'import foo, bar.baz'
-                    for alias_node in node.names: # 遍历所有被导入的项 (ast.alias 对象)
-                        # alias_node.name 是导入的完整名称，如 'requests' 或 'my_package.sub_module'
-                        # 我们取其第一部分作为顶层模块名，如 'requests' 或 'my_package'
-                        top_level_module = alias_node.name.split('.')[0]
-
-                        # 进行过滤：非空、非标准库、非项目内部模块
-                        if top_level_module and \
-                           top_level_module not in self.std_lib_modules and \
-                           not self._is_project_module(top_level_module):
-                            self.found_potential_dependencies.add(top_level_module) # 添加到结果集
-
-                elif isinstance(node, ast.ImportFrom): # 处理 'from foo import bar' 或 'from foo.bar import baz'
-                    # node.module 是 'from' 后面的模块路径，如 'foo' 或 'foo.bar'
-                    # node.level > 0 表示是相对导入 (如 'from . import X')，我们只关心绝对导入 (level == 0)
-                    if node.module and node.level == 0:
-                        top_level_module = node.module.split('.')[0] # 取顶层模块名
-
-                        # 同样进行过滤
-                        if top_level_module and \
-                           top_level_module not in self.std_lib_modules and \
-                           not self._is_project_module(top_level_module):
-                            self.found_potential_dependencies.add(top_level_module)
+            if self.skip_generated_files: # 只读取文件开头查找标记，跳过的文件不解析
+                generated_marker = read_generated_file_marker(file_path)
+                if generated_marker is not None:
+                    self.generated_files.append((relative_file_path, generated_marker))
+                    return imported_top_level_modules
+            # 解析结果可能来自共享分析缓存；相对导入 (level > 0) 一定是项目内部模块，不予考虑
+            parse_result = parse_source_imports(file_path, self.analysis_cache)
+            if parse_result["generated"] is not None:
+                self.generated_files.append((relative_file_path, parse_result["generated"]))
+            elif parse_result["partial"]: # 自动生成的大文件本来就只解析导入头部，不另行提示
+                self.partially_parsed_files.append(relative_file_path)
+            for imported_module, import_level, _, _ in parse_result["imports"]:
+                if not imported_module or import_level != 0:
+                    continue
+                # 'import foo.bar' 与 'from foo.bar import baz' 都取第一部分作为顶层模块名
+                imported_top_level_modules.add(imported_module.split('.')[0])
+                self._static_module_names.add(imported_module)
+            if parse_result["dynamic"]:
+                self.dynamic_import_sites.extend(
+                    {"module": module_name, "file": relative_file_path, "line": line_number, "kind": kind, "confidence": confidence, "detail": detail}
+                    for module_name, line_number, kind, confidence, detail in parse_result["dynamic"])
 
         except SyntaxError as e: # 捕获Python语法错误
             if self.logger and callable(self.logger):
@@ -217,107 +1153,4832 @@ class DependencyScanner:
                 self.logger(f"[依赖扫描器] 处理文件 {file_path.name} 时发生未知错误: {e}", "ERROR")
                 import traceback # 导入traceback以获取详细堆栈
                 self.logger(traceback.format_exc(), "DEBUG") # 记录完整错误堆栈到DEBUG级别
+        return imported_top_level_modules
+
+    # 需要忽略的目录名或路径片段 (小写)
+    IGNORE_DIR_KEYWORDS = {
+        "site-packages", "dist-packages",       # Python包安装目录
+        "lib/python",                           # 标准库或虚拟环境的lib目录 (需要更精确判断)
+        ".git", ".hg", ".svn",                  # 版本控制系统目录
+        "__pycache__",                          # Python字节码缓存
+        ".pytest_cache", ".mypy_cache",         # 测试和类型检查工具的缓存
+        "node_modules",                         # Node.js 模块目录
+        "venv", "env", ".venv", ".env",         # 常见的虚拟环境目录名
+        "migrations",                           # Django/Alembic等数据库迁移目录
+        "tests", "test",                        # 测试代码目录
+        "docs", "doc",                          # 文档目录
+        "examples", "samples",                  # 示例代码目录
+        "build", "dist",                        # PyInstaller或setuptools的输出目录
+    }
+    # 需要忽略的文件名 (小写)
+    IGNORE_FILENAMES = {
+        "setup.py",                             # 项目打包脚本
+        "manage.py",                            # Django管理脚本
+        "conftest.py",                          # Pytest配置文件
+    }
+    # 需要忽略的文件名后缀 (小写)
+    IGNORE_FILENAME_SUFFIXES = (
+        "_test.py", "_tests.py",                # 测试文件名后缀
+        ".spec",                                # PyInstaller的spec文件
+    )
 
-
-    def scan(self) -> list[str]:
+    def discover_files(self) -> tuple[list[Path], int]:
         """
-        执行扫描操作。
-        递归查找项目根目录下的所有 `.py` 文件，对每个文件提取导入项，
-        最后返回一个去重、排序、且不包含已存在隐藏导入的潜在依赖项列表。
+        扫描的第一阶段 (发现)：递归查找项目根目录下的所有 `.py` 文件，
+        并按启发式规则跳过虚拟环境、缓存、测试、文档和构建输出等非项目代码。
 
         Returns:
-            list[str]: 排序后的潜在新依赖项模块名列表。
+            tuple[list[Path], int]: (需要解析的文件列表, 被跳过的文件数)。
         """
-        if self.logger and callable(self.logger):
-            self.logger(f"[依赖扫描器] 开始扫描项目根目录: {self.project_root}", "INFO")
-
-        processed_file_count = 0 # 记录已处理的文件数
+        files_to_parse = []
         skipped_file_count = 0   # 记录已跳过的文件数
 
-        # 递归查找项目根目录下的所有 .py 文件
         for py_file in self.project_root.rglob("*.py"):
-            # 应用启发式规则来跳过常见的非项目代码目录和文件
-            # (例如虚拟环境、缓存、测试文件、版本控制目录等)
-            path_str_lower = str(py_file).lower() # 路径转小写以便不区分大小写比较
             try:
                 relative_path_to_root = py_file.relative_to(self.project_root) # 获取相对于项目根的路径
                 relative_path_parts = relative_path_to_root.parts
             except ValueError: # 如果py_file不在project_root下（理论上rglob不会，但防御一下）
+                relative_path_to_root = py_file.name
                 relative_path_parts = py_file.parts
 
-
-            # 定义需要忽略的目录名或路径片段 (通常是小写)
-            ignore_dir_keywords = [
-                "site-packages", "dist-packages",       # Python包安装目录
-                "lib/python",                           # 标准库或虚拟环境的lib目录 (需要更精确判断)
-                ".git", ".hg", ".svn",                  # 版本控制系统目录
-                "__pycache__",                          # Python字节码缓存
-                ".pytest_cache", ".mypy_cache",         # 测试和类型检查工具的缓存
-                "node_modules",                         # Node.js 模块目录
-                "venv", "env", ".venv", ".env",         # 常见的虚拟环境目录名
-                "migrations",                           # Django/Alembic等数据库迁移目录
-                "tests", "test",                        # 测试代码目录
-                "docs", "doc",                          # 文档目录
-                "examples", "samples",                  # 示例代码目录
-                "build", "dist",                        # PyInstaller或setuptools的输出目录
-            ]
-            # 定义需要忽略的文件名 (通常是小写)
-            ignore_filenames = [
-                "setup.py",                             # 项目打包脚本
-                "manage.py",                            # Django管理脚本
-                "conftest.py",                          # Pytest配置文件
-            ]
-            # 定义需要忽略的文件名后缀 (通常是小写)
-            ignore_filename_suffixes = [
-                "_test.py", "_tests.py",                # 测试文件名后缀
-                ".spec",                                # PyInstaller的spec文件
-            ]
-
             should_skip = False
             # 1. 检查路径中是否包含忽略的目录关键字 (检查相对路径的每个部分)
-            for part in relative_path_parts:
-                if part.lower() in ignore_dir_keywords:
+            for part_index, part in enumerate(relative_path_parts):
+                if part.lower() in self.IGNORE_DIR_KEYWORDS:
                     should_skip = True
                     break
                 # 检查是否是隐藏目录 (以点开头，但不是 "." 或 "..")
                 if part.startswith(".") and len(part) > 1:
                     # 确保这个以点开头的路径部分确实对应一个目录
-                    if (self.project_root / Path(*relative_path_parts[:relative_path_parts.index(part)+1])).is_dir():
+                    if (self.project_root / Path(*relative_path_parts[:part_index + 1])).is_dir():
                         should_skip = True
                         break
-            
+
             if not should_skip:
-                # 2. 检查文件名是否完全匹配忽略列表
-                if py_file.name.lower() in ignore_filenames:
-                    should_skip = True
-                # 3. 检查文件名是否以忽略的后缀结尾
-                if not should_skip:
-                    for suffix in ignore_filename_suffixes:
-                        if py_file.name.lower().endswith(suffix):
-                            should_skip = True
-                            break
-            
+                # 2. 检查文件名是否完全匹配忽略列表，3. 检查文件名是否以忽略的后缀结尾
+                file_name_lower = py_file.name.lower()
+                should_skip = file_name_lower in self.IGNORE_FILENAMES or file_name_lower.endswith(self.IGNORE_FILENAME_SUFFIXES)
+
             # 如果根据规则应该跳过此文件
             if should_skip:
                 if self.logger and callable(self.logger):
-                    self.logger(f"[依赖扫描器] 跳过文件 (基于启发式规则): {relative_path_to_root if 'relative_path_to_root' in locals() else py_file.name}", "DEBUG")
+                    self.logger(f"[依赖扫描器] 跳过文件 (基于启发式规则): {relative_path_to_root}", "DEBUG")
                 skipped_file_count += 1
                 continue # 继续处理下一个文件
+            files_to_parse.append(py_file)
+        return files_to_parse, skipped_file_count
+
+    def parse_files(self, file_paths: list[Path]) -> set[str]:
+        """
+        扫描的第二阶段 (解析)：逐个解析文件，汇总全部绝对导入的顶层模块名。
+
+        Returns:
+            set[str]: 顶层模块名集合 (尚未过滤)。
+        """
+        imported_top_level_modules = set()
+        for py_file in file_paths:
+            if self.logger and callable(self.logger):
+                self.logger(f"[依赖扫描器] 正在处理文件: {py_file.relative_to(self.project_root) if py_file.is_relative_to(self.project_root) else py_file.name}", "DEBUG")
+            imported_top_level_modules.update(self._extract_imports_from_file(py_file)) # 解析文件并提取导入
+        return imported_top_level_modules
+
+    def filter_dependencies(self, module_names: set[str]) -> set[str]:
+        """
+        扫描的第三阶段 (过滤)：去掉标准库模块和项目内部模块，剩下的即潜在外部依赖。
+        每个模块名只检查一次 (项目内部模块的判断需要访问文件系统)。
+
+        Returns:
+            set[str]: 潜在外部依赖的顶层模块名集合。
+        """
+        return {module_name for module_name in module_names
+                if module_name and module_name not in self.std_lib_modules and not self._is_project_module(module_name)}
+
+    def dynamic_import_candidates(self) -> dict:
+        """
+        从动态导入位置中挑出可以直接加入隐藏导入的模块：模块名已确定 (置信度为高或中)，
+        不是子模块枚举/入口点 (这两类需要收集整个包或依赖包元数据)，且没有被导入语句静态导入过。
+        与静态导入不同，项目内部模块和标准库模块也会保留 (PyInstaller 同样找不到它们)。
+
+        Returns:
+            dict: {完整模块名: 第一个导入位置的记录}
+        """
+        candidates = {}
+        for import_site in self.dynamic_import_sites:
+            module_name = import_site["module"]
+            if (module_name and import_site["confidence"] in ("high", "medium") and import_site["kind"] not in ("pkgutil", "entry_points")
+                    and module_name not in self._static_module_names and module_name not in candidates):
+                candidates[module_name] = import_site
+        return candidates
+
+    def _log_generated_and_partial_files(self, max_logged_files: int = 10):
+        """在日志中汇总自动生成的文件 (已跳过或只解析了导入头部) 和只解析了一部分的大文件。"""
+        if self.generated_files:
+            generated_action = "已跳过" if self.skip_generated_files else "已解析 (大文件只解析导入头部)"
+            self.logger(f"🏭 [依赖扫描器] {len(self.generated_files)} 个自动生成的文件{generated_action}:", "INFO")
+            for relative_file_path, generated_marker in self.generated_files[:max_logged_files]:
+                self.logger(f"    {relative_file_path}  ({generated_marker[:80]})", "INFO")
+            if len(self.generated_files) > max_logged_files:
+                self.logger(f"    ... 另有 {len(self.generated_files) - max_logged_files} 个", "INFO")
+        if self.partially_parsed_files:
+            self.logger(f"✂️ [依赖扫描器] {len(self.partially_parsed_files)} 个大文件只解析了一部分 (超长的行或巨大的字面量之后的导入可能被遗漏):", "WARNING")
+            for relative_file_path in self.partially_parsed_files[:max_logged_files]:
+                self.logger(f"    {relative_file_path}", "WARNING")
+            if len(self.partially_parsed_files) > max_logged_files:
+                self.logger(f"    ... 另有 {len(self.partially_parsed_files) - max_logged_files} 个", "WARNING")
+
+    def _log_dynamic_import_sites(self, max_logged_sites: int = 50):
+        """在日志中列出动态导入位置 (按置信度从高到低)。"""
+        if not self.dynamic_import_sites:
+            return
+        confidence_order = {"high": 0, "medium": 1, "low": 2}
+        confidence_counts = Counter(import_site["confidence"] for import_site in self.dynamic_import_sites)
+        self.logger(f"[依赖扫描器] 发现 {len(self.dynamic_import_sites)} 处动态导入 (置信度 高 {confidence_counts['high']} / "
+                    f"中 {confidence_counts['medium']} / 低 {confidence_counts['low']})，PyInstaller 无法自动分析这些导入:", "INFO")
+        sorted_sites = sorted(self.dynamic_import_sites, key=lambda site: (confidence_order[site["confidence"]], site["file"], site["line"]))
+        for import_site in sorted_sites[:max_logged_sites]:
+            self.logger(f"    {import_site['file']}:{import_site['line']}  [{DYNAMIC_IMPORT_CONFIDENCE_LABELS[import_site['confidence']]}] "
+                        f"{import_site['kind']} → {import_site['module'] or '?'}"
+                        + (f"  ({import_site['detail']})" if import_site["detail"] != import_site["module"] else ""), "INFO")
+        if len(sorted_sites) > max_logged_sites:
+            self.logger(f"    ... 其余 {len(sorted_sites) - max_logged_sites} 处未列出。", "INFO")
+
+    def scan(self) -> list[str]:
+        """
+        执行扫描操作：依次执行发现 (discover_files)、解析 (parse_files) 和过滤 (filter_dependencies) 三个阶段，
+        最后返回一个去重、排序、且不包含已存在隐藏导入的潜在依赖项列表 (包括模块名已确定的动态导入，见 dynamic_import_candidates)。
+
+        Returns:
+            list[str]: 排序后的潜在新依赖项模块名列表。
+        """
+        if self.logger and callable(self.logger):
+            self.logger(f"[依赖扫描器] 开始扫描项目根目录: {self.project_root}", "INFO")
+
+        files_to_parse, skipped_file_count = self.discover_files()
+        self.imported_third_party_modules = self.filter_dependencies(self.parse_files(files_to_parse))
+        self.found_potential_dependencies.update(self.imported_third_party_modules)
+        self.found_potential_dependencies.update(self.dynamic_import_candidates())
+
+        if self.logger and callable(self.logger):
+            self.logger(f"[依赖扫描器] 扫描完成。共处理 {len(files_to_parse)} 个 .py 文件，跳过 {skipped_file_count} 个文件。", "INFO")
+            self._log_generated_and_partial_files()
+            self._log_dynamic_import_sites()
+
+        # 从找到的潜在依赖项中，移除那些用户已在UI中声明为隐藏导入的模块
+        final_potential_dependencies = self.found_potential_dependencies - self.existing_hidden_imports
+
+        return sorted(list(final_potential_dependencies)) # 返回排序后的列表
+
+    def scan_declared(self, verify: bool = True) -> dict:
+        """
+        声明依赖优先的扫描：先读取依赖清单 (见 DeclaredDependencyReader)，立即在日志中给出声明的第三方包及其导入名；
+        verify 为 True 时再执行完整的源码扫描 (scan) 进行核对，分别报告“已导入但未声明”和“已声明但未导入”的依赖。
+
+        Args:
+            verify (bool): 是否扫描源码核对；为 False 时只读取清单，不遍历、不解析源文件。
+
+        Returns:
+            dict: {"manifests": [清单相对路径, ...],
+                   "declared": DeclaredDependencyReader.read() 的结果 (每项另有 "modules" 导入名列表和 "mapping" 映射来源),
+                   "potential_dependencies": verify 时与 scan() 的结果相同，否则为运行时/可选依赖的导入名 (不含已有的隐藏导入),
+                   "verified": bool, "used_undeclared": [顶层模块名, ...], "declared_unused": [规范化的发行包名, ...]}
+        """
+        read_start_time = time.perf_counter()
+        declared_reader = DeclaredDependencyReader(self.project_root, self.distribution_import_names, logger_func=self.logger)
+        declared = declared_reader.read()
+        declared_module_owners = {} # {导入名: 规范化的发行包名}
+        for normalized_name, declared_entry in declared.items():
+            declared_entry["modules"], declared_entry["mapping"] = declared_reader.import_names_for(declared_entry["name"])
+            for module_name in declared_entry["modules"]:
+                declared_module_owners.setdefault(module_name, normalized_name)
+        report = {"manifests": [manifest_path.relative_to(self.project_root).as_posix() for manifest_path in declared_reader.manifest_paths],
+                  "declared": declared, "verified": verify, "used_undeclared": [], "declared_unused": []}
+        self._log_declared_dependencies(report, time.perf_counter() - read_start_time)
+        if not verify: # 只列出运行时/可选依赖的公开顶层模块；开发依赖和锁定文件中的间接依赖不会被程序导入
+            report["potential_dependencies"] = sorted(
+                module_name for normalized_name, declared_entry in declared.items()
+                if declared_entry["kinds"] & {"runtime", "optional"} and normalized_name not in self.BUILD_TOOL_DISTRIBUTIONS
+                for module_name in declared_entry["modules"]
+                if not module_name.startswith("_") and module_name not in self.std_lib_modules and module_name not in self.existing_hidden_imports
+                and not self._is_project_module(module_name))
+            return report
+
+        report["potential_dependencies"] = self.scan()
+        used_modules = self.imported_third_party_modules | self.filter_dependencies({module_name.split(".")[0] for module_name in self.dynamic_import_candidates()})
+        report["used_undeclared"] = sorted(used_modules - declared_module_owners.keys())
+        report["declared_unused"] = sorted(
+            normalized_name for normalized_name, declared_entry in declared.items()
+            if "runtime" in declared_entry["kinds"] and normalized_name not in self.BUILD_TOOL_DISTRIBUTIONS
+            and not any(module_name in used_modules or module_name in self.std_lib_modules or self._is_project_module(module_name)
+                        for module_name in declared_entry["modules"])) # 标准库的向后移植包和 monorepo 中的兄弟项目不算未使用
+        self.logger(f"[依赖扫描器] 与源码核对: {len(report['used_undeclared'])} 个模块已导入但未声明，"
+                    f"{len(report['declared_unused'])} 个运行时依赖已声明但未导入。", "INFO")
+        if report["used_undeclared"]:
+            self.logger(f"    已导入但未声明 (隔离构建环境中不会安装): {', '.join(report['used_undeclared'])}", "WARNING")
+        if report["declared_unused"]:
+            self.logger(f"    已声明但未导入 (可能由插件/驱动机制动态加载，也可能可以从清单中删除): "
+                        f"{', '.join(declared[normalized_name]['name'] for normalized_name in report['declared_unused'])}", "INFO")
+        return report
+
+    def _log_declared_dependencies(self, report: dict, elapsed_seconds: float):
+        """在日志中列出清单中直接声明的依赖及其导入名 (只出现在锁定文件中的间接依赖只计数)。"""
+        if not report["manifests"]:
+            self.logger("[依赖扫描器] 项目中没有找到依赖清单 (pyproject.toml、Pipfile、requirements*.txt 或锁定文件)。", "INFO")
+            return
+        direct_dependencies = {normalized_name: declared_entry for normalized_name, declared_entry in report["declared"].items() if declared_entry["kinds"] != {"locked"}}
+        self.logger(f"[依赖扫描器] 从 {len(report['manifests'])} 个依赖清单 ({', '.join(report['manifests'][:5])}{' ...' if len(report['manifests']) > 5 else ''}) "
+                    f"中读取到 {len(direct_dependencies)} 个直接声明的依赖，锁定文件中另有 {len(report['declared']) - len(direct_dependencies)} 个，"
+                    f"耗时 {elapsed_seconds * 1000:.0f} 毫秒:", "INFO")
+        for _, declared_entry in sorted(direct_dependencies.items()):
+            kind_labels = "/".join(DeclaredDependencyReader.DECLARATION_KIND_LABELS[kind] for kind in sorted(declared_entry["kinds"]))
+            self.logger(f"    {declared_entry['name']} → {', '.join(declared_entry['modules'])}"
+                        f"{'  (按包名推测)' if declared_entry['mapping'] == 'guess' else ''}  [{kind_labels}]", "INFO")
+
+
+# --------------------------------------------------------------------------
+#  ScannerBenchmark: DependencyScanner 在合成项目上的性能基准
+# --------------------------------------------------------------------------
+class ScannerBenchmark:
+    """
+    生成确定性的合成项目 (深层嵌套的包、内置虚拟环境、超大的生成模块、语法错误文件、测试与文档目录)，
+    分别测量 DependencyScanner 发现、解析、过滤三个阶段的耗时、吞吐量和 Python 内存峰值。
+    结果可保存为 JSON 基线，之后在其他提交上运行并与基线对比，发现性能退化。
+
+    耗时取多次运行的中位数 (不开启 tracemalloc)；内存峰值在额外的一次运行中用 tracemalloc 逐阶段测量。
+    """
+    FORMAT_VERSION = 1
+    GENERATOR_VERSION = 1 # 生成规则变化时递增，旧的合成项目会被重新生成
+    MARKER_FILE_NAME = ".scanner-benchmark.json"
+    PHASES = ("discovery", "parsing", "filtering")
+    STDLIB_IMPORTS = ("os", "sys", "json", "re", "collections", "itertools", "functools", "logging", "pathlib", "typing",
+                      "dataclasses", "datetime", "subprocess", "threading", "asyncio", "hashlib")
+    THIRD_PARTY_IMPORTS = ("numpy", "pandas", "requests", "yaml", "PIL", "scipy", "sqlalchemy", "jinja2", "click", "attr",
+                           "six", "dateutil", "pytz", "lxml", "cryptography")
+    # 低于该绝对变化量的差异视为噪声，不判为退化
+    NOISE_FLOOR_SECONDS = 0.005
+    NOISE_FLOOR_BYTES = 1024 * 1024
+
+    def __init__(self, work_dir: Path, repeat: int = 3, logger_func=None):
+        """
+        Args:
+            work_dir (Path): 存放合成项目的目录 (按规模分子目录，生成规则未变时复用)。
+            repeat (int): 每个规模计时运行的次数 (取中位数)。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.work_dir = Path(work_dir)
+        self.repeat = max(1, repeat)
+        self.logger = logger_func if logger_func else print
+
+    @staticmethod
+    def parse_size_label(size_label: str) -> int:
+        """将 "1k"、"10k"、"100k"、"2500" 这样的规模标签转换为文件数。"""
+        size_label = size_label.strip().lower()
+        multiplier = 1000 if size_label.endswith("k") else 1
+        return int(float(size_label.rstrip("k")) * multiplier)
+
+    # --- 合成项目 ---
+    def generate_project(self, file_count: int, seed: int = 0) -> Path:
+        """
+        生成 (或复用已生成的) 约 file_count 个 .py 文件的合成项目。相同的 file_count/seed/生成规则总是得到相同的文件树。
+
+        文件构成：约 80% 为嵌套 2~8 层的项目包模块，10% 位于内置虚拟环境 (.venv 与 venv 下的 site-packages，应被跳过)，
+        5% 位于 tests/docs/build 等应跳过的目录，约 1% 为语法错误文件，另有少量数 MB 的超大生成模块。
+
+        Returns:
+            Path: 合成项目的根目录。
+        """
+        project_root = self.work_dir / f"project_{file_count}_{seed}"
+        marker_path = project_root / self.MARKER_FILE_NAME
+        expected_marker = {"generator_version": self.GENERATOR_VERSION, "file_count": file_count, "seed": seed}
+        try:
+            if json.loads(marker_path.read_text(encoding="utf-8")) == expected_marker:
+                return project_root
+        except (OSError, ValueError):
+            pass
+        if project_root.exists():
+            shutil.rmtree(project_root)
+        self.logger(f"[扫描器基准] 正在生成 {file_count} 个文件的合成项目: {project_root}", "INFO")
+        random_generator = random.Random(f"{seed}:{file_count}")
+        project_root.mkdir(parents=True)
+        huge_module_count = min(10, max(1, file_count // 5000))
+        syntax_error_count = max(1, file_count // 100)
+        vendored_count = file_count // 10
+        skipped_dir_count = file_count // 20
+        package_module_count = max(1, file_count - huge_module_count - syntax_error_count - vendored_count - skipped_dir_count)
+
+        package_paths = self._generate_package_modules(project_root, package_module_count, random_generator)
+        for module_index in range(vendored_count):
+            venv_root = ".venv/lib/python3.11/site-packages" if module_index % 2 == 0 else "venv/Lib/site-packages"
+            vendored_path = project_root / venv_root / f"vendored_{module_index % 50}" / f"module_{module_index}.py"
+            vendored_path.parent.mkdir(parents=True, exist_ok=True)
+            vendored_path.write_text(self._render_module(random_generator, package_paths), encoding="utf-8")
+        skipped_dirs = ("tests", "docs", "build", "examples", "migrations")
+        for module_index in range(skipped_dir_count):
+            skipped_path = project_root / skipped_dirs[module_index % len(skipped_dirs)] / f"case_{module_index}.py"
+            skipped_path.parent.mkdir(parents=True, exist_ok=True)
+            skipped_path.write_text(self._render_module(random_generator, package_paths), encoding="utf-8")
+        for module_index in range(syntax_error_count):
+            broken_path = project_root / package_paths[random_generator.randrange(len(package_paths))] / f"broken_{module_index}.py"
+            broken_path.write_text(self._render_module(random_generator, package_paths) + "\ndef broken(:\n    pass\n", encoding="utf-8")
+        for module_index in range(huge_module_count):
+            (project_root / f"generated_table_{module_index}.py").write_text(self._render_huge_module(random_generator), encoding="utf-8")
+        marker_path.write_text(json.dumps(expected_marker), encoding="utf-8")
+        return project_root
+
+    def _generate_package_modules(self, project_root: Path, module_count: int, random_generator: random.Random) -> list[str]:
+        """生成嵌套的项目包 (每层都有 __init__.py)，返回全部包目录的相对路径 (使用 / 分隔)。"""
+        package_paths = []
+        top_level_count = max(1, min(20, module_count // 200))
+        for top_level_index in range(top_level_count):
+            package_paths.append(f"app_pkg_{top_level_index}")
+        while len(package_paths) * 8 < module_count: # 平均每个包约 8 个模块
+            parent_path = package_paths[random_generator.randrange(len(package_paths))]
+            if parent_path.count("/") >= 7: # 最多嵌套 8 层
+                continue
+            package_paths.append(f"{parent_path}/sub_{len(package_paths)}")
+        for package_path in package_paths:
+            (project_root / package_path).mkdir(parents=True, exist_ok=True)
+            (project_root / package_path / "__init__.py").write_text(f'"""合成包 {package_path}"""\n', encoding="utf-8")
+        for module_index in range(max(0, module_count - len(package_paths))):
+            package_path = package_paths[random_generator.randrange(len(package_paths))]
+            (project_root / package_path / f"module_{module_index}.py").write_text(self._render_module(random_generator, package_paths), encoding="utf-8")
+        (project_root / "main.py").write_text(self._render_module(random_generator, package_paths), encoding="utf-8")
+        return package_paths
+
+    def _render_module(self, random_generator: random.Random, package_paths: list[str]) -> str:
+        """生成一个普通模块：标准库/第三方/项目内部/相对导入、可选导入，以及若干函数和类。"""
+        source_lines = ['"""合成模块 (扫描器基准测试)。"""']
+        for _ in range(random_generator.randint(2, 6)):
+            source_lines.append(f"import {random_generator.choice(self.STDLIB_IMPORTS)}")
+        for _ in range(random_generator.randint(0, 3)):
+            source_lines.append(f"from {random_generator.choice(self.THIRD_PARTY_IMPORTS)} import helper_{random_generator.randrange(10)}")
+        for _ in range(random_generator.randint(0, 3)):
+            source_lines.append(f"import {random_generator.choice(package_paths).replace('/', '.')}")
+        if random_generator.random() < 0.3:
+            source_lines.append("from . import sibling_module")
+        if random_generator.random() < 0.2:
+            source_lines += ["try:", f"    import optional_dep_{random_generator.randrange(20)}", "except ImportError:", "    pass"]
+        for function_index in range(random_generator.randint(2, 8)):
+            source_lines += [
+                "", "",
+                f"def function_{function_index}(value, factor={random_generator.randint(1, 9)}):",
+                f'    """合成函数 {function_index}。"""',
+                "    result = [item * factor for item in range(value) if item % 3]",
+                "    if len(result) > 10:",
+                "        return {str(key): key ** 2 for key in result}",
+                "    return sum(result)",
+            ]
+        if random_generator.random() < 0.5:
+            source_lines += ["", "", "class SyntheticModel:", "    def __init__(self, name):", "        self.name = name",
+                             "", "    def describe(self):", "        return f'{self.name}: {len(self.name)}'"]
+        return "\n".join(source_lines) + "\n"
+
+    @staticmethod
+    def _render_huge_module(random_generator: random.Random) -> str:
+        """生成约 2 MB 的超大模块 (类似 protobuf/表格生成代码：少量导入 + 巨大的字面量)。"""
+        source_lines = ['"""自动生成的数据表 (扫描器基准测试)。"""', "import struct", "", "TABLE = {"]
+        for row_index in range(40000):
+            source_lines.append(f"    {row_index}: ({random_generator.random():.12f}, 'row_{row_index}', {random_generator.randrange(1 << 30)}),")
+        source_lines.append("}")
+        return "\n".join(source_lines) + "\n"
+
+    # --- 测量 ---
+    def measure(self, project_root: Path) -> dict:
+        """
+        在一个项目上运行扫描器并测量各阶段。
+
+        Returns:
+            dict: {"files_discovered", "files_parsed", "files_skipped", "bytes_parsed", "modules_imported", "dependencies_found",
+                   "phases": {阶段: {"seconds", "per_second", "peak_python_bytes"}}, "total_seconds", "files_per_second",
+                   "peak_rss_bytes" (进程 RSS 峰值，平台不支持时为 None)}
+        """
+        phase_timings = {phase_name: [] for phase_name in self.PHASES}
+        for _ in range(self.repeat):
+            for phase_name, phase_seconds in self._run_phases(project_root)[0].items():
+                phase_timings[phase_name].append(phase_seconds)
+        tracemalloc.start()
+        try:
+            phase_peaks, (files_to_parse, skipped_count, imported_modules, dependencies) = self._run_phases(project_root, trace_memory=True)[1:]
+        finally:
+            tracemalloc.stop()
+
+        phase_medians = {phase_name: statistics.median(timings) for phase_name, timings in phase_timings.items()}
+        phase_item_counts = {"discovery": len(files_to_parse) + skipped_count, "parsing": len(files_to_parse), "filtering": len(imported_modules)}
+        total_seconds = sum(phase_medians.values())
+        return {
+            "files_discovered": len(files_to_parse) + skipped_count,
+            "files_parsed": len(files_to_parse),
+            "files_skipped": skipped_count,
+            "bytes_parsed": sum(file_path.stat().st_size for file_path in files_to_parse),
+            "modules_imported": len(imported_modules),
+            "dependencies_found": len(dependencies),
+            "phases": {phase_name: {"seconds": round(phase_medians[phase_name], 6),
+                                    "per_second": round(phase_item_counts[phase_name] / phase_medians[phase_name], 1) if phase_medians[phase_name] else None,
+                                    "peak_python_bytes": phase_peaks[phase_name]}
+                       for phase_name in self.PHASES},
+            "total_seconds": round(total_seconds, 6),
+            "files_per_second": round(len(files_to_parse) / total_seconds, 1) if total_seconds else None,
+            "peak_rss_bytes": self._peak_rss_bytes(),
+        }
+
+    def _run_phases(self, project_root: Path, trace_memory: bool = False) -> tuple[dict, dict, tuple]:
+        """运行一次完整扫描 (不使用分析缓存)，返回 ({阶段: 秒}, {阶段: 内存峰值字节}, 各阶段的结果)。"""
+        dependency_scanner = DependencyScanner(project_root, [], logger_func=lambda message, level="INFO": None)
+        phase_seconds, phase_peaks = {}, {}
+        phase_functions = {
+            "discovery": dependency_scanner.discover_files,
+            "parsing": lambda: dependency_scanner.parse_files(phase_results["discovery"][0]),
+            "filtering": lambda: dependency_scanner.filter_dependencies(phase_results["parsing"]),
+        }
+        phase_results = {}
+        for phase_name in self.PHASES:
+            if trace_memory:
+                tracemalloc.reset_peak()
+                baseline_bytes = tracemalloc.get_traced_memory()[0]
+            phase_start_time = time.perf_counter()
+            phase_results[phase_name] = phase_functions[phase_name]()
+            phase_seconds[phase_name] = time.perf_counter() - phase_start_time
+            if trace_memory:
+                phase_peaks[phase_name] = max(0, tracemalloc.get_traced_memory()[1] - baseline_bytes)
+        files_to_parse, skipped_count = phase_results["discovery"]
+        return phase_seconds, phase_peaks, (files_to_parse, skipped_count, phase_results["parsing"], phase_results["filtering"])
+
+    @staticmethod
+    def _peak_rss_bytes() -> int | None:
+        try:
+            import resource # 仅 POSIX 平台提供
+        except ImportError:
+            return None
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024 # Linux 上单位为 KB
+
+    def run(self, size_labels: list[str], seed: int = 0) -> dict:
+        """生成 (或复用) 各规模的合成项目并逐一测量，返回可保存为基线的结果。"""
+        results = {}
+        for size_label in size_labels:
+            project_root = self.generate_project(self.parse_size_label(size_label), seed)
+            self.logger(f"[扫描器基准] 正在测量 {size_label} ({self.repeat} 次)...", "INFO")
+            results[size_label] = self.measure(project_root)
+        return {
+            "version": self.FORMAT_VERSION,
+            "generator_version": self.GENERATOR_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": self._current_commit(),
+            "python": platform.python_version(),
+            "platform": sys.platform,
+            "machine": platform.machine(),
+            "repeat": self.repeat,
+            "seed": seed,
+            "results": results,
+        }
+
+    @staticmethod
+    def _current_commit() -> str | None:
+        """本程序所在 git 仓库的当前提交 (不在仓库中或没有 git 时为 None)。"""
+        try:
+            git_result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parent,
+                                        capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return (git_result.stdout.strip() or None) if git_result.returncode == 0 else None
+
+    @classmethod
+    def compare(cls, baseline: dict, current: dict, threshold: float = 0.10) -> list[dict]:
+        """
+        与基线对比各规模、各阶段的耗时和内存峰值。
+
+        Args:
+            baseline (dict): 之前保存的 run() 结果。
+            current (dict): 本次的 run() 结果。
+            threshold (float): 允许的相对增幅 (0.10 表示 10%)；超过且超过噪声下限即判为退化。
+
+        Returns:
+            list[dict]: 每项 {"size", "phase", "metric" ("seconds"/"peak_python_bytes"), "baseline", "current", "change", "regression"}。
+        """
+        comparisons = []
+        for size_label, current_result in current["results"].items():
+            baseline_result = baseline.get("results", {}).get(size_label)
+            if baseline_result is None:
+                continue
+            for phase_name in cls.PHASES:
+                for metric_name, noise_floor in (("seconds", cls.NOISE_FLOOR_SECONDS), ("peak_python_bytes", cls.NOISE_FLOOR_BYTES)):
+                    baseline_value = baseline_result["phases"].get(phase_name, {}).get(metric_name)
+                    current_value = current_result["phases"][phase_name][metric_name]
+                    if baseline_value is None or current_value is None:
+                        continue
+                    change = (current_value - baseline_value) / baseline_value if baseline_value else 0.0
+                    comparisons.append({"size": size_label, "phase": phase_name, "metric": metric_name,
+                                        "baseline": baseline_value, "current": current_value, "change": change,
+                                        "regression": change > threshold and current_value - baseline_value > noise_floor})
+        return comparisons
+
+    @classmethod
+    def format_report(cls, benchmark_result: dict, comparisons: list[dict] | None = None) -> str:
+        """将结果 (以及与基线的对比) 格式化为文本表格。"""
+        report_lines = [f"DependencyScanner 基准 (Python {benchmark_result['python']}，{benchmark_result['platform']}/{benchmark_result['machine']}，"
+                        f"提交 {benchmark_result['commit'] or '未知'}，每项取 {benchmark_result['repeat']} 次中位数)"]
+        for size_label, size_result in benchmark_result["results"].items():
+            report_lines.append(f"\n[{size_label}] 发现 {size_result['files_discovered']} 个文件，解析 {size_result['files_parsed']} 个 "
+                                f"({format_byte_size(size_result['bytes_parsed'])})，跳过 {size_result['files_skipped']} 个，"
+                                f"导入 {size_result['modules_imported']} 个顶层模块，潜在依赖 {size_result['dependencies_found']} 个")
+            for phase_name in cls.PHASES:
+                phase_result = size_result["phases"][phase_name]
+                unit = "模块/秒" if phase_name == "filtering" else "文件/秒"
+                report_lines.append(f"  {phase_name:<10} {phase_result['seconds'] * 1000:>10.1f} ms  {phase_result['per_second'] or 0:>12,.0f} {unit}  "
+                                    f"峰值 {format_byte_size(phase_result['peak_python_bytes'])}")
+            report_lines.append(f"  {'total':<10} {size_result['total_seconds'] * 1000:>10.1f} ms  {size_result['files_per_second'] or 0:>12,.0f} 文件/秒"
+                                + (f"  进程 RSS 峰值 {format_byte_size(size_result['peak_rss_bytes'])}" if size_result["peak_rss_bytes"] else ""))
+        if comparisons is not None:
+            report_lines.append("\n与基线对比:")
+            for comparison in comparisons:
+                formatter = (lambda value: f"{value * 1000:.1f} ms") if comparison["metric"] == "seconds" else format_byte_size
+                report_lines.append(f"  {'❌ 退化' if comparison['regression'] else '   正常'}  [{comparison['size']}] {comparison['phase']:<10} "
+                                    f"{comparison['metric']:<17} {formatter(comparison['baseline'])} -> {formatter(comparison['current'])} ({comparison['change']:+.1%})")
+        return "\n".join(report_lines)
+
+
+# --------------------------------------------------------------------------
+#  ProjectImportGraph: 入口脚本可达源文件解析 (监视模式使用)
+# --------------------------------------------------------------------------
+class ProjectImportGraph:
+    """
+    从入口脚本出发，静态解析其可达的项目内部源文件（本地模块依赖图）。
+    只跟随能在入口脚本目录或项目根目录下解析到的导入，外部模块仅记录顶层名称。
+    每个文件的解析结果会被缓存，文件变更时只需重新解析该文件本身。
+    """
+    def __init__(self, entry_script_path: Path, project_root_path: Path | None = None, logger_func=None, analysis_cache=None):
+        """
+        初始化依赖图。
+
+        Args:
+            entry_script_path (Path): 入口脚本的路径。
+            project_root_path (Path, optional): 项目根目录，作为额外的模块搜索根。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+            analysis_cache (SharedAnalysisCache, optional): 共享分析缓存，内容未变的文件不再重新解析。
+        """
+        self.entry_script = Path(entry_script_path).resolve()
+        self.search_roots = [self.entry_script.parent]
+        if project_root_path:
+            resolved_root = Path(project_root_path).resolve()
+            if resolved_root not in self.search_roots:
+                self.search_roots.append(resolved_root)
+        self.logger = logger_func if logger_func else print
+        self.analysis_cache = analysis_cache
+
+        self._local_edges_by_file = {}    # {源文件: 该文件直接导入的本地源文件集合}
+        self._external_by_file = {}       # {源文件: 该文件导入的外部顶层模块名集合}
+        self.source_files = set()         # 当前可达的全部本地源文件
+        self.external_modules = set()     # 可达源文件导入的全部外部顶层模块名 (含标准库)
+
+    def build(self):
+        """解析入口脚本及其全部可达的本地源文件。返回 self 以便链式调用。"""
+        self._recompute_reachable_files()
+        self.logger(f"[依赖图] 入口脚本可达 {len(self.source_files)} 个本地源文件，"
+                    f"引用 {len(self.external_modules)} 个外部顶层模块。", "DEBUG")
+        return self
+
+    def module_names(self) -> set[str]:
+        """
+        返回可达源文件对应的点分模块名集合 (入口脚本同时记为 "__main__")，
+        用于与 PyInstaller 的 warn 文件等按模块名记录的信息交叉比对。
+        """
+        module_names = {"__main__", self.entry_script.stem}
+        for source_file in self.source_files:
+            for root_dir in self.search_roots:
+                try:
+                    relative_parts = list(source_file.relative_to(root_dir).with_suffix("").parts)
+                except ValueError:
+                    continue
+                if relative_parts and relative_parts[-1] == "__init__":
+                    relative_parts.pop()
+                if relative_parts:
+                    module_names.add(".".join(relative_parts))
+                break
+        return module_names
+
+    def refresh_file(self, file_path: Path) -> tuple[set, set]:
+        """
+        某个源文件发生变更后调用：只重新解析该文件，再基于内存中的依赖边重新计算可达集合。
+
+        Args:
+            file_path (Path): 发生变更的源文件。
+
+        Returns:
+            tuple[set, set]: (新增的可达文件集合, 不再可达的文件集合)。
+        """
+        changed_file = Path(file_path).resolve()
+        self._local_edges_by_file.pop(changed_file, None)
+        self._external_by_file.pop(changed_file, None)
+        previous_files = set(self.source_files)
+        self._recompute_reachable_files()
+        return self.source_files - previous_files, previous_files - self.source_files
+
+    def _recompute_reachable_files(self):
+        """从入口脚本做广度优先遍历；只有尚未缓存的文件才会被读取和解析。"""
+        reachable_files = set()
+        external_modules = set()
+        pending_files = [self.entry_script]
+        while pending_files:
+            current_file = pending_files.pop()
+            if current_file in reachable_files or not current_file.is_file():
+                continue
+            reachable_files.add(current_file)
+            if current_file not in self._local_edges_by_file:
+                self._analyze_file(current_file)
+            external_modules.update(self._external_by_file.get(current_file, ()))
+            pending_files.extend(self._local_edges_by_file.get(current_file, ()))
+        self.source_files = reachable_files
+        self.external_modules = external_modules
+
+    def _analyze_file(self, file_path: Path):
+        """解析单个文件的导入语句，记录本地依赖边和外部模块名。"""
+        local_files = set()
+        external_modules = set()
+        try:
+            import_records = parse_import_statements(file_path, self.analysis_cache)
+        except (SyntaxError, ValueError, OSError) as e:
+            # 语法错误的文件 (例如正在编辑中) 仍然保留在可达集合中，以便修复后再次触发
+            self.logger(f"[依赖图] 无法解析 {file_path.name}: {e}", "DEBUG")
+            self._local_edges_by_file[file_path] = local_files
+            self._external_by_file[file_path] = external_modules
+            return
+
+        for imported_module, import_level, imported_names, _ in import_records:
+            if imported_names is None: # import a.b
+                resolved_files = self._resolve_module(imported_module)
+                if resolved_files:
+                    local_files.update(resolved_files)
+                else:
+                    external_modules.add(imported_module.split('.')[0])
+            elif import_level > 0: # 相对导入：以当前文件所在包为基准
+                base_dir = file_path.parent
+                for _ in range(import_level - 1):
+                    base_dir = base_dir.parent
+                resolved_files = self._resolve_module(imported_module, [base_dir]) if imported_module else []
+                local_files.update(resolved_files)
+                submodule_prefix = f"{imported_module}." if imported_module else ""
+                for imported_name in imported_names: # 'from . import x' 中的 x 可能是子模块
+                    local_files.update(self._resolve_module(submodule_prefix + imported_name, [base_dir]))
+            elif imported_module:
+                resolved_files = self._resolve_module(imported_module)
+                if resolved_files:
+                    local_files.update(resolved_files)
+                    for imported_name in imported_names:
+                        local_files.update(self._resolve_module(f"{imported_module}.{imported_name}"))
+                else:
+                    external_modules.add(imported_module.split('.')[0])
+
+        local_files.discard(file_path)
+        self._local_edges_by_file[file_path] = local_files
+        self._external_by_file[file_path] = external_modules
+
+    def _resolve_module(self, dotted_module_name: str, search_roots: list | None = None) -> list[Path]:
+        """
+        将点分模块名解析为本地源文件列表 (包含沿途各级包的 __init__.py)。
+
+        Returns:
+            list[Path]: 解析到的文件；无法在本地解析时返回空列表。
+        """
+        for root_dir in (search_roots or self.search_roots):
+            resolved_files = []
+            current_dir = root_dir
+            for name_part in dotted_module_name.split('.'):
+                package_init_file = current_dir / name_part / "__init__.py"
+                if package_init_file.is_file():
+                    resolved_files.append(package_init_file.resolve())
+                    current_dir = current_dir / name_part
+                    continue
+                module_file = current_dir / f"{name_part}.py"
+                if module_file.is_file():
+                    resolved_files.append(module_file.resolve())
+                break # 普通模块之下不可能再有子模块；找不到则停止
+            if resolved_files:
+                return resolved_files
+        return []
+
+
+# --------------------------------------------------------------------------
+#  FileChangeWatcher: 文件变更监视 (Linux 使用 inotify，其他平台回退为轮询)
+# --------------------------------------------------------------------------
+class FileChangeWatcher:
+    """
+    监视一组显式指定的文件和目录（目录递归监视），在变更平息后（防抖）回调一次。
+    Linux 上通过 ctypes 直接使用 inotify，无需第三方库；其他平台回退为轮询。
+    事件到来时只处理受影响的路径，不会重新遍历整个项目树。
+    """
+    # inotify 事件掩码 (见 <sys/inotify.h>)
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_FROM = 0x00000040
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_DELETE = 0x00000200
+    _IN_Q_OVERFLOW = 0x00004000
+    _IN_IGNORED = 0x00008000
+    _IN_ISDIR = 0x40000000
+    _WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    _EVENT_HEADER_FORMAT = "iIII" # struct inotify_event: wd, mask, cookie, len
+
+    def __init__(self, on_change_callback, debounce_seconds: float = 0.6, poll_interval_seconds: float = 1.0,
+                 logger_func=None, force_polling: bool = False):
+        """
+        初始化监视器 (调用 start() 后才开始监视)。
+
+        Args:
+            on_change_callback (callable): 变更回调，签名为 callback(changed_paths: set[Path])，在监视线程中调用。
+            debounce_seconds (float): 防抖时间；最后一个事件之后静默这么久才触发回调。
+            poll_interval_seconds (float): 轮询后端的检查间隔。
+            logger_func (callable, optional): 日志回调。
+            force_polling (bool): 即使 inotify 可用也强制使用轮询后端。
+        """
+        self.on_change = on_change_callback
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.logger = logger_func if logger_func else print
+
+        self._targets_lock = threading.Lock()
+        self._target_files = set()    # 单独监视的文件
+        self._target_dirs = set()     # 递归监视的目录根
+        self._targets_dirty = False   # 目标集合是否有待同步到后端的更新
+        self._stop_event = threading.Event()
+        self._watch_thread = None
+        self._pending_changes = set()
+        self._last_event_time = 0.0
+
+        self._libc = None if force_polling else self._load_inotify_libc()
+        self.backend_name = "inotify" if self._libc else "polling"
+
+    @staticmethod
+    def _load_inotify_libc():
+        """在 Linux 上加载 libc 的 inotify 函数，不可用时返回 None。"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            return libc
+        except (OSError, AttributeError):
+            return None
+
+    def set_targets(self, file_paths, dir_paths=()):
+        """
+        设置（或更新）需要监视的文件和目录。可在监视运行期间随时调用，
+        后端只会为新增的目标建立监视，已存在的目标不会被重新遍历。
+        """
+        with self._targets_lock:
+            self._target_files = {Path(p).resolve() for p in file_paths}
+            self._target_dirs = {Path(p).resolve() for p in dir_paths}
+            self._targets_dirty = True
+
+    def start(self):
+        """在后台守护线程中启动监视。"""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._watch_thread = threading.Thread(target=self._run_watch_loop, name="FileChangeWatcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop(self, timeout_seconds: float = 2.0):
+        """停止监视并等待监视线程退出。"""
+        self._stop_event.set()
+        if self._watch_thread and self._watch_thread.is_alive() and self._watch_thread is not threading.current_thread():
+            self._watch_thread.join(timeout_seconds)
+
+    def is_running(self) -> bool:
+        return bool(self._watch_thread and self._watch_thread.is_alive())
+
+    def _take_targets_snapshot(self):
+        """取出最新的目标集合并清除“待同步”标记。"""
+        with self._targets_lock:
+            self._targets_dirty = False
+            return set(self._target_files), set(self._target_dirs)
+
+    def _record_change(self, changed_path: Path):
+        self._pending_changes.add(changed_path)
+        self._last_event_time = time.monotonic()
+
+    def _flush_changes_if_quiet(self):
+        """防抖：距离最后一个事件已静默 debounce_seconds 后，合并触发一次回调。"""
+        if not self._pending_changes or time.monotonic() - self._last_event_time < self.debounce_seconds:
+            return
+        changed_paths, self._pending_changes = self._pending_changes, set()
+        try:
+            self.on_change(changed_paths)
+        except Exception as e:
+            self.logger(f"[文件监视] 变更回调执行出错: {e}", "ERROR")
+
+    def _run_watch_loop(self):
+        try:
+            if self._libc and self._run_inotify_loop():
+                return
+            self.backend_name = "polling"
+            self._run_polling_loop()
+        except Exception as e:
+            self.logger(f"[文件监视] 监视线程异常退出: {e}", "ERROR")
+            import traceback
+            self.logger(traceback.format_exc(), "DEBUG")
+
+    # --- inotify 后端 ---
+
+    def _run_inotify_loop(self) -> bool:
+        """inotify 事件循环。inotify 初始化失败时返回 False，由调用方回退到轮询。"""
+        inotify_fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if inotify_fd < 0:
+            self.logger("[文件监视] inotify 初始化失败，回退为轮询模式。", "WARNING")
+            return False
+
+        self._wd_to_dir = {}            # {watch描述符: 目录}
+        self._dir_to_wd = {}            # {目录: watch描述符}
+        self._watched_file_names = {}   # {目录: 该目录下被单独监视的文件名集合}
+        self._recursive_dirs = set()    # 递归监视范围内的全部目录 (含子目录)
+        self._watched_roots = set()     # 已建立递归监视的目录根
+        header_size = struct.calcsize(self._EVENT_HEADER_FORMAT)
+        try:
+            while not self._stop_event.is_set():
+                if self._targets_dirty:
+                    self._sync_inotify_watches(inotify_fd)
+                readable_fds, _, _ = select.select([inotify_fd], [], [], min(self.debounce_seconds, 0.25))
+                if readable_fds:
+                    try:
+                        event_buffer = os.read(inotify_fd, 64 * 1024)
+                    except BlockingIOError:
+                        event_buffer = b""
+                    offset = 0
+                    while offset + header_size <= len(event_buffer):
+                        watch_descriptor, event_mask, _cookie, name_length = struct.unpack_from(
+                            self._EVENT_HEADER_FORMAT, event_buffer, offset)
+                        raw_name = event_buffer[offset + header_size: offset + header_size + name_length]
+                        offset += header_size + name_length
+                        self._handle_inotify_event(inotify_fd, watch_descriptor, event_mask,
+                                                   os.fsdecode(raw_name.rstrip(b"\0")))
+                self._flush_changes_if_quiet()
+        finally:
+            os.close(inotify_fd)
+        return True
+
+    def _add_inotify_watch(self, inotify_fd: int, directory: Path):
+        if directory in self._dir_to_wd:
+            return
+        watch_descriptor = self._libc.inotify_add_watch(inotify_fd, os.fsencode(str(directory)), self._WATCH_MASK)
+        if watch_descriptor < 0:
+            import ctypes
+            self.logger(f"[文件监视] 无法监视目录 {directory} (errno={ctypes.get_errno()})", "DEBUG")
+            return
+        self._wd_to_dir[watch_descriptor] = directory
+        self._dir_to_wd[directory] = watch_descriptor
+
+    def _add_recursive_inotify_watch(self, inotify_fd: int, root_dir: Path):
+        """为目录及其全部子目录建立监视 (仅在该目录首次加入时遍历一次)。"""
+        for current_dir, _sub_dirs, _files in os.walk(root_dir):
+            current_dir_path = Path(current_dir)
+            self._recursive_dirs.add(current_dir_path)
+            self._add_inotify_watch(inotify_fd, current_dir_path)
+
+    def _sync_inotify_watches(self, inotify_fd: int):
+        """把最新的目标集合同步为 inotify watch：只为新增目标建立监视，移除不再需要的监视。"""
+        target_files, target_dirs = self._take_targets_snapshot()
+        watched_file_names = {}
+        for file_path in target_files:
+            watched_file_names.setdefault(file_path.parent, set()).add(file_path.name)
+        self._watched_file_names = watched_file_names
+
+        for root_dir in target_dirs - self._watched_roots:
+            if root_dir.is_dir():
+                self._add_recursive_inotify_watch(inotify_fd, root_dir)
+        removed_roots = self._watched_roots - target_dirs
+        self._watched_roots = {d for d in target_dirs if d.is_dir()}
+        if removed_roots:
+            self._recursive_dirs = {d for d in self._recursive_dirs
+                                    if any(d == r or r in d.parents for r in self._watched_roots)}
+        for parent_dir in watched_file_names:
+            if parent_dir.is_dir():
+                self._add_inotify_watch(inotify_fd, parent_dir)
+
+        needed_dirs = set(watched_file_names) | self._recursive_dirs
+        for stale_dir in [d for d in self._dir_to_wd if d not in needed_dirs]:
+            watch_descriptor = self._dir_to_wd.pop(stale_dir)
+            self._wd_to_dir.pop(watch_descriptor, None)
+            self._libc.inotify_rm_watch(inotify_fd, watch_descriptor)
+
+    def _handle_inotify_event(self, inotify_fd: int, watch_descriptor: int, event_mask: int, entry_name: str):
+        if event_mask & self._IN_Q_OVERFLOW: # 事件队列溢出：保守地认为所有目标 (包括递归监视的数据文件夹) 都已变更
+            with self._targets_lock:
+                for target_path in self._target_files | self._target_dirs:
+                    self._record_change(target_path)
+            return
+        event_dir = self._wd_to_dir.get(watch_descriptor)
+        if event_dir is None:
+            return
+        if event_mask & self._IN_IGNORED: # 被监视目录已删除或 watch 已移除
+            self._wd_to_dir.pop(watch_descriptor, None)
+            self._dir_to_wd.pop(event_dir, None)
+            return
+        changed_path = event_dir / entry_name
+        if event_dir in self._recursive_dirs:
+            if event_mask & self._IN_ISDIR and event_mask & (self._IN_CREATE | self._IN_MOVED_TO):
+                self._add_recursive_inotify_watch(inotify_fd, changed_path) # 只遍历新出现的子目录
+            self._record_change(changed_path)
+        elif entry_name in self._watched_file_names.get(event_dir, ()):
+            self._record_change(changed_path)
+
+    # --- 轮询后端 ---
+
+    @staticmethod
+    def _stat_signature(path: Path):
+        try:
+            stat_result = path.stat()
+            return (stat_result.st_mtime_ns, stat_result.st_size)
+        except OSError:
+            return None
+
+    def _poll_register_directory_tree(self, root_dir: Path, file_states: dict, dir_states: dict):
+        """首次加入一个递归目录时遍历一次，记录目录与文件的状态快照。"""
+        for current_dir, _sub_dirs, file_names in os.walk(root_dir):
+            current_dir_path = Path(current_dir)
+            dir_states[current_dir_path] = self._stat_signature(current_dir_path)
+            for file_name in file_names:
+                file_path = current_dir_path / file_name
+                file_states[file_path] = self._stat_signature(file_path)
+
+    def _run_polling_loop(self):
+        """轮询循环：每轮只 stat 已知的文件和目录；目录 mtime 变化时才重新列出该目录本身。"""
+        file_states = {}      # {文件: (mtime_ns, size) 或 None}
+        dir_states = {}       # {递归范围内的目录: (mtime_ns, size) 或 None}
+        watched_roots = set()
+        while not self._stop_event.is_set():
+            if self._targets_dirty:
+                target_files, target_dirs = self._take_targets_snapshot()
+                for root_dir in target_dirs - watched_roots:
+                    if root_dir.is_dir():
+                        self._poll_register_directory_tree(root_dir, file_states, dir_states)
+                watched_roots = target_dirs
+                tracked_files = {f for f in file_states
+                                 if f in target_files or any(r in f.parents for r in watched_roots)}
+                for file_path in target_files - tracked_files:
+                    tracked_files.add(file_path)
+                    file_states[file_path] = self._stat_signature(file_path)
+                file_states = {f: file_states[f] for f in tracked_files}
+                dir_states = {d: s for d, s in dir_states.items()
+                              if any(d == r or r in d.parents for r in watched_roots)}
+
+            for dir_path, old_signature in list(dir_states.items()):
+                new_signature = self._stat_signature(dir_path)
+                if new_signature == old_signature:
+                    continue
+                dir_states[dir_path] = new_signature
+                if new_signature is None:
+                    continue
+                try:
+                    with os.scandir(dir_path) as dir_entries:
+                        for dir_entry in dir_entries:
+                            entry_path = Path(dir_entry.path)
+                            if dir_entry.is_dir(follow_symlinks=False):
+                                if entry_path not in dir_states:
+                                    self._poll_register_directory_tree(entry_path, file_states, dir_states)
+                                    self._record_change(entry_path)
+                            elif entry_path not in file_states:
+                                file_states[entry_path] = self._stat_signature(entry_path)
+                                self._record_change(entry_path)
+                except OSError:
+                    pass
+
+            for file_path, old_signature in list(file_states.items()):
+                new_signature = self._stat_signature(file_path)
+                if new_signature != old_signature:
+                    file_states[file_path] = new_signature
+                    self._record_change(file_path)
+
+            self._flush_changes_if_quiet()
+            self._stop_event.wait(self.poll_interval_seconds)
+
+
+# --------------------------------------------------------------------------
+#  BuildEvent / PyInstallerOutputParser: 将 PyInstaller 输出解析为结构化事件
+# --------------------------------------------------------------------------
+class BuildEvent:
+    """
+    从 PyInstaller 输出中解析出的一条结构化构建事件。
+    进度条、错误提示对话框和构建历史记录都只消费这些事件，而不再直接匹配原始日志行。
+    """
+    PHASE_START = "phase_start"             # 某个构建阶段开始 (Analysis/PYZ/PKG/EXE/COLLECT/BUNDLE)
+    PHASE_END = "phase_end"                 # 某个构建阶段完成
+    BUILD_COMPLETE = "build_complete"       # 整个构建完成
+    WARNING = "warning"                     # 警告
+    ERROR = "error"                         # 错误 (包括 Python 异常行)
+    MISSING_MODULE = "missing_module"       # 隐藏导入/模块未找到
+    HOOK_APPLIED = "hook_applied"           # 应用了某个 hook 文件
+    BINARY_COLLECTED = "binary_collected"   # 收集了某个二进制依赖
+    INFO = "info"                           # 其他带日志级别的普通信息
+    OUTPUT = "output"                       # 其他无法识别的输出 (例如异常堆栈中的行)
+
+    __slots__ = ("kind", "timestamp", "line", "message", "level", "phase", "progress", "data")
+
+    def __init__(self, kind: str, timestamp: float, line: str, message: str, level: str | None = None,
+                 phase: str | None = None, progress: float | None = None, data: dict | None = None):
+        """
+        Args:
+            kind (str): 事件类型，取值为本类中定义的常量之一。
+            timestamp (float): 事件时间戳 (time.time() 格式)。
+            line (str): 原始输出行 (已去除行尾换行符)。
+            message (str): 去掉耗时和日志级别前缀后的消息正文。
+            level (str, optional): PyInstaller 日志级别 (INFO/WARNING/ERROR 等)，无级别前缀时为 None。
+            phase (str, optional): 事件所属的构建阶段名称。
+            progress (float, optional): 该事件对应的估算构建进度 (0.0-1.0)，不影响进度时为 None。
+            data (dict, optional): 与事件类型相关的附加字段 (例如 module、hook、binary、path)。
+        """
+        self.kind = kind
+        self.timestamp = timestamp
+        self.line = line
+        self.message = message
+        self.level = level
+        self.phase = phase
+        self.progress = progress
+        self.data = data or {}
+
+    def to_dict(self) -> dict:
+        """将事件转换为可序列化为JSON的字典。"""
+        return {slot_name: getattr(self, slot_name) for slot_name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"BuildEvent({self.kind!r}, phase={self.phase!r}, progress={self.progress!r}, message={self.message!r})"
+
+
+class PyInstallerOutputParser:
+    """
+    将 PyInstaller 的输出逐行解析为 BuildEvent。
+    每一行只用一个预编译的正则表达式匹配一次 (各种事件是同一个表达式中的命名分支)，
+    再根据命中的分支名 (match.lastgroup) 查表分派，不存在逐个关键词的循环匹配。
+    解析器只依赖输入的文本行，因此可以直接对录制下来的构建日志进行解析和测试。
+    """
+    # 各构建阶段 (开始, 完成) 时对应的估算进度。基于典型 PyInstaller 输出的经验值。
+    PHASE_PROGRESS = {
+        "Analysis": (0.20, 0.38),
+        "PYZ": (0.40, 0.55),
+        "PKG": (0.60, 0.72),
+        "EXE": (0.75, 0.90),
+        "COLLECT": (0.92, 0.97),
+        "BUNDLE": (0.97, 0.98),
+    }
+    BANNER_PROGRESS = 0.10
+    BUILD_COMPLETE_PROGRESS = 0.99
+
+    # 所有分支都包在一个最外层命名组中：最外层组最后闭合，因此 match.lastgroup 即为命中的分支名
+    _LINE_PATTERN = re.compile(r"""
+        ^\s*(?:(?P<elapsed_ms>\d+)\s+)?                                   # PyInstaller 的相对耗时 (毫秒)
+        (?:(?P<level>DEBUG|INFO|WARNING|ERROR|CRITICAL|DEPRECATION):\s*)?  # 日志级别
+        (?:
+            (?P<phase_end>Building\s+(?P<end_phase>PYZ|PKG|EXE|COLLECT|BUNDLE)\b.*\bcompleted\s+successfully\.?)
+          | (?P<phase_start>Building\s+(?P<start_phase>PYZ|PKG|EXE|COLLECT|BUNDLE)\b(?!\s+because)(?P<start_detail>.*))
+          | (?P<analysis_start>Running\s+Analysis\s+(?P<analysis_toc>\S+))
+          | (?P<analysis_end>Warnings\s+written\s+to\s+(?P<warn_file>.+?)\s*$)
+          | (?P<build_complete>Build\s+complete!(?:.*?available\s+in:\s*(?P<result_dir>.+?))?\s*$)
+          | (?P<hook_applied>(?:Processing|Including)\s+(?P<hook_kind>(?:[\w-]+\s+){0,2}?)hook\s+
+                (?P<hook_name>'[^']+'|"[^"]+"|\S+)(?:\s+from\s+(?P<hook_dir>'[^']+'|"[^"]+"))?)
+          | (?P<hidden_import_missing>Hidden\s+import\s+["'](?P<missing_name>[^"']+)["']\s+not\s+found)
+          | (?P<module_not_found>(?:ModuleNotFoundError|ImportError):\s*No\s+module\s+named\s+["'](?P<absent_module>[^"']+)["'])
+          | (?P<binary_collected>(?:Collecting|Adding)\s+(?:dependency|shared\s+library|binary)\s+
+                (?P<binary_src>'[^']+'|"[^"]+"|\S+)(?:\s+(?:as|at|located\s+in)\s+(?P<binary_dest>.+?))?\.?\s*$)
+          | (?P<dist_not_empty>.*(?i:is\s+not\s+empty\.\s+please\s+remove\s+all\s+its\s+contents).*)
+          | (?P<exception>(?P<exception_type>[A-Za-z_][\w.]*(?:Error|Exception)):\s*(?P<exception_message>.*))
+          | (?P<banner>PyInstaller:\s*(?P<pyinstaller_version>[\w.+-]+).*)
+          | (?P<generic>.*)
+        )
+    """, re.VERBOSE)
+
+    def __init__(self, clock=time.time):
+        """
+        Args:
+            clock (callable): 未显式提供时间戳时用于生成事件时间戳的函数，默认 time.time。
+        """
+        self._clock = clock
+        self._branch_handlers = {
+            "phase_end": self._handle_phase_end,
+            "phase_start": self._handle_phase_start,
+            "analysis_start": self._handle_analysis_start,
+            "analysis_end": self._handle_analysis_end,
+            "build_complete": self._handle_build_complete,
+            "hook_applied": self._handle_hook_applied,
+            "hidden_import_missing": self._handle_hidden_import_missing,
+            "module_not_found": self._handle_module_not_found,
+            "binary_collected": self._handle_binary_collected,
+            "dist_not_empty": self._handle_dist_not_empty,
+            "exception": self._handle_exception,
+            "banner": self._handle_banner,
+            "generic": self._handle_generic,
+        }
+        self.reset()
+
+    def reset(self):
+        """重置解析状态，以便解析下一次构建的输出。"""
+        self.current_phase = None
+        self._last_progress = 0.0
+
+    def parse_line(self, line: str, timestamp: float | None = None) -> BuildEvent:
+        """
+        解析一行输出。
+
+        Args:
+            line (str): 一行 PyInstaller 输出 (可以带行尾换行符)。
+            timestamp (float, optional): 事件时间戳，未提供时使用 clock()。
+
+        Returns:
+            BuildEvent: 解析得到的事件 (任何一行都会产生一个事件，无法识别的行类型为 OUTPUT)。
+        """
+        stripped_line = line.rstrip("\r\n")
+        line_match = self._LINE_PATTERN.match(stripped_line) # generic 分支保证一定能匹配
+        level = line_match.group("level")
+        message = stripped_line[line_match.start(line_match.lastgroup):].strip()
+        kind, phase, progress, data = self._branch_handlers[line_match.lastgroup](line_match, level)
+        if progress is not None: # 进度只增不减 (onedir 模式下 COLLECT 在 EXE 之后)
+            progress = max(progress, self._last_progress)
+            self._last_progress = progress
+        elapsed_ms = line_match.group("elapsed_ms")
+        if elapsed_ms is not None:
+            data["elapsed_ms"] = int(elapsed_ms)
+        return BuildEvent(kind, self._clock() if timestamp is None else timestamp, stripped_line, message,
+                          level=level, phase=phase if phase is not None else self.current_phase,
+                          progress=progress, data=data)
+
+    def parse_lines(self, lines):
+        """
+        逐行解析一个可迭代的输出 (例如录制下来的日志文件对象)。
+
+        Args:
+            lines (iterable[str]): 输出行。
+
+        Yields:
+            BuildEvent: 每一行对应的事件。
+        """
+        for line in lines:
+            yield self.parse_line(line)
+
+    def parse_batch(self, lines: list[str], timestamp: float | None = None) -> list[BuildEvent]:
+        """
+        解析一批同时读到的输出行 (例如 ProcessOutputReader 产出的一批)，整批使用同一个时间戳。
+
+        Returns:
+            list[BuildEvent]: 与各行一一对应的事件。
+        """
+        batch_timestamp = self._clock() if timestamp is None else timestamp
+        parse_line = self.parse_line
+        return [parse_line(line, batch_timestamp) for line in lines]
+
+    @staticmethod
+    def _unquote(text: str | None) -> str | None:
+        """去掉 PyInstaller 以 %r 格式输出的路径/名称两侧的引号。"""
+        if text and len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+            return text[1:-1]
+        return text
+
+    # --- 各分支的处理函数：返回 (kind, phase, progress, data) ---
+    def _handle_phase_start(self, line_match, level):
+        phase_name = line_match.group("start_phase")
+        self.current_phase = phase_name
+        return BuildEvent.PHASE_START, phase_name, self.PHASE_PROGRESS[phase_name][0], {"detail": line_match.group("start_detail").strip()}
+
+    def _handle_phase_end(self, line_match, level):
+        phase_name = line_match.group("end_phase")
+        return BuildEvent.PHASE_END, phase_name, self.PHASE_PROGRESS[phase_name][1], {}
+
+    def _handle_analysis_start(self, line_match, level):
+        self.current_phase = "Analysis"
+        return BuildEvent.PHASE_START, "Analysis", self.PHASE_PROGRESS["Analysis"][0], {"toc": line_match.group("analysis_toc")}
+
+    def _handle_analysis_end(self, line_match, level):
+        return BuildEvent.PHASE_END, "Analysis", self.PHASE_PROGRESS["Analysis"][1], {"warn_file": line_match.group("warn_file")}
+
+    def _handle_build_complete(self, line_match, level):
+        self.current_phase = None
+        return BuildEvent.BUILD_COMPLETE, None, self.BUILD_COMPLETE_PROGRESS, {"result_dir": line_match.group("result_dir")}
+
+    def _handle_hook_applied(self, line_match, level):
+        return BuildEvent.HOOK_APPLIED, None, None, {
+            "hook": self._unquote(line_match.group("hook_name")),
+            "hook_kind": line_match.group("hook_kind").strip() or None,
+            "hook_dir": self._unquote(line_match.group("hook_dir")),
+        }
+
+    def _handle_hidden_import_missing(self, line_match, level):
+        return BuildEvent.MISSING_MODULE, None, None, {"module": line_match.group("missing_name"), "source": "hiddenimport"}
+
+    def _handle_module_not_found(self, line_match, level):
+        return BuildEvent.ERROR, None, None, {"module": line_match.group("absent_module")}
+
+    def _handle_binary_collected(self, line_match, level):
+        return BuildEvent.BINARY_COLLECTED, None, None, {
+            "binary": self._unquote(line_match.group("binary_src")),
+            "destination": self._unquote(line_match.group("binary_dest")),
+        }
+
+    def _handle_dist_not_empty(self, line_match, level):
+        return BuildEvent.ERROR, None, None, {"hint": "目标输出目录非空。请手动清空该目录或其子目录后重试。"}
+
+    def _handle_exception(self, line_match, level):
+        return BuildEvent.ERROR, None, None, {"exception_type": line_match.group("exception_type")}
+
+    def _handle_banner(self, line_match, level):
+        return BuildEvent.INFO, None, self.BANNER_PROGRESS, {"pyinstaller_version": line_match.group("pyinstaller_version")}
+
+    def _handle_generic(self, line_match, level):
+        if level in ("ERROR", "CRITICAL"):
+            return BuildEvent.ERROR, None, None, {}
+        if level == "WARNING":
+            return BuildEvent.WARNING, None, None, {}
+        return (BuildEvent.INFO if level else BuildEvent.OUTPUT), None, None, {}
+
+    @staticmethod
+    def summarize(events: list) -> dict:
+        """
+        汇总一次构建的事件列表，用于构建历史记录和结果提示。
+
+        Args:
+            events (list[BuildEvent]): 一次构建按顺序产生的全部事件。
+
+        Returns:
+            dict: 包含 phase_durations (各阶段耗时，秒)、warning_count、error_count、missing_modules、
+                  hooks_applied、binaries_collected、warn_file、result_dir、pyinstaller_version 和 error_cause 的字典。
+        """
+        phase_start_times, phase_durations = {}, {}
+        summary = {
+            "phase_durations": phase_durations, "warning_count": 0, "error_count": 0, "missing_modules": [],
+            "hooks_applied": 0, "binaries_collected": 0, "warn_file": None, "result_dir": None,
+            "pyinstaller_version": None, "error_cause": None,
+        }
+        for event in events:
+            if event.kind == BuildEvent.PHASE_START:
+                phase_start_times[event.phase] = event.timestamp
+            elif event.kind == BuildEvent.PHASE_END and event.phase in phase_start_times:
+                phase_durations[event.phase] = round(event.timestamp - phase_start_times.pop(event.phase), 3)
+            elif event.kind == BuildEvent.WARNING:
+                summary["warning_count"] += 1
+            elif event.kind == BuildEvent.ERROR:
+                summary["error_count"] += 1
+                summary["error_cause"] = event.data.get("hint") or event.message # 以最后一个错误为准
+            elif event.kind == BuildEvent.MISSING_MODULE:
+                if event.data["module"] not in summary["missing_modules"]:
+                    summary["missing_modules"].append(event.data["module"])
+            elif event.kind == BuildEvent.HOOK_APPLIED:
+                summary["hooks_applied"] += 1
+            elif event.kind == BuildEvent.BINARY_COLLECTED:
+                summary["binaries_collected"] += 1
+            elif event.kind == BuildEvent.BUILD_COMPLETE:
+                summary["result_dir"] = event.data.get("result_dir")
+            if event.data.get("warn_file"):
+                summary["warn_file"] = event.data["warn_file"]
+            if event.data.get("pyinstaller_version"):
+                summary["pyinstaller_version"] = event.data["pyinstaller_version"]
+        return summary
+
+
+# --------------------------------------------------------------------------
+#  ProcessOutputReader: 分块读取子进程输出 (增量解码，批量切分行)
+# --------------------------------------------------------------------------
+class ProcessOutputReader:
+    """
+    以二进制方式大块读取子进程的输出管道，增量解码 (多字节字符被切断在块边界上也能正确解码)，
+    再一次性切分出完整的行，按批交给调用方。与文本模式下逐行迭代相比，省去了逐行的解码和换行转换开销，
+    调用方也可以按批更新界面，而不是每一行调度一次。
+    换行符的处理与文本模式 (universal newlines) 一致："\\r\\n" 和单独的 "\\r" 都视为换行。
+    """
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+    UNBUFFERED_CHILD_ENVIRONMENT = {"PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"} # 让 Python 子进程立即输出，且编码与解码一致
+
+    def __init__(self, byte_stream, encoding: str = "utf-8", chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            byte_stream: 以二进制模式打开的输出流 (例如 Popen(..., stdout=PIPE) 且未指定 text 时的 process.stdout)。
+            encoding (str): 输出的编码，无法解码的字节替换为 U+FFFD。
+            chunk_size (int): 每次读取的最大字节数。
+        """
+        self._byte_stream = byte_stream
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._chunk_size = chunk_size
+        # read1 只返回管道中已有的数据，不会为了凑满一块而等待，因此不会推迟进度更新
+        self._read_chunk = getattr(byte_stream, "read1", byte_stream.read)
+
+    @classmethod
+    def child_environment(cls, base_environment: dict | None = None) -> dict:
+        """返回启动子进程时使用的环境变量 (在 base_environment 或当前环境的基础上关闭 Python 的输出缓冲)。"""
+        return {**(os.environ if base_environment is None else base_environment), **cls.UNBUFFERED_CHILD_ENVIRONMENT}
+
+    def iter_line_batches(self):
+        """
+        读取直到输出结束。
+
+        Yields:
+            list[str]: 一批完整的行 (不含换行符)；最后一行没有换行符时在输出结束后单独产出。
+        """
+        pending_text = ""
+        while True:
+            chunk = self._read_chunk(self._chunk_size)
+            if not chunk:
+                break
+            pending_text += self._decoder.decode(chunk)
+            if "\r" in pending_text:
+                # 末尾的 "\r" 可能是被块边界切开的 "\r\n"，留到下一块再处理
+                carried_carriage_return = pending_text.endswith("\r")
+                pending_text = pending_text[:-1 if carried_carriage_return else None].replace("\r\n", "\n").replace("\r", "\n") + ("\r" if carried_carriage_return else "")
+            last_newline_position = pending_text.rfind("\n")
+            if last_newline_position < 0:
+                continue
+            complete_lines = pending_text[:last_newline_position].split("\n")
+            pending_text = pending_text[last_newline_position + 1:]
+            yield complete_lines
+        pending_text += self._decoder.decode(b"", final=True)
+        if pending_text:
+            yield pending_text.replace("\r\n", "\n").replace("\r", "\n").rstrip("\n").split("\n")
+
+
+# --------------------------------------------------------------------------
+#  LogLineIndex: 构建日志的增量行索引 (日志搜索与级别过滤)
+# --------------------------------------------------------------------------
+class LogLineIndex:
+    """
+    与日志文本框逐行对应的索引，随日志写入增量维护，查询时不需要读取文本框内容。
+    行按固定大小分块保存，每块缓存拼接后的文本 (以及小写副本)，查找在整块文本上进行 (而不是逐行调用)，
+    几十万行的普通文本查询只需几十毫秒。每行带一组级别标签：日志级别，以及 PyInstaller 输出行中
+    自带的级别 (例如 BUILD 行中的 "123 WARNING: Hidden import ... not found" 同时带有 WARNING 标签)。
+
+    只应在同一个线程 (Tk 主线程) 中使用。
+    """
+    BLOCK_LINE_COUNT = 4096
+    PYINSTALLER_LEVEL_PATTERN = re.compile(r"^\d+\s+(DEBUG|INFO|WARNING|ERROR|CRITICAL|FATAL):")
+    LINE_PREFIX_PATTERN = re.compile(r"^\[[^\]]*\]:\s*") # _log_to_terminal 添加的 "[时间 图标 级别]: " 前缀
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空索引 (日志文本框被清空时调用)。"""
+        self._blocks = [] # [{"lines": [...], "tags": [...], "text": 缓存的拼接文本或 None, "offsets": 各行起始偏移, "lower_text": 小写副本}]
+        self._lines_by_tag = {} # {标签: [行号 (从 0 开始), ...]}，按行号升序
+        self._tag_sets = {} # 复用相同的标签组合，避免每行一个新元组
+        self.line_count = 0
+
+    def append(self, text: str, level: str):
+        """追加一条日志消息 (可能包含多行)，每个物理行都记录一次。"""
+        level = level.upper()
+        for line_text in str(text).split("\n"):
+            tags = (level,)
+            if level == "BUILD":
+                pyinstaller_level_match = self.PYINSTALLER_LEVEL_PATTERN.match(self.LINE_PREFIX_PATTERN.sub("", line_text, count=1))
+                if pyinstaller_level_match:
+                    tags = (level, "ERROR" if pyinstaller_level_match.group(1) in ("CRITICAL", "FATAL") else pyinstaller_level_match.group(1))
+            tags = self._tag_sets.setdefault(tags, tags)
+            if not self._blocks or len(self._blocks[-1]["lines"]) >= self.BLOCK_LINE_COUNT:
+                self._blocks.append({"lines": [], "tags": [], "text": None, "offsets": None, "lower_text": None})
+            current_block = self._blocks[-1]
+            current_block["lines"].append(line_text)
+            current_block["tags"].append(tags)
+            current_block["text"] = current_block["lower_text"] = None
+            for tag in tags:
+                self._lines_by_tag.setdefault(tag, []).append(self.line_count)
+            self.line_count += 1
+
+    def tag_counts(self) -> dict:
+        """返回 {标签: 行数}。"""
+        return {tag: len(line_numbers) for tag, line_numbers in self._lines_by_tag.items()}
+
+    def search(self, pattern: str = "", tags: set | None = None, use_regex: bool = False, case_sensitive: bool = False) -> list[int]:
+        """
+        查找匹配的行。
+
+        Args:
+            pattern (str): 搜索内容；为空时只按级别过滤。
+            tags (set, optional): 只返回带有其中任一标签的行；None 或空集合表示不限级别。
+            use_regex (bool): pattern 是否为正则表达式 (否则按普通文本查找)。
+            case_sensitive (bool): 是否区分大小写。
+
+        Returns:
+            list[int]: 匹配行的行号 (从 0 开始，升序)。
+
+        Raises:
+            re.error: 正则表达式无效。
+        """
+        if not pattern:
+            if not tags:
+                return list(range(self.line_count))
+            return sorted(set().union(*(self._lines_by_tag.get(tag, ()) for tag in tags))) if len(tags) > 1 else list(self._lines_by_tag.get(next(iter(tags)), []))
+        compiled_pattern = re.compile(pattern if use_regex else re.escape(pattern), re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+        lowered_pattern = pattern.lower() if not use_regex and not case_sensitive else None # 普通文本的忽略大小写查找改用 str.find，比 IGNORECASE 正则快得多
+        matched_line_numbers = []
+        first_line_number = 0
+        for block in self._blocks:
+            block_text, line_offsets = self._get_block_text(block)
+            if lowered_pattern is not None and block["lower_text"] is None:
+                lower_text = block_text.lower()
+                block["lower_text"] = lower_text if len(lower_text) == len(block_text) else "" # 小写后长度变化 (少数 Unicode 字符) 时偏移不再对应，退回正则
+            search_position = 0
+            while True:
+                if lowered_pattern is not None and block["lower_text"]:
+                    match_start = block["lower_text"].find(lowered_pattern, search_position)
+                    if match_start < 0:
+                        break
+                else:
+                    pattern_match = compiled_pattern.search(block_text, search_position)
+                    if pattern_match is None:
+                        break
+                    match_start = pattern_match.start()
+                line_in_block = bisect.bisect_right(line_offsets, match_start) - 1
+                if not tags or not tags.isdisjoint(block["tags"][line_in_block]):
+                    matched_line_numbers.append(first_line_number + line_in_block)
+                if line_in_block + 1 >= len(line_offsets): # 同一行只记录一次，从下一行继续查找
+                    break
+                search_position = line_offsets[line_in_block + 1]
+            first_line_number += len(block["lines"])
+        return matched_line_numbers
+
+    @staticmethod
+    def _get_block_text(block: dict) -> tuple[str, list[int]]:
+        """返回块的拼接文本和各行的起始偏移 (块内容未变化时使用缓存)。"""
+        if block["text"] is None:
+            line_offsets = []
+            current_offset = 0
+            for line_text in block["lines"]:
+                line_offsets.append(current_offset)
+                current_offset += len(line_text) + 1
+            block["text"], block["offsets"] = "\n".join(block["lines"]), line_offsets
+        return block["text"], block["offsets"]
+
+
+# --------------------------------------------------------------------------
+#  BuildHistoryStore: 构建历史记录 (JSON Lines 文件)
+# --------------------------------------------------------------------------
+class BuildHistoryStore:
+    """
+    以 JSON Lines 格式持久化保存每次构建的摘要记录 (每行一条)。
+    追加写入无需读取整个文件；文件行数超过 max_records 的两倍时才会截断为最近的 max_records 条。
+    """
+    def __init__(self, history_file_path: Path, max_records: int = 500, logger_func=None):
+        """
+        Args:
+            history_file_path (Path): 历史记录文件路径。
+            max_records (int): 保留的最大记录条数。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.history_file_path = Path(history_file_path)
+        self.max_records = max_records
+        self.logger = logger_func if logger_func else print
+        self._lock = threading.Lock() # 构建线程与UI线程可能同时读写
+
+    def append(self, record: dict):
+        """追加一条构建记录。"""
+        with self._lock:
+            try:
+                self.history_file_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.history_file_path, 'a', encoding='utf-8') as history_file:
+                    history_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._truncate_if_needed()
+            except OSError as e_write:
+                self.logger(f"[构建历史] 无法写入构建记录 '{self.history_file_path}': {e_write}", "WARNING")
+
+    def load(self, limit: int | None = None, app_name: str | None = None) -> list[dict]:
+        """
+        读取构建记录 (按时间先后顺序)。
+
+        Args:
+            limit (int, optional): 只返回最近的 limit 条记录。
+            app_name (str, optional): 只返回该应用名称的记录。
+
+        Returns:
+            list[dict]: 构建记录列表。损坏的行会被跳过。
+        """
+        with self._lock:
+            records = self._read_all_records()
+        if app_name is not None:
+            records = [record for record in records if record.get("app_name") == app_name]
+        return records[-limit:] if limit else records
+
+    def latest(self, app_name: str | None = None, successful_only: bool = False) -> dict | None:
+        """返回最近一条 (可按应用名称和是否成功过滤的) 构建记录，不存在时返回 None。"""
+        for record in reversed(self.load(app_name=app_name)):
+            if not successful_only or record.get("success"):
+                return record
+        return None
+
+    def _read_all_records(self) -> list[dict]:
+        if not self.history_file_path.is_file():
+            return []
+        records = []
+        with open(self.history_file_path, 'r', encoding='utf-8', errors='replace') as history_file:
+            for record_line in history_file:
+                try:
+                    records.append(json.loads(record_line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def _truncate_if_needed(self):
+        with open(self.history_file_path, 'rb') as history_file:
+            line_count = sum(chunk.count(b"\n") for chunk in iter(lambda: history_file.read(1 << 16), b""))
+        if line_count <= self.max_records * 2:
+            return
+        kept_records = self._read_all_records()[-self.max_records:]
+        temp_file_path = self.history_file_path.with_suffix(".tmp")
+        with open(temp_file_path, 'w', encoding='utf-8') as temp_file:
+            for record in kept_records:
+                temp_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_file_path, self.history_file_path)
+
+
+# --------------------------------------------------------------------------
+#  WarnFileAnalyzer: 构建后分析 PyInstaller 的 warn-<name>.txt
+# --------------------------------------------------------------------------
+class WarnFileAnalyzer:
+    """
+    构建完成后分析 PyInstaller 写入 workpath 的 warn-<name>.txt。
+    warn 文件可能有数MB，因此逐行流式读取；每个缺失模块会被分类为真实缺失或条件/可选导入，
+    并与项目自身的导入进行交叉比对，给出“添加到隐藏导入”或“添加到排除模块”的建议。
+    """
+    # 仅在特定平台/解释器上存在的模块：在其他平台上缺失是正常现象，可以忽略
+    PLATFORM_SPECIFIC_MODULES = frozenset({
+        "nt", "winreg", "_winreg", "_winapi", "msvcrt", "_overlapped", "winsound", "_wmi", "win32api", "win32con",
+        "win32com", "pywintypes", "pythoncom", "_winxptheme", "posix", "pwd", "grp", "termios", "fcntl", "resource",
+        "_posixsubprocess", "_posixshmem", "_scproxy", "vms_lib", "java", "org", "riscos", "riscosenviron",
+        "riscospath", "ce", "_dummy_threading", "android", "_android_support", "_ios_support", "_frozen_importlib",
+        "_frozen_importlib_external", "__builtin__", "_manylinux",
+    })
+    _ENTRY_PATTERN = re.compile(r"^(?P<status>missing|excluded) module named (?P<module>\S+) - imported by (?P<importers>.*)$")
+    _IMPORTER_PATTERN = re.compile(r"([^\s,()]+) \(([^)]*)\)")
+
+    def __init__(self, warn_file_path: Path, logger_func=None, interpreter_path: str | None = None):
+        """
+        Args:
+            warn_file_path (Path): warn-<name>.txt 文件的路径。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+            interpreter_path (str, optional): 构建用的解释器 (所选解释器或隔离构建环境中的 python)，模块是否已安装按它判断；
+                                              为 None 时按运行本程序的环境判断。
+        """
+        self.warn_file_path = Path(warn_file_path)
+        self.logger = logger_func if logger_func else print
+        self.interpreter_path = interpreter_path
+        self._installed_cache = {} # {顶层模块名: 构建环境中是否可以找到}
+
+    def iter_entries(self):
+        """
+        流式解析 warn 文件，逐条产出缺失/排除模块记录。
+
+        Yields:
+            dict: {"module": 模块名, "status": "missing"/"excluded",
+                   "importers": [(导入方模块名, {导入类型集合}), ...]}
+        """
+        with open(self.warn_file_path, 'r', encoding='utf-8', errors='replace') as warn_file:
+            for warn_line in warn_file:
+                entry_match = self._ENTRY_PATTERN.match(warn_line.rstrip("\r\n"))
+                if not entry_match:
+                    continue # 文件头部的说明文字
+                importers = [(importer_name, {kind.strip() for kind in kinds_text.split(',')})
+                             for importer_name, kinds_text in self._IMPORTER_PATTERN.findall(entry_match.group("importers"))]
+                yield {"module": entry_match.group("module").strip("'\""), "status": entry_match.group("status"), "importers": importers}
+
+    def analyze(self, project_module_names=(), project_imported_modules=(), existing_hidden_imports=(), existing_excluded_modules=()) -> list[dict]:
+        """
+        分析 warn 文件并与项目导入交叉比对。
+
+        Args:
+            project_module_names (iterable[str]): 项目自身模块的点分名称 (例如 ProjectImportGraph.module_names())。
+            project_imported_modules (iterable[str]): 项目源文件导入的外部顶层模块名。
+            existing_hidden_imports (iterable[str]): 已配置的隐藏导入。
+            existing_excluded_modules (iterable[str]): 已配置的排除模块。
+
+        Returns:
+            list[dict]: 每个缺失模块一条报告，按重要程度排序。报告字段：
+                module, top_level, status, classification ("real"/"delayed"/"conditional"/"optional"/"platform"/"excluded"),
+                importers (导入方名称列表), project_importers (属于项目的导入方), referenced_by_project (bool),
+                installed (bool, 构建环境中能否找到该模块), suggestion ("hidden_import"/"exclude"/"install"/None)。
+        """
+        project_module_names = set(project_module_names)
+        project_imported_modules = set(project_imported_modules)
+        existing_hidden_imports = set(existing_hidden_imports)
+        existing_excluded_modules = set(existing_excluded_modules)
+        warn_entries = list(self.iter_entries())
+        if self.interpreter_path: # 在构建用解释器中一次查找全部顶层模块
+            top_level_names = {warn_entry["module"].split('.')[0] for warn_entry in warn_entries}
+            try:
+                self._installed_cache.update(InterpreterRegistry.find_modules(self.interpreter_path, top_level_names))
+            except RuntimeError as e_lookup:
+                self.logger(f"[warn分析] 无法在构建用解释器中检查模块，改为按当前环境判断: {e_lookup}", "WARNING")
+        reports = []
+        for warn_entry in warn_entries:
+            module_name = warn_entry["module"]
+            top_level_name = module_name.split('.')[0]
+            project_importers = [name for name, _ in warn_entry["importers"] if name in project_module_names]
+            referenced_by_project = bool(project_importers) or top_level_name in project_imported_modules
+            classification = self._classify(warn_entry, top_level_name)
+            installed = self._is_installed(top_level_name)
+            suggestion = None
+            if classification == "excluded" or module_name in existing_hidden_imports or module_name in existing_excluded_modules:
+                suggestion = None
+            elif classification == "real" or referenced_by_project:
+                suggestion = "hidden_import" if installed else ("install" if classification == "real" else None)
+            elif classification != "platform":
+                suggestion = "exclude" # 仅被第三方库有条件地导入：排除后可消除告警，也避免误收集
+            reports.append({
+                "module": module_name, "top_level": top_level_name, "status": warn_entry["status"],
+                "classification": classification, "importers": [name for name, _ in warn_entry["importers"]],
+                "project_importers": project_importers, "referenced_by_project": referenced_by_project,
+                "installed": installed, "suggestion": suggestion,
+            })
+        classification_rank = {"real": 0, "delayed": 1, "conditional": 2, "optional": 3, "platform": 4, "excluded": 5}
+        reports.sort(key=lambda report: (not report["referenced_by_project"], classification_rank[report["classification"]], report["module"]))
+        self.logger(f"[warn分析] {self.warn_file_path.name}: 共 {len(reports)} 条记录，"
+                    f"其中真实缺失 {sum(r['classification'] == 'real' for r in reports)} 个。", "DEBUG")
+        return reports
+
+    def _classify(self, warn_entry: dict, top_level_name: str) -> str:
+        """
+        根据导入方式对缺失模块分类：存在未被 if/try 保护的模块级导入即为真实缺失 (real)，
+        仅在函数内未受保护导入为 delayed，其余为 conditional/optional。
+        """
+        if warn_entry["status"] == "excluded":
+            return "excluded"
+        if top_level_name in self.PLATFORM_SPECIFIC_MODULES:
+            return "platform"
+        all_kinds = set()
+        for _, import_kinds in warn_entry["importers"]:
+            all_kinds |= import_kinds
+            if not import_kinds & {"conditional", "optional"}: # 未受 if/try 保护的导入
+                if "top-level" in import_kinds:
+                    return "real"
+        if any(not kinds & {"conditional", "optional"} for _, kinds in warn_entry["importers"]):
+            return "delayed"
+        return "optional" if "optional" in all_kinds else "conditional"
+
+    def _is_installed(self, top_level_name: str) -> bool:
+        """检查能否找到指定的顶层模块 (只查找，不导入)；构建用解释器的结果已在 analyze 中批量查好，未查到的按当前环境判断。"""
+        if top_level_name not in self._installed_cache:
+            try:
+                self._installed_cache[top_level_name] = importlib.util.find_spec(top_level_name) is not None
+            except (ImportError, ValueError):
+                self._installed_cache[top_level_name] = False
+        return self._installed_cache[top_level_name]
+
+
+# --------------------------------------------------------------------------
+#  BundleSizeAnalyzer: 构建产物体积分析 (按顶层包/二进制文件汇总)
+# --------------------------------------------------------------------------
+def format_byte_size(num_bytes: float) -> str:
+    """将字节数格式化为便于阅读的字符串，例如 1536 -> '1.5 KB'。"""
+    size_value = float(num_bytes)
+    for unit_name in ("B", "KB", "MB", "GB"):
+        if abs(size_value) < 1024 or unit_name == "GB":
+            return f"{size_value:.0f} {unit_name}" if unit_name == "B" else f"{size_value:.1f} {unit_name}"
+        size_value /= 1024
+    return f"{size_value:.1f} GB"
+
+
+class BundleSizeAnalyzer:
+    """
+    分析 PyInstaller 的构建产物，按顶层包和二进制文件汇总体积。
+    onedir 产物直接遍历输出目录；可执行文件中嵌入的 PKG (CArchive) 及其中的 PYZ 只读取目录表 (TOC)，
+    通过 seek 定位条目大小，不会把归档解压到磁盘，也不会把整个归档读入内存。
+    """
+    _CARCHIVE_COOKIE_MAGIC = b'MEI\014\013\012\013\016'
+    _CARCHIVE_COOKIE_FORMAT = '!8sIIII64s'  # magic, pkg_length, toc_offset, toc_length, python_version, python_libname
+    _CARCHIVE_TOC_ENTRY_FORMAT = '!IIIIBc'  # entry_length, offset, data_length, uncompressed_length, compress_flag, typecode
+    _PYZ_MAGIC = b'PYZ\0'
+    _MAGIC_SEARCH_CHUNK_SIZE = 64 * 1024
+    BINARY_SUFFIXES = ('.so', '.pyd', '.dll', '.dylib')
+
+    def __init__(self, logger_func=None):
+        """
+        Args:
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.logger = logger_func if logger_func else print
+        self._stdlib_module_names = getattr(sys, "stdlib_module_names", frozenset())
+
+    @staticmethod
+    def output_fingerprint(output_target: Path) -> list:
+        """返回构建产物的简单指纹 [修改时间(ns), 大小]，用于在构建历史中区分不同次构建的产物。"""
+        target_stat = Path(output_target).stat()
+        return [target_stat.st_mtime_ns, target_stat.st_size]
+
+    def analyze(self, output_target: Path) -> dict:
+        """
+        分析构建产物。
+
+        Args:
+            output_target (Path): onefile 模式下为生成的可执行文件，onedir 模式下为输出目录 (dist/<应用名>)。
+
+        Returns:
+            dict: {"target", "mode" ("onefile"/"onedir"), "total_bytes" (磁盘占用),
+                   "packages": {顶层包名: {"bytes", "uncompressed_bytes", "entries", "category"}},
+                   "binaries": [{"name", "package", "bytes", "uncompressed_bytes"}],
+                   "modules": {点分模块名 (含扩展模块): 字节数}, "fingerprint"}
+        """
+        output_target = Path(output_target)
+        result = {"target": str(output_target), "mode": "onedir" if output_target.is_dir() else "onefile",
+                  "total_bytes": 0, "packages": {}, "binaries": [], "modules": {}, "fingerprint": self.output_fingerprint(output_target)}
+        if output_target.is_dir():
+            self._analyze_directory(output_target, result)
+        else:
+            result["total_bytes"] = output_target.stat().st_size
+            if not self._analyze_executable(output_target, result):
+                self._add_entry(result, output_target.name, output_target.name, result["total_bytes"], result["total_bytes"], "binary")
+        result["binaries"].sort(key=lambda binary: binary["bytes"], reverse=True)
+        return result
+
+    def _analyze_directory(self, output_dir: Path, result: dict):
+        """遍历 onedir 输出目录；带有 PKG 归档的可执行文件会被展开为归档内的条目。"""
+        directories_to_visit = [output_dir]
+        while directories_to_visit:
+            current_dir = directories_to_visit.pop()
+            try:
+                dir_entries = list(os.scandir(current_dir))
+            except OSError as e_scan:
+                self.logger(f"[体积分析] 无法读取目录 {current_dir}: {e_scan}", "WARNING")
+                continue
+            for dir_entry in dir_entries:
+                if dir_entry.is_dir(follow_symlinks=False):
+                    directories_to_visit.append(Path(dir_entry.path))
+                    continue
+                entry_size = dir_entry.stat(follow_symlinks=False).st_size
+                result["total_bytes"] += entry_size
+                relative_parts = Path(dir_entry.path).relative_to(output_dir).parts
+                if relative_parts[0] == "_internal" and len(relative_parts) > 1: # PyInstaller 6 的 contents 目录
+                    relative_parts = relative_parts[1:]
+                if len(relative_parts) == 1 and current_dir == output_dir and self._analyze_executable(Path(dir_entry.path), result):
+                    continue # 主程序：已按其中嵌入的归档条目计入
+                entry_kind = "binary" if self._looks_like_binary(dir_entry.name) else "data"
+                relative_name = "/".join(relative_parts)
+                self._add_entry(result, relative_name, self._top_level_of_path(relative_name), entry_size, entry_size, entry_kind)
+
+    def _analyze_executable(self, executable_path: Path, result: dict) -> bool:
+        """
+        读取可执行文件中嵌入的 PKG 归档目录表，按条目计入体积。
+
+        Returns:
+            bool: 文件中找到并解析了 PKG 归档时返回 True。
+        """
+        try:
+            with open(executable_path, 'rb') as archive_file:
+                cookie_offset = self._find_magic_backwards(archive_file, self._CARCHIVE_COOKIE_MAGIC)
+                if cookie_offset < 0:
+                    return False
+                archive_file.seek(cookie_offset)
+                cookie_size = struct.calcsize(self._CARCHIVE_COOKIE_FORMAT)
+                _, pkg_length, toc_offset, toc_length, _, _ = struct.unpack(self._CARCHIVE_COOKIE_FORMAT, archive_file.read(cookie_size))
+                pkg_start_offset = cookie_offset + cookie_size - pkg_length
+                archive_file.seek(pkg_start_offset + toc_offset)
+                toc_data = archive_file.read(toc_length)
+
+                archived_bytes = 0
+                toc_entry_header_size = struct.calcsize(self._CARCHIVE_TOC_ENTRY_FORMAT)
+                toc_position = 0
+                while toc_position + toc_entry_header_size <= len(toc_data):
+                    entry_length, entry_offset, data_length, uncompressed_length, _, typecode = struct.unpack_from(
+                        self._CARCHIVE_TOC_ENTRY_FORMAT, toc_data, toc_position)
+                    entry_name = toc_data[toc_position + toc_entry_header_size:toc_position + entry_length].rstrip(b'\0').decode('utf-8', 'replace')
+                    toc_position += entry_length
+                    if entry_length <= 0:
+                        break
+                    typecode = typecode.decode('ascii', 'replace')
+                    archived_bytes += data_length
+                    if typecode == 'z': # PYZ：展开为其中的各个模块
+                        if not self._analyze_pyz(archive_file, pkg_start_offset + entry_offset, data_length, result):
+                            self._add_entry(result, entry_name, entry_name, data_length, uncompressed_length, "python")
+                    elif typecode in ('o', 'd'): # 运行时选项/依赖引用，不占体积
+                        continue
+                    elif typecode == 'b':
+                        self._add_entry(result, entry_name, self._top_level_of_path(entry_name), data_length, uncompressed_length, "binary")
+                    elif typecode in ('m', 'M', 's'):
+                        package_name = "(启动脚本)" if typecode == 's' else entry_name.split('.')[0]
+                        self._add_entry(result, entry_name, package_name, data_length, uncompressed_length, "python")
+                        if typecode != 's':
+                            result["modules"][entry_name] = result["modules"].get(entry_name, 0) + data_length
+                    else: # 'x' 数据文件、'Z' zip、'l' 启动画面资源等
+                        self._add_entry(result, entry_name, self._top_level_of_path(entry_name), data_length, uncompressed_length, "data")
+                bootloader_bytes = executable_path.stat().st_size - archived_bytes
+                if bootloader_bytes > 0:
+                    self._add_entry(result, executable_path.name, "(引导程序)", bootloader_bytes, bootloader_bytes, "binary")
+                return True
+        except (OSError, struct.error) as e_archive:
+            self.logger(f"[体积分析] 无法读取 {executable_path.name} 中的归档: {e_archive}", "WARNING")
+            return False
+
+    def _analyze_pyz(self, archive_file, pyz_start_offset: int, pyz_length: int, result: dict) -> bool:
+        """读取嵌入的 PYZ 归档目录表，把每个模块的压缩大小计入其顶层包。"""
+        archive_file.seek(pyz_start_offset)
+        if archive_file.read(len(self._PYZ_MAGIC)) != self._PYZ_MAGIC:
+            return False
+        archive_file.read(4) # Python 字节码 magic
+        pyz_toc_offset, = struct.unpack('!i', archive_file.read(4))
+        archive_file.seek(pyz_start_offset + pyz_toc_offset)
+        try:
+            pyz_toc = dict(marshal.load(archive_file)) # {模块名: (typecode, offset, length)}；旧版本为 (ispkg, offset, length)
+        except (EOFError, ValueError, TypeError) as e_marshal:
+            self.logger(f"[体积分析] 无法解析 PYZ 目录表 (可能由不同版本的 Python 生成): {e_marshal}", "DEBUG")
+            return False
+        modules_bytes = 0
+        for module_name, module_toc_entry in pyz_toc.items():
+            module_length = module_toc_entry[-1]
+            modules_bytes += module_length
+            self._add_entry(result, module_name, module_name.split('.')[0], module_length, module_length, "python")
+            result["modules"][module_name] = result["modules"].get(module_name, 0) + module_length
+        toc_overhead_bytes = pyz_length - modules_bytes # PYZ 头部和目录表本身
+        if toc_overhead_bytes > 0:
+            self._add_entry(result, "PYZ", "(PYZ 目录表)", toc_overhead_bytes, toc_overhead_bytes, "python")
+        return True
+
+    def _find_magic_backwards(self, file_obj, magic: bytes) -> int:
+        """从文件末尾向前分块查找 magic，返回其偏移；找不到时返回 -1。"""
+        file_obj.seek(0, os.SEEK_END)
+        search_end = file_obj.tell()
+        while search_end >= len(magic):
+            search_start = max(search_end - self._MAGIC_SEARCH_CHUNK_SIZE, 0)
+            file_obj.seek(search_start)
+            chunk = file_obj.read(search_end - search_start)
+            found_at = chunk.rfind(magic)
+            if found_at != -1:
+                return search_start + found_at
+            if search_start == 0:
+                break
+            search_end = search_start + len(magic) - 1 # 保留重叠，避免 magic 跨越两个块
+        return -1
+
+    def _looks_like_binary(self, file_name: str) -> bool:
+        lowered_name = file_name.lower()
+        return lowered_name.endswith(self.BINARY_SUFFIXES) or ".so." in lowered_name
+
+    @staticmethod
+    def _top_level_of_path(entry_name: str) -> str:
+        normalized_name = entry_name.replace("\\", "/")
+        if "/lib-dynload/" in normalized_name: # 标准库扩展模块：按模块名归类，而不是归入 pythonX.Y 目录
+            return normalized_name.rsplit("/", 1)[-1].split(".")[0]
+        return normalized_name.split("/")[0]
+
+    def _add_entry(self, result: dict, entry_name: str, package_name: str, size_bytes: int, uncompressed_bytes: int, entry_kind: str):
+        """把一个条目计入其顶层包；二进制条目同时记录到 binaries 列表。"""
+        package_stats = result["packages"].setdefault(package_name, {"bytes": 0, "uncompressed_bytes": 0, "entries": 0, "category": None})
+        package_stats["bytes"] += size_bytes
+        package_stats["uncompressed_bytes"] += uncompressed_bytes
+        package_stats["entries"] += 1
+        # 分类优先级：内部 > 标准库/Python包 > 二进制 > 数据 (例如含扩展模块的包仍归为 Python 包)
+        if package_name.startswith("("):
+            package_stats["category"] = "内部"
+        elif package_name in self._stdlib_module_names:
+            package_stats["category"] = "标准库"
+        elif entry_kind == "python":
+            package_stats["category"] = "Python包"
+        elif package_stats["category"] not in ("Python包", "二进制"):
+            package_stats["category"] = "二进制" if entry_kind == "binary" else "数据"
+        if entry_kind == "binary":
+            result["binaries"].append({"name": entry_name, "package": package_name, "bytes": size_bytes, "uncompressed_bytes": uncompressed_bytes})
+            extension_module_name = self._extension_module_name(entry_name)
+            if extension_module_name:
+                result["modules"][extension_module_name] = result["modules"].get(extension_module_name, 0) + size_bytes
+
+    @staticmethod
+    def _extension_module_name(entry_name: str) -> str | None:
+        """由扩展模块的相对路径推算其点分模块名，例如 'yaml/_yaml.cpython-311-x86_64-linux-gnu.so' -> 'yaml._yaml'。"""
+        normalized_name = entry_name.replace("\\", "/")
+        file_name = normalized_name.rsplit("/", 1)[-1]
+        if not file_name.endswith((".pyd", ".so")) or ".so." in file_name or file_name.startswith("lib"):
+            return None
+        if "/lib-dynload/" in normalized_name:
+            return file_name.split(".")[0]
+        return ".".join(normalized_name.split("/")[:-1] + [file_name.split(".")[0]])
+
+    @staticmethod
+    def diff_package_sizes(current_sizes: dict, previous_sizes: dict) -> dict:
+        """
+        比较两次构建的按包体积。
+
+        Args:
+            current_sizes (dict): {包名: 字节数} (本次)。
+            previous_sizes (dict): {包名: 字节数} (上次)。
+
+        Returns:
+            dict: {包名: 字节数变化}，只包含发生变化的包 (新增的包为正值，被移除的包为负值)。
+        """
+        size_changes = {}
+        for package_name in set(current_sizes) | set(previous_sizes):
+            size_change = current_sizes.get(package_name, 0) - previous_sizes.get(package_name, 0)
+            if size_change:
+                size_changes[package_name] = size_change
+        return size_changes
+
+
+# --------------------------------------------------------------------------
+#  ExcludeModuleAdvisor: 根据入口脚本的可达导入图推荐可安全排除的模块
+# --------------------------------------------------------------------------
+class ExcludeModuleAdvisor:
+    """
+    将入口脚本的可达导入图与 PyInstaller 实际收集的模块进行比较，推荐可以排除的模块。
+    可达性通过静态解析源码得到 (定位模块源文件时只查找文件，不会导入任何模块)：
+    位于 try/except ImportError 中的导入、以及 if TYPE_CHECKING 下的导入视为“可选”，其余导入 (包括函数内导入) 均视为必需。
+    推荐结果是覆盖全部未被必需路径引用的已收集模块的最小前缀集合，并按可节省的字节数排序。
+    """
+    # PyInstaller 引导程序和运行时钩子所需的模块，无论是否被引用都不能排除
+    ALWAYS_REQUIRED_MODULES = frozenset({
+        "encodings", "codecs", "io", "abc", "os", "stat", "posixpath", "ntpath", "genericpath", "_collections_abc",
+        "struct", "zlib", "marshal", "importlib", "inspect", "zipimport", "collections", "functools", "keyword",
+        "operator", "reprlib", "heapq", "itertools", "types", "weakref", "_weakrefset", "copyreg", "re", "enum",
+        "sre_compile", "sre_parse", "sre_constants", "traceback", "linecache", "tokenize", "token", "warnings",
+        "pkgutil", "locale", "ast", "dis", "opcode", "contextlib", "tempfile", "shutil", "random", "bisect",
+        "hashlib", "threading", "_threading_local", "textwrap", "string", "typing", "fnmatch", "signal",
+    })
+    # 经验上常被连带收集、但很少在运行时真正需要的模块 (未被必需路径引用时给出高置信度推荐)
+    KNOWN_OPTIONAL_MODULES = frozenset({
+        "tkinter", "_tkinter", "test", "unittest", "pydoc", "pydoc_data", "doctest", "IPython", "lib2to3", "idlelib",
+        "turtle", "turtledemo", "distutils", "setuptools", "pip", "ensurepip", "venv", "pytest", "_pytest", "sphinx",
+        "jedi", "parso", "notebook", "jupyter_client", "ipykernel", "matplotlib.backends.backend_tkagg",
+        "matplotlib.backends.backend_qtagg", "matplotlib.backends.backend_qt5agg", "matplotlib.backends.backend_wx",
+        "matplotlib.backends.backend_wxagg", "matplotlib.backends.backend_gtk3agg", "matplotlib.backends.backend_webagg",
+        "matplotlib.backends.backend_nbagg", "matplotlib.tests", "numpy.tests", "pandas.tests", "scipy.tests",
+    })
+    # 排除某个模块时会一并去掉的数据/二进制目录 (用于估算节省的体积)
+    ASSOCIATED_BUNDLE_ENTRIES = {"tkinter": ("_tkinter", "_tcl_data", "_tk_data", "tcl8", "tcl", "tk")}
+
+    def __init__(self, entry_script_path: Path, project_root_path: Path | None = None, extra_required_modules=(),
+                 search_paths: list | None = None, logger_func=None, analysis_cache=None):
+        """
+        Args:
+            entry_script_path (Path): 入口脚本路径。
+            project_root_path (Path, optional): 项目根目录 (作为额外的模块搜索路径)。
+            extra_required_modules (iterable[str]): 额外视为必需的模块 (例如用户配置的隐藏导入)。
+            search_paths (list, optional): 查找第三方/标准库模块源文件的路径，默认使用 sys.path。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+            analysis_cache (SharedAnalysisCache, optional): 共享分析缓存；第三方库和标准库的源码解析结果可在各配置间复用。
+        """
+        self.entry_script = Path(entry_script_path).resolve()
+        self.analysis_cache = analysis_cache
+        self.project_search_paths = [self.entry_script.parent]
+        if project_root_path and Path(project_root_path).resolve() not in self.project_search_paths:
+            self.project_search_paths.append(Path(project_root_path).resolve())
+        self.search_paths = self.project_search_paths + [Path(p) for p in (search_paths if search_paths is not None else sys.path) if p and Path(p).is_dir()]
+        self.extra_required_modules = set(extra_required_modules)
+        self.logger = logger_func if logger_func else print
+        self._module_location_cache = {} # {点分模块名: (源文件Path或None, 是否为包, 是否存在)}
+        self._file_imports_cache = {}    # {源文件: [(导入的点分模块名, 是否可选), ...]}
+
+    def compute_reachable_modules(self) -> tuple[set, set]:
+        """
+        从入口脚本出发计算可达模块。
+
+        Returns:
+            tuple[set, set]: (必需模块集合, 仅通过可选导入可达的模块集合)，均为点分模块名 (包含各级父包)。
+        """
+        required_modules, optional_modules = set(), set()
+        pending_required = [("__main__", self.entry_script, False)]
+        pending_required.extend((name, None, None) for name in self.extra_required_modules | self.ALWAYS_REQUIRED_MODULES)
+        pending_optional = []
+        for target_set, pending_queue, excluded_set in ((required_modules, pending_required, set()), (optional_modules, pending_optional, required_modules)):
+            while pending_queue:
+                module_name, source_file, is_package = pending_queue.pop()
+                if module_name in target_set or module_name in excluded_set:
+                    continue
+                if source_file is None:
+                    source_file, is_package, module_exists = self._locate_module(module_name)
+                    if not module_exists:
+                        continue
+                target_set.add(module_name)
+                if "." in module_name: # 导入子模块会先导入其各级父包
+                    pending_queue.append((module_name.rsplit(".", 1)[0], None, None))
+                if source_file is None or source_file.suffix != ".py":
+                    continue # 扩展模块或命名空间包，无法继续解析
+                for imported_name, is_optional_import in self._get_file_imports(module_name, source_file, is_package):
+                    if is_optional_import or target_set is optional_modules:
+                        pending_optional.append((imported_name, None, None))
+                    else:
+                        pending_queue.append((imported_name, None, None))
+        self.logger(f"[排除推荐] 必需模块 {len(required_modules)} 个，仅可选导入可达的模块 {len(optional_modules)} 个。", "DEBUG")
+        return required_modules, optional_modules
+
+    def recommend(self, collected_module_sizes: dict, bundle_package_sizes: dict | None = None, existing_excluded_modules=(),
+                  min_saving_bytes: int = 16 * 1024) -> list[dict]:
+        """
+        生成排除建议。
+
+        Args:
+            collected_module_sizes (dict): PyInstaller 实际收集的模块 {点分模块名: 字节数} (BundleSizeAnalyzer 结果中的 modules)。
+            bundle_package_sizes (dict, optional): 构建产物按顶层条目的体积 {名称: 字节数}，用于估算关联数据目录的体积。
+            existing_excluded_modules (iterable[str]): 已配置的排除模块。
+            min_saving_bytes (int): 低于该节省量的建议会被忽略。
+
+        Returns:
+            list[dict]: 按节省字节数降序排列的建议，字段为 module、bytes_saved、module_count、
+                        reason ("known"/"optional"/"unreferenced") 和 confidence ("high"/"medium"/"low")。
+        """
+        required_modules, optional_modules = self.compute_reachable_modules()
+        existing_excluded_modules = set(existing_excluded_modules)
+        stdlib_module_names = getattr(sys, "stdlib_module_names", frozenset())
+        savings_by_prefix = {}
+        for module_name, module_bytes in collected_module_sizes.items():
+            top_level_name = module_name.split(".")[0]
+            if module_name in required_modules or top_level_name in self.ALWAYS_REQUIRED_MODULES:
+                continue
+            if top_level_name.startswith("_") and top_level_name in stdlib_module_names:
+                continue # 标准库的 C 加速模块/编解码实现：通过 try/except 或字符串动态加载，排除后会变慢或出错
+            name_parts = module_name.split(".")
+            exclusion_prefix = module_name
+            for prefix_length in range(1, len(name_parts) + 1): # 找到最高一级“未被必需路径引用”的祖先
+                candidate_prefix = ".".join(name_parts[:prefix_length])
+                if candidate_prefix not in required_modules:
+                    exclusion_prefix = candidate_prefix
+                    break
+            if exclusion_prefix in existing_excluded_modules:
+                continue
+            prefix_stats = savings_by_prefix.setdefault(exclusion_prefix, {"bytes_saved": 0, "module_count": 0})
+            prefix_stats["bytes_saved"] += module_bytes
+            prefix_stats["module_count"] += 1
+
+        recommendations = []
+        for exclusion_prefix, prefix_stats in savings_by_prefix.items():
+            for associated_entry in self.ASSOCIATED_BUNDLE_ENTRIES.get(exclusion_prefix, ()):
+                prefix_stats["bytes_saved"] += (bundle_package_sizes or {}).get(associated_entry, 0)
+            if prefix_stats["bytes_saved"] < min_saving_bytes:
+                continue
+            if exclusion_prefix in self.KNOWN_OPTIONAL_MODULES:
+                reason, confidence = "known", "high"
+            elif exclusion_prefix in optional_modules: # 代码能在缺少它时继续运行，但可能失去部分功能
+                reason, confidence = "optional", "medium"
+            else: # 没有任何静态导入引用它：通常是 hook 的 hiddenimports 或动态导入，需要试构建/运行验证
+                reason, confidence = "unreferenced", "low"
+            recommendations.append({"module": exclusion_prefix, "reason": reason, "confidence": confidence, **prefix_stats})
+        recommendations.sort(key=lambda item: item["bytes_saved"], reverse=True)
+        return recommendations
+
+    def _locate_module(self, dotted_module_name: str) -> tuple:
+        """
+        在搜索路径中查找模块的源文件 (只检查文件是否存在，不导入模块)。
+
+        Returns:
+            tuple: (源文件 Path 或 None, 是否为包, 模块是否存在)。扩展模块返回其二进制文件路径。
+        """
+        if dotted_module_name in self._module_location_cache:
+            return self._module_location_cache[dotted_module_name]
+        location = (None, False, False)
+        name_parts = dotted_module_name.split(".")
+        if len(name_parts) > 1: # 子模块只在父包所在目录中查找
+            parent_file, parent_is_package, parent_exists = self._locate_module(".".join(name_parts[:-1]))
+            candidate_dirs = [parent_file.parent] if parent_exists and parent_is_package and parent_file else []
+        else:
+            candidate_dirs = self.search_paths
+            if dotted_module_name in sys.builtin_module_names:
+                location = (None, False, True)
+        for candidate_dir in candidate_dirs:
+            if location[2]:
+                break
+            module_name = name_parts[-1]
+            package_init_file = candidate_dir / module_name / "__init__.py"
+            if package_init_file.is_file():
+                location = (package_init_file, True, True)
+            elif (candidate_dir / f"{module_name}.py").is_file():
+                location = (candidate_dir / f"{module_name}.py", False, True)
+            else:
+                extension_files = [entry for entry in candidate_dir.glob(f"{module_name}.*") if entry.suffix in (".so", ".pyd")]
+                if extension_files:
+                    location = (extension_files[0], False, True)
+        self._module_location_cache[dotted_module_name] = location
+        return location
+
+    def _get_file_imports(self, module_name: str, source_file: Path, is_package: bool) -> list[tuple]:
+        """解析源文件的导入 (带缓存)，返回 [(点分模块名, 是否为可选导入), ...]。"""
+        if source_file in self._file_imports_cache:
+            return self._file_imports_cache[source_file]
+        try:
+            import_records = parse_import_statements(source_file, self.analysis_cache)
+        except (SyntaxError, ValueError, OSError):
+            self._file_imports_cache[source_file] = []
+            return []
+        package_name = module_name if is_package else module_name.rpartition(".")[0]
+        imports = []
+        for imported_module, import_level, imported_names, is_optional in import_records:
+            if imported_names is None: # import a.b
+                imports.append((imported_module, is_optional))
+                continue
+            if import_level:
+                base_parts = package_name.split(".") if package_name else []
+                base_parts = base_parts[:len(base_parts) - (import_level - 1)] if import_level > 1 else base_parts
+                base_module = ".".join(base_parts + ([imported_module] if imported_module else []))
+            else:
+                base_module = imported_module or ""
+            if not base_module:
+                continue
+            imports.append((base_module, is_optional))
+            for imported_name in imported_names: # 'from pkg import sub' 中的 sub 可能是子模块
+                if imported_name != "*":
+                    submodule_name = f"{base_module}.{imported_name}"
+                    if self._locate_module(submodule_name)[2]:
+                        imports.append((submodule_name, is_optional))
+        self._file_imports_cache[source_file] = imports
+        return imports
+
+
+# --------------------------------------------------------------------------
+#  StartupBenchmark: 构建产物的启动耗时基准测试
+# --------------------------------------------------------------------------
+class StartupBenchmark:
+    """
+    多次启动构建出的可执行文件并测量“启动到退出”的耗时，分别统计冷启动和热启动的百分位数。
+    onefile 程序每次启动都要自解压到临时目录，因此冷启动耗时主要反映解压和磁盘读取的开销。
+
+    冷启动：每次运行前尽量把可执行文件 (onedir 为整个输出目录) 从操作系统页缓存中逐出
+    (Linux 上使用 posix_fadvise，无需管理员权限)；其他平台无法逐出缓存，只有第一次运行是真正的冷启动。
+    热启动：先预热运行一次，之后的运行都命中页缓存。
+
+    程序需要能在启动后立即退出：可以通过环境变量 (程序检测到 PYI_STUDIO_BENCHMARK_EXIT 后立即 sys.exit())
+    或命令行参数 (例如 --version) 触发，也可以选择等待程序自然退出。
+    """
+    EXIT_TRIGGER_ENV_VAR = "PYI_STUDIO_BENCHMARK_EXIT"
+
+    def __init__(self, executable_path: Path, cold_runs: int = 3, warm_runs: int = 10, exit_trigger: str = "env",
+                 exit_argument: str = "--version", timeout_seconds: float = 60.0, logger_func=None):
+        """
+        Args:
+            executable_path (Path): 要测试的可执行文件 (onedir 模式下为输出目录中的主程序)。
+            cold_runs (int): 冷启动运行次数。
+            warm_runs (int): 热启动运行次数 (不含预热运行)。
+            exit_trigger (str): 退出触发方式："env" (设置环境变量)、"argument" (传入命令行参数) 或 "none" (等待自然退出)。
+            exit_argument (str): exit_trigger 为 "argument" 时传入的参数。
+            timeout_seconds (float): 单次运行的超时时间，超时后结束进程树并记为失败。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.executable_path = Path(executable_path)
+        self.cold_runs = cold_runs
+        self.warm_runs = warm_runs
+        self.exit_trigger = exit_trigger
+        self.exit_argument = exit_argument
+        self.timeout_seconds = timeout_seconds
+        self.logger = logger_func if logger_func else print
+
+    def run(self, cancel_event: threading.Event | None = None) -> dict:
+        """
+        执行基准测试。
+
+        Args:
+            cancel_event (threading.Event, optional): 置位后在当前这次运行结束后停止测试。
+
+        Returns:
+            dict: {"executable", "exit_trigger", "cache_eviction" (是否能真正逐出页缓存),
+                   "cold": 统计结果, "warm": 统计结果, "cold_timings", "warm_timings",
+                   "failures" (超时或无法启动的次数), "nonzero_exit_count"}。统计结果见 summarize_timings()。
+        """
+        result = {"executable": str(self.executable_path), "exit_trigger": self.exit_trigger, "cache_eviction": hasattr(os, "posix_fadvise"),
+                  "cold_timings": [], "warm_timings": [], "failures": 0, "nonzero_exit_count": 0}
+        for run_index in range(self.cold_runs):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            self._evict_from_page_cache()
+            self._record_run(result, "cold_timings")
+            self.logger(f"[启动基准] 冷启动 {run_index + 1}/{self.cold_runs} 完成。", "DEBUG")
+        if self.warm_runs and not (cancel_event is not None and cancel_event.is_set()):
+            self._launch_once() # 预热：让可执行文件及其依赖进入页缓存
+            for run_index in range(self.warm_runs):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                self._record_run(result, "warm_timings")
+                self.logger(f"[启动基准] 热启动 {run_index + 1}/{self.warm_runs} 完成。", "DEBUG")
+        result["cold"] = self.summarize_timings(result["cold_timings"])
+        result["warm"] = self.summarize_timings(result["warm_timings"])
+        return result
+
+    def _record_run(self, result: dict, timings_key: str):
+        elapsed_seconds, exit_code = self._launch_once()
+        if elapsed_seconds is None:
+            result["failures"] += 1
+            return
+        result[timings_key].append(round(elapsed_seconds, 4))
+        if exit_code != 0:
+            result["nonzero_exit_count"] += 1
+
+    def _launch_once(self) -> tuple:
+        """
+        启动一次可执行文件并等待其退出。
+
+        Returns:
+            tuple: (耗时秒数, 退出码)；超时或无法启动时为 (None, None)。
+        """
+        launch_command = [str(self.executable_path)]
+        if self.exit_trigger == "argument" and self.exit_argument:
+            launch_command.append(self.exit_argument)
+        launch_env = dict(os.environ)
+        if self.exit_trigger == "env":
+            launch_env[self.EXIT_TRIGGER_ENV_VAR] = "1"
+        start_time = time.perf_counter()
+        try:
+            launched_process = subprocess.Popen(
+                launch_command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                env=launch_env, cwd=str(self.executable_path.parent),
+                creationflags=(subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0),
+                start_new_session=(sys.platform != "win32"))
+        except OSError as e_launch:
+            self.logger(f"[启动基准] 无法启动 {self.executable_path}: {e_launch}", "ERROR")
+            return None, None
+        try:
+            exit_code = launched_process.wait(self.timeout_seconds)
+        except subprocess.TimeoutExpired:
+            self.logger(f"[启动基准] 程序在 {self.timeout_seconds:.0f} 秒内未退出 (请检查退出触发方式)，已结束其进程树。", "WARNING")
+            terminate_process_tree(launched_process, timeout_seconds=2.0, logger_func=self.logger)
+            return None, None
+        return time.perf_counter() - start_time, exit_code
+
+    def _evict_from_page_cache(self) -> bool:
+        """尽量将可执行文件 (onedir 时为整个输出目录) 从页缓存中逐出。平台不支持时返回 False。"""
+        if not hasattr(os, "posix_fadvise"):
+            return False
+        target_dir = self.executable_path.parent
+        candidate_files = [self.executable_path]
+        if (target_dir / "_internal").is_dir() or any(target_dir.glob("*.so*")) or any(target_dir.glob("*.dll")):
+            candidate_files = [path for path in target_dir.rglob("*") if path.is_file()] # onedir：逐出全部依赖文件
+        for candidate_file in candidate_files:
+            try:
+                file_descriptor = os.open(candidate_file, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(file_descriptor)
+            except OSError:
+                continue
+        return True
+
+    @staticmethod
+    def percentile(sorted_values: list, fraction: float) -> float | None:
+        """对已排序的数值按线性插值计算百分位数 (fraction 取值 0.0-1.0)；列表为空时返回 None。"""
+        if not sorted_values:
+            return None
+        position = (len(sorted_values) - 1) * fraction
+        lower_index = int(position)
+        upper_index = min(lower_index + 1, len(sorted_values) - 1)
+        return sorted_values[lower_index] + (sorted_values[upper_index] - sorted_values[lower_index]) * (position - lower_index)
+
+    @classmethod
+    def summarize_timings(cls, timings: list) -> dict:
+        """
+        统计耗时列表。
+
+        Returns:
+            dict: {"count", "min", "mean", "p50", "p90", "p95", "max"} (单位：秒；没有数据时数值均为 None)。
+        """
+        sorted_timings = sorted(timings)
+        return {
+            "count": len(sorted_timings),
+            "min": sorted_timings[0] if sorted_timings else None,
+            "mean": sum(sorted_timings) / len(sorted_timings) if sorted_timings else None,
+            "p50": cls.percentile(sorted_timings, 0.50),
+            "p90": cls.percentile(sorted_timings, 0.90),
+            "p95": cls.percentile(sorted_timings, 0.95),
+            "max": sorted_timings[-1] if sorted_timings else None,
+        }
+
+
+# --------------------------------------------------------------------------
+#  DataFolderFilter: 数据文件夹的包含/排除 glob 规则
+# --------------------------------------------------------------------------
+class DataFolderFilter:
+    """
+    数据文件夹条目的包含/排除 glob 规则。规则使用 fnmatch 语法，匹配相对于该文件夹、以 / 分隔的路径；
+    不含 / 的规则 (例如 *.psd、__pycache__) 同时匹配任意层级的文件名或目录名。
+    排除规则匹配到目录时整个目录不再遍历 (剪枝)；包含规则为空时表示包含全部文件。
+
+    expand() 把过滤结果转换为 --add-data 参数：内容被完整保留的子目录仍作为一个整体传给 PyInstaller，
+    只有存在被过滤文件的目录才逐个列出文件，避免命令行随文件数量膨胀。
+    """
+    def __init__(self, include_patterns=(), exclude_patterns=()):
+        """
+        Args:
+            include_patterns (iterable[str]): 包含规则；为空时包含全部文件。
+            exclude_patterns (iterable[str]): 排除规则；优先于包含规则。
+        """
+        self.include_patterns = [pattern.strip().strip("/") for pattern in include_patterns if pattern.strip().strip("/")]
+        self.exclude_patterns = [pattern.strip().strip("/") for pattern in exclude_patterns if pattern.strip().strip("/")]
+
+    @classmethod
+    def from_config(cls, filter_config: dict | None):
+        """由配置中保存的 {"include": [...], "exclude": [...]} 创建规则；没有任何规则时返回 None。"""
+        if not filter_config:
+            return None
+        folder_filter = cls(filter_config.get("include", ()), filter_config.get("exclude", ()))
+        return folder_filter if folder_filter.include_patterns or folder_filter.exclude_patterns else None
+
+    @staticmethod
+    def split_patterns(patterns_text: str) -> list[str]:
+        """将逗号、分号或换行分隔的规则文本拆分为列表。"""
+        return [pattern.strip() for pattern in re.split(r"[,;\n]", patterns_text) if pattern.strip()]
+
+    @staticmethod
+    def _matches_any(relative_path: str, patterns: list[str]) -> bool:
+        base_name = relative_path.rsplit("/", 1)[-1]
+        return any(fnmatch.fnmatchcase(relative_path, pattern) or ("/" not in pattern and fnmatch.fnmatchcase(base_name, pattern))
+                   for pattern in patterns)
+
+    def is_file_included(self, relative_path: str) -> bool:
+        if self._matches_any(relative_path, self.exclude_patterns):
+            return False
+        return not self.include_patterns or self._matches_any(relative_path, self.include_patterns)
+
+    def is_dir_pruned(self, relative_path: str) -> bool:
+        return self._matches_any(relative_path, self.exclude_patterns)
+
+    def expand(self, source_dir: Path, destination: str) -> dict:
+        """
+        遍历源文件夹 (被排除的目录直接剪枝)，返回过滤结果。
+
+        Args:
+            source_dir (Path): 数据文件夹。
+            destination (str): 打包后的目标目录。
+
+        Returns:
+            dict: {"add_data": [(源路径str, 目标目录str), ...], "files": [(源文件Path, 打包内路径str), ...],
+                   "file_count", "total_bytes"}
+        """
+        result = {"add_data": [], "files": [], "file_count": 0, "total_bytes": 0}
+        destination_root = Path(destination or ".")
+        if self._expand_directory(Path(source_dir), "", destination_root, result):
+            result["add_data"] = [(str(source_dir), destination_root.as_posix())]
+        return result
+
+    def _expand_directory(self, current_dir: Path, relative_dir: str, destination_root: Path, result: dict) -> bool:
+        """
+        递归遍历一个目录。返回该目录是否被完整保留；被完整保留时其中的条目不写入 add_data，由上层合并为一个目录参数。
+        """
+        kept_pairs = [] # 本目录中被保留的文件 (或被完整保留的子目录)，仅在本目录不完整时写入 add_data
+        directory_complete = True
+        try:
+            directory_entries = sorted(os.scandir(current_dir), key=lambda entry: entry.name)
+        except OSError:
+            return False
+        for directory_entry in directory_entries:
+            relative_path = f"{relative_dir}/{directory_entry.name}" if relative_dir else directory_entry.name
+            if directory_entry.is_dir(follow_symlinks=True):
+                if self.is_dir_pruned(relative_path):
+                    directory_complete = False
+                    continue
+                if self._expand_directory(Path(directory_entry.path), relative_path, destination_root, result):
+                    kept_pairs.append((directory_entry.path, (destination_root / relative_path).as_posix()))
+                else: # 不完整的子目录已自行写入其保留的文件
+                    directory_complete = False
+            elif self.is_file_included(relative_path):
+                try:
+                    file_size = directory_entry.stat().st_size
+                except OSError:
+                    continue
+                result["files"].append((Path(directory_entry.path), (destination_root / relative_path).as_posix()))
+                result["file_count"] += 1
+                result["total_bytes"] += file_size
+                kept_pairs.append((directory_entry.path, (destination_root / relative_dir).as_posix() if relative_dir else destination_root.as_posix()))
+            else:
+                directory_complete = False
+        if not directory_complete:
+            result["add_data"].extend(kept_pairs)
+        return directory_complete
+
+
+# --------------------------------------------------------------------------
+#  SpecFileManager: 生成、复用与解析 .spec 文件
+# --------------------------------------------------------------------------
+class SpecFileManager:
+    """
+    管理一个配置对应的规范 .spec 文件：
+      - 根据界面配置生成 .spec (格式与 PyInstaller 自带模板一致)，文件头记录输入指纹和正文哈希；
+      - 输入未变化时不重写文件 (文件保持不变，PyInstaller 的构建缓存更容易命中)；
+      - 正文被手动修改过时，只要界面配置未变就直接使用修改后的文件，否则先备份再重新生成；
+      - 用 ast 解析 .spec 中 Analysis(...) / EXE(...) 的参数 (不会执行 .spec 文件)，以便导回界面。
+    """
+    SPEC_FORMAT_VERSION = 1
+    CODING_LINE = "# -*- mode: python ; coding: utf-8 -*-"
+    MARKER_PATTERN = re.compile(r"^# PyInstaller Studio spec v(\d+): inputs=([0-9a-f]+) body=([0-9a-f]+)$")
+    LIST_ARGUMENTS = ("pathex", "datas", "hiddenimports", "excludes")
+
+    def __init__(self, spec_path: Path, logger_func=None):
+        """
+        Args:
+            spec_path (Path): .spec 文件路径。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.spec_path = Path(spec_path)
+        self.logger = logger_func if logger_func else print
+        self._assigned_lists = {} # 解析时: 模块级列表变量 -> 可求值的字面量条目
+        self._unsupported = {}    # 解析时: {参数名: [无法按字面量求值的表达式文本]}
+
+    @classmethod
+    def fingerprint(cls, spec_options: dict) -> str:
+        """计算生成 .spec 所用输入的指纹 (选项字典的规范 JSON 的 sha256)。"""
+        canonical_json = json.dumps({"format": cls.SPEC_FORMAT_VERSION, **spec_options}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _body_hash(body_text: str) -> str:
+        return hashlib.sha256(body_text.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def render(spec_options: dict) -> str:
+        """
+        根据选项生成 .spec 正文 (不含文件头的编码行和指纹行)。
+
+        Args:
+            spec_options (dict): 包含 script, name, onefile, console, debug, upx, icon, pathex, datas, hiddenimports, excludes, macos_bundle。
+        """
+        datas = [tuple(data_pair) for data_pair in spec_options["datas"]]
+        bootloader_options = "[('v', None, 'OPTION')]" if spec_options["debug"] else "[]" # 与 --debug=all 相同：打印导入信息
+        icon_value = [spec_options["icon"]] if spec_options.get("icon") else None
+        common_exe_arguments = (
+            f"    name={spec_options['name']!r},\n"
+            f"    debug={spec_options['debug']!r},\n"
+            f"    bootloader_ignore_signals=False,\n"
+            f"    strip=False,\n"
+            f"    upx={spec_options['upx']!r},\n"
+        )
+        platform_exe_arguments = (
+            f"    console={spec_options['console']!r},\n"
+            f"    disable_windowed_traceback=False,\n"
+            f"    argv_emulation=False,\n"
+            f"    target_arch=None,\n"
+            f"    codesign_identity=None,\n"
+            f"    entitlements_file=None,\n"
+            + (f"    icon={icon_value!r},\n" if icon_value else "")
+        )
+        spec_body = (
+            "# 由 PyInstaller Studio Pro 根据界面配置生成。界面配置不变时，构建会直接使用手动修改后的本文件；\n"
+            "# 界面配置变化后会重新生成 (手动修改的版本会先备份为 .bak 文件)。\n"
+            "\n"
+            "a = Analysis(\n"
+            f"    [{spec_options['script']!r}],\n"
+            f"    pathex={list(spec_options['pathex'])!r},\n"
+            f"    binaries=[],\n"
+            f"    datas={datas!r},\n"
+            f"    hiddenimports={list(spec_options['hiddenimports'])!r},\n"
+            f"    hookspath=[],\n"
+            f"    hooksconfig={{}},\n"
+            f"    runtime_hooks=[],\n"
+            f"    excludes={list(spec_options['excludes'])!r},\n"
+            f"    noarchive={spec_options['debug']!r},\n"
+            ")\n"
+            "pyz = PYZ(a.pure)\n"
+            "\n"
+        )
+        if spec_options["onefile"]:
+            spec_body += (
+                "exe = EXE(\n"
+                "    pyz,\n"
+                "    a.scripts,\n"
+                "    a.binaries,\n"
+                "    a.datas,\n"
+                f"    {bootloader_options},\n"
+                + common_exe_arguments +
+                "    upx_exclude=[],\n"
+                "    runtime_tmpdir=None,\n"
+                + platform_exe_arguments +
+                ")\n"
+            )
+        else:
+            spec_body += (
+                "exe = EXE(\n"
+                "    pyz,\n"
+                "    a.scripts,\n"
+                f"    {bootloader_options},\n"
+                "    exclude_binaries=True,\n"
+                + common_exe_arguments + platform_exe_arguments +
+                ")\n"
+                "coll = COLLECT(\n"
+                "    exe,\n"
+                "    a.binaries,\n"
+                "    a.datas,\n"
+                "    strip=False,\n"
+                f"    upx={spec_options['upx']!r},\n"
+                "    upx_exclude=[],\n"
+                f"    name={spec_options['name']!r},\n"
+                ")\n"
+            )
+        if spec_options.get("macos_bundle"): # 与 PyInstaller 一致：macOS 上的窗口程序额外生成 .app
+            spec_body += (
+                "app = BUNDLE(\n"
+                f"    {'exe' if spec_options['onefile'] else 'coll'},\n"
+                f"    name={spec_options['name'] + '.app'!r},\n"
+                f"    icon={spec_options.get('icon') or None!r},\n"
+                "    bundle_identifier=None,\n"
+                ")\n"
+            )
+        return spec_body
+
+    def read_marker(self) -> tuple[str | None, bool]:
+        """
+        读取现有 .spec 文件的指纹行。
+
+        Returns:
+            tuple[str | None, bool]: (生成时的输入指纹，文件不是本程序生成的则为 None；正文是否被手动修改过)。
+        """
+        spec_text = self.spec_path.read_text(encoding="utf-8")
+        spec_lines = spec_text.split("\n", 2)
+        marker_match = self.MARKER_PATTERN.match(spec_lines[1]) if len(spec_lines) == 3 else None
+        if not marker_match or int(marker_match.group(1)) != self.SPEC_FORMAT_VERSION:
+            return None, True
+        return marker_match.group(2), self._body_hash(spec_lines[2]) != marker_match.group(3)
+
+    def ensure(self, spec_options: dict) -> tuple[str, Path | None]:
+        """
+        确保 .spec 文件与当前输入一致，必要时 (原子地) 重写。
+
+        Returns:
+            tuple[str, Path | None]: (状态, 备份路径)。状态为：
+                "created"     - 文件原本不存在，已生成；
+                "unchanged"   - 输入未变化，文件保持不变；
+                "edited"      - 输入未变化但文件被手动修改过，保留并使用修改后的文件；
+                "regenerated" - 输入已变化，已重新生成 (手动修改过的旧文件会备份，备份路径非 None)。
+        """
+        inputs_fingerprint = self.fingerprint(spec_options)
+        backup_path = None
+        if self.spec_path.is_file():
+            previous_fingerprint, manually_edited = self.read_marker()
+            if previous_fingerprint == inputs_fingerprint:
+                return ("edited" if manually_edited else "unchanged"), None
+            if manually_edited: # 手动修改过 (或不是本程序生成的) 文件不能直接覆盖
+                backup_path = self.spec_path.with_name(f"{self.spec_path.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}.bak")
+                shutil.copy2(self.spec_path, backup_path)
+            spec_status = "regenerated"
+        else:
+            spec_status = "created"
+        spec_body = self.render(spec_options)
+        spec_text = f"{self.CODING_LINE}\n# PyInstaller Studio spec v{self.SPEC_FORMAT_VERSION}: inputs={inputs_fingerprint} body={self._body_hash(spec_body)}\n{spec_body}"
+        self.spec_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.spec_path.with_name(f".{self.spec_path.name}.tmp")
+        temporary_path.write_text(spec_text, encoding="utf-8")
+        os.replace(temporary_path, self.spec_path)
+        return spec_status, backup_path
+
+    def parse(self) -> dict:
+        """
+        用 ast 解析 .spec 文件 (不执行)，取出 Analysis(...) 与 EXE(...) 中可以按字面量求值的参数。
+        列表参数支持先赋值给模块级变量 (含 +=) 再传入；非字面量的项 (例如 collect_data_files(...)) 会记入 unsupported。
+
+        Returns:
+            dict: scripts, pathex, datas, hiddenimports, excludes (列表)；name, console, debug, upx, icon, onefile
+                  (未在 .spec 中找到时为 None)；unsupported ({参数名: [表达式文本]})。
+
+        Raises:
+            ValueError: 没有找到 Analysis(...) 调用。
+            SyntaxError: .spec 文件存在语法错误。
+        """
+        with open(self.spec_path, "rb") as f:
+            spec_tree = ast.parse(f.read(), filename=str(self.spec_path))
+        self._assigned_lists, self._unsupported = {}, {}
+        # 先收集模块级 "name = [...]" / "name += [...]"，以便解析 datas=name 的写法
+        list_value_types = (ast.List, ast.Tuple, ast.BinOp, ast.Name)
+        for statement in spec_tree.body:
+            if isinstance(statement, ast.Assign) and len(statement.targets) == 1 and isinstance(statement.targets[0], ast.Name) \
+                    and isinstance(statement.value, list_value_types):
+                variable_name = statement.targets[0].id
+                self._unsupported.pop(f"${variable_name}", None)
+                self._assigned_lists[variable_name] = self._literal_items(statement.value, f"${variable_name}")
+            elif isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name) and isinstance(statement.op, ast.Add):
+                variable_name = statement.target.id
+                self._assigned_lists[variable_name] = self._assigned_lists.get(variable_name, []) + self._literal_items(statement.value, f"${variable_name}")
+
+        calls_by_name = {}
+        for call_node in ast.walk(spec_tree):
+            if isinstance(call_node, ast.Call):
+                calls_by_name.setdefault(getattr(call_node.func, "id", getattr(call_node.func, "attr", None)), call_node)
+        analysis_call = calls_by_name.get("Analysis")
+        if analysis_call is None:
+            raise ValueError("在 .spec 文件中没有找到 Analysis(...) 调用。")
+        spec_settings = {argument_name: [] for argument_name in self.LIST_ARGUMENTS}
+        spec_settings["scripts"] = self._literal_items(analysis_call.args[0], "scripts") if analysis_call.args else []
+        for keyword_node in analysis_call.keywords:
+            if keyword_node.arg in self.LIST_ARGUMENTS:
+                spec_settings[keyword_node.arg] = self._literal_items(keyword_node.value, keyword_node.arg)
+
+        exe_call = calls_by_name.get("EXE")
+        exe_keywords = {keyword_node.arg: keyword_node.value for keyword_node in exe_call.keywords} if exe_call else {}
+        for argument_name in ("name", "console", "debug", "upx", "icon"):
+            spec_settings[argument_name] = self._literal_value(exe_keywords[argument_name], argument_name) if argument_name in exe_keywords else None
+        if isinstance(spec_settings["icon"], (list, tuple)): # icon 可以是列表，界面只支持一个图标
+            spec_settings["icon"] = spec_settings["icon"][0] if spec_settings["icon"] else None
+        if exe_call is None:
+            spec_settings["onefile"] = None
+        else:
+            exclude_binaries = self._literal_value(exe_keywords["exclude_binaries"], "exclude_binaries") if "exclude_binaries" in exe_keywords else False
+            spec_settings["onefile"] = not (exclude_binaries or "COLLECT" in calls_by_name)
+        # "$变量名" 下记录的是变量中的表达式，只有被引用后才会复制到对应参数下
+        spec_settings["unsupported"] = {argument_name: expressions for argument_name, expressions in self._unsupported.items() if not argument_name.startswith("$")}
+        return spec_settings
+
+    def _literal_value(self, value_node, argument_name: str):
+        try:
+            return ast.literal_eval(value_node)
+        except (ValueError, TypeError, SyntaxError):
+            self._unsupported.setdefault(argument_name, []).append(ast.unparse(value_node))
+            return None
+
+    def _literal_items(self, value_node, argument_name: str) -> list:
+        """求出列表/元组表达式中可以按字面量求值的元素；其他元素记入 unsupported。"""
+        if isinstance(value_node, ast.BinOp) and isinstance(value_node.op, ast.Add):
+            return self._literal_items(value_node.left, argument_name) + self._literal_items(value_node.right, argument_name)
+        if isinstance(value_node, ast.Name) and value_node.id in self._assigned_lists:
+            variable_unsupported = self._unsupported.get(f"${value_node.id}")
+            if variable_unsupported:
+                self._unsupported.setdefault(argument_name, []).extend(variable_unsupported)
+            return list(self._assigned_lists[value_node.id])
+        if not isinstance(value_node, (ast.List, ast.Tuple)):
+            self._unsupported.setdefault(argument_name, []).append(ast.unparse(value_node))
+            return []
+        literal_items = []
+        for element_node in value_node.elts:
+            try:
+                literal_items.append(ast.literal_eval(element_node))
+            except (ValueError, TypeError, SyntaxError):
+                self._unsupported.setdefault(argument_name, []).append(ast.unparse(element_node))
+        return literal_items
+
+
+# --------------------------------------------------------------------------
+#  DataManifestReader: 从清单文件批量读取数据文件条目
+# --------------------------------------------------------------------------
+class DataManifestReader:
+    """
+    从清单文件中读取数据文件条目，支持：
+      - CSV：每行 "源路径,目标路径" (目标可省略；首行为 source/destination 等表头时自动跳过)；
+      - JSON：条目列表 (字符串 "源路径<os.pathsep>目标路径"、[源, 目标] 或 {"source": ..., "destination": ...})，
+              也可以是包含 datas/add_data/data 键的对象；
+      - TOML：顶层或 [tool.pyinstaller] 下的 datas/add_data/data 数组 (需要 Python 3.11+ 的 tomllib)；
+      - .spec：Analysis(...) 的 datas=[...] 参数 (支持先赋值给变量再传入；非字面量的项，例如 collect_data_files(...)，会被跳过)。
+    相对路径相对于清单文件所在目录解析 (与 PyInstaller 解析 .spec 中相对路径的方式一致)。
+    """
+    SOURCE_KEYS = ("source", "src", "path")
+    DESTINATION_KEYS = ("destination", "dest", "dst", "target")
+    LIST_KEYS = ("datas", "add_data", "data")
+
+    def __init__(self, manifest_path: Path, logger_func=None):
+        """
+        Args:
+            manifest_path (Path): 清单文件路径。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.manifest_path = Path(manifest_path)
+        self.base_dir = self.manifest_path.resolve().parent
+        self.logger = logger_func if logger_func else print
+        self.skipped_items = [] # 无法识别的条目 (原样文本)，用于汇总提示
+
+    def read(self) -> list[tuple[str, str | None]]:
+        """
+        读取清单。
+
+        Returns:
+            list[tuple[str, str | None]]: [(绝对源路径, 目标路径或None), ...]；目标为 None 表示清单中未指定。
+
+        Raises:
+            ValueError: 文件格式无法识别或内容无法解析。
+            OSError: 文件无法读取。
+        """
+        suffix = self.manifest_path.suffix.lower()
+        if suffix == ".csv":
+            raw_items = self._read_csv()
+        elif suffix == ".json":
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                raw_items = self._items_from_container(json.load(f))
+        elif suffix == ".toml":
+            try:
+                import tomllib
+            except ImportError:
+                raise ValueError("读取 TOML 清单需要 Python 3.11 及以上版本 (tomllib)。")
+            with open(self.manifest_path, "rb") as f:
+                toml_data = tomllib.load(f)
+            raw_items = self._items_from_container(toml_data.get("tool", {}).get("pyinstaller", toml_data) if isinstance(toml_data, dict) else toml_data)
+        elif suffix == ".spec":
+            raw_items = self._read_spec_datas()
+        else:
+            raise ValueError(f"不支持的清单格式: {suffix or '(无扩展名)'}，支持 .csv / .json / .toml / .spec。")
+        entries = []
+        for raw_item in raw_items:
+            normalized_entry = self._normalize_item(raw_item)
+            if normalized_entry is None:
+                self.skipped_items.append(str(raw_item))
+            else:
+                entries.append(normalized_entry)
+        return entries
+
+    def _read_csv(self) -> list:
+        with open(self.manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+            csv_rows = [row for row in csv.reader(f) if row and any(cell.strip() for cell in row) and not row[0].lstrip().startswith("#")]
+        if csv_rows and csv_rows[0][0].strip().lower() in self.SOURCE_KEYS:
+            csv_rows = csv_rows[1:] # 跳过表头
+        return [[cell.strip() for cell in row[:2]] for row in csv_rows]
+
+    def _items_from_container(self, container) -> list:
+        """从 JSON/TOML 的顶层结构中取出条目列表。"""
+        if isinstance(container, list):
+            return container
+        if isinstance(container, dict):
+            for list_key in self.LIST_KEYS:
+                if isinstance(container.get(list_key), list):
+                    return container[list_key]
+            if all(isinstance(value, str) for value in container.values()): # {源: 目标} 映射
+                return [[source, destination] for source, destination in container.items()]
+        raise ValueError("清单中没有找到数据条目列表 (应为数组，或包含 datas / add_data / data 数组的对象)。")
+
+    def _read_spec_datas(self) -> list:
+        """从 .spec 文件中取出 Analysis(...) 的 datas 参数中的字面量条目 (不会执行 .spec 文件)。"""
+        spec_settings = SpecFileManager(self.manifest_path, logger_func=self.logger).parse()
+        self.skipped_items.extend(spec_settings["unsupported"].get("datas", []))
+        return spec_settings["datas"]
+
+    def _normalize_item(self, raw_item) -> tuple[str, str | None] | None:
+        """将各种形式的条目统一为 (绝对源路径, 目标路径或None)；无法识别时返回 None。"""
+        source_str = destination_str = None
+        if isinstance(raw_item, str):
+            source_str, _, destination_str = raw_item.partition(os.pathsep) if os.pathsep in raw_item else (raw_item, "", None)
+        elif isinstance(raw_item, (list, tuple)) and raw_item and all(isinstance(part, str) for part in raw_item[:2]):
+            source_str = raw_item[0]
+            destination_str = raw_item[1] if len(raw_item) > 1 else None
+        elif isinstance(raw_item, dict):
+            source_str = next((raw_item[key] for key in self.SOURCE_KEYS if isinstance(raw_item.get(key), str)), None)
+            destination_str = next((raw_item[key] for key in self.DESTINATION_KEYS if isinstance(raw_item.get(key), str)), None)
+        if not source_str or not source_str.strip():
+            return None
+        source_path = Path(os.path.expanduser(source_str.strip()))
+        if not source_path.is_absolute():
+            source_path = self.base_dir / source_path
+        destination_str = destination_str.strip() if destination_str and destination_str.strip() else None
+        return os.path.normpath(str(source_path)), destination_str
+
+    @staticmethod
+    def validate_sources(source_paths: list[str], max_workers: int = 16) -> dict:
+        """
+        并行检查源路径是否存在 (网络共享上逐个 stat 很慢，并行可以显著缩短等待时间)。
+        含通配符的源路径 (PyInstaller 的 --add-data 支持) 只要能匹配到至少一个文件即视为存在。
+
+        Returns:
+            dict: {源路径: "file" / "dir" / "glob" / None (不存在)}
+        """
+        def _check_source(source_str: str):
+            if glob.has_magic(source_str):
+                return "glob" if glob.glob(source_str) else None
+            source_path = Path(source_str)
+            try:
+                if source_path.is_dir():
+                    return "dir"
+                if source_path.is_file():
+                    return "file"
+            except OSError:
+                pass
+            return None
+        unique_sources = list(dict.fromkeys(source_paths))
+        with ThreadPoolExecutor(max_workers=max_workers) as check_executor:
+            return dict(zip(unique_sources, check_executor.map(_check_source, unique_sources)))
+
+
+# --------------------------------------------------------------------------
+#  DataFileIndex: 附加数据文件的展开、哈希与重复/重叠检查
+# --------------------------------------------------------------------------
+class DataFileIndex:
+    """
+    将 add_data_list 中的条目 (文件或文件夹) 展开为逐个文件，并行计算内容哈希，找出：
+      - 重复内容：相同内容的文件被打包到多个不同的目标位置 (浪费体积)；
+      - 重叠条目：某个条目的源路径位于另一个条目的源文件夹中 (同一批文件被复制两次)；
+      - 目标冲突：不同内容的文件被打包到同一个目标路径 (后者会覆盖前者)。
+    哈希结果连同文件大小和 mtime 一起持久化，再次检查时只重新计算发生变化的文件。
+    """
+    FORMAT_VERSION = 1
+    HASH_CHUNK_BYTES = 1024 * 1024
+
+    def __init__(self, index_file_path: Path, max_workers: int | None = None, logger_func=None):
+        """
+        Args:
+            index_file_path (Path): 持久化索引文件 (JSON) 的路径。
+            max_workers (int, optional): 并行哈希的线程数，默认按 CPU 数量确定。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.index_file_path = Path(index_file_path)
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 2) * 2)
+        self.logger = logger_func if logger_func else print
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_entry(data_entry_str: str) -> tuple[Path, str] | None:
+        """将 "源路径<os.pathsep>目标路径" 格式的条目拆分为 (源路径, 目标路径)；格式不正确时返回 None。"""
+        if os.pathsep not in data_entry_str:
+            return None
+        source_path_str, destination_str = data_entry_str.split(os.pathsep, 1)
+        return Path(source_path_str), destination_str.strip() or "."
+
+    def expand_entries(self, data_entries: list[str], entry_filters: dict | None = None) -> list[dict]:
+        """
+        展开全部条目。与 PyInstaller 的 --add-data 语义一致：目标路径是目标“目录”，
+        文件放在其中并保留原文件名，文件夹的内容按相对路径放在其中。
+
+        Args:
+            data_entries (list[str]): add_data_list 中的条目。
+            entry_filters (dict, optional): {条目字符串: DataFolderFilter}，文件夹条目只展开规则保留的文件。
+
+        Returns:
+            list[dict]: 每个文件一项 {"entry_index", "source" (Path), "destination" (使用 / 分隔的打包内路径)}。
+        """
+        expanded_files = []
+        for entry_index, data_entry_str in enumerate(data_entries):
+            parsed_entry = self.parse_entry(data_entry_str)
+            if parsed_entry is None:
+                continue
+            source_path, destination_str = parsed_entry
+            destination_root = Path(destination_str)
+            if source_path.is_file():
+                expanded_files.append({"entry_index": entry_index, "source": source_path,
+                                       "destination": (destination_root / source_path.name).as_posix()})
+            elif source_path.is_dir() and (entry_filters or {}).get(data_entry_str) is not None:
+                for filtered_path, bundle_path in entry_filters[data_entry_str].expand(source_path, destination_str)["files"]:
+                    expanded_files.append({"entry_index": entry_index, "source": filtered_path, "destination": bundle_path})
+            elif source_path.is_dir():
+                for walk_root, _, file_names in os.walk(source_path):
+                    for file_name in file_names:
+                        file_path = Path(walk_root) / file_name
+                        expanded_files.append({"entry_index": entry_index, "source": file_path,
+                                               "destination": (destination_root / file_path.relative_to(source_path)).as_posix()})
+        return expanded_files
+
+    def validate(self, data_entries: list[str], entry_filters: dict | None = None) -> dict:
+        """
+        展开并哈希全部数据文件，然后检查重复、重叠与冲突。
+
+        Args:
+            data_entries (list[str]): add_data_list 中的条目。
+            entry_filters (dict, optional): {条目字符串: DataFolderFilter}，见 expand_entries()。
+
+        Returns:
+            dict: {"file_count", "total_bytes", "hashed_count" (本次实际重新哈希的文件数), "reused_count",
+                   "duplicates": [{"sha256", "size", "destinations", "sources", "wasted_bytes"}, ...] (按浪费体积降序),
+                   "duplicate_bytes", "overlaps": [{"entry_a", "entry_b", "shared_files", "shared_bytes"}, ...],
+                   "conflicts": [{"destination", "sources"}, ...]}
+        """
+        expanded_files = self.expand_entries(data_entries, entry_filters)
+        file_hashes, hashed_count = self.hash_files([expanded_file["source"] for expanded_file in expanded_files])
+        for expanded_file in expanded_files:
+            index_entry = file_hashes.get(str(expanded_file["source"]))
+            if index_entry is not None:
+                expanded_file["size"], expanded_file["sha256"] = index_entry[0], index_entry[2]
+
+        hashed_files = [expanded_file for expanded_file in expanded_files if "sha256" in expanded_file]
+        report = {
+            "file_count": len(hashed_files),
+            "total_bytes": sum(expanded_file["size"] for expanded_file in hashed_files),
+            "hashed_count": hashed_count,
+            "reused_count": len(file_hashes) - hashed_count,
+        }
+        report.update(self._find_duplicates(hashed_files))
+        report["overlaps"] = self._find_overlaps(data_entries, hashed_files)
+        report["conflicts"] = self._find_conflicts(hashed_files)
+        return report
+
+    def hash_files(self, file_paths: list[Path]) -> tuple[dict, int]:
+        """
+        增量计算文件的 SHA-256：大小和 mtime 与索引一致的文件直接复用上次的结果，其余文件并行哈希。
+        索引随后只保留本次涉及的文件。
+
+        Returns:
+            tuple[dict, int]: ({路径字符串: [大小, mtime_ns, 哈希]}，本次实际重新哈希的文件数)。无法读取的文件不在结果中。
+        """
+        previous_index = self._load_index()
+        updated_index = {}
+        files_to_hash = {} # {路径字符串: 展开项}；同一文件出现多次时只哈希一次
+        for file_path in file_paths:
+            source_key = str(file_path)
+            if source_key in updated_index or source_key in files_to_hash:
+                continue
+            try:
+                file_stat = Path(file_path).stat()
+            except OSError:
+                continue
+            cached_entry = previous_index.get(source_key)
+            if cached_entry and cached_entry[0] == file_stat.st_size and cached_entry[1] == file_stat.st_mtime_ns:
+                updated_index[source_key] = cached_entry
+            else:
+                files_to_hash[source_key] = {"source": file_path}
+        if files_to_hash:
+            self.logger(f"[数据文件索引] 正在计算 {len(files_to_hash)} 个新增或已变更文件的哈希...", "DEBUG")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as hash_executor:
+                for source_key, hash_result in zip(files_to_hash, hash_executor.map(self._hash_file, files_to_hash.values())):
+                    if hash_result is not None:
+                        updated_index[source_key] = hash_result
+        self._save_index(updated_index)
+        return updated_index, len(files_to_hash)
+
+    def _hash_file(self, expanded_file: dict) -> list | None:
+        """(工作线程) 计算文件的 SHA-256；返回索引项 [大小, mtime_ns, 哈希]，读取失败时返回 None。"""
+        try:
+            with open(expanded_file["source"], "rb") as f:
+                file_stat = os.fstat(f.fileno())
+                content_hash = hashlib.sha256()
+                while True:
+                    chunk = f.read(self.HASH_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    content_hash.update(chunk)
+        except OSError as e_read:
+            self.logger(f"[数据文件索引] 无法读取 {expanded_file['source']}: {e_read}", "WARNING")
+            return None
+        return [file_stat.st_size, file_stat.st_mtime_ns, content_hash.hexdigest()]
+
+    @staticmethod
+    def _find_duplicates(hashed_files: list[dict]) -> dict:
+        """按内容哈希分组，找出被打包到多个不同目标位置的相同内容。空文件不计入。"""
+        files_by_hash = {}
+        for hashed_file in hashed_files:
+            if hashed_file["size"]:
+                files_by_hash.setdefault(hashed_file["sha256"], []).append(hashed_file)
+        duplicates = []
+        for content_hash, same_content_files in files_by_hash.items():
+            destinations = sorted({same_file["destination"] for same_file in same_content_files})
+            if len(destinations) < 2:
+                continue
+            file_size = same_content_files[0]["size"]
+            duplicates.append({
+                "sha256": content_hash,
+                "size": file_size,
+                "destinations": destinations,
+                "sources": sorted({str(same_file["source"]) for same_file in same_content_files}),
+                "wasted_bytes": file_size * (len(destinations) - 1),
+            })
+        duplicates.sort(key=lambda duplicate: duplicate["wasted_bytes"], reverse=True)
+        return {"duplicates": duplicates, "duplicate_bytes": sum(duplicate["wasted_bytes"] for duplicate in duplicates)}
+
+    def _find_overlaps(self, data_entries: list[str], hashed_files: list[dict]) -> list[dict]:
+        """找出源路径相同或位于另一条目源文件夹中的条目对，并统计被重复复制的文件数和字节数。"""
+        parsed_entries = [(entry_index, self.parse_entry(data_entry_str)) for entry_index, data_entry_str in enumerate(data_entries)]
+        resolved_sources = [(entry_index, parsed_entry[0].resolve()) for entry_index, parsed_entry in parsed_entries if parsed_entry]
+        sizes_by_entry = {}
+        for hashed_file in hashed_files:
+            sizes_by_entry.setdefault(hashed_file["entry_index"], []).append(hashed_file["size"])
+        overlaps = []
+        for position, (outer_index, outer_source) in enumerate(resolved_sources):
+            for inner_index, inner_source in resolved_sources[position + 1:]:
+                if inner_source == outer_source or inner_source.is_relative_to(outer_source):
+                    contained_index = inner_index
+                elif outer_source.is_relative_to(inner_source):
+                    contained_index = outer_index
+                else:
+                    continue
+                contained_sizes = sizes_by_entry.get(contained_index, [])
+                overlaps.append({"entry_a": outer_index, "entry_b": inner_index,
+                                 "shared_files": len(contained_sizes), "shared_bytes": sum(contained_sizes)})
+        return overlaps
+
+    @staticmethod
+    def _find_conflicts(hashed_files: list[dict]) -> list[dict]:
+        """找出被不同内容占用的同一目标路径。"""
+        hashes_by_destination = {}
+        for hashed_file in hashed_files:
+            hashes_by_destination.setdefault(hashed_file["destination"], {})[hashed_file["sha256"]] = str(hashed_file["source"])
+        return [{"destination": destination, "sources": sorted(sources_by_hash.values())}
+                for destination, sources_by_hash in sorted(hashes_by_destination.items()) if len(sources_by_hash) > 1]
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_file_path, "r", encoding="utf-8") as f:
+                index_data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index_data, dict) or index_data.get("version") != self.FORMAT_VERSION:
+            return {}
+        return index_data.get("files", {})
+
+    def _save_index(self, file_index: dict):
+        """保存索引 (只保留本次涉及的文件，已移出数据列表的文件随之清除)。"""
+        with self._lock:
+            try:
+                self.index_file_path.parent.mkdir(parents=True, exist_ok=True)
+                temporary_path = self.index_file_path.with_name(f"{self.index_file_path.name}.{os.getpid()}.tmp")
+                temporary_path.write_text(json.dumps({"version": self.FORMAT_VERSION, "files": file_index}), encoding="utf-8")
+                os.replace(temporary_path, self.index_file_path)
+            except OSError as e_write:
+                self.logger(f"[数据文件索引] 保存索引失败: {e_write}", "DEBUG")
+
+
+# --------------------------------------------------------------------------
+#  InterpreterRegistry: 构建用 Python 解释器的元数据缓存
+# --------------------------------------------------------------------------
+_INTERPRETER_PROBE_SCRIPT = """
+import json, os, pkgutil, platform, re, struct, sys, sysconfig
+try:
+    stdlib_module_names = sorted(sys.stdlib_module_names)
+except AttributeError: # Python < 3.10: 内置模块 + 标准库目录中的模块
+    stdlib_dir = sysconfig.get_paths()["stdlib"]
+    stdlib_module_names = sorted(set(sys.builtin_module_names) | {module_info.name for module_info in pkgutil.iter_modules([stdlib_dir, os.path.join(stdlib_dir, "lib-dynload")])})
+try:
+    import PyInstaller
+    pyinstaller_version = PyInstaller.__version__
+except Exception:
+    pyinstaller_version = None
+distribution_modules = {} # {规范化的发行包名: [顶层导入名, ...]}：优先读取 top_level.txt，没有时取 RECORD 中的顶层 .py/扩展模块
+try:
+    import importlib.metadata as metadata
+    for dist in metadata.distributions():
+        top_level_text = dist.read_text("top_level.txt")
+        module_names = top_level_text.split() if top_level_text else [
+            str(file_path).replace("\\\\", "/").split("/")[0].split(".")[0] for file_path in (dist.files or ())
+            if str(file_path).endswith((".py", ".pyd", ".so")) and not str(file_path).startswith("..")]
+        if dist.metadata["Name"] and module_names:
+            distribution_modules.setdefault(re.sub(r"[-_.]+", "-", dist.metadata["Name"]).lower(), []).extend(sorted(set(module_names)))
+except ImportError: # Python < 3.8
+    pass
+print(json.dumps({
+    "version": platform.python_version(), "implementation": platform.python_implementation(), "bits": struct.calcsize("P") * 8,
+    "platform": sys.platform, "machine": platform.machine(), "executable": sys.executable, "prefix": sys.prefix,
+    "is_venv": sys.prefix != getattr(sys, "base_prefix", sys.prefix), "pyinstaller": pyinstaller_version,
+    "stdlib_modules": stdlib_module_names, "distribution_modules": distribution_modules,
+    "search_paths": [path for path in sys.path if path and os.path.isdir(path)],
+}))
+"""
+_MODULE_LOOKUP_SCRIPT = """
+import importlib.util, json, sys
+found_modules = {}
+for module_name in json.loads(sys.stdin.read()):
+    try:
+        found_modules[module_name] = importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        found_modules[module_name] = False
+print(json.dumps(found_modules))
+"""
+
+
+class InterpreterRegistry:
+    """
+    缓存构建用 Python 解释器 (系统 Python 或虚拟环境) 的元数据：Python 版本、PyInstaller 版本、标准库模块列表和已安装包的导入名。
+    结果保存在磁盘上，解释器本身及其 sys.path 目录的 mtime 都未变化 (没有升级 Python、安装/卸载包) 时直接使用缓存，
+    因此矩阵构建的准备只需几次 stat 调用；变化后才重新启动解释器探测。
+    """
+    FORMAT_VERSION = 2 # 2: 增加 distribution_modules
+    PROBE_TIMEOUT_SECONDS = 60
+
+    def __init__(self, cache_path: Path, logger_func=None):
+        """
+        Args:
+            cache_path (Path): 缓存文件路径 (JSON)。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.cache_path = Path(cache_path)
+        self.logger = logger_func if logger_func else print
+        self._lock = threading.Lock()
+        self._entries = None # {解释器绝对路径: {"mtimes": [...], "metadata": {...}}}，首次使用时从磁盘加载
+
+    @staticmethod
+    def normalize_path(interpreter_path: str) -> str:
+        """返回解释器的绝对路径 (只写了命令名时在 PATH 中查找)；不解析符号链接，虚拟环境中的 python 通常是指向基础解释器的链接。"""
+        return str(Path(shutil.which(interpreter_path) or interpreter_path).expanduser().absolute())
+
+    @staticmethod
+    def build_command_prefix(interpreter_path: str | None) -> list[str]:
+        """
+        返回 PyInstaller 命令的开头部分。
+
+        Args:
+            interpreter_path (str, optional): 构建用的 Python 解释器；为空时使用 PATH 中的 pyinstaller。
+
+        Returns:
+            list[str]: ["pyinstaller"] 或 [解释器, "-m", "PyInstaller"]。
+        """
+        return [interpreter_path, "-m", "PyInstaller"] if interpreter_path else ["pyinstaller"]
+
+    def describe(self, interpreter_path: str, refresh: bool = False) -> dict:
+        """
+        返回解释器的元数据 (缓存有效时不启动解释器)。
+
+        Args:
+            interpreter_path (str): 解释器路径或 PATH 中的命令名。
+            refresh (bool): 忽略缓存，重新探测。
+
+        Returns:
+            dict: {"interpreter", "version", "implementation", "bits", "platform", "machine", "executable", "prefix",
+                   "is_venv", "pyinstaller" (未安装时为 None), "stdlib_modules", "distribution_modules", "search_paths", "from_cache"}
+
+        Raises:
+            RuntimeError: 解释器不存在或探测失败。
+        """
+        normalized_path = self.normalize_path(interpreter_path)
+        with self._lock:
+            self._ensure_loaded()
+            cached_entry = self._entries.get(normalized_path)
+        if cached_entry is not None and not refresh:
+            if cached_entry["mtimes"] == BuildArtifactStore._path_mtimes([normalized_path] + cached_entry["metadata"]["search_paths"]):
+                return {**cached_entry["metadata"], "interpreter": normalized_path, "from_cache": True}
+        if not Path(normalized_path).is_file():
+            raise RuntimeError(f"解释器不存在: {normalized_path}")
+        try:
+            probe_result = subprocess.run([normalized_path, "-c", _INTERPRETER_PROBE_SCRIPT], capture_output=True, text=True, encoding="utf-8", errors="replace",
+                                          timeout=self.PROBE_TIMEOUT_SECONDS, creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+        except (OSError, subprocess.SubprocessError) as e_probe:
+            raise RuntimeError(f"无法运行解释器 {normalized_path}: {e_probe}") from e_probe
+        if probe_result.returncode != 0 or not probe_result.stdout.strip():
+            raise RuntimeError(f"探测解释器 {normalized_path} 失败: {' '.join(probe_result.stderr.split())[-300:]}")
+        try:
+            metadata = json.loads(probe_result.stdout.strip().splitlines()[-1])
+        except ValueError as e_json:
+            raise RuntimeError(f"探测解释器 {normalized_path} 返回了无法解析的结果: {e_json}") from e_json
+        with self._lock:
+            self._entries[normalized_path] = {"mtimes": BuildArtifactStore._path_mtimes([normalized_path] + metadata["search_paths"]), "metadata": metadata}
+            self._save()
+        self.logger(f"[解释器] 已探测 {normalized_path}: Python {metadata['version']}，PyInstaller {metadata['pyinstaller'] or '(未安装)'}。", "DEBUG")
+        return {**metadata, "interpreter": normalized_path, "from_cache": False}
+
+    @classmethod
+    def find_modules(cls, interpreter_path: str, module_names) -> dict:
+        """
+        在指定解释器中查找模块 (importlib.util.find_spec，只查找，不导入)，一次启动检查全部模块。
+        已安装的包随时可能变化，结果不缓存。
+
+        Args:
+            interpreter_path (str): 解释器路径或 PATH 中的命令名。
+            module_names (iterable[str]): 要查找的模块名。
+
+        Returns:
+            dict: {模块名: 能否找到}
+
+        Raises:
+            RuntimeError: 解释器无法运行或查找失败。
+        """
+        normalized_path = cls.normalize_path(interpreter_path)
+        try:
+            lookup_result = subprocess.run([normalized_path, "-c", _MODULE_LOOKUP_SCRIPT], input=json.dumps(sorted(set(module_names))),
+                                           capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=cls.PROBE_TIMEOUT_SECONDS,
+                                           creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+        except (OSError, subprocess.SubprocessError) as e_lookup:
+            raise RuntimeError(f"无法运行解释器 {normalized_path}: {e_lookup}") from e_lookup
+        try:
+            return json.loads(lookup_result.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError) as e_json:
+            raise RuntimeError(f"在解释器 {normalized_path} 中查找模块失败: {' '.join(lookup_result.stderr.split())[-300:] or e_json}") from e_json
+
+    def describe_many(self, interpreter_paths: list[str]) -> dict:
+        """
+        并发获取多个解释器的元数据 (需要探测的解释器同时启动)。
+
+        Returns:
+            dict: {传入的路径: 元数据字典或 RuntimeError}
+        """
+        if not interpreter_paths:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(8, len(interpreter_paths))) as executor:
+            futures = {interpreter_path: executor.submit(self.describe, interpreter_path) for interpreter_path in interpreter_paths}
+        results = {}
+        for interpreter_path, future in futures.items():
+            try:
+                results[interpreter_path] = future.result()
+            except RuntimeError as e_describe:
+                results[interpreter_path] = e_describe
+        return results
+
+    @staticmethod
+    def discover_candidates(project_dirs: list[Path] = ()) -> list[str]:
+        """
+        查找常见位置的解释器：PATH 中的 python3.X / python3 / python，pyenv 安装的各个版本，
+        以及项目目录下的虚拟环境 (.venv、venv、env 等)。返回的路径未经探测，可能包含无法运行的解释器 (例如未激活版本的 pyenv shim)。
+
+        Returns:
+            list[str]: 去重后的解释器绝对路径。
+        """
+        candidate_paths = []
+        command_names = ["python", "python3"] + [f"python3.{minor_version}" for minor_version in range(7, 16)]
+        for command_name in command_names:
+            found_path = shutil.which(command_name)
+            if found_path:
+                candidate_paths.append(found_path)
+        venv_executable = Path("Scripts") / "python.exe" if sys.platform == "win32" else Path("bin") / "python"
+        pyenv_versions_dir = Path(os.environ.get("PYENV_ROOT") or Path.home() / ".pyenv") / "versions"
+        if pyenv_versions_dir.is_dir():
+            candidate_paths.extend(str(version_dir / "bin" / "python") for version_dir in sorted(pyenv_versions_dir.iterdir())
+                                   if (version_dir / "bin" / "python").is_file())
+        for project_dir in project_dirs:
+            for venv_dir_name in (".venv", "venv", "env", ".env"):
+                venv_python_path = Path(project_dir) / venv_dir_name / venv_executable
+                if venv_python_path.is_file():
+                    candidate_paths.append(str(venv_python_path))
+            try:
+                for child_path in Path(project_dir).iterdir(): # 其他带 pyvenv.cfg 的子目录 (例如 .venv-py39)
+                    if (child_path / "pyvenv.cfg").is_file() and (child_path / venv_executable).is_file():
+                        candidate_paths.append(str(child_path / venv_executable))
+            except OSError:
+                pass
+        unique_paths, seen_real_paths = [], set()
+        for candidate_path in candidate_paths:
+            absolute_path = str(Path(candidate_path).absolute())
+            real_path_key = (os.path.realpath(absolute_path), str(Path(absolute_path).parent.parent)) # 同一环境中的 python/python3 只保留一个
+            if real_path_key not in seen_real_paths:
+                seen_real_paths.add(real_path_key)
+                unique_paths.append(absolute_path)
+        return unique_paths
+
+    # --- 磁盘缓存 ---
+    def _ensure_loaded(self):
+        """(需持有锁) 首次使用时读取缓存文件；版本不符或损坏时从空缓存开始。"""
+        if self._entries is not None:
+            return
+        try:
+            cache_data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            self._entries = cache_data["interpreters"] if cache_data.get("version") == self.FORMAT_VERSION else {}
+        except (OSError, ValueError, KeyError, AttributeError):
+            self._entries = {}
+
+    def _save(self):
+        """(需持有锁) 原子地写回缓存文件。"""
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary_path = self.cache_path.with_suffix(".tmp")
+            temporary_path.write_text(json.dumps({"version": self.FORMAT_VERSION, "interpreters": self._entries}, ensure_ascii=False), encoding="utf-8")
+            os.replace(temporary_path, self.cache_path)
+        except OSError as e_save:
+            self.logger(f"[解释器] 保存解释器缓存失败: {e_save}", "WARNING")
+
+
+# --------------------------------------------------------------------------
+#  IsolatedBuildEnvironmentStore: 按锁定文件缓存的隔离构建环境
+# --------------------------------------------------------------------------
+class IsolatedBuildEnvironmentStore:
+    """
+    根据项目的 requirements 锁定文件创建干净的构建用虚拟环境，只安装锁定的依赖和 PyInstaller，
+    避免把开发环境中无关的包分析、打包进产物。环境按 (锁定文件内容、基础解释器、平台) 的哈希缓存，
+    锁定文件不变时各次构建直接复用。
+
+    安装只使用本地 wheel 目录 (--no-index，不访问网络)。PATH 中有 uv 时用它安装，
+    包文件从 uv 缓存硬链接到环境中 (--link-mode hardlink)，同一个 wheel 在多个环境中只占一份空间；
+    否则使用环境中的 pip (会复制文件)。
+    """
+    LOCKFILE_NAMES = ("requirements.lock", "requirements-lock.txt", "requirements.txt")
+    MARKER_FILE_NAME = "studio-environment.json" # 环境创建完成后才写入，没有它的目录视为未完成
+    MAX_ENVIRONMENTS = 5
+    INSTALL_TIMEOUT_SECONDS = 1800
+    INCLUDE_PATTERN = re.compile(r"^\s*(?:-r|-c|--requirement|--constraint)[\s=]+(\S+)", re.MULTILINE)
+    PYINSTALLER_REQUIREMENT_PATTERN = re.compile(r"^\s*pyinstaller\s*(?:[=<>!~;\[]|$)", re.IGNORECASE | re.MULTILINE)
+
+    def __init__(self, store_dir: Path, logger_func=None):
+        """
+        Args:
+            store_dir (Path): 环境的保存目录 (每个环境一个子目录)。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.store_dir = Path(store_dir)
+        self.logger = logger_func if logger_func else print
+        self._locks_guard = threading.Lock()
+        self._environment_locks = {} # {环境键: threading.Lock}，同一环境的创建与使用互斥 (后台预先创建时，构建会等待其完成)
+
+    @classmethod
+    def find_lockfile(cls, project_dir: Path) -> Path | None:
+        """在项目目录中按优先顺序查找锁定文件 (requirements.lock、requirements-lock.txt、requirements.txt)。"""
+        for lockfile_name in cls.LOCKFILE_NAMES:
+            candidate_path = Path(project_dir) / lockfile_name
+            if candidate_path.is_file():
+                return candidate_path
+        return None
+
+    @classmethod
+    def read_requirement_files(cls, lockfile_path: Path) -> list[Path]:
+        """返回锁定文件及其通过 -r/-c 引用的其他 requirements 文件 (递归，按出现顺序)。"""
+        requirement_files, pending_paths = [], [Path(lockfile_path).resolve()]
+        while pending_paths:
+            requirement_path = pending_paths.pop(0)
+            if requirement_path in requirement_files:
+                continue
+            requirement_files.append(requirement_path)
+            requirement_text = requirement_path.read_text(encoding="utf-8", errors="replace")
+            pending_paths.extend((requirement_path.parent / included_name).resolve() for included_name in cls.INCLUDE_PATTERN.findall(requirement_text))
+        return requirement_files
+
+    @classmethod
+    def compute_environment_key(cls, lockfile_path: Path, base_interpreter_info: dict) -> str:
+        """
+        计算环境键：锁定文件 (及其引用的文件) 的内容 + 基础解释器的路径、版本和平台。
+
+        Raises:
+            OSError: 锁定文件无法读取。
+        """
+        key_hash = hashlib.sha256()
+        for requirement_path in cls.read_requirement_files(lockfile_path):
+            key_hash.update(requirement_path.read_bytes() + b"\0")
+        key_hash.update(json.dumps([base_interpreter_info["interpreter"], base_interpreter_info["version"], base_interpreter_info["platform"],
+                                    base_interpreter_info["machine"], base_interpreter_info["bits"]]).encode("utf-8"))
+        return key_hash.hexdigest()[:16]
+
+    @staticmethod
+    def environment_python(environment_dir: Path) -> Path:
+        """返回虚拟环境中 python 的路径。"""
+        return Path(environment_dir) / ("Scripts/python.exe" if sys.platform == "win32" else "bin/python")
+
+    def get_ready_environment(self, environment_key: str) -> Path | None:
+        """环境已创建完成时返回其 python 路径 (不加锁，也不创建)，否则返回 None。"""
+        environment_dir = self.store_dir / environment_key
+        if (environment_dir / self.MARKER_FILE_NAME).is_file() and self.environment_python(environment_dir).is_file():
+            return self.environment_python(environment_dir)
+        return None
+
+    def ensure_environment(self, lockfile_path: Path, base_interpreter_info: dict, wheel_dir: Path) -> Path:
+        """
+        返回与锁定文件对应的环境中的 python；环境不存在时创建 (同一环境同时只有一个线程创建，其他线程等待)。
+
+        Args:
+            lockfile_path (Path): requirements 格式的锁定文件。
+            base_interpreter_info (dict): 基础解释器的元数据 (InterpreterRegistry.describe 的结果)，用于创建虚拟环境。
+            wheel_dir (Path): 本地 wheel 目录，是唯一的安装来源。
+
+        Returns:
+            Path: 环境中 python 的路径。
+
+        Raises:
+            RuntimeError: 锁定文件或 wheel 目录无效，或环境创建/安装失败。
+        """
+        if not Path(wheel_dir).is_dir():
+            raise RuntimeError(f"wheel 目录不存在: {wheel_dir}")
+        try:
+            environment_key = self.compute_environment_key(lockfile_path, base_interpreter_info)
+        except OSError as e_lockfile:
+            raise RuntimeError(f"无法读取锁定文件 {lockfile_path}: {e_lockfile}") from e_lockfile
+        with self._locks_guard:
+            environment_lock = self._environment_locks.setdefault(environment_key, threading.Lock())
+        with environment_lock:
+            environment_python_path = self.get_ready_environment(environment_key)
+            if environment_python_path is not None:
+                self._update_marker(environment_key, last_used=time.time())
+                return environment_python_path
+            environment_python_path = self._create_environment(environment_key, Path(lockfile_path), base_interpreter_info, Path(wheel_dir))
+        self.prune(keep_keys={environment_key})
+        return environment_python_path
+
+    def _create_environment(self, environment_key: str, lockfile_path: Path, base_interpreter_info: dict, wheel_dir: Path) -> Path:
+        """(需持有该环境的锁) 创建虚拟环境并从 wheel 目录安装锁定的依赖和 PyInstaller。"""
+        environment_dir = self.store_dir / environment_key
+        if environment_dir.exists(): # 上次创建中断留下的不完整环境
+            shutil.rmtree(environment_dir, ignore_errors=True)
+        creation_start_time = time.perf_counter()
+        uv_executable = shutil.which("uv")
+        self.logger(f"[构建环境] 正在为 {lockfile_path.name} 创建隔离构建环境 {environment_key} (Python {base_interpreter_info['version']}，"
+                    f"{'uv，硬链接安装' if uv_executable else 'pip'})...", "INFO")
+        venv_command = [base_interpreter_info["executable"] or base_interpreter_info["interpreter"], "-m", "venv", str(environment_dir)]
+        if uv_executable:
+            venv_command.insert(-1, "--without-pip") # uv 直接安装到环境中，不需要环境自带 pip
+        self._run_step(venv_command, "创建虚拟环境")
+        environment_python_path = self.environment_python(environment_dir)
+
+        lockfile_text = lockfile_path.read_text(encoding="utf-8", errors="replace")
+        extra_requirements = [] if self.PYINSTALLER_REQUIREMENT_PATTERN.search(lockfile_text) else ["pyinstaller"] # 锁定文件中没有时也从 wheel 目录安装
+        if uv_executable:
+            install_command = [uv_executable, "pip", "install", "--python", str(environment_python_path), "--offline", "--no-index",
+                               "--find-links", str(wheel_dir), "--link-mode", "hardlink", "--cache-dir", str(self.store_dir / "uv-cache"),
+                               "-r", str(lockfile_path), *extra_requirements]
+        else:
+            install_command = [str(environment_python_path), "-m", "pip", "install", "--no-index", "--find-links", str(wheel_dir),
+                               "--disable-pip-version-check", "--no-input", "-r", str(lockfile_path), *extra_requirements]
+        try:
+            self._run_step(install_command, "安装依赖", cwd=lockfile_path.parent)
+        except RuntimeError:
+            shutil.rmtree(environment_dir, ignore_errors=True)
+            raise
+        creation_seconds = time.perf_counter() - creation_start_time
+        (environment_dir / self.MARKER_FILE_NAME).write_text(json.dumps({
+            "key": environment_key, "lockfile": str(lockfile_path), "base_interpreter": base_interpreter_info["interpreter"],
+            "python_version": base_interpreter_info["version"], "installer": "uv" if uv_executable else "pip",
+            "created": time.time(), "last_used": time.time(), "creation_seconds": round(creation_seconds, 2),
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.logger(f"[构建环境] 环境 {environment_key} 已创建，耗时 {creation_seconds:.1f} 秒。", "SUCCESS")
+        return environment_python_path
+
+    def _run_step(self, command: list[str], step_description: str, cwd: Path | None = None):
+        """运行环境创建的一个步骤，失败时抛出带有输出末尾的 RuntimeError。"""
+        try:
+            step_result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace", cwd=cwd,
+                                         timeout=self.INSTALL_TIMEOUT_SECONDS, creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+        except (OSError, subprocess.SubprocessError) as e_step:
+            raise RuntimeError(f"{step_description}失败: {e_step}") from e_step
+        if step_result.returncode != 0:
+            output_tail = "\n".join((step_result.stdout + step_result.stderr).strip().splitlines()[-8:])
+            raise RuntimeError(f"{step_description}失败 (返回代码 {step_result.returncode}):\n{output_tail}")
+
+    def list_environments(self) -> list[dict]:
+        """返回已创建完成的环境的记录 (按最后使用时间从新到旧)。"""
+        environment_records = []
+        if self.store_dir.is_dir():
+            for marker_path in self.store_dir.glob(f"*/{self.MARKER_FILE_NAME}"):
+                try:
+                    environment_records.append(json.loads(marker_path.read_text(encoding="utf-8")))
+                except (OSError, ValueError):
+                    continue
+        return sorted(environment_records, key=lambda record: record.get("last_used", 0), reverse=True)
+
+    def prune(self, keep_keys: set = frozenset()):
+        """只保留最近使用的 MAX_ENVIRONMENTS 个环境 (keep_keys 中的环境总是保留)；正在被创建或使用的环境不会被删除。"""
+        for environment_record in self.list_environments()[self.MAX_ENVIRONMENTS:]:
+            environment_key = environment_record.get("key")
+            if not environment_key or environment_key in keep_keys:
+                continue
+            with self._locks_guard:
+                environment_lock = self._environment_locks.setdefault(environment_key, threading.Lock())
+            if environment_lock.acquire(blocking=False):
+                try:
+                    shutil.rmtree(self.store_dir / environment_key, ignore_errors=True)
+                    self.logger(f"[构建环境] 已删除最久未使用的环境 {environment_key}。", "DEBUG")
+                finally:
+                    environment_lock.release()
+
+    def clear(self) -> int:
+        """删除全部环境 (uv 缓存一并删除)，返回删除的环境数量。"""
+        removed_count = 0
+        for environment_record in self.list_environments():
+            if environment_record.get("key"):
+                shutil.rmtree(self.store_dir / environment_record["key"], ignore_errors=True)
+                removed_count += 1
+        shutil.rmtree(self.store_dir / "uv-cache", ignore_errors=True)
+        return removed_count
+
+    def _update_marker(self, environment_key: str, **updates):
+        marker_path = self.store_dir / environment_key / self.MARKER_FILE_NAME
+        try:
+            marker_data = json.loads(marker_path.read_text(encoding="utf-8"))
+            marker_data.update(updates)
+            marker_path.write_text(json.dumps(marker_data, ensure_ascii=False, indent=2), encoding="utf-8")
+        except (OSError, ValueError):
+            pass
+
+
+# --------------------------------------------------------------------------
+#  BuildArtifactStore: 按构建指纹寻址的本地产物仓库
+# --------------------------------------------------------------------------
+_TOOLCHAIN_PROBE_SCRIPT = """
+import hashlib, json, os, platform, sys
+import importlib.metadata as metadata
+distributions = sorted({f"{str(dist.metadata['Name']).lower()}=={dist.version}" for dist in metadata.distributions()})
+try:
+    import PyInstaller
+    pyinstaller_version = PyInstaller.__version__
+except Exception:
+    pyinstaller_version = None
+print(json.dumps({
+    "python": sys.version, "platform": sys.platform, "machine": platform.machine(), "pyinstaller": pyinstaller_version,
+    "distributions": hashlib.sha256("\\n".join(distributions).encode("utf-8")).hexdigest(),
+    "search_paths": [path for path in sys.path if path and os.path.isdir(path)],
+}))
+"""
+
+
+class BuildArtifactStore:
+    """
+    以构建指纹 (命令 + 输入文件内容 + 工具链) 为键保存最近 N 次构建的产物。
+    请求的指纹已有对应产物时，直接以 reflink (写时复制克隆)、硬链接或复制的方式恢复到 dist 目录，
+    不必重新运行 PyInstaller。总大小和条目数超过上限时按最近最少使用 (LRU) 的顺序淘汰。
+
+    硬链接与 dist 中的文件共享同一份数据：PyInstaller 重新构建时会先删除旧文件再写入新文件，不会改动仓库中的内容；
+    若有其他工具原地修改了产物，恢复前的大小/mtime 校验会发现不一致并丢弃该条目。
+    """
+    FORMAT_VERSION = 1
+    INDEX_FILE_NAME = "index.json"
+    FICLONE_IOCTL = 0x40049409 # Linux 的 FICLONE (btrfs/XFS 等文件系统支持 reflink)
+    # 不影响产物内容的命令行参数 (带值的参数连同其值一起忽略)
+    NEUTRAL_FLAGS = {"--clean", "--noconfirm", "-y"}
+    NEUTRAL_VALUE_OPTIONS = {"--distpath", "--workpath", "--specpath"}
+
+    _toolchain_cache = {} # {解释器路径: (校验用的 mtime 列表, 工具链描述)}
+    _toolchain_cache_lock = threading.Lock()
+
+    def __init__(self, store_dir: Path, max_entries: int = 10, max_bytes: int = 4 * 1024 ** 3, logger_func=None):
+        """
+        Args:
+            store_dir (Path): 仓库目录 (不存在时在首次写入时创建)。
+            max_entries (int): 最多保留的产物数量。
+            max_bytes (int): 全部产物的总大小上限；单个产物超过上限时不入库。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.store_dir = Path(store_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logger_func if logger_func else print
+        self._lock = threading.Lock()
+
+    # --- 指纹 ---
+    @classmethod
+    def describe_toolchain(cls, command_list: list[str]) -> dict:
+        """
+        描述执行构建命令的工具链：Python 版本、平台、PyInstaller 版本，以及该环境中全部已安装发行包 (名称==版本) 的哈希。
+        结果按解释器缓存；该解释器的 sys.path 目录或 PyInstaller 入口发生变化 (安装/升级/卸载包) 时重新探测。
+
+        Args:
+            command_list (list[str]): 构建命令 (pyinstaller ... 或 python -m PyInstaller ...)。
+
+        Returns:
+            dict: {"interpreter", "python", "platform", "machine", "pyinstaller", "distributions"}
+        """
+        interpreter_path, entry_point_path = cls._resolve_interpreter(command_list)
+        watched_paths = [entry_point_path] if entry_point_path else []
+        with cls._toolchain_cache_lock:
+            cached_entry = cls._toolchain_cache.get(interpreter_path)
+        if cached_entry is not None:
+            cached_mtimes, cached_description = cached_entry
+            if cached_mtimes == cls._path_mtimes(watched_paths + cached_description["search_paths"]):
+                return {key: value for key, value in cached_description.items() if key != "search_paths"}
+        probe_result = subprocess.run([interpreter_path, "-c", _TOOLCHAIN_PROBE_SCRIPT], capture_output=True, text=True, timeout=60,
+                                      creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+        if probe_result.returncode != 0:
+            raise RuntimeError(f"无法探测构建工具链 ({interpreter_path}): {probe_result.stderr.strip()[-300:]}")
+        description = json.loads(probe_result.stdout.strip().splitlines()[-1])
+        description["interpreter"] = interpreter_path
+        with cls._toolchain_cache_lock:
+            cls._toolchain_cache[interpreter_path] = (cls._path_mtimes(watched_paths + description["search_paths"]), description)
+        return {key: value for key, value in description.items() if key != "search_paths"}
+
+    @staticmethod
+    def _resolve_interpreter(command_list: list[str]) -> tuple[str, str | None]:
+        """找出构建命令实际使用的 Python 解释器：python -m PyInstaller 形式直接取第一项，pyinstaller 入口脚本读取其 shebang。"""
+        if len(command_list) >= 3 and command_list[1] == "-m" and command_list[2].lower() == "pyinstaller":
+            return str(Path(shutil.which(command_list[0]) or command_list[0]).absolute()), None
+        entry_point_path = shutil.which(command_list[0]) if command_list else None
+        if entry_point_path and sys.platform != "win32":
+            try:
+                with open(entry_point_path, "rb") as f:
+                    first_line = f.readline(512).decode("utf-8", errors="replace").strip()
+            except OSError:
+                first_line = ""
+            if first_line.startswith("#!"):
+                shebang_parts = first_line[2:].split()
+                if shebang_parts and Path(shebang_parts[0]).name == "env" and len(shebang_parts) > 1:
+                    shebang_parts = [shutil.which(shebang_parts[1]) or shebang_parts[1]]
+                if shebang_parts and Path(shebang_parts[0]).is_file():
+                    return shebang_parts[0], entry_point_path
+        if entry_point_path and sys.platform == "win32": # pip 生成的 Scripts\pyinstaller.exe 旁边 (或上一级) 就是该环境的 python.exe
+            for candidate_path in (Path(entry_point_path).parent / "python.exe", Path(entry_point_path).parent.parent / "python.exe"):
+                if candidate_path.is_file():
+                    return str(candidate_path), entry_point_path
+        return sys.executable, entry_point_path
+
+    @staticmethod
+    def _path_mtimes(paths: list[str]) -> list:
+        mtimes = []
+        for path_str in paths:
+            try:
+                mtimes.append(os.stat(path_str).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    @classmethod
+    def compute_fingerprint(cls, command_list: list[str], input_manifest: dict, toolchain: dict) -> str:
+        """
+        计算构建指纹。命令中只影响输出位置的参数 (--distpath/--workpath/--specpath/--clean/--noconfirm) 被忽略，
+        .spec 文件以其内容哈希代替路径。
+
+        Args:
+            command_list (list[str]): 构建命令。
+            input_manifest (dict): {输入文件的相对路径: sha256}，包括项目源码、数据文件和图标。
+            toolchain (dict): describe_toolchain() 的结果。
+
+        Returns:
+            str: 十六进制的 SHA-256 指纹。
+        """
+        normalized_arguments = []
+        skip_next_argument = False
+        for argument in command_list[1:]:
+            if skip_next_argument:
+                skip_next_argument = False
+                continue
+            if argument in cls.NEUTRAL_FLAGS or argument.split("=", 1)[0] in cls.NEUTRAL_VALUE_OPTIONS:
+                skip_next_argument = argument in cls.NEUTRAL_VALUE_OPTIONS
+                continue
+            if argument.endswith(".spec") and Path(argument).is_file():
+                argument = "spec:" + hashlib.sha256(Path(argument).read_bytes()).hexdigest()
+            normalized_arguments.append(argument)
+        fingerprint_source = json.dumps({"version": cls.FORMAT_VERSION, "arguments": normalized_arguments,
+                                         "inputs": input_manifest, "toolchain": toolchain}, sort_keys=True)
+        return hashlib.sha256(fingerprint_source.encode("utf-8")).hexdigest()
+
+    # --- 入库与恢复 ---
+    def lookup(self, fingerprint: str) -> dict | None:
+        """返回指纹对应的条目信息 (不检查文件完整性)；不存在时返回 None。"""
+        with self._lock:
+            return self._load_index().get(fingerprint)
+
+    def entries(self) -> list[dict]:
+        """返回全部条目 (每项带 "fingerprint" 键)，按最后使用时间从新到旧排列。"""
+        with self._lock:
+            index_entries = self._load_index()
+        return sorted(({"fingerprint": fingerprint, **entry} for fingerprint, entry in index_entries.items()),
+                      key=lambda entry: entry["last_used"], reverse=True)
+
+    def store(self, fingerprint: str, output_paths: list[Path], metadata: dict | None = None) -> dict | None:
+        """
+        将构建产物 (onefile 的可执行文件、onedir 的目录或 .app 包) 放入仓库，随后按上限淘汰旧条目。
+
+        Args:
+            fingerprint (str): 构建指纹。
+            output_paths (list[Path]): dist 目录中的产物路径 (同一次构建可能同时生成目录和 .app 包)。
+            metadata (dict, optional): 随条目保存的说明信息 (例如应用名、打包模式)。
+
+        Returns:
+            dict | None: 新条目的信息；产物超过总大小上限或写入失败时返回 None。
+        """
+        output_paths = [Path(output_path) for output_path in output_paths if Path(output_path).exists()]
+        if not output_paths:
+            return None
+        objects_dir = self.store_dir / "objects"
+        temporary_dir = objects_dir / f".tmp-{fingerprint[:16]}-{uuid.uuid4().hex[:8]}"
+        try:
+            temporary_dir.mkdir(parents=True)
+            link_methods = {}
+            for output_path in output_paths:
+                self._replicate(output_path, temporary_dir / output_path.name, link_methods)
+            file_stats = self._collect_file_stats(temporary_dir)
+            total_bytes = sum(file_size for file_size, _ in file_stats.values())
+            if total_bytes > self.max_bytes:
+                self.logger(f"[产物仓库] 产物大小 {format_byte_size(total_bytes)} 超过仓库上限 {format_byte_size(self.max_bytes)}，不入库。", "DEBUG")
+                shutil.rmtree(temporary_dir, ignore_errors=True)
+                return None
+            with self._lock:
+                index_entries = self._load_index()
+                object_dir = objects_dir / fingerprint
+                if object_dir.exists():
+                    shutil.rmtree(object_dir, ignore_errors=True)
+                os.replace(temporary_dir, object_dir)
+                stored_entry = {**(metadata or {}), "outputs": [output_path.name for output_path in output_paths], "files": file_stats,
+                                "total_bytes": total_bytes, "created": time.time(), "last_used": time.time()}
+                index_entries[fingerprint] = stored_entry
+                evicted_count = self._evict(index_entries, keep_fingerprint=fingerprint)
+                self._save_index(index_entries)
+        except OSError as e_store:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+            self.logger(f"[产物仓库] 保存产物失败: {e_store}", "WARNING")
+            return None
+        if evicted_count:
+            self.logger(f"[产物仓库] 已按最近最少使用淘汰 {evicted_count} 个旧产物。", "DEBUG")
+        return {"fingerprint": fingerprint, **stored_entry, "link_methods": link_methods}
+
+    def restore(self, fingerprint: str, dist_path: Path) -> dict | None:
+        """
+        将指纹对应的产物恢复到 dist 目录 (替换同名的旧产物)。恢复前核对仓库中每个文件的大小和 mtime，
+        不一致 (被原地修改或损坏) 时丢弃该条目并返回 None。
+
+        Returns:
+            dict | None: {"outputs": [恢复后的路径], "file_count", "total_bytes", "link_methods": {方式: 文件数}, "elapsed_seconds"}；
+                         没有可用产物时返回 None。
+        """
+        with self._lock:
+            index_entries = self._load_index()
+            stored_entry = index_entries.get(fingerprint)
+            if stored_entry is None:
+                return None
+            object_dir = self.store_dir / "objects" / fingerprint
+            if self._collect_file_stats(object_dir) != stored_entry["files"]:
+                self.logger(f"[产物仓库] 产物 {fingerprint[:12]} 的文件已被修改或缺失，已丢弃该条目。", "WARNING")
+                del index_entries[fingerprint]
+                shutil.rmtree(object_dir, ignore_errors=True)
+                self._save_index(index_entries)
+                return None
+            restore_start_time = time.perf_counter()
+            dist_path = Path(dist_path)
+            dist_path.mkdir(parents=True, exist_ok=True)
+            link_methods = {}
+            restored_paths = []
+            for output_name in stored_entry["outputs"]:
+                target_path = dist_path / output_name
+                if target_path.is_dir() and not target_path.is_symlink():
+                    shutil.rmtree(target_path)
+                elif target_path.exists() or target_path.is_symlink():
+                    target_path.unlink()
+                self._replicate(object_dir / output_name, target_path, link_methods)
+                restored_paths.append(target_path)
+            stored_entry["last_used"] = time.time()
+            self._save_index(index_entries)
+        return {"outputs": restored_paths, "file_count": len(stored_entry["files"]), "total_bytes": stored_entry["total_bytes"],
+                "link_methods": link_methods, "elapsed_seconds": time.perf_counter() - restore_start_time}
+
+    def remove(self, fingerprint: str | None = None) -> int:
+        """删除指定条目；fingerprint 为 None 时清空整个仓库。返回删除的条目数。"""
+        with self._lock:
+            index_entries = self._load_index()
+            removed_fingerprints = list(index_entries) if fingerprint is None else [fingerprint] if fingerprint in index_entries else []
+            for removed_fingerprint in removed_fingerprints:
+                del index_entries[removed_fingerprint]
+                shutil.rmtree(self.store_dir / "objects" / removed_fingerprint, ignore_errors=True)
+            if fingerprint is None: # 顺带清除中断的入库留下的临时目录
+                shutil.rmtree(self.store_dir / "objects", ignore_errors=True)
+            self._save_index(index_entries)
+        return len(removed_fingerprints)
+
+    def _evict(self, index_entries: dict, keep_fingerprint: str) -> int:
+        """(需持有锁) 按最后使用时间从旧到新淘汰条目，直到条目数和总大小都不超过上限。"""
+        evicted_count = 0
+        total_bytes = sum(entry["total_bytes"] for entry in index_entries.values())
+        for fingerprint in sorted(index_entries, key=lambda key: index_entries[key]["last_used"]):
+            if len(index_entries) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            if fingerprint == keep_fingerprint:
+                continue
+            total_bytes -= index_entries.pop(fingerprint)["total_bytes"]
+            shutil.rmtree(self.store_dir / "objects" / fingerprint, ignore_errors=True)
+            evicted_count += 1
+        return evicted_count
+
+    def _replicate(self, source_path: Path, target_path: Path, link_methods: dict):
+        """
+        复制一个文件或目录树：文件依次尝试 reflink、硬链接、普通复制 (某种方式失败后本次操作不再尝试)，
+        符号链接按原样重建。link_methods 累计每种方式处理的文件数。
+        """
+        if source_path.is_symlink():
+            os.symlink(os.readlink(source_path), target_path)
+        elif source_path.is_dir():
+            target_path.mkdir()
+            for child_entry in os.scandir(source_path):
+                self._replicate(Path(child_entry.path), target_path / child_entry.name, link_methods)
+            shutil.copystat(source_path, target_path)
+        else:
+            for link_method in ("reflink", "hardlink", "copy"):
+                if link_methods.get(f"{link_method}_failed"):
+                    continue
+                try:
+                    if link_method == "reflink":
+                        self._reflink_file(source_path, target_path)
+                    elif link_method == "hardlink":
+                        os.link(source_path, target_path)
+                    else:
+                        shutil.copy2(source_path, target_path)
+                except OSError:
+                    if link_method == "copy":
+                        raise
+                    link_methods[f"{link_method}_failed"] = True
+                    continue
+                link_methods[link_method] = link_methods.get(link_method, 0) + 1
+                return
+
+    def _reflink_file(self, source_path: Path, target_path: Path):
+        """使用 FICLONE 创建写时复制的克隆 (仅 Linux，文件系统不支持时抛出 OSError)。"""
+        if not sys.platform.startswith("linux"):
+            raise OSError("reflink 仅在 Linux 上可用")
+        import fcntl # 仅 POSIX 平台提供
+        try:
+            with open(source_path, "rb") as source_file, open(target_path, "wb") as target_file:
+                fcntl.ioctl(target_file.fileno(), self.FICLONE_IOCTL, source_file.fileno())
+        except OSError:
+            try:
+                os.unlink(target_path)
+            except OSError:
+                pass
+            raise
+        shutil.copystat(source_path, target_path)
+
+    @staticmethod
+    def _collect_file_stats(root_dir: Path) -> dict:
+        """返回 {相对路径: [大小, mtime_ns]} (不跟随符号链接，符号链接本身不计入)。"""
+        file_stats = {}
+        for walk_root, _, file_names in os.walk(root_dir):
+            for file_name in file_names:
+                file_path = os.path.join(walk_root, file_name)
+                if os.path.islink(file_path):
+                    continue
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError:
+                    continue
+                file_stats[Path(file_path).relative_to(root_dir).as_posix()] = [file_stat.st_size, file_stat.st_mtime_ns]
+        return file_stats
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.store_dir / self.INDEX_FILE_NAME, "r", encoding="utf-8") as f:
+                index_data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index_data, dict) or index_data.get("version") != self.FORMAT_VERSION:
+            return {}
+        return {fingerprint: entry for fingerprint, entry in index_data.get("entries", {}).items()
+                if (self.store_dir / "objects" / fingerprint).is_dir()}
+
+    def _save_index(self, index_entries: dict):
+        index_path = self.store_dir / self.INDEX_FILE_NAME
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            temporary_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+            temporary_path.write_text(json.dumps({"version": self.FORMAT_VERSION, "entries": index_entries}), encoding="utf-8")
+            os.replace(temporary_path, index_path)
+        except OSError as e_write:
+            self.logger(f"[产物仓库] 保存仓库索引失败: {e_write}", "DEBUG")
+
+
+# --------------------------------------------------------------------------
+#  RunProfiler: 剖析一次扫描/构建 (cProfile + 栈采样)
+# --------------------------------------------------------------------------
+class RunProfiler:
+    """
+    在当前 (工作) 线程中以 cProfile 运行一个函数，同时用后台线程定时采样该线程 (以及可选的 Tk 主线程) 的调用栈。
+    结束后保存：
+      - <标签>-<时间>.pstats：cProfile 结果，可用 python -m pstats、snakeviz 等查看；
+      - <标签>-<时间>-worker.collapsed / -tk-main.collapsed：折叠栈 ("帧;帧;帧 次数")，可直接交给 flamegraph.pl 或 speedscope 生成火焰图；
+    并在日志中汇总自身耗时最高的函数。
+    """
+    TK_IDLE_FUNCTION_NAMES = {"mainloop", "wait_window", "wait_variable"} # 主线程停在这些帧中说明界面空闲
+
+    def __init__(self, output_dir: Path, run_label: str, sample_main_thread: bool = False, sample_interval_seconds: float = 0.005,
+                 top_count: int = 15, logger_func=None):
+        """
+        Args:
+            output_dir (Path): 结果文件的保存目录。
+            run_label (str): 结果文件名前缀 (例如 "build"、"dependency-scan")。
+            sample_main_thread (bool): 是否同时采样 Tk 主线程 (用于发现运行期间卡住界面的代码)。
+            sample_interval_seconds (float): 栈采样间隔。
+            top_count (int): 日志中列出的热点函数数量。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.output_dir = Path(output_dir)
+        self.run_label = run_label
+        self.sample_main_thread = sample_main_thread
+        self.sample_interval_seconds = sample_interval_seconds
+        self.top_count = top_count
+        self.logger = logger_func if logger_func else print
+
+    def run(self, target_function, *args, **kwargs):
+        """在剖析下运行 target_function(*args, **kwargs) 并返回其结果；结果文件在函数结束 (包括抛出异常) 后保存。"""
+        sampled_threads = {"worker": threading.get_ident()}
+        if self.sample_main_thread and threading.main_thread().ident != threading.get_ident():
+            sampled_threads["tk-main"] = threading.main_thread().ident
+        stack_counts = {thread_label: Counter() for thread_label in sampled_threads}
+        stop_sampling_event = threading.Event()
+        sampler_thread = threading.Thread(target=self._sample_stacks, args=(sampled_threads, stack_counts, stop_sampling_event), daemon=True)
+        cprofile_profiler = cProfile.Profile()
+        try:
+            cprofile_profiler.enable()
+        except ValueError as e_profiler: # 已有其他剖析工具 (例如调试器) 在运行
+            self.logger(f"[剖析] 无法启用 cProfile ({e_profiler})，只进行栈采样。", "WARNING")
+            cprofile_profiler = None
+        run_start_time = time.perf_counter()
+        sampler_thread.start()
+        try:
+            return target_function(*args, **kwargs)
+        finally:
+            if cprofile_profiler is not None:
+                cprofile_profiler.disable()
+            stop_sampling_event.set()
+            sampler_thread.join()
+            try:
+                self._save_results(cprofile_profiler, stack_counts, time.perf_counter() - run_start_time)
+            except OSError as e_save:
+                self.logger(f"[剖析] 保存剖析结果失败: {e_save}", "WARNING")
+
+    def _sample_stacks(self, sampled_threads: dict, stack_counts: dict, stop_sampling_event: threading.Event):
+        """(采样线程) 定时读取各线程当前的调用栈，累计为折叠栈。"""
+        while not stop_sampling_event.wait(self.sample_interval_seconds):
+            current_frames = sys._current_frames()
+            for thread_label, thread_ident in sampled_threads.items():
+                frame = current_frames.get(thread_ident)
+                stack_frames = []
+                while frame is not None:
+                    frame_code = frame.f_code
+                    stack_frames.append(f"{frame_code.co_name} ({Path(frame_code.co_filename).name}:{frame_code.co_firstlineno})".replace(";", ","))
+                    frame = frame.f_back
+                if stack_frames:
+                    stack_counts[thread_label][";".join(reversed(stack_frames))] += 1
+
+    def _save_results(self, cprofile_profiler, stack_counts: dict, elapsed_seconds: float):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        file_prefix = self.output_dir / f"{self.run_label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        saved_paths = []
+        if cprofile_profiler is not None:
+            pstats_path = file_prefix.with_name(file_prefix.name + ".pstats")
+            cprofile_profiler.dump_stats(str(pstats_path))
+            saved_paths.append(pstats_path)
+        for thread_label, thread_stack_counts in stack_counts.items():
+            if thread_stack_counts:
+                collapsed_path = file_prefix.with_name(f"{file_prefix.name}-{thread_label}.collapsed")
+                collapsed_path.write_text("".join(f"{stack} {count}\n" for stack, count in thread_stack_counts.most_common()), encoding="utf-8")
+                saved_paths.append(collapsed_path)
+
+        self.logger(f"🔬 剖析完成 ({self.run_label}，耗时 {elapsed_seconds:.2f} 秒)，结果已保存:", "INFO")
+        for saved_path in saved_paths:
+            self.logger(f"    {saved_path}", "INFO")
+        if cprofile_profiler is not None:
+            self._log_hotspots(pstats.Stats(cprofile_profiler), elapsed_seconds)
+        if "tk-main" in stack_counts:
+            self._log_main_thread_summary(stack_counts["tk-main"])
+
+    def _log_hotspots(self, profile_stats: pstats.Stats, elapsed_seconds: float):
+        """按自身耗时 (tottime) 列出热点函数。"""
+        function_rows = sorted(profile_stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top_count]
+        self.logger(f"🔥 自身耗时最高的 {len(function_rows)} 个函数 (自身耗时 / 累计耗时 / 调用次数):", "INFO")
+        for (file_name, line_number, function_name), (_, call_count, own_seconds, cumulative_seconds, _) in function_rows:
+            location = f"{Path(file_name).name}:{line_number}" if line_number else "内置" # 内置函数没有文件位置
+            self.logger(f"    {own_seconds:8.3f}s {own_seconds / elapsed_seconds if elapsed_seconds else 0:6.1%}  {cumulative_seconds:8.3f}s  "
+                        f"{call_count:>9}  {function_name} ({location})", "INFO")
+
+    def _log_main_thread_summary(self, main_stack_counts: Counter):
+        """汇总 Tk 主线程的采样：忙碌 (不在事件循环中等待) 的比例，以及忙碌时最常见的栈顶函数。"""
+        total_samples = sum(main_stack_counts.values())
+        busy_leaf_counts = Counter()
+        for stack, count in main_stack_counts.items():
+            leaf_frame = stack.rsplit(";", 1)[-1]
+            if leaf_frame.split(" (", 1)[0] not in self.TK_IDLE_FUNCTION_NAMES:
+                busy_leaf_counts[leaf_frame] += count
+        busy_samples = sum(busy_leaf_counts.values())
+        self.logger(f"🖥️ 界面主线程: {total_samples} 次采样中 {busy_samples} 次处于忙碌状态 ({busy_samples / total_samples if total_samples else 0:.1%})。", "INFO")
+        for leaf_frame, count in busy_leaf_counts.most_common(5):
+            self.logger(f"    {count:>6} 次  {leaf_frame}", "INFO")
+
+
+# --------------------------------------------------------------------------
+#  进程树终止 (取消构建时使用)
+# --------------------------------------------------------------------------
+def _signal_posix_process_group(process_group_id: int, signal_number: int) -> bool:
+    """向 POSIX 进程组发送信号。进程组已不存在时返回 False。"""
+    try:
+        os.killpg(process_group_id, signal_number)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def _posix_process_group_has_live_members(process_group_id: int) -> bool:
+    """
+    检查 POSIX 进程组中是否还有存活 (非僵尸) 的进程。
+    已被杀死但尚未被回收的僵尸进程仍属于该进程组，killpg(pgid, 0) 会把它们当作存活，
+    因此在有 /proc 的系统上逐个读取进程状态进行判断。
+    """
+    proc_dir = Path("/proc")
+    if not proc_dir.is_dir():
+        return _signal_posix_process_group(process_group_id, 0) # 信号0仅检查进程组是否还有成员
+    for proc_entry in proc_dir.iterdir():
+        if not proc_entry.name.isdigit():
+            continue
+        try:
+            stat_fields = (proc_entry / "stat").read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue # 进程在读取期间已退出
+        # stat_fields[0] 为进程状态，stat_fields[2] 为进程组ID
+        if len(stat_fields) > 2 and stat_fields[2] == str(process_group_id) and stat_fields[0] not in ("Z", "X"):
+            return True
+    return False
+
+
+def terminate_process_tree(process: subprocess.Popen, timeout_seconds: float = 5.0, logger_func=None) -> str:
+    """
+    终止子进程及其整个进程树 (包括 PyInstaller 调用的 UPX、编译器等子进程)。
+    先发送温和的终止信号，等待 timeout_seconds 后仍未退出则升级为强制杀死。
+
+    POSIX 上要求子进程以 start_new_session=True 启动 (独立进程组)，通过 killpg 结束整个进程组；
+    Windows 上要求子进程以 CREATE_NEW_PROCESS_GROUP 启动，先发送 CTRL_BREAK，超时后使用 taskkill /T /F。
+    如果安装了可选的 psutil，还会额外结束已脱离进程组的后代进程。
+
+    Args:
+        process (subprocess.Popen): 要终止的子进程 (进程树的根)。
+        timeout_seconds (float): 每个阶段等待进程退出的超时时间 (秒)。
+        logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+
+    Returns:
+        str: "exited" (调用前根进程已退出)、"terminated" (温和终止成功) 或 "killed" (已强制杀死)。
+    """
+    logger = logger_func if logger_func else print
+    try:
+        import psutil # 可选依赖：用于枚举后代进程
+    except ImportError:
+        psutil = None
+    descendant_processes = []
+    if psutil is not None:
+        try:
+            descendant_processes = psutil.Process(process.pid).children(recursive=True)
+        except psutil.Error:
+            descendant_processes = []
+
+    outcome = "exited" if process.poll() is not None else "terminated"
+
+    # 1. 温和终止整个进程树
+    if sys.platform == "win32":
+        if outcome != "exited":
+            try:
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            except (OSError, ValueError):
+                process.terminate()
+    else:
+        _signal_posix_process_group(process.pid, signal.SIGTERM)
+    for descendant_process in descendant_processes:
+        try:
+            descendant_process.terminate()
+        except psutil.Error:
+            pass
+
+    # 2. 等待根进程退出，超时则强制杀死
+    try:
+        process.wait(timeout_seconds)
+    except subprocess.TimeoutExpired:
+        outcome = "killed"
+        logger(f"[进程终止] 进程 {process.pid} 在 {timeout_seconds:.0f} 秒内未退出，正在强制结束进程树...", "WARNING")
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            _signal_posix_process_group(process.pid, signal.SIGKILL)
+        try:
+            process.kill()
+            process.wait(timeout_seconds)
+        except (OSError, subprocess.TimeoutExpired) as e_kill:
+            logger(f"[进程终止] 无法结束进程 {process.pid}: {e_kill}", "ERROR")
+
+    # 3. 清理仍然存活的后代进程 (例如仍在运行的 UPX)
+    if descendant_processes:
+        _, still_alive_processes = psutil.wait_procs(descendant_processes, timeout=timeout_seconds)
+        for descendant_process in still_alive_processes:
+            try:
+                descendant_process.kill()
+                outcome = "killed"
+            except psutil.Error:
+                pass
+    elif sys.platform != "win32":
+        deadline = time.monotonic() + timeout_seconds
+        while _posix_process_group_has_live_members(process.pid):
+            if time.monotonic() >= deadline:
+                _signal_posix_process_group(process.pid, signal.SIGKILL)
+                outcome = "killed"
+                break
+            time.sleep(0.05)
+    return outcome
+
+
+# --------------------------------------------------------------------------
+#  BuildAgentServer / BuildAgentClient: 远程构建代理 (HTTP 协议)
+# --------------------------------------------------------------------------
+# 协议 (JSON over HTTP，可选的共享令牌通过 X-Build-Agent-Token 请求头传递)：
+#   GET  /v1/info                    代理信息 (平台、Python 与 PyInstaller 版本)
+#   POST /v1/blobs/missing           {"hashes": [...]} -> {"missing": [...]}，只有缺失的文件内容才需要上传
+#   PUT  /v1/blobs/<sha256>          上传文件内容 (代理会校验哈希)
+#   POST /v1/jobs                    {"workspace", "options", "manifest": {相对路径: sha256}, "clean"} -> {"job_id"}
+#   GET  /v1/jobs/<id>/events?after=N  以换行分隔的 JSON 流式返回日志事件，直到构建结束
+#   GET  /v1/jobs/<id>/artifact      构建产物 (zip)
+#   POST /v1/jobs/<id>/cancel        取消构建
+BUILD_AGENT_PROTOCOL_VERSION = 1
+BUILD_AGENT_TOKEN_HEADER = "X-Build-Agent-Token"
+BUILD_AGENT_META_DIR = ".studio-build-meta" # 产物 zip 中存放 warn 文件等构建元数据的目录
+
+
+class _BuildAgentRequestHandler(BaseHTTPRequestHandler):
+    """把请求转交给 BuildAgentServer.dispatch()；每个连接一个线程 (ThreadingHTTPServer)。"""
+    server_version = f"PyInstallerStudioBuildAgent/{BUILD_AGENT_PROTOCOL_VERSION}"
+
+    def do_GET(self):
+        self.server.build_agent.dispatch(self, "GET")
+
+    def do_POST(self):
+        self.server.build_agent.dispatch(self, "POST")
+
+    def do_PUT(self):
+        self.server.build_agent.dispatch(self, "PUT")
+
+    def log_message(self, format, *args):
+        self.server.build_agent.logger(f"[构建代理] {self.address_string()} {format % args}", "DEBUG")
+
+
+class BuildAgentJob:
+    """代理上的一个构建任务：日志事件列表 (带序号，可断点续读) 与运行状态。"""
+    FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+    def __init__(self, job_id: str, workspace_key: str, options: dict, manifest: dict, clean: bool):
+        self.job_id = job_id
+        self.workspace_key = workspace_key
+        self.options = options
+        self.manifest = manifest
+        self.clean = clean
+        self.state = "queued"
+        self.returncode = None
+        self.artifact_path = None
+        self.process = None
+        self.cancel_requested = False
+        self.events = []
+        self.condition = threading.Condition()
+
+    def add_event(self, kind: str, **event_fields):
+        with self.condition:
+            self.events.append({"seq": len(self.events), "kind": kind, **event_fields})
+            self.condition.notify_all()
+
+    def finish(self, state: str, returncode: int | None):
+        with self.condition:
+            self.state, self.returncode = state, returncode
+            self.events.append({"seq": len(self.events), "kind": "end", "state": state, "returncode": returncode,
+                                "artifact": self.artifact_path is not None})
+            self.condition.notify_all()
+
+
+class BuildAgentServer:
+    """
+    无界面的构建代理：接收构建任务 (序列化的打包选项 + 源码快照清单)，在本机运行 PyInstaller，
+    并把日志流式返回给界面。源码按内容哈希存放，同一文件内容只需上传一次。
+    每个客户端项目/应用对应一个固定的工作区 (源码目录、workpath、distpath)，因此 PyInstaller 的构建缓存在多次构建间有效。
+    """
+    DEFAULT_PORT = 8765
+    KEEP_FINISHED_JOBS = 10 # 保留最近几个已结束任务的产物
+    MAX_REQUEST_JSON_BYTES = 64 * 1024 * 1024
+    STREAM_HEARTBEAT_SECONDS = 10.0
+    IO_CHUNK_BYTES = 1024 * 1024
+
+    def __init__(self, work_dir: Path, host: str = "127.0.0.1", port: int = DEFAULT_PORT, token: str | None = None,
+                 max_concurrent_jobs: int = 1, logger_func=None):
+        """
+        Args:
+            work_dir (Path): 代理的工作目录 (内容存储 blobs/、工作区 workspaces/、任务产物 jobs/)。
+            host (str): 监听地址，默认只监听本机。
+            port (int): 监听端口，0 表示由系统分配。
+            token (str, optional): 共享令牌；设置后所有请求都必须携带相同的令牌。
+            max_concurrent_jobs (int): 同时运行的构建数。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        self.work_dir = Path(work_dir)
+        self.blob_dir = self.work_dir / "blobs"
+        self.token = token or None
+        self.logger = logger_func if logger_func else print
+        self.jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._build_slots = threading.Semaphore(max(1, max_concurrent_jobs))
+        self._workspace_locks = {}
+        self._pyinstaller_version = None
+        self.http_server = ThreadingHTTPServer((host, port), _BuildAgentRequestHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.build_agent = self
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.http_server.server_address[:2]
+
+    def serve_forever(self):
+        self.logger(f"🛰️ 构建代理正在监听 http://{self.address[0]}:{self.address[1]} (工作目录: {self.work_dir})", "INFO")
+        self.http_server.serve_forever()
+
+    def shutdown(self):
+        """停止接受请求，并终止仍在运行的构建。"""
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        with self._jobs_lock:
+            running_jobs = [job for job in self.jobs.values() if job.process is not None]
+        for job in running_jobs:
+            job.cancel_requested = True
+            terminate_process_tree(job.process, timeout_seconds=3.0, logger_func=self.logger)
+
+    def blob_path(self, content_hash: str) -> Path:
+        return self.blob_dir / content_hash[:2] / content_hash
+
+    # --- 请求处理 ---
+
+    def dispatch(self, handler: BaseHTTPRequestHandler, method: str):
+        """按路径分发请求；参数错误返回 400，业务错误返回对应状态码和 {"error": ...}。"""
+        if self.token and not hmac.compare_digest(handler.headers.get(BUILD_AGENT_TOKEN_HEADER, ""), self.token):
+            self._send_json(handler, 401, {"error": "令牌无效"})
+            return
+        request_url = urllib.parse.urlsplit(handler.path)
+        path_parts = [part for part in request_url.path.split("/") if part]
+        try:
+            if method == "GET" and path_parts == ["v1", "info"]:
+                self._send_json(handler, 200, self.describe())
+            elif method == "POST" and path_parts == ["v1", "blobs", "missing"]:
+                requested_hashes = self._read_json(handler).get("hashes", [])
+                self._send_json(handler, 200, {"missing": [content_hash for content_hash in requested_hashes
+                                                           if not self._is_valid_hash(content_hash) or not self.blob_path(content_hash).is_file()]})
+            elif method == "PUT" and len(path_parts) == 3 and path_parts[:2] == ["v1", "blobs"]:
+                self._receive_blob(handler, path_parts[2])
+            elif method == "POST" and path_parts == ["v1", "jobs"]:
+                self._send_json(handler, 202, {"job_id": self.submit_job(self._read_json(handler)).job_id})
+            elif len(path_parts) == 4 and path_parts[:2] == ["v1", "jobs"]:
+                with self._jobs_lock:
+                    job = self.jobs.get(path_parts[2])
+                if job is None:
+                    self._send_json(handler, 404, {"error": f"任务不存在: {path_parts[2]}"})
+                elif method == "GET" and path_parts[3] == "events":
+                    after_seq = int(urllib.parse.parse_qs(request_url.query).get("after", ["-1"])[0])
+                    self._stream_events(handler, job, after_seq)
+                elif method == "GET" and path_parts[3] == "artifact":
+                    self._send_artifact(handler, job)
+                elif method == "POST" and path_parts[3] == "cancel":
+                    self.cancel_job(job)
+                    self._send_json(handler, 200, {"state": job.state})
+                else:
+                    self._send_json(handler, 404, {"error": "未知的请求"})
+            else:
+                self._send_json(handler, 404, {"error": "未知的请求"})
+        except ValueError as e_request:
+            self._send_json(handler, 400, {"error": str(e_request)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass # 客户端已断开 (例如界面取消了构建)
+
+    def describe(self) -> dict:
+        """代理信息。构建产物与代理所在平台相同，界面据此提示跨平台构建。"""
+        if self._pyinstaller_version is None:
+            try:
+                self._pyinstaller_version = subprocess.run(["pyinstaller", "--version"], capture_output=True, text=True, timeout=60).stdout.strip()
+            except (OSError, subprocess.SubprocessError):
+                self._pyinstaller_version = ""
+        return {"protocol": BUILD_AGENT_PROTOCOL_VERSION, "platform": sys.platform, "machine": platform.machine(),
+                "python": sys.version.split()[0], "pyinstaller": self._pyinstaller_version or None}
+
+    @staticmethod
+    def _is_valid_hash(content_hash) -> bool:
+        return isinstance(content_hash, str) and re.fullmatch(r"[0-9a-f]{64}", content_hash) is not None
+
+    @staticmethod
+    def _is_safe_relative_path(relative_path) -> bool:
+        """只接受工作区内的相对 POSIX 路径 (不能是绝对路径，也不能包含 ..)。"""
+        if not isinstance(relative_path, str) or not relative_path or relative_path.startswith("/") or "\\" in relative_path:
+            return False
+        path_parts = relative_path.split("/")
+        return ".." not in path_parts and "" not in path_parts and not re.match(r"^[A-Za-z]:", relative_path)
+
+    def _read_json(self, handler) -> dict:
+        content_length = int(handler.headers.get("Content-Length") or 0)
+        if content_length > self.MAX_REQUEST_JSON_BYTES:
+            raise ValueError("请求体过大")
+        try:
+            request_data = json.loads(handler.rfile.read(content_length) or b"{}")
+        except json.JSONDecodeError as e_json:
+            raise ValueError(f"请求体不是有效的 JSON: {e_json}")
+        if not isinstance(request_data, dict):
+            raise ValueError("请求体必须是 JSON 对象")
+        return request_data
+
+    @staticmethod
+    def _send_json(handler, status_code: int, response_data: dict):
+        response_bytes = json.dumps(response_data, ensure_ascii=False).encode("utf-8")
+        handler.send_response(status_code)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(response_bytes)))
+        handler.end_headers()
+        handler.wfile.write(response_bytes)
+
+    def _receive_blob(self, handler, content_hash: str):
+        """流式接收文件内容，边写临时文件边校验哈希，校验通过后原子地放入内容存储。"""
+        if not self._is_valid_hash(content_hash):
+            raise ValueError(f"无效的内容哈希: {content_hash}")
+        remaining_bytes = int(handler.headers.get("Content-Length") or 0)
+        target_path = self.blob_path(content_hash)
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = target_path.with_name(f".{content_hash}.{threading.get_ident()}.tmp")
+        content_digest = hashlib.sha256()
+        try:
+            with open(temporary_path, "wb") as f:
+                while remaining_bytes > 0:
+                    chunk = handler.rfile.read(min(self.IO_CHUNK_BYTES, remaining_bytes))
+                    if not chunk:
+                        break
+                    content_digest.update(chunk)
+                    f.write(chunk)
+                    remaining_bytes -= len(chunk)
+            if remaining_bytes or content_digest.hexdigest() != content_hash:
+                raise ValueError("上传内容不完整或与哈希不符")
+            os.replace(temporary_path, target_path)
+        finally:
+            if temporary_path.exists():
+                temporary_path.unlink()
+        self._send_json(handler, 201, {"stored": content_hash})
+
+    def _stream_events(self, handler, job: BuildAgentJob, after_seq: int):
+        """以换行分隔的 JSON 流式发送 after_seq 之后的事件；没有新事件时定期发送心跳，构建结束后关闭连接。"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        handler.end_headers()
+        next_seq = after_seq + 1
+        while True:
+            with job.condition:
+                if next_seq >= len(job.events) and job.state not in BuildAgentJob.FINISHED_STATES:
+                    job.condition.wait(self.STREAM_HEARTBEAT_SECONDS)
+                pending_events = job.events[next_seq:]
+                job_finished = job.state in BuildAgentJob.FINISHED_STATES
+            if not pending_events:
+                if job_finished: # 客户端续读时已经读到了结束事件
+                    return
+                pending_events = [{"kind": "heartbeat"}]
+            handler.wfile.write(b"".join(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n" for event in pending_events))
+            handler.wfile.flush()
+            next_seq += sum(1 for event in pending_events if "seq" in event)
+            if pending_events[-1]["kind"] == "end":
+                return
+
+    def _send_artifact(self, handler, job: BuildAgentJob):
+        if job.artifact_path is None or not job.artifact_path.is_file():
+            self._send_json(handler, 404, {"error": "该任务没有可下载的产物"})
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/zip")
+        handler.send_header("Content-Length", str(job.artifact_path.stat().st_size))
+        handler.end_headers()
+        with open(job.artifact_path, "rb") as f:
+            shutil.copyfileobj(f, handler.wfile, self.IO_CHUNK_BYTES)
+
+    # --- 任务 ---
+
+    def submit_job(self, job_request: dict) -> BuildAgentJob:
+        """校验任务请求 (路径必须位于快照内，内容必须已上传) 并在后台线程中开始构建。"""
+        manifest = job_request.get("manifest")
+        options = job_request.get("options")
+        workspace_id = job_request.get("workspace")
+        if not isinstance(manifest, dict) or not isinstance(options, dict) or not isinstance(workspace_id, str):
+            raise ValueError("任务请求缺少 manifest / options / workspace")
+        for relative_path, content_hash in manifest.items():
+            if not self._is_safe_relative_path(relative_path) or not self._is_valid_hash(content_hash):
+                raise ValueError(f"快照清单中的条目无效: {relative_path}")
+        missing_hashes = sorted({content_hash for content_hash in manifest.values() if not self.blob_path(content_hash).is_file()})
+        if missing_hashes:
+            raise ValueError(f"有 {len(missing_hashes)} 个文件内容尚未上传")
+        snapshot_dirs = {relative_path.rsplit("/", 1)[0] for relative_path in manifest if "/" in relative_path}
+        snapshot_dirs |= {"/".join(directory.split("/")[:depth]) for directory in snapshot_dirs for depth in range(1, directory.count("/") + 1)}
+        def _require_snapshot_path(relative_path):
+            if not self._is_safe_relative_path(relative_path) or (relative_path not in manifest and relative_path not in snapshot_dirs):
+                raise ValueError(f"路径不在源码快照中: {relative_path}")
+        _require_snapshot_path(options.get("script"))
+        for data_pair in options.get("datas", []):
+            if not (isinstance(data_pair, list) and len(data_pair) == 2 and isinstance(data_pair[1], str)):
+                raise ValueError(f"数据条目无效: {data_pair!r}")
+            _require_snapshot_path(data_pair[0])
+        if options.get("icon"):
+            _require_snapshot_path(options["icon"])
+        if not isinstance(options.get("name"), str) or not re.fullmatch(r"[^/\\:]+", options["name"]) or options["name"] in (".", ".."):
+            raise ValueError("应用名称无效")
+
+        job = BuildAgentJob(uuid.uuid4().hex[:12], hashlib.sha256(workspace_id.encode("utf-8")).hexdigest()[:16],
+                            options, manifest, bool(job_request.get("clean")))
+        with self._jobs_lock:
+            self.jobs[job.job_id] = job
+        threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+        self.logger(f"🛰️ 已接收构建任务 {job.job_id}: {options['name']} ({len(manifest)} 个源文件)", "INFO")
+        return job
+
+    def cancel_job(self, job: BuildAgentJob):
+        job.cancel_requested = True
+        job_process = job.process # _run_job 会在其线程中把 job.process 置为 None，只读取一次
+        if job_process is not None:
+            terminate_process_tree(job_process, timeout_seconds=5.0, logger_func=self.logger)
+
+    def _run_job(self, job: BuildAgentJob):
+        """(后台线程) 同步工作区、生成 .spec、运行 PyInstaller，并打包产物。"""
+        with self._jobs_lock:
+            workspace_lock = self._workspace_locks.setdefault(job.workspace_key, threading.Lock())
+        job.add_event("log", text=f"🛰️ 构建代理: 任务 {job.job_id} 正在排队...")
+        with self._build_slots, workspace_lock:
+            if job.cancel_requested:
+                job.finish("cancelled", None)
+                return
+            job.state = "running"
+            workspace_dir = self.work_dir / "workspaces" / job.workspace_key
+            try:
+                changed_count, removed_count = self._sync_workspace_sources(workspace_dir / "src", job.manifest)
+                job.add_event("log", text=f"🛰️ 构建代理: 工作区已同步 (更新 {changed_count} 个文件，删除 {removed_count} 个文件)。")
+                resolved_options = dict(job.options)
+                resolved_options["script"] = str(workspace_dir / "src" / job.options["script"])
+                resolved_options["datas"] = [[str(workspace_dir / "src" / source_str), destination_str] for source_str, destination_str in job.options.get("datas", [])]
+                resolved_options["icon"] = str(workspace_dir / "src" / job.options["icon"]) if job.options.get("icon") else None
+                resolved_options["macos_bundle"] = sys.platform == "darwin" and not job.options.get("console", True)
+                spec_path = workspace_dir / f"{job.options['name']}.spec"
+                SpecFileManager(spec_path, logger_func=self.logger).ensure(resolved_options)
+                dist_dir = workspace_dir / "dist"
+                build_command = ["pyinstaller", "--noconfirm", "--distpath", str(dist_dir), "--workpath", str(workspace_dir / "build")]
+                if job.clean:
+                    build_command.append("--clean")
+                build_command.append(str(spec_path))
+                job.add_event("log", text=f"🛠️ 构建代理执行命令: {' '.join(build_command)}")
+                job.process = subprocess.Popen(
+                    build_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0, env=ProcessOutputReader.child_environment(),
+                    cwd=str(Path(resolved_options["script"]).parent),
+                    creationflags=((subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP) if sys.platform == "win32" else 0),
+                    start_new_session=(sys.platform != "win32")
+                )
+                if job.cancel_requested: # 取消请求在进程启动期间到达，cancel_job 没有看到该进程
+                    terminate_process_tree(job.process, timeout_seconds=5.0, logger_func=self.logger)
+                for output_line_batch in ProcessOutputReader(job.process.stdout).iter_line_batches():
+                    for output_line in output_line_batch:
+                        job.add_event("log", text=output_line)
+                returncode = job.process.wait()
+                job.process = None
+                if job.cancel_requested:
+                    job.finish("cancelled", returncode)
+                    return
+                job.artifact_path = self._package_artifact(job, workspace_dir, include_output=returncode == 0)
+                job.finish("succeeded" if returncode == 0 else "failed", returncode)
+            except Exception as e_job:
+                job.process = None
+                job.add_event("log", text=f"❌ 构建代理执行任务时出错: {e_job}")
+                job.finish("failed", None)
+            finally:
+                self.logger(f"🛰️ 构建任务 {job.job_id} 已结束: {job.state} (返回码 {job.returncode})", "INFO")
+                self._prune_finished_jobs()
+
+    def _sync_workspace_sources(self, source_dir: Path, manifest: dict) -> tuple[int, int]:
+        """
+        让工作区源码目录与快照清单一致：内容未变的文件保持不动 (mtime 不变，PyInstaller 缓存仍然有效)，
+        其余文件从内容存储硬链接 (跨文件系统时复制) 过来，清单中没有的文件被删除。
+        """
+        state_path = source_dir.parent / "manifest.json"
+        try:
+            previous_manifest = json.loads(state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous_manifest = {}
+        changed_count = removed_count = 0
+        for relative_path in set(previous_manifest) - set(manifest):
+            stale_path = source_dir / relative_path
+            if stale_path.is_file():
+                stale_path.unlink()
+                removed_count += 1
+        for relative_path, content_hash in manifest.items():
+            target_path = source_dir / relative_path
+            if previous_manifest.get(relative_path) == content_hash and target_path.is_file():
+                continue
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            if target_path.exists():
+                target_path.unlink()
+            try:
+                os.link(self.blob_path(content_hash), target_path)
+            except OSError:
+                shutil.copyfile(self.blob_path(content_hash), target_path)
+            changed_count += 1
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        state_path.write_text(json.dumps(manifest), encoding="utf-8")
+        return changed_count, removed_count
+
+    def _package_artifact(self, job: BuildAgentJob, workspace_dir: Path, include_output: bool) -> Path | None:
+        """把构建产物 (dist 下的应用) 和 warn 文件打包为 zip，保留可执行权限。"""
+        app_name = job.options["name"]
+        dist_dir = workspace_dir / "dist"
+        warn_file_path = workspace_dir / "build" / app_name / f"warn-{app_name}.txt"
+        output_paths = [output_path for output_path in (dist_dir / app_name, dist_dir / f"{app_name}.exe", dist_dir / f"{app_name}.app")
+                        if include_output and output_path.exists()]
+        if not output_paths and not warn_file_path.is_file():
+            return None
+        artifact_path = self.work_dir / "jobs" / job.job_id / "artifact.zip"
+        artifact_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(artifact_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as artifact_zip:
+            for output_path in output_paths:
+                member_paths = [output_path] if output_path.is_file() else sorted(path for path in output_path.rglob("*") if path.is_file())
+                for member_path in member_paths:
+                    artifact_zip.write(member_path, member_path.relative_to(dist_dir).as_posix())
+            if warn_file_path.is_file():
+                artifact_zip.write(warn_file_path, f"{BUILD_AGENT_META_DIR}/{warn_file_path.name}")
+        return artifact_path
+
+    def _prune_finished_jobs(self):
+        """只保留最近 KEEP_FINISHED_JOBS 个已结束任务的记录和产物。"""
+        with self._jobs_lock:
+            finished_jobs = [job for job in self.jobs.values() if job.state in BuildAgentJob.FINISHED_STATES]
+            stale_jobs = finished_jobs[:-self.KEEP_FINISHED_JOBS] if len(finished_jobs) > self.KEEP_FINISHED_JOBS else []
+            for job in stale_jobs:
+                del self.jobs[job.job_id]
+        for job in stale_jobs:
+            shutil.rmtree(self.work_dir / "jobs" / job.job_id, ignore_errors=True)
+
+
+class BuildAgentClient:
+    """界面端的构建代理客户端：准备并按内容寻址上传源码快照、提交任务、读取日志流、下载产物。"""
+    SNAPSHOT_EXCLUDED_DIRS = {".git", ".hg", ".svn", "__pycache__", ".venv", "venv", "env", ".tox", ".mypy_cache",
+                              ".pytest_cache", "node_modules", "build", "dist"}
+    SNAPSHOT_EXCLUDED_SUFFIXES = (".pyc", ".pyo", ".spec.bak")
+    MAX_STREAM_RECONNECTS = 30 # 日志流连续重连都没有收到数据的最大次数
+    UPLOAD_WORKERS = 4
+
+    def __init__(self, agent_url: str, token: str | None = None, timeout_seconds: float = 60.0, logger_func=None):
+        """
+        Args:
+            agent_url (str): 代理地址，例如 http://127.0.0.1:8765。
+            token (str, optional): 共享令牌。
+            timeout_seconds (float): 单次网络操作的超时 (日志流有心跳，不会因构建时间长而超时)。
+            logger_func (callable, optional): 日志回调，签名为 logger_func(message: str, level: str = "INFO")。
+        """
+        split_url = urllib.parse.urlsplit(agent_url if "://" in agent_url else f"http://{agent_url}")
+        if split_url.scheme not in ("http", "https") or not split_url.hostname:
+            raise ValueError(f"无效的构建代理地址: {agent_url}")
+        self.split_url = split_url
+        self.token = token or None
+        self.timeout_seconds = timeout_seconds
+        self.logger = logger_func if logger_func else print
+
+    def _connect(self) -> http.client.HTTPConnection:
+        connection_class = http.client.HTTPSConnection if self.split_url.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.split_url.hostname, self.split_url.port, timeout=self.timeout_seconds)
+
+    def _request(self, method: str, path: str, body=None, headers: dict | None = None, expect_json: bool = True):
+        """发送请求；expect_json 为 False 时返回 (连接, 响应) 由调用方流式读取。非 2xx 响应抛出 ConnectionError。"""
+        request_headers = dict(headers or {})
+        if self.token:
+            request_headers[BUILD_AGENT_TOKEN_HEADER] = self.token
+        if isinstance(body, dict):
+            body = json.dumps(body).encode("utf-8")
+            request_headers["Content-Type"] = "application/json"
+        connection = self._connect()
+        try:
+            connection.request(method, path, body=body, headers=request_headers)
+            response = connection.getresponse()
+            if response.status >= 300:
+                try:
+                    error_text = json.loads(response.read()).get("error", "")
+                except ValueError:
+                    error_text = ""
+                raise ConnectionError(f"构建代理返回 HTTP {response.status}: {error_text or response.reason}")
+            if not expect_json:
+                return connection, response
+            return json.loads(response.read())
+        except Exception:
+            connection.close()
+            raise
+        finally:
+            if expect_json:
+                connection.close()
+
+    def get_info(self) -> dict:
+        return self._request("GET", "/v1/info")
+
+    @classmethod
+    def prepare_snapshot(cls, spec_options: dict, project_root: Path, hash_index: DataFileIndex) -> dict:
+        """
+        收集构建所需的源码快照：项目根目录下的源文件 (跳过版本库、虚拟环境、缓存和构建输出目录)，
+        以及位于项目外的入口脚本、数据文件和图标 (放在快照的 _external/<序号>/ 下)。
+        打包选项中的本地路径被改写为快照内的相对路径。本地产物仓库也用其清单计算构建指纹的输入部分。
+
+        Returns:
+            dict: {"manifest": {相对路径: sha256}, "blobs": {sha256: (本地路径, 大小)}, "options": 改写后的选项,
+                   "total_bytes": 快照总大小, "hashed_count": 本次实际重新哈希的文件数}
+        """
+        project_root = Path(project_root).resolve()
+        snapshot_files = {} # {相对路径: 本地路径}
+        external_roots = {} # {项目外的本地路径: 快照内的相对路径}
+
+        def _add_tree(local_dir: Path, relative_prefix: str):
+            for walk_root, dir_names, file_names in os.walk(local_dir):
+                dir_names[:] = [dir_name for dir_name in dir_names if dir_name not in cls.SNAPSHOT_EXCLUDED_DIRS]
+                relative_root = Path(walk_root).relative_to(local_dir).as_posix()
+                for file_name in file_names:
+                    if not file_name.endswith(cls.SNAPSHOT_EXCLUDED_SUFFIXES):
+                        relative_path = "/".join(part for part in (relative_prefix, relative_root, file_name) if part and part != ".")
+                        snapshot_files[relative_path] = Path(walk_root) / file_name
+
+        def _to_snapshot_path(local_path_str: str) -> str:
+            local_path = Path(local_path_str).resolve()
+            if local_path.is_relative_to(project_root):
+                relative_path = local_path.relative_to(project_root).as_posix()
+            else:
+                relative_path = external_roots.setdefault(local_path, f"_external/{len(external_roots)}/{local_path.name}")
+            if local_path.is_dir(): # 数据文件夹可能位于被跳过的目录中，按条目本身重新收集一次
+                _add_tree(local_path, relative_path)
+            elif local_path.is_file():
+                snapshot_files[relative_path] = local_path
+            return relative_path
+
+        _add_tree(project_root, "")
+        remote_options = dict(spec_options)
+        remote_options["script"] = _to_snapshot_path(spec_options["script"])
+        remote_options["icon"] = _to_snapshot_path(spec_options["icon"]) if spec_options.get("icon") else None
+        remote_datas = []
+        for source_str, destination_str in spec_options["datas"]:
+            source_paths = sorted(glob.glob(source_str)) if glob.has_magic(source_str) else [source_str] # 通配符在本地展开
+            remote_datas.extend([_to_snapshot_path(source_path_str), destination_str] for source_path_str in source_paths)
+        remote_options["datas"] = remote_datas
+        remote_options["pathex"] = []
+        remote_options.pop("macos_bundle", None) # 由代理按自身平台决定
+
+        file_hashes, hashed_count = hash_index.hash_files(list(snapshot_files.values()))
+        manifest, blobs = {}, {}
+        for relative_path, local_path in snapshot_files.items():
+            index_entry = file_hashes.get(str(local_path))
+            if index_entry is None: # 无法读取的文件不进入快照
+                continue
+            manifest[relative_path] = index_entry[2]
+            blobs[index_entry[2]] = (local_path, index_entry[0])
+        return {"manifest": manifest, "blobs": blobs, "options": remote_options,
+                "total_bytes": sum(blob_size for _, blob_size in blobs.values()), "hashed_count": hashed_count}
+
+    def upload_snapshot(self, snapshot: dict, cancel_event: threading.Event | None = None) -> dict:
+        """
+        只上传代理上还没有的文件内容 (按 sha256 去重)，并行上传。
+
+        Returns:
+            dict: {"uploaded_count", "uploaded_bytes", "reused_count"}
+        """
+        missing_hashes = self._request("POST", "/v1/blobs/missing", {"hashes": list(snapshot["blobs"])})["missing"]
+        def _upload_blob(content_hash: str):
+            if cancel_event is not None and cancel_event.is_set():
+                return 0
+            local_path, blob_size = snapshot["blobs"][content_hash]
+            with open(local_path, "rb") as f:
+                self._request("PUT", f"/v1/blobs/{content_hash}", body=f, headers={"Content-Length": str(blob_size),
+                                                                                   "Content-Type": "application/octet-stream"})
+            return blob_size
+        with ThreadPoolExecutor(max_workers=self.UPLOAD_WORKERS) as upload_executor:
+            uploaded_sizes = list(upload_executor.map(_upload_blob, missing_hashes))
+        return {"uploaded_count": len(missing_hashes), "uploaded_bytes": sum(uploaded_sizes),
+                "reused_count": len(snapshot["blobs"]) - len(missing_hashes)}
+
+    def submit_job(self, workspace_id: str, snapshot: dict, clean: bool) -> str:
+        return self._request("POST", "/v1/jobs", {"workspace": workspace_id, "options": snapshot["options"],
+                                                  "manifest": snapshot["manifest"], "clean": clean})["job_id"]
+
+    def stream_events(self, job_id: str):
+        """
+        逐个产出任务事件 (心跳已过滤)，直到收到 "end" 事件。连接中断 (或响应在 "end" 之前结束) 时等待 1 秒后从上次的序号续读；
+        连续 MAX_STREAM_RECONNECTS 次重连都没有收到任何数据时放弃。
 
-            # 如果文件未被跳过，则处理它
-            if self.logger and callable(self.logger):
-                self.logger(f"[依赖扫描器] 正在处理文件: {relative_path_to_root if 'relative_path_to_root' in locals() else py_file.name}", "DEBUG")
-            self._extract_imports_from_file(py_file) # 解析文件并提取导入
-            processed_file_count += 1
+        Raises:
+            ConnectionError: 多次重连后仍无法读取任务事件。
+        """
+        last_seq = -1
+        failed_reconnect_count = 0
+        while True:
+            connection, response = self._request("GET", f"/v1/jobs/{job_id}/events?after={last_seq}", expect_json=False)
+            try:
+                for event_line in response:
+                    failed_reconnect_count = 0 # 心跳也说明连接正常
+                    if not event_line.strip():
+                        continue
+                    job_event = json.loads(event_line)
+                    if job_event["kind"] == "heartbeat":
+                        continue
+                    last_seq = job_event["seq"]
+                    yield job_event
+                    if job_event["kind"] == "end":
+                        return
+                self.logger("⚠️ 构建代理的日志流在任务结束前关闭，正在重连...", "WARNING")
+            except (OSError, http.client.HTTPException) as e_stream:
+                self.logger(f"⚠️ 与构建代理的日志连接中断，正在重连: {e_stream}", "WARNING")
+            finally:
+                connection.close()
+            failed_reconnect_count += 1
+            if failed_reconnect_count > self.MAX_STREAM_RECONNECTS:
+                raise ConnectionError(f"连续 {self.MAX_STREAM_RECONNECTS} 次重连后仍无法读取任务 {job_id} 的日志。")
+            time.sleep(1.0)
 
-        if self.logger and callable(self.logger):
-            self.logger(f"[依赖扫描器] 扫描完成。共处理 {processed_file_count} 个 .py 文件，跳过 {skipped_file_count} 个文件。", "INFO")
+    def cancel_job(self, job_id: str):
+        self._request("POST", f"/v1/jobs/{job_id}/cancel", {})
 
-        # 从找到的潜在依赖项中，移除那些用户已在UI中声明为隐藏导入的模块
-        final_potential_dependencies = self.found_potential_dependencies - self.existing_hidden_imports
+    def download_artifact(self, job_id: str, dist_path: Path, work_path: Path, app_name: str) -> list[Path]:
+        """
+        下载产物并解压：应用输出替换 dist_path 下的同名旧产物，warn 文件放到 work_path 中 (供构建后分析使用)。
 
-        return sorted(list(final_potential_dependencies)) # 返回排序后的列表
+        Returns:
+            list[Path]: 解压出的顶层输出路径。
+        """
+        dist_path.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryFile() as artifact_file:
+            connection, response = self._request("GET", f"/v1/jobs/{job_id}/artifact", expect_json=False)
+            try:
+                shutil.copyfileobj(response, artifact_file, 1024 * 1024)
+            finally:
+                connection.close()
+            artifact_file.seek(0)
+            extracted_roots = []
+            with zipfile.ZipFile(artifact_file) as artifact_zip:
+                # 先检查全部成员的路径，再删除任何旧输出：不安全的路径 (例如 "../x"、"/x") 不能导致删除 dist_path 之外的内容
+                resolved_dist_path, resolved_work_path = dist_path.resolve(), work_path.resolve()
+                member_targets = []
+                for member in artifact_zip.infolist():
+                    if not BuildAgentServer._is_safe_relative_path(member.filename.rstrip("/")):
+                        raise ValueError(f"产物中包含不安全的路径: {member.filename}")
+                    if member.filename.startswith(f"{BUILD_AGENT_META_DIR}/"):
+                        target_path, allowed_root = work_path / Path(member.filename).name, resolved_work_path
+                    else:
+                        target_path, allowed_root = dist_path / member.filename, resolved_dist_path
+                    resolved_target_path = target_path.resolve()
+                    if resolved_target_path == allowed_root or not resolved_target_path.is_relative_to(allowed_root):
+                        raise ValueError(f"产物中包含不安全的路径: {member.filename}")
+                    member_targets.append((member, target_path))
+                top_level_names = {member.filename.split("/", 1)[0] for member, _ in member_targets} - {BUILD_AGENT_META_DIR}
+                for top_level_name in sorted(top_level_names): # 与 PyInstaller 一致：先删除旧的输出
+                    previous_output = dist_path / top_level_name
+                    if previous_output.is_dir() and not previous_output.is_symlink():
+                        shutil.rmtree(previous_output)
+                    elif previous_output.exists() or previous_output.is_symlink():
+                        previous_output.unlink()
+                    extracted_roots.append(previous_output)
+                for member, target_path in member_targets:
+                    if member.is_dir():
+                        continue
+                    target_path.parent.mkdir(parents=True, exist_ok=True)
+                    with artifact_zip.open(member) as source_file, open(target_path, "wb") as target_file:
+                        shutil.copyfileobj(source_file, target_file, 1024 * 1024)
+                    file_mode = (member.external_attr >> 16) & 0o777 # zipfile 解压不会恢复权限，需要手动恢复可执行位
+                    if file_mode:
+                        os.chmod(target_path, file_mode)
+        return extracted_roots
+
+
+def run_build_agent(argument_list: list[str]) -> int:
+    """命令行入口: python CNPyInstaller.py --build-agent [--host 127.0.0.1] [--port 8765] [--work-dir 目录] [--token 令牌]"""
+    argument_parser = argparse.ArgumentParser(prog="CNPyInstaller.py --build-agent", description="PyInstaller Studio Pro 无界面构建代理")
+    argument_parser.add_argument("--build-agent", action="store_true", help=argparse.SUPPRESS)
+    argument_parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认只监听本机；对局域网开放时请同时设置令牌)")
+    argument_parser.add_argument("--port", type=int, default=BuildAgentServer.DEFAULT_PORT, help="监听端口")
+    argument_parser.add_argument("--work-dir", default=str(Path.home() / ".pyinstaller_studio_pro_v3_1" / "build_agent"), help="工作目录")
+    argument_parser.add_argument("--token", default=os.environ.get("PYI_STUDIO_AGENT_TOKEN"), help="共享令牌 (也可通过环境变量 PYI_STUDIO_AGENT_TOKEN 设置)")
+    argument_parser.add_argument("--jobs", type=int, default=1, help="同时运行的构建数")
+    parsed_arguments = argument_parser.parse_args(argument_list)
+    if parsed_arguments.host not in ("127.0.0.1", "localhost", "::1") and not parsed_arguments.token:
+        print("[构建代理] ⚠️ 正在对非本机地址开放且未设置令牌，任何能访问该端口的人都可以在本机运行构建。")
+    build_agent = BuildAgentServer(Path(parsed_arguments.work_dir), parsed_arguments.host, parsed_arguments.port, parsed_arguments.token,
+                                   max_concurrent_jobs=parsed_arguments.jobs,
+                                   logger_func=lambda message, level="INFO": print(f"[{level}] {message}", flush=True) if level != "DEBUG" else None)
+    try:
+        build_agent.serve_forever()
+    except KeyboardInterrupt:
+        print("[构建代理] 正在停止...")
+    finally:
+        build_agent.shutdown()
+    return 0
+
+
+def run_scanner_benchmark(argument_list: list[str]) -> int:
+    """命令行入口: python CNPyInstaller.py --benchmark-scanner [--sizes 1k,10k,100k] [--save-baseline 文件] [--compare 文件]"""
+    argument_parser = argparse.ArgumentParser(prog="CNPyInstaller.py --benchmark-scanner", description="DependencyScanner 性能基准 (合成项目)")
+    argument_parser.add_argument("--benchmark-scanner", action="store_true", help=argparse.SUPPRESS)
+    argument_parser.add_argument("--sizes", default="1k,10k,100k", help="合成项目的规模 (文件数)，用逗号分隔")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="每个规模的计时次数 (取中位数)")
+    argument_parser.add_argument("--seed", type=int, default=0, help="合成项目的随机种子")
+    argument_parser.add_argument("--work-dir", default=str(Path(tempfile.gettempdir()) / "pyinstaller_studio_scanner_benchmark"),
+                                 help="存放合成项目的目录 (生成规则未变时复用)")
+    argument_parser.add_argument("--save-baseline", metavar="文件", help="将结果保存为 JSON 基线")
+    argument_parser.add_argument("--compare", metavar="文件", help="与之前保存的 JSON 基线对比；出现退化时返回码为 1")
+    argument_parser.add_argument("--threshold", type=float, default=0.10, help="判为退化的相对增幅 (默认 0.10，即 10%%)")
+    parsed_arguments = argument_parser.parse_args(argument_list)
+    size_labels = [size_label.strip() for size_label in parsed_arguments.sizes.split(",") if size_label.strip()]
+    try:
+        for size_label in size_labels:
+            ScannerBenchmark.parse_size_label(size_label)
+    except ValueError:
+        argument_parser.error(f"无效的规模: {parsed_arguments.sizes}")
 
+    baseline_result = None
+    if parsed_arguments.compare:
+        try:
+            with open(parsed_arguments.compare, "r", encoding="utf-8") as f:
+                baseline_result = json.load(f)
+        except (OSError, ValueError) as e_baseline:
+            print(f"[扫描器基准] ❌ 无法读取基线文件: {e_baseline}")
+            return 2
+        if baseline_result.get("version") != ScannerBenchmark.FORMAT_VERSION or baseline_result.get("generator_version") != ScannerBenchmark.GENERATOR_VERSION:
+            print("[扫描器基准] ⚠️ 基线由不同版本的基准程序生成，合成项目可能不同，对比结果仅供参考。")
+
+    scanner_benchmark = ScannerBenchmark(Path(parsed_arguments.work_dir), repeat=parsed_arguments.repeat,
+                                         logger_func=lambda message, level="INFO": print(message, flush=True) if level != "DEBUG" else None)
+    benchmark_result = scanner_benchmark.run(size_labels, seed=parsed_arguments.seed)
+    comparisons = ScannerBenchmark.compare(baseline_result, benchmark_result, parsed_arguments.threshold) if baseline_result else None
+    if baseline_result and (baseline_result.get("python"), baseline_result.get("platform"), baseline_result.get("machine")) != \
+            (benchmark_result["python"], benchmark_result["platform"], benchmark_result["machine"]):
+        print(f"[扫描器基准] ⚠️ 基线的运行环境 (Python {baseline_result.get('python')}，{baseline_result.get('platform')}/{baseline_result.get('machine')}) 与本次不同。")
+    print(ScannerBenchmark.format_report(benchmark_result, comparisons))
+    if parsed_arguments.save_baseline:
+        Path(parsed_arguments.save_baseline).write_text(json.dumps(benchmark_result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n[扫描器基准] 基线已保存到 {parsed_arguments.save_baseline}")
+    return 1 if comparisons and any(comparison["regression"] for comparison in comparisons) else 0
+
+def run_output_reader_benchmark(argument_list: list[str]) -> int:
+    """
+    命令行入口: python CNPyInstaller.py --benchmark-output-reader [--log 录制的构建日志] [--lines N] [--repeat N]
+    让一个子进程原样输出日志文件，分别用原来的文本模式逐行迭代和 ProcessOutputReader 分块读取，比较吞吐量。
+    """
+    argument_parser = argparse.ArgumentParser(prog="CNPyInstaller.py --benchmark-output-reader", description="构建输出读取性能对比 (逐行文本模式 / 分块读取)")
+    argument_parser.add_argument("--benchmark-output-reader", action="store_true", help=argparse.SUPPRESS)
+    argument_parser.add_argument("--log", metavar="文件", help="录制的 PyInstaller 输出 (未指定时生成一份合成日志)")
+    argument_parser.add_argument("--lines", type=int, default=200000, help="合成日志的行数")
+    argument_parser.add_argument("--repeat", type=int, default=3, help="每种方式的计时次数 (取中位数)")
+    parsed_arguments = argument_parser.parse_args(argument_list)
+
+    if parsed_arguments.log:
+        log_path = Path(parsed_arguments.log)
+        if not log_path.is_file():
+            print(f"[输出读取基准] ❌ 日志文件不存在: {log_path}")
+            return 2
+    else: # 由典型的 PyInstaller 输出行组成，其中少量为警告、hook 和阶段行
+        log_path = Path(tempfile.gettempdir()) / f"pyinstaller_studio_output_benchmark_{parsed_arguments.lines}.log"
+        if not log_path.is_file():
+            synthetic_random = random.Random(0)
+            line_templates = [
+                "{ms} INFO: Analyzing hidden import 'pkg{n}.module{n}'",
+                "{ms} INFO: Processing module hooks (post-graph stage)...",
+                "{ms} INFO: Loading module hook 'hook-pkg{n}.py' from '/usr/lib/python3/site-packages/PyInstaller/hooks'...",
+                "{ms} WARNING: Hidden import \"pkg{n}.missing\" not found!",
+                "{ms} DEBUG: Collecting dependency '/usr/lib/libexample{n}.so.1' as 'libexample{n}.so.1'.",
+                "{ms} INFO: 依赖分析 模块{n} — 中文输出",
+            ]
+            with open(log_path, "w", encoding="utf-8", newline="\n") as f:
+                f.write("123 INFO: PyInstaller: 6.0.0, contrib hooks: 2024.0\n456 INFO: Running Analysis Analysis-00.toc\n")
+                for line_number in range(parsed_arguments.lines):
+                    f.write(synthetic_random.choices(line_templates, weights=(40, 20, 20, 5, 14, 1))[0].format(ms=1000 + line_number, n=synthetic_random.randrange(5000)) + "\n")
+                f.write("999999 INFO: Building EXE from EXE-00.toc completed successfully.\n999999 INFO: Build complete! The results are available in: /tmp/dist\n")
+    replay_command = [sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(open(sys.argv[1], 'rb'), sys.stdout.buffer, 1 << 16)", str(log_path)]
+
+    def _read_text_lines(parse_output: bool) -> int: # 原实现：文本模式逐行迭代，每行解析一次
+        output_parser, line_count = PyInstallerOutputParser(), 0
+        replay_process = subprocess.Popen(replay_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
+        for output_line in replay_process.stdout:
+            output_line.strip() # 与写入日志时相同的逐行处理
+            if parse_output:
+                output_parser.parse_line(output_line)
+            line_count += 1
+        replay_process.wait()
+        return line_count
+
+    def _read_line_batches(parse_output: bool) -> int: # 新实现：分块读取、增量解码，按批解析
+        output_parser, line_count = PyInstallerOutputParser(), 0
+        replay_process = subprocess.Popen(replay_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0, env=ProcessOutputReader.child_environment())
+        for output_line_batch in ProcessOutputReader(replay_process.stdout).iter_line_batches():
+            [output_line.strip() for output_line in output_line_batch] # 与写入日志时相同的逐行处理
+            if parse_output:
+                output_parser.parse_batch(output_line_batch)
+            line_count += len(output_line_batch)
+        replay_process.wait()
+        return line_count
+
+    log_byte_size = log_path.stat().st_size
+    print(f"[输出读取基准] 日志: {log_path} ({format_byte_size(log_byte_size)})，Python {platform.python_version()}，每项取 {parsed_arguments.repeat} 次的中位数\n")
+    print(f"{'方式':<24}{'行数':>10}{'耗时(秒)':>10}{'MB/秒':>10}{'万行/秒':>10}")
+    median_seconds = {}
+    for mode_label, read_function, parse_output in (("逐行文本模式 (仅读取)", _read_text_lines, False), ("分块读取 (仅读取)", _read_line_batches, False),
+                                                    ("逐行文本模式 + 解析", _read_text_lines, True), ("分块读取 + 批量解析", _read_line_batches, True)):
+        elapsed_samples = []
+        for _ in range(max(1, parsed_arguments.repeat)):
+            run_start_time = time.perf_counter()
+            line_count = read_function(parse_output)
+            elapsed_samples.append(time.perf_counter() - run_start_time)
+        median_seconds[mode_label] = statistics.median(elapsed_samples)
+        print(f"{mode_label:<24}{line_count:>10}{median_seconds[mode_label]:>10.3f}{log_byte_size / 1048576 / median_seconds[mode_label]:>10.1f}"
+              f"{line_count / 10000 / median_seconds[mode_label]:>10.1f}")
+    print(f"\n仅读取: 分块读取为逐行文本模式的 {median_seconds['逐行文本模式 (仅读取)'] / median_seconds['分块读取 (仅读取)']:.2f} 倍速度；"
+          f"含解析: {median_seconds['逐行文本模式 + 解析'] / median_seconds['分块读取 + 批量解析']:.2f} 倍。")
+    return 0
 
 # --- 全局外观设置 ---
 # ... (ctk.set_appearance_mode 和 ctk.set_default_color_theme)
@@ -329,15 +5990,18 @@ ctk.set_default_color_theme("blue")
 # ==============================================================================
 class UltraModernPyInstallerGUI:
     """PyInstaller Studio Pro 的主GUI应用程序类。"""
+    DATA_ENTRY_STATS_CACHE_SIZE = 512 # 数据条目类型/大小统计结果的缓存容量
 
     def __init__(self):
         """初始化应用程序主窗口、变量、字体和UI组件。"""
+        self._startup_perf_counter = time.perf_counter() # 用于统计启动到界面可交互的耗时 (见 _report_time_to_interactive)
         self.root = ctk.CTk()
 
         self._define_fonts()      # 统一定义字体
         self._setup_window()      # 设置主窗口属性
         self._setup_variables()   # 初始化所有Tkinter变量和内部状态变量
-        self._create_widgets()    # 创建所有UI组件
+        self._create_widgets()    # 创建所有UI组件 (非默认选项卡的内容在首次切换到时才创建)
+        self._widgets_created_perf_counter = time.perf_counter()
         self.load_config()        # 程序启动时加载上次保存的配置
         self._setup_animations()  # 设置UI动画效果
 
@@ -471,13 +6135,67 @@ class UltraModernPyInstallerGUI:
         self.is_debug = tk.BooleanVar()
         self.is_clean = tk.BooleanVar(value=True)
         self.is_upx = tk.BooleanVar()
+        self.build_from_spec = tk.BooleanVar(value=True) # 生成并复用规范 .spec 文件，基于它构建
+        self.use_remote_agent = tk.BooleanVar(value=False) # 在远程构建代理上构建
+        self.remote_agent_url = tk.StringVar()
+        self.remote_agent_token = tk.StringVar(value=os.environ.get("PYI_STUDIO_AGENT_TOKEN", "")) # 令牌不写入配置文件
+        self.use_artifact_store = tk.BooleanVar(value=True) # 输入未变化时直接从产物仓库恢复上次的产物
+        self.python_interpreter = tk.StringVar() # 构建用的 Python 解释器 (为空时使用 PATH 中的 pyinstaller)
+        self.use_isolated_build_env = tk.BooleanVar(value=False) # 在按锁定文件创建的隔离虚拟环境中构建
+        self.build_env_lockfile = tk.StringVar() # 为空时在项目根目录中查找
+        self.build_env_wheel_dir = tk.StringVar() # 为空时使用锁定文件旁的 wheelhouse/wheels 目录
+        self.profile_next_run = tk.BooleanVar(value=False) # 剖析下一次依赖扫描或构建 (一次性，不保存到配置)
+        self.profile_sample_main_thread = tk.BooleanVar(value=False) # 剖析时同时采样 Tk 主线程
+        self.dependency_scan_mode = tk.StringVar(value="清单 + 源码核对") # 见 DEPENDENCY_SCAN_MODES (不保存到配置)
+        self.dependency_scan_skip_generated = tk.BooleanVar(value=False) # 依赖扫描跳过带有自动生成标记的文件 (不保存到配置)
+        self.log_search_use_regex = tk.BooleanVar(value=False) # 日志搜索：按正则表达式匹配
+        self.log_search_level_vars = {level: tk.BooleanVar(value=False) for level in ("ERROR", "WARNING", "BUILD", "DEBUG")} # 都不勾选时不限级别
+        self.log_line_index = LogLineIndex() # 与日志文本框逐行对应的搜索索引
+        self._deferred_terminal_log = [] # “构建输出”选项卡创建之前产生的日志 [(带前缀的文本, 级别)]，创建时一并写入
+        self._tab_builders = {} # 尚未创建内容的选项卡 {选项卡名称: 创建方法}
+        self._tooltip_window = None # 所有控件共用的工具提示窗口 (首次悬停时创建，之后只隐藏/显示)
+        self._tooltip_label = None
+        self._tooltip_owner = None # 当前显示的提示所属的控件
+        self._log_search_state = {"query": None, "matches": [], "current": -1, "line_count": 0, "elapsed_ms": 0.0, "after_id": None}
         self.exclude_modules = tk.StringVar()
         self.hidden_imports = tk.StringVar()
         self.upx_dir = tk.StringVar()
         
         # --- 内部状态变量 ---
         self.add_data_list = []       # 存储 {source: dest} 格式的数据文件条目
+        self.data_entry_filters = {}  # {数据文件夹条目: {"include": [glob...], "exclude": [glob...]}}
+        self._data_list_rows = []     # 数据文件列表中的行 [(条目, 行ID), ...]，与 add_data_list 一一对应
+        self._data_entry_stats = OrderedDict() # LRU: {(条目, 包含规则, 排除规则): (是否为文件夹, 文件数, 总字节数) 或 None}
+        self._data_entry_stats_lock = threading.Lock()
+        self._data_entry_stats_queue = deque()
+        self._data_entry_stats_pending_keys = set()
+        self._data_entry_stats_thread_running = False
         self.is_building = False      # 标记当前是否正在执行构建
+        self._build_process = None    # 当前正在运行的 PyInstaller 子进程 (用于取消)
+        self._active_build_id = 0     # 当前构建的编号；取消后置为None，旧的构建线程据此不再改动UI
+        self._build_counter = 0       # 构建编号计数器
+        self._active_build_work_path = None # 当前构建的 workpath (取消时可选择清理)
+        self._terminating_builds = {} # 已取消、仍在后台终止中的构建 (单进程、矩阵和远程构建): {取消标识: [进程, ...]}
+        self._trial_build_process = None # 排除模块推荐的后台试构建进程
+        self._remote_build_job = None # 正在远程构建代理上运行的任务 (客户端, 任务ID)，用于取消
+        self._remote_build_cancel_event = None # 远程构建的取消事件 (取消时中止上传快照)
+        self._matrix_build_processes = {} # 矩阵构建中正在运行的子进程 {标签: Popen}，用于取消
+        self._isolated_build_env_python = None # 已就绪的隔离构建环境中的 python (未启用或未就绪时为 None)
+        self._isolated_build_env_status_text = "启用后，打开配置时即在后台按锁定文件准备环境。"
+        self.matrix_interpreters = [] # 矩阵构建使用的解释器列表 (保存到配置)
+        self._startup_benchmark_cancel_event = None # 启动耗时基准测试运行期间为 threading.Event，关闭程序时置位
+        self._shared_analysis_cache = None # 当前项目的共享分析缓存 (见 _get_shared_analysis_cache)
+        self.build_history_store = BuildHistoryStore(Path.home() / '.pyinstaller_studio_pro_v3_1' / 'build_history.jsonl', logger_func=self._log_to_terminal)
+        self.startup_benchmark_store = BuildHistoryStore(Path.home() / '.pyinstaller_studio_pro_v3_1' / 'startup_benchmarks.jsonl', logger_func=self._log_to_terminal)
+        self.artifact_store = BuildArtifactStore(Path.home() / '.pyinstaller_studio_pro_v3_1' / 'artifact_store', logger_func=self._log_to_terminal)
+        self.interpreter_registry = InterpreterRegistry(Path.home() / '.pyinstaller_studio_pro_v3_1' / 'interpreters.json', logger_func=self._log_to_terminal)
+        self.isolated_env_store = IsolatedBuildEnvironmentStore(Path.home() / '.pyinstaller_studio_pro_v3_1' / 'build_envs', logger_func=self._log_to_terminal)
+        self.is_watch_mode = tk.BooleanVar(value=False) # 监视模式开关 (不保存到配置)
+        self._file_watcher = None     # 监视模式下的 FileChangeWatcher 实例
+        self._watch_import_graph = None # 监视模式下入口脚本的 ProjectImportGraph
+        self._watch_mode_generation = 0 # 每次开启/关闭监视模式时递增，过期的初始化线程据此放弃结果
+        self._watch_rebuild_pending = False # 已取消的构建终止期间检测到变更，终止完成后需要重新构建
+        self._last_warn_analysis_reports = [] # 最近一次 warn 文件分析的结果
         self.status_animation_on = True # 控制状态指示器动画
         self.status_indicator_alt_color_active = False # 动画辅助
         
@@ -518,22 +6236,45 @@ class UltraModernPyInstallerGUI:
     def _create_tabview(self, parent): # (实现同前，已移除对tabview的font设置)
         self.tabview = ctk.CTkTabview(parent, corner_radius=15, 
                                      segmented_button_selected_color=("#3B8ED0", "#1F6AA5"),
-                                     segmented_button_selected_hover_color=("#36719F", "#144870"))
+                                     segmented_button_selected_hover_color=("#36719F", "#144870"),
+                                     command=lambda: self._ensure_tab_built(self.tabview.get()))
         self.tabview.pack(fill="both", expand=True, padx=20, pady=20)
         self.basic_tab = self.tabview.add("🎯 基础配置")
         self.advanced_tab = self.tabview.add("⚙️ 高级设置") 
         self.output_tab = self.tabview.add("📱 构建输出")
         self.tools_tab = self.tabview.add("🛠️ 工具箱")
         self._create_basic_tab_content() # 修改方法名以示区分
-        self._create_advanced_tab_content()
-        self._create_output_tab_content()
-        self._create_tools_tab_content()
+        # 其余选项卡在首次切换到时才创建 (加快首次显示)；设置 PYINSTALLER_STUDIO_EAGER_TABS=1 时启动即全部创建，便于对比启动耗时
+        self._tab_builders = {"⚙️ 高级设置": self._create_advanced_tab_content, "📱 构建输出": self._create_output_tab_content,
+                              "🛠️ 工具箱": self._create_tools_tab_content}
+        if os.environ.get("PYINSTALLER_STUDIO_EAGER_TABS") == "1":
+            for tab_name in list(self._tab_builders):
+                self._ensure_tab_built(tab_name)
+
+    def _ensure_tab_built(self, tab_name: str):
+        """(主线程) 如果选项卡的内容尚未创建，立即创建。"""
+        tab_builder = self._tab_builders.pop(tab_name, None)
+        if tab_builder is None:
+            return
+        tab_build_start_time = time.perf_counter()
+        tab_builder()
+        self._log_to_terminal(f"🧩 已创建“{tab_name}”选项卡 ({(time.perf_counter() - tab_build_start_time) * 1000:.0f} 毫秒)。", "DEBUG")
+
+    def _select_tab(self, tab_name: str):
+        """(主线程) 切换到指定选项卡 (tabview.set 不会触发切换回调，因此先确保内容已创建)。"""
+        if hasattr(self, 'tabview'):
+            self._ensure_tab_built(tab_name)
+            self.tabview.set(tab_name)
 
     def _create_bottom_controls(self, parent): # (实现同前，应用字体)
         bottom_frame = ctk.CTkFrame(parent, height=80, corner_radius=20, fg_color=("gray85", "gray15"))
         bottom_frame.pack(fill="x", padx=20, pady=20); bottom_frame.pack_propagate(False)
         self.build_button = ctk.CTkButton(bottom_frame, text="🚀 开始构建应用程序", font=self.font_button_large, command=self.start_build, width=250, height=50, corner_radius=15, fg_color=("#FF6B35", "#E65100"), hover_color=("#FF8C42", "#F57C00"))
         self.build_button.pack(side="left", padx=20, pady=15)
+        self.cancel_build_button = ctk.CTkButton(bottom_frame, text="⏹️ 取消构建", font=self.font_button, command=self.cancel_build, width=120, height=50, corner_radius=15, state="disabled", fg_color=("#E53935", "#C62828"), hover_color=("#D32F2F", "#B71C1C"))
+        self.cancel_build_button.pack(side="left", padx=(0, 20), pady=15)
+        self.watch_mode_switch = ctk.CTkSwitch(bottom_frame, text="👀 监视模式 (变更后自动重建)", variable=self.is_watch_mode, command=self.toggle_watch_mode, font=self.font_switch)
+        self.watch_mode_switch.pack(side="left", padx=(0, 20), pady=15)
         config_frame = ctk.CTkFrame(bottom_frame, fg_color="transparent")
         config_frame.pack(side="right", padx=20, pady=15)
         ctk.CTkButton(config_frame, text="💾 保存", command=self.save_config, width=80, height=35, font=self.font_button).pack(side="left", padx=(0,10))
@@ -600,6 +6341,18 @@ class UltraModernPyInstallerGUI:
             button_font=self.font_button
         )
 
+        # 构建用 Python 解释器 (每个配置可以不同)
+        self._create_input_row_helper(
+            parent_container=files_config_frame, 
+            label_text_str="🐍 构建用 Python 解释器 (可选):", 
+            tkinter_var=self.python_interpreter, 
+            placeholder_text_str="留空则使用 PATH 中的 pyinstaller；指定后以 <解释器> -m PyInstaller 构建 (可选虚拟环境中的 python)", 
+            browse_command_func=self.browse_python_interpreter,
+            label_font=self.font_default_bold, 
+            entry_font=self.font_input_text, 
+            button_font=self.font_button
+        )
+
         # --- 应用程序配置区域 ---
         app_details_config_frame = ctk.CTkFrame(scroll_frame, corner_radius=15, fg_color=("gray88", "gray12"))
         app_details_config_frame.pack(fill="x", pady=(0, 20))
@@ -643,7 +6396,10 @@ class UltraModernPyInstallerGUI:
         self.onefile_switch = ctk.CTkSwitch(left_switches_column, text="🎯 单文件模式 (OneFile)", variable=self.is_onefile, font=self.font_switch)
         self.onefile_switch.pack(anchor="w", pady=(0,12)) # 增加开关间垂直间距
         self.windowed_switch = ctk.CTkSwitch(left_switches_column, text="🖼️ 窗口模式 (无控制台)", variable=self.is_windowed, font=self.font_switch)
-        self.windowed_switch.pack(anchor="w")
+        self.windowed_switch.pack(anchor="w", pady=(0,12))
+        self.spec_build_switch = ctk.CTkSwitch(left_switches_column, text="📝 基于 .spec 文件构建", variable=self.build_from_spec, font=self.font_switch)
+        self.spec_build_switch.pack(anchor="w")
+        self._create_tooltip(self.spec_build_switch, "为当前配置生成规范的 .spec 文件并基于它构建；配置未变化时不重写 .spec，手动修改过的 .spec 在配置不变时会被直接使用。")
 
         # 右侧开关列
         right_switches_column = ctk.CTkFrame(switches_container_grid, fg_color="transparent")
@@ -651,7 +6407,11 @@ class UltraModernPyInstallerGUI:
         self.debug_switch = ctk.CTkSwitch(right_switches_column, text="🐛 调试模式 (Debug All)", variable=self.is_debug, font=self.font_switch)
         self.debug_switch.pack(anchor="w", pady=(0,12))
         self.clean_switch = ctk.CTkSwitch(right_switches_column, text="🧹 清理上次构建缓存", variable=self.is_clean, font=self.font_switch)
-        self.clean_switch.pack(anchor="w")
+        self.clean_switch.pack(anchor="w", pady=(0,12))
+        self.artifact_store_switch = ctk.CTkSwitch(right_switches_column, text="♻️ 复用相同输入的产物", variable=self.use_artifact_store, font=self.font_switch)
+        self.artifact_store_switch.pack(anchor="w")
+        self._create_tooltip(self.artifact_store_switch, "命令、源码/数据文件内容和工具链 (Python、PyInstaller 及已安装的包) 都与以前某次构建相同时，"
+                                                         "直接从本地产物仓库恢复该次的产物 (硬链接/reflink，毫秒级)，不再运行 PyInstaller。需要强制重新构建时请关闭。")
 
     def _create_advanced_tab_content(self):
         """创建“高级设置”选项卡内的所有UI元素，包括对隐藏导入和数据文件的说明。"""
@@ -701,15 +6461,30 @@ class UltraModernPyInstallerGUI:
         # 数据文件列表显示框
         data_list_display_subframe = ctk.CTkFrame(data_files_frame, fg_color="transparent")
         data_list_display_subframe.pack(fill="x", padx=20, pady=(0,10)) # 调整pady
-        self.data_textbox = ctk.CTkTextbox(data_list_display_subframe, height=130, font=self.font_log_terminal, state="disabled", wrap="word") # 增加高度, wrap="word"
-        self.data_textbox.pack(fill="x", expand=True) # 让文本框可以扩展
-        self.update_data_textbox() # 初始化时填充内容
+        # ttk.Treeview 只绘制可见的行，增删条目时也只需插入/删除对应的行
+        self.data_list_view = ttk.Treeview(data_list_display_subframe, columns=("index", "name", "destination", "stats", "rules"),
+                                           show="headings", height=6, selectmode="extended")
+        for column_id, heading_text, column_width, column_stretch in (("index", "#", 40, False), ("name", "源文件/文件夹", 220, True),
+                                                                     ("destination", "打包到 (目标相对路径)", 200, True),
+                                                                     ("stats", "文件数 / 大小", 150, False), ("rules", "过滤规则", 200, True)):
+            self.data_list_view.heading(column_id, text=heading_text, anchor="w")
+            self.data_list_view.column(column_id, width=column_width, stretch=column_stretch, anchor="w")
+        data_list_scrollbar = ttk.Scrollbar(data_list_display_subframe, orient="vertical", command=self.data_list_view.yview)
+        self.data_list_view.configure(yscrollcommand=data_list_scrollbar.set)
+        data_list_scrollbar.pack(side="right", fill="y")
+        self.data_list_view.pack(side="left", fill="x", expand=True)
+        self.data_list_empty_label = ctk.CTkLabel(self.data_list_view, text="当前没有添加任何数据文件或文件夹...", font=self.font_small, text_color=("gray50", "gray55"))
+        self.update_data_list_view() # 初始化时填充内容
 
         # 数据文件操作按钮 (添加文件/文件夹, 清空列表)
         data_file_buttons_subframe = ctk.CTkFrame(data_files_frame, fg_color="transparent")
         data_file_buttons_subframe.pack(fill="x", padx=20, pady=(0,15)) # 调整pady
         ctk.CTkButton(data_file_buttons_subframe, text="📄 添加文件", command=self.add_data_file, font=self.font_button).pack(side="left", padx=(0,10))
         ctk.CTkButton(data_file_buttons_subframe, text="📁 添加文件夹", command=self.add_data_folder, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(data_file_buttons_subframe, text="📥 批量导入", command=self.import_data_manifest, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(data_file_buttons_subframe, text="➖ 移除选中", command=self.remove_selected_data_entries, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(data_file_buttons_subframe, text="🎯 过滤规则", command=self.edit_data_entry_filters, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(data_file_buttons_subframe, text="🧬 检查重复", command=self.check_data_file_duplicates, font=self.font_button).pack(side="left", padx=(0,10))
         ctk.CTkButton(data_file_buttons_subframe, text="🗑️ 清空列表", command=self.clear_data_files, font=self.font_button, 
                       fg_color=("#E53935", "#C62828"), hover_color=("#D32F2F", "#B71C1C")).pack(side="left")
 
@@ -731,6 +6506,47 @@ class UltraModernPyInstallerGUI:
         self.upx_entry.grid(row=0, column=1, sticky="ew", padx=(0,8))
         ctk.CTkButton(upx_path_input_row, text="📁", width=35, command=self.browse_upx, font=self.font_button).grid(row=0, column=2)
 
+        # --- 隔离构建环境区域 ---
+        isolated_env_frame = ctk.CTkFrame(scroll_frame, corner_radius=15, fg_color=("gray88", "gray12"))
+        isolated_env_frame.pack(fill="x", pady=(0,20))
+        ctk.CTkLabel(isolated_env_frame, text="🧪 隔离构建环境", font=self.font_section_title).pack(pady=(15,10))
+        isolated_env_switch_row = ctk.CTkFrame(isolated_env_frame, fg_color="transparent")
+        isolated_env_switch_row.pack(fill="x", padx=20)
+        self.isolated_env_switch = ctk.CTkSwitch(isolated_env_switch_row, text="🧪 在按锁定文件创建的干净虚拟环境中构建", variable=self.use_isolated_build_env,
+                                                 command=self._on_isolated_build_env_toggled, font=self.font_switch)
+        self.isolated_env_switch.pack(anchor="w", pady=(0,5))
+        self._create_tooltip(self.isolated_env_switch, "不在开发环境中构建，而是按 requirements 锁定文件创建只包含锁定依赖和 PyInstaller 的虚拟环境 "
+                                                       "(以“构建用 Python 解释器”为基础)。环境按锁定文件内容缓存，打开配置时即在后台准备好。")
+        self._create_input_row_helper(
+            parent_container=isolated_env_frame,
+            label_text_str="🔒 锁定文件 (可选):",
+            tkinter_var=self.build_env_lockfile,
+            placeholder_text_str="留空则在项目根目录中查找 requirements.lock / requirements-lock.txt / requirements.txt",
+            browse_command_func=self.browse_build_env_lockfile,
+            label_font=self.font_default_bold,
+            entry_font=self.font_input_text,
+            button_font=self.font_button
+        )
+        self._create_input_row_helper(
+            parent_container=isolated_env_frame,
+            label_text_str="📦 本地 wheel 目录:",
+            tkinter_var=self.build_env_wheel_dir,
+            placeholder_text_str="安装的唯一来源 (不访问网络)；留空则使用锁定文件旁的 wheelhouse 或 wheels 目录",
+            browse_command_func=self.browse_build_env_wheel_dir,
+            label_font=self.font_default_bold,
+            entry_font=self.font_input_text,
+            button_font=self.font_button
+        )
+        isolated_env_buttons_row = ctk.CTkFrame(isolated_env_frame, fg_color="transparent")
+        isolated_env_buttons_row.pack(fill="x", padx=20, pady=(5,5))
+        ctk.CTkButton(isolated_env_buttons_row, text="⚙️ 立即准备环境", command=self._prepare_isolated_build_env_in_background, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(isolated_env_buttons_row, text="📥 下载依赖到 wheel 目录", command=self.fill_build_env_wheel_dir, font=self.font_button).pack(side="left", padx=(0,10))
+        ctk.CTkButton(isolated_env_buttons_row, text="🗑️ 清空环境缓存", command=self.clear_isolated_build_envs, font=self.font_button,
+                      fg_color="gray50", hover_color="gray40").pack(side="left")
+        self.isolated_env_status_label = ctk.CTkLabel(isolated_env_frame, text=self._isolated_build_env_status_text, font=self.font_small,
+                                                      text_color=("gray50", "gray55"), justify="left")
+        self.isolated_env_status_label.pack(fill="x", padx=20, pady=(0,15))
+
     def _create_output_tab_content(self): # (实现同前)
         # ... (代码同前，确保应用字体)
         progress_frame = ctk.CTkFrame(self.output_tab, corner_radius=15, fg_color=("gray88", "gray12")); progress_frame.pack(fill="x", padx=10, pady=10)
@@ -739,15 +6555,58 @@ class UltraModernPyInstallerGUI:
         self.progress_label = ctk.CTkLabel(progress_frame, text="等待开始构建...", font=self.font_default_bold); self.progress_label.pack(pady=(0,15))
         terminal_frame = ctk.CTkFrame(self.output_tab, corner_radius=15, fg_color=("gray88", "gray12")); terminal_frame.pack(fill="both", expand=True, padx=10, pady=(0,10))
         ctk.CTkLabel(terminal_frame, text="💻 构建日志输出", font=self.font_section_title).pack(pady=(15,10)) # 标题微调
+
+        # 日志搜索栏：查询由增量维护的行索引完成，跳转匹配只移动标记和视图，不重建文本框内容
+        log_search_bar = ctk.CTkFrame(terminal_frame, fg_color="transparent"); log_search_bar.pack(fill="x", padx=20, pady=(0,8))
+        self.log_search_entry = ctk.CTkEntry(log_search_bar, placeholder_text="🔍 搜索日志 (回车: 下一个，Shift+回车: 上一个)", font=self.font_input_text)
+        self.log_search_entry.pack(side="left", fill="x", expand=True, padx=(0,8))
+        self.log_search_entry.bind("<KeyRelease>", self._schedule_log_search)
+        self.log_search_entry.bind("<Return>", lambda event: self._jump_to_log_match(1))
+        self.log_search_entry.bind("<Shift-Return>", lambda event: self._jump_to_log_match(-1))
+        ctk.CTkCheckBox(log_search_bar, text="正则", variable=self.log_search_use_regex, width=60, font=self.font_small, command=self._schedule_log_search).pack(side="left", padx=(0,6))
+        for level_name, level_var in self.log_search_level_vars.items():
+            ctk.CTkCheckBox(log_search_bar, text=level_name, variable=level_var, width=60, font=self.font_small, command=self._schedule_log_search).pack(side="left", padx=(0,6))
+        ctk.CTkButton(log_search_bar, text="▲", width=32, command=lambda: self._jump_to_log_match(-1), font=self.font_button).pack(side="left", padx=(4,4))
+        ctk.CTkButton(log_search_bar, text="▼", width=32, command=lambda: self._jump_to_log_match(1), font=self.font_button).pack(side="left")
+        self.log_search_status_label = ctk.CTkLabel(log_search_bar, text="", width=170, font=self.font_small, text_color=("gray40", "gray60"))
+        self.log_search_status_label.pack(side="left", padx=(8,0))
+
         self.terminal_textbox = ctk.CTkTextbox(terminal_frame, font=self.font_log_terminal, fg_color=("gray95", "gray5"), text_color=("SeaGreen3", "PaleGreen1"), state="disabled", wrap="word"); self.terminal_textbox.pack(fill="both", expand=True, padx=20, pady=(0,20))
+        self.terminal_textbox.tag_config("log_search_match", underline=True)
+        self.terminal_textbox.tag_config("log_search_current", background="#ffb000", foreground="black")
         # 初始化日志
+        startup_lines = [f"🚀 PyInstaller Studio Pro (增强版 v3.1) 已启动", f"🕒 当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                         f"📁 当前工作目录: {os.getcwd()}", "💡 系统已就绪，等待您的构建指令...", "=" * 80] # 分隔线加长
         self.terminal_textbox.configure(state="normal")
-        self.terminal_textbox.insert("0.0", f"🚀 PyInstaller Studio Pro (增强版 v3.1) 已启动\n"); self.terminal_textbox.insert("end", f"🕒 当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"); self.terminal_textbox.insert("end", f"📁 当前工作目录: {os.getcwd()}\n"); self.terminal_textbox.insert("end", "💡 系统已就绪，等待您的构建指令...\n"); self.terminal_textbox.insert("end", "=" * 80 + "\n") # 分隔线加长
+        # 选项卡创建之前产生的日志 (见 _log_to_terminal) 接在启动信息后面一并写入
+        self.terminal_textbox.insert("0.0", "\n".join(startup_lines) + "\n" + "".join(log_text for log_text, _ in self._deferred_terminal_log))
         self.terminal_textbox.configure(state="disabled")
+        for startup_line in startup_lines:
+            self.log_line_index.append(startup_line, "INFO")
+        for log_text, message_level in self._deferred_terminal_log:
+            self.log_line_index.append(log_text[:-1], message_level)
+        self._deferred_terminal_log = []
 
     def _create_tools_tab_content(self): # (实现同前增强版，包含打开.spec文件，优化布局)
         # ... (代码同前，确保应用字体)
         scroll_frame = ctk.CTkScrollableFrame(self.tools_tab, corner_radius=10, fg_color="transparent"); scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        profiling_frame = ctk.CTkFrame(scroll_frame, corner_radius=15, fg_color=("gray88", "gray12")); profiling_frame.pack(fill="x", padx=8, pady=(10,0))
+        profile_switch = ctk.CTkSwitch(profiling_frame, text="🔬 剖析下一次扫描/构建", variable=self.profile_next_run, font=self.font_switch)
+        profile_switch.pack(side="left", padx=(20,15), pady=12)
+        self._create_tooltip(profile_switch, "下一次“扫描项目依赖”或构建将在 cProfile 下运行，并采样工作线程的调用栈。结果 (.pstats 与火焰图用的折叠栈文件) "
+                                             "保存在日志文件旁的 profiles 目录中，热点函数汇总在“构建输出”日志里。只生效一次，关闭时没有任何额外开销。")
+        ctk.CTkSwitch(profiling_frame, text="同时采样界面主线程", variable=self.profile_sample_main_thread, font=self.font_switch).pack(side="left", padx=15, pady=12)
+        scan_mode_frame = ctk.CTkFrame(scroll_frame, corner_radius=15, fg_color=("gray88", "gray12")); scan_mode_frame.pack(fill="x", padx=8, pady=(10,0))
+        ctk.CTkLabel(scan_mode_frame, text="🐍 依赖扫描方式:", font=self.font_default).pack(side="left", padx=(20,10), pady=12)
+        scan_mode_button = ctk.CTkSegmentedButton(scan_mode_frame, values=list(self.DEPENDENCY_SCAN_MODES), variable=self.dependency_scan_mode, font=self.font_default)
+        scan_mode_button.pack(side="left", padx=(0,15), pady=12)
+        self._create_tooltip(scan_mode_button, "“清单 + 源码核对”先读取 pyproject.toml、requirements*.txt、Pipfile 和锁定文件中声明的依赖 (通常不到一秒，结果立即写入日志)，"
+                                               "再完整扫描源码，分别列出“已导入但未声明”和“已声明但未导入”的依赖；“仅读取清单”跳过源码扫描。")
+        skip_generated_switch = ctk.CTkSwitch(scan_mode_frame, text="跳过自动生成的文件", variable=self.dependency_scan_skip_generated, font=self.font_switch)
+        skip_generated_switch.pack(side="left", padx=15, pady=12)
+        self._create_tooltip(skip_generated_switch, "不解析开头带有 @generated、“DO NOT EDIT”、“Generated by the protocol buffer compiler”、"
+                                                    "“Resource object code” 等标记的文件 (protobuf 的 *_pb2.py、Qt 资源文件等)。"
+                                                    "关闭时它们仍会被解析，超过 1 MB 的只解析开头的导入语句。")
         tools_grid_container = ctk.CTkFrame(scroll_frame, fg_color="transparent"); tools_grid_container.pack(fill="x", pady=10)
         # 让列均匀分配空间
         tools_grid_container.grid_columnconfigure((0,1,2), weight=1, uniform="tool_button_col")
@@ -759,10 +6618,18 @@ class UltraModernPyInstallerGUI:
             ("📋 复制构建命令", self.copy_command, "将当前配置生成的完整PyInstaller命令行复制到系统剪贴板。"),
             ("💾 保存当前配置", self.save_config_file, "将当前界面的所有配置参数保存到一个JSON文件中，供以后加载。"),
             ("📂 加载配置文件", self.load_config_file, "从之前保存的JSON文件中加载配置参数到当前界面。"),
+            ("🗄️ 产物仓库", self.manage_artifact_store, "查看按构建指纹保存的最近产物，可将任一产物恢复到输出目录 (例如切换分支后)，或清空仓库。"),
+            ("🧮 多解释器矩阵构建", self.open_matrix_build_dialog, "用多个 Python 解释器/虚拟环境并行构建当前配置 (例如 3.9 与 3.12)，各自使用独立的临时目录，产物输出到 <输出目录>/matrix/<标签>/。"),
+            ("🛰️ 远程构建代理", self.configure_remote_build_agent, "把构建交给局域网内的构建机 (运行本程序的 --build-agent 模式)：源码按内容哈希增量上传，日志实时返回，产物自动下载。"),
             ("🔧 检查依赖环境", self.check_dependencies, "检查PyInstaller、UPX以及项目中可能需要的常用第三方库是否可用。"),
-            ("📝 打开 .spec 文件", self.open_spec_file, "在系统默认文本编辑器中打开当前项目生成的.spec配置文件 (高级用户)。"),
+            ("📝 打开 .spec 文件", self.open_spec_file, "在系统默认文本编辑器中打开当前配置的.spec文件 (尚未生成时先根据当前配置生成，高级用户)。"),
+            ("📥 从 .spec 导入配置", self.import_spec_file, "解析已有 .spec 文件中 Analysis(...) 与 EXE(...) 的参数 (不执行文件)，导回到界面配置中。"),
             # --- 新增工具 ---
             ("🐍 扫描项目依赖", self.scan_project_for_dependencies, "扫描项目内的Python文件，查找潜在的、PyInstaller可能遗漏的第三方依赖项。"),
+            ("⏱️ 启动耗时基准", self.benchmark_startup_time, "多次启动构建产物，统计冷/热启动到退出的耗时百分位数；可对比 onefile/onedir 与 UPX 开关，结果保存在构建历史旁。"),
+            ("📊 分析包体积", self.analyze_bundle_size, "按顶层包和二进制文件统计构建产物的体积 (直接读取 onefile 的内嵌归档，无需解压)，并与上次构建对比。"),
+            ("🪶 推荐排除模块", self.recommend_exclude_modules, "比较入口脚本的可达导入图与实际收集的模块，按可节省体积推荐可排除的模块，并可在后台试构建验证。"),
+            ("🔎 分析缺失模块", self.analyze_build_warnings, "分析上次构建生成的 warn 文件，区分真实缺失与条件/可选导入，并一键添加到隐藏导入或排除模块。"),
             # ---
             ("📖 查看官方文档", self.open_docs, "在浏览器中打开PyInstaller官方在线文档 (英文)。"),
             ("ℹ️ 关于本软件", self.show_about, "显示本软件的版本信息、特性和开发者信息。"),
@@ -849,7 +6716,8 @@ class UltraModernPyInstallerGUI:
     def _create_tooltip(self, target_widget: ctk.CTkBaseClass, tooltip_text_str: str):
         """
         为给定的CustomTkinter控件创建一个自定义的工具提示。
-        当鼠标悬停在控件上时显示，移开时消失。使用CTkToplevel以保持风格统一。
+        当鼠标悬停在控件上时显示，移开时消失。所有控件共用一个CTkToplevel提示窗口 (首次悬停时创建，
+        之后只更新文本和位置并隐藏/显示)，避免每次悬停都创建和销毁窗口。
 
         Args:
             target_widget (ctk.CTkBaseClass): 要为其添加工具提示的CustomTkinter控件。
@@ -857,20 +6725,12 @@ class UltraModernPyInstallerGUI:
         """
         # 中文注释: 为UI元素（如按钮）创建鼠标悬停时显示的提示信息。
 
-        tooltip_window_instance = None # 用于存储当前活动的CTkToplevel提示窗口实例
-
         def _show_tooltip_on_mouse_enter(event_details):
             """鼠标进入控件区域时触发，显示工具提示。"""
-            nonlocal tooltip_window_instance # 允许修改外部作用域的变量
-            
-            # 如果已存在提示窗口，或者提示文本为空，则不执行任何操作
-            if tooltip_window_instance or not tooltip_text_str:
+            # 如果提示文本为空，则不执行任何操作
+            if not tooltip_text_str:
                 return
 
-            # 创建一个新的CTkToplevel窗口作为提示框
-            tooltip_window_instance = ctk.CTkToplevel(self.root)
-            tooltip_window_instance.wm_overrideredirect(True) # 移除窗口边框和标题栏
-
             # --- 动态确定提示框的背景色和文本色，以适应当前主题 ---
             try:
                 # 尝试获取目标控件的前景色(fg_color)作为提示背景的基准
@@ -896,17 +6756,10 @@ class UltraModernPyInstallerGUI:
                 tooltip_bg_color_hex = "#333333" if ctk.get_appearance_mode() == "Dark" else "#FFFFE0" # 深灰或淡黄
                 tooltip_text_color_hex = "#DCE4EE" if ctk.get_appearance_mode() == "Dark" else "#101010" # 亮白或深黑
             
-            # 创建显示提示文本的CTkLabel
-            tooltip_label = ctk.CTkLabel(
-                tooltip_window_instance, 
-                text=tooltip_text_str, 
-                corner_radius=3,          # 小圆角
-                font=self.font_tooltip,   # 使用预定义的工具提示字体
-                fg_color=tooltip_bg_color_hex,  # 计算得到的背景色
-                text_color=tooltip_text_color_hex, # 计算得到的文本色
-                padx=7, pady=4            # 内部边距，让文本不贴边
-            )
-            tooltip_label.pack() # Label会自动适应文本内容大小
+            # 获取共用的提示窗口，只更新其中的文本和颜色
+            tooltip_window_instance, tooltip_label = self._get_tooltip_window()
+            tooltip_label.configure(text=tooltip_text_str, fg_color=tooltip_bg_color_hex, text_color=tooltip_text_color_hex)
+            self._tooltip_owner = target_widget
             
             # --- 计算并设置提示窗口的位置 ---
             tooltip_window_instance.update_idletasks() # 确保窗口尺寸已计算完毕
@@ -916,8 +6769,8 @@ class UltraModernPyInstallerGUI:
             widget_height = target_widget.winfo_height()  # 目标控件高度
             widget_width = target_widget.winfo_width()    # 目标控件宽度
             
-            tooltip_width = tooltip_window_instance.winfo_width() # 提示窗口宽度
-            tooltip_height = tooltip_window_instance.winfo_height()# 提示窗口高度
+            tooltip_width = tooltip_window_instance.winfo_reqwidth() # 提示窗口宽度 (窗口隐藏时实际尺寸不会更新，使用请求尺寸)
+            tooltip_height = tooltip_window_instance.winfo_reqheight()# 提示窗口高度
             
             # 默认将提示窗口置于目标控件下方，并水平居中对齐
             tooltip_pos_x = widget_root_x + (widget_width - tooltip_width) // 2
@@ -940,18 +6793,19 @@ class UltraModernPyInstallerGUI:
                 tooltip_pos_y = widget_root_y + widget_height + 6 # 迫不得已还是放下方（可能部分被遮挡）
 
             tooltip_window_instance.wm_geometry(f"+{tooltip_pos_x}+{tooltip_pos_y}") # 设置窗口位置
+            tooltip_window_instance.deiconify()
             tooltip_window_instance.attributes("-topmost", True) # 确保提示窗口在最顶层显示
 
         def _hide_tooltip_on_mouse_leave(event_details=None): # event参数可选，方便直接调用
-            """鼠标移开控件区域或控件被点击时触发，销毁工具提示窗口。"""
-            nonlocal tooltip_window_instance
-            if tooltip_window_instance:
-                try:
-                    if tooltip_window_instance.winfo_exists(): # 再次检查，防止重复销毁
-                        tooltip_window_instance.destroy()
-                except tk.TclError: # 组件可能已被Tkinter层销毁
-                    pass 
-                tooltip_window_instance = None # 重置实例变量
+            """鼠标移开控件区域或控件被点击时触发，隐藏工具提示窗口 (窗口保留供下次使用)。"""
+            if self._tooltip_owner is not target_widget: # 提示已切换到其他控件
+                return
+            self._tooltip_owner = None
+            try:
+                if self._tooltip_window is not None and self._tooltip_window.winfo_exists():
+                    self._tooltip_window.withdraw()
+            except tk.TclError: # 组件可能已被Tkinter层销毁
+                pass 
         
         # 为目标控件绑定鼠标进入和移开事件
         target_widget.bind("<Enter>", _show_tooltip_on_mouse_enter, add="+") # add="+" 确保不覆盖控件已有的其他绑定
@@ -959,6 +6813,21 @@ class UltraModernPyInstallerGUI:
         # 当鼠标点击控件时，也隐藏提示（可选，但通常是好的用户体验）
         target_widget.bind("<Button-1>", lambda event: _hide_tooltip_on_mouse_leave(), add="+")
 
+    def _get_tooltip_window(self) -> tuple:
+        """返回共用的工具提示窗口及其标签 (不存在时创建)。"""
+        if self._tooltip_window is None or not self._tooltip_window.winfo_exists():
+            self._tooltip_window = ctk.CTkToplevel(self.root)
+            self._tooltip_window.wm_overrideredirect(True) # 移除窗口边框和标题栏
+            self._tooltip_label = ctk.CTkLabel(
+                self._tooltip_window, 
+                text="", 
+                corner_radius=3,          # 小圆角
+                font=self.font_tooltip,   # 使用预定义的工具提示字体
+                padx=7, pady=4            # 内部边距，让文本不贴边
+            )
+            self._tooltip_label.pack() # Label会自动适应文本内容大小
+        return self._tooltip_window, self._tooltip_label
+
     # --- 文件/目录浏览方法 (增强版：包含项目根目录处理，并确保对话框父窗口) ---
 
     def browse_script(self):
@@ -1021,6 +6890,33 @@ class UltraModernPyInstallerGUI:
             self._log_to_terminal(f"✅ 构建输出目录已成功设置为: {selected_directory_path}", "SUCCESS")
         else:
             self._log_to_terminal("ℹ️ 用户取消了选择构建输出目录。", "INFO")
+
+    def browse_python_interpreter(self):
+        """(UI回调) 用户点击“浏览”按钮选择构建用的 Python 解释器，选择后在后台读取其版本信息。"""
+        selected_file_path = filedialog.askopenfilename(
+            title="请选择构建用的 Python 解释器 (例如虚拟环境中的 python)",
+            filetypes=[("Python 解释器", "python*.exe")] if sys.platform == "win32" else [("所有文件", "*")],
+            initialdir=self.project_root_dir.get() or (str(Path(self.script_path.get()).parent) if self.script_path.get() else None),
+            parent=self.root
+        )
+        if not selected_file_path:
+            self._log_to_terminal("ℹ️ 用户取消了选择 Python 解释器。", "INFO")
+            return
+        self.python_interpreter.set(selected_file_path)
+
+        def _describe_in_thread():
+            try:
+                interpreter_info = self.interpreter_registry.describe(selected_file_path)
+            except RuntimeError as e_describe:
+                self._log_to_terminal(f"❌ {e_describe}", "ERROR")
+                self.root.after(0, self.show_error, "解释器不可用", str(e_describe))
+                return
+            self._log_to_terminal(f"✅ 构建用解释器已设置为: {interpreter_info['interpreter']} "
+                                  f"(Python {interpreter_info['version']}，PyInstaller {interpreter_info['pyinstaller'] or '未安装'})", "SUCCESS")
+            if not interpreter_info["pyinstaller"]:
+                self.root.after(0, self.show_warning, "未安装 PyInstaller",
+                                f"所选解释器中未安装 PyInstaller，构建前请先安装:\n\n{interpreter_info['interpreter']} -m pip install pyinstaller")
+        threading.Thread(target=_describe_in_thread, daemon=True).start()
             
     def browse_icon(self):
         """(UI回调) 用户点击“浏览”按钮选择应用程序的图标文件。"""
@@ -1041,6 +6937,7 @@ class UltraModernPyInstallerGUI:
             # 但通常filedialog的filetypes已经做了初步筛选
             self.icon_path.set(selected_file_path)
             self._log_to_terminal(f"✅ 应用程序图标已成功选择: {selected_file_path}", "SUCCESS")
+            self._refresh_watch_targets()
         else:
             self._log_to_terminal("ℹ️ 用户取消了选择应用程序图标文件。", "INFO")
             
@@ -1169,7 +7066,7 @@ class UltraModernPyInstallerGUI:
             data_file_entry_str = f"{absolute_source_file_path}{os.pathsep}{final_destination_in_package}"
             self.add_data_list.append(data_file_entry_str)
             
-            self.update_data_textbox() # 更新UI上数据文件列表的显示
+            self.update_data_list_view() # 更新UI上数据文件列表的显示
             self._log_to_terminal(f"✅ 已添加数据文件: {Path(selected_file_path_str).name}  ➔  打包后路径: {final_destination_in_package}", "SUCCESS")
             
     def add_data_folder(self):
@@ -1219,9 +7116,378 @@ class UltraModernPyInstallerGUI:
             data_folder_entry_str = f"{absolute_source_folder_path}{os.pathsep}{final_destination_in_package}"
             self.add_data_list.append(data_folder_entry_str)
             
-            self.update_data_textbox()
+            self.update_data_list_view()
             self._log_to_terminal(f"✅ 已添加数据文件夹: {Path(selected_folder_path_str).name}  ➔  打包后路径: {final_destination_in_package}", "SUCCESS")
             
+    def import_data_manifest(self):
+        """(UI回调) 从清单文件 (CSV / JSON / TOML / .spec) 批量导入数据条目。解析与源路径检查在后台线程中并行进行。"""
+        initial_dir_str = self.project_root_dir.get() or (str(Path(self.script_path.get()).parent) if self.script_path.get() else os.getcwd())
+        manifest_path_str = filedialog.askopenfilename(
+            title="选择数据文件清单",
+            initialdir=initial_dir_str,
+            filetypes=[("数据文件清单", "*.csv *.json *.toml *.spec"), ("CSV 文件", "*.csv"), ("JSON 文件", "*.json"),
+                       ("TOML 文件", "*.toml"), ("PyInstaller Spec 文件", "*.spec"), ("所有文件", "*.*")]
+        )
+        if not manifest_path_str:
+            return
+        self._log_to_terminal(f"📥 正在读取数据文件清单: {manifest_path_str}", "INFO")
+        self.update_status("🟡", "导入数据清单...")
+        def _read_in_thread():
+            manifest_reader = DataManifestReader(Path(manifest_path_str), logger_func=self._log_to_terminal)
+            try:
+                manifest_entries = manifest_reader.read()
+                source_kinds = DataManifestReader.validate_sources([source_str for source_str, _ in manifest_entries])
+            except (OSError, ValueError, SyntaxError) as e_manifest:
+                self._log_to_terminal(f"❌ 读取数据文件清单失败: {e_manifest}", "ERROR")
+                self.update_status("🔴", "数据清单导入失败")
+                if self.root.winfo_exists():
+                    self.root.after(0, self.show_error, "导入失败", f"无法读取清单文件:\n{manifest_path_str}\n\n{e_manifest}")
+                return
+            if self.root.winfo_exists():
+                self.root.after(0, self._apply_imported_data_entries, manifest_path_str, manifest_entries, source_kinds, manifest_reader.skipped_items)
+        threading.Thread(target=_read_in_thread, daemon=True).start()
+
+    def _derive_data_destination(self, source_str: str, source_kind: str) -> str:
+        """为清单中未指定目标路径的条目推导目标路径：保持其相对于项目根目录的位置，不在项目内时放在应用程序根目录。"""
+        if source_kind == "glob": # 通配符按其所在目录推导
+            source_str = str(Path(source_str).parent)
+            source_kind = "dir"
+        relative_path_suggestion = self._generate_relative_path_suggestion(source_str)
+        if source_kind == "dir":
+            return relative_path_suggestion or Path(source_str).name
+        # --add-data 的目标是目录，文件放在其相对路径的父目录中
+        parent_suggestion = str(Path(relative_path_suggestion).parent) if relative_path_suggestion else "."
+        return parent_suggestion or "."
+
+    def _apply_imported_data_entries(self, manifest_path_str: str, manifest_entries: list, source_kinds: dict, skipped_items: list[str]):
+        """(主UI线程) 将导入的条目一次性加入数据列表，并汇总显示缺失的源路径、重复条目和无法识别的条目。"""
+        existing_entries = set(self.add_data_list)
+        new_entries, missing_sources, duplicate_count = [], [], 0
+        for source_str, destination_str in manifest_entries:
+            source_kind = source_kinds.get(source_str)
+            if source_kind is None:
+                missing_sources.append(source_str)
+                continue
+            if destination_str is None:
+                destination_str = self._derive_data_destination(source_str, source_kind)
+            data_entry_str = f"{source_str}{os.pathsep}{destination_str}"
+            if data_entry_str in existing_entries:
+                duplicate_count += 1
+                continue
+            existing_entries.add(data_entry_str)
+            new_entries.append(data_entry_str)
+
+        if new_entries:
+            self.add_data_list.extend(new_entries)
+            self.update_data_list_view() # 一次性刷新列表，只追加新行
+        manifest_name = Path(manifest_path_str).name
+        self._log_to_terminal(f"📥 从 {manifest_name} 导入了 {len(new_entries)} 个数据条目 (清单共 {len(manifest_entries)} 项，"
+                              f"已存在 {duplicate_count} 项，源路径缺失 {len(missing_sources)} 项)。", "SUCCESS" if new_entries else "INFO")
+        for missing_source in missing_sources:
+            self._log_to_terminal(f"⚠️ 源路径不存在，已跳过: {missing_source}", "WARNING")
+        for skipped_item in skipped_items:
+            self._log_to_terminal(f"⚠️ 无法识别的清单条目 (例如非字面量的表达式)，已跳过: {skipped_item}", "WARNING")
+        self.update_status("🟢", "数据清单导入完成")
+
+        summary_message = f"已导入 {len(new_entries)} 个数据条目 (清单共 {len(manifest_entries)} 项)。"
+        if duplicate_count:
+            summary_message += f"\n{duplicate_count} 项已在列表中，未重复添加。"
+        if not (missing_sources or skipped_items):
+            self.show_success("导入完成", summary_message)
+            return
+        preview_limit = 15 # 对话框中最多列出的条目，完整列表见日志
+        if missing_sources:
+            summary_message += f"\n\n以下 {len(missing_sources)} 个源路径不存在，已跳过:\n" + "\n".join(missing_sources[:preview_limit])
+            if len(missing_sources) > preview_limit:
+                summary_message += f"\n... 另有 {len(missing_sources) - preview_limit} 项，详见日志"
+        if skipped_items:
+            summary_message += f"\n\n以下 {len(skipped_items)} 个条目无法识别，已跳过:\n" + "\n".join(skipped_items[:preview_limit])
+            if len(skipped_items) > preview_limit:
+                summary_message += f"\n... 另有 {len(skipped_items) - preview_limit} 项，详见日志"
+        self.show_warning("导入完成 (部分条目已跳过)", summary_message)
+
+    def _create_data_file_index(self) -> DataFileIndex:
+        """创建当前项目的数据文件索引 (哈希结果保存在项目缓存目录中，供下次检查增量使用)。"""
+        return DataFileIndex(self._get_project_cache_dir() / 'data_file_index.json', logger_func=self._log_to_terminal)
+
+    def check_data_file_duplicates(self):
+        """(UI回调) 在后台展开并哈希全部数据文件，检查重复内容、重叠条目和目标冲突，并显示结果。"""
+        if not self.add_data_list:
+            self.show_info("没有数据文件", "当前没有添加任何数据文件或文件夹。")
+            return
+        self._log_to_terminal(f"🧬 正在检查 {len(self.add_data_list)} 个数据条目中的重复与重叠...", "INFO")
+        self.update_status("🟡", "检查数据文件...")
+        data_entries = list(self.add_data_list)
+        def _check_in_thread():
+            try:
+                index_report = self._create_data_file_index().validate(data_entries, self._get_data_entry_filters(data_entries))
+            except Exception as e_index:
+                self._log_to_terminal(f"❌ 检查数据文件失败: {e_index}", "ERROR")
+                self.update_status("🔴", "数据文件检查失败")
+                return
+            self._log_data_file_index_report(index_report)
+            self.update_status("🟢", "数据文件检查完成")
+            if self.root.winfo_exists():
+                self.root.after(0, self._show_data_file_index_dialog, index_report, data_entries)
+        threading.Thread(target=_check_in_thread, daemon=True).start()
+
+    def _log_data_file_index_report(self, index_report: dict):
+        """将数据文件检查结果的摘要写入日志；存在问题时使用 WARNING 级别。"""
+        self._log_to_terminal(f"🧬 数据文件: {index_report['file_count']} 个文件，共 {format_byte_size(index_report['total_bytes'])} "
+                              f"(重新哈希 {index_report['hashed_count']} 个，复用索引 {index_report['reused_count']} 个)。", "INFO")
+        if index_report["duplicates"]:
+            self._log_to_terminal(f"⚠️ {len(index_report['duplicates'])} 组相同内容被打包到多个位置，浪费约 {format_byte_size(index_report['duplicate_bytes'])}。", "WARNING")
+        for overlap in index_report["overlaps"]:
+            self._log_to_terminal(f"⚠️ 数据条目 #{overlap['entry_a'] + 1} 与 #{overlap['entry_b'] + 1} 的源路径重叠，"
+                                  f"{overlap['shared_files']} 个文件 ({format_byte_size(overlap['shared_bytes'])}) 会被复制两次。", "WARNING")
+        for conflict in index_report["conflicts"][:10]:
+            self._log_to_terminal(f"⚠️ 目标路径 {conflict['destination']} 被多个不同内容的文件占用: {', '.join(conflict['sources'])}", "WARNING")
+
+    def _show_data_file_index_dialog(self, index_report: dict, data_entries: list[str]):
+        """在主UI线程中显示数据文件检查结果：重复内容、重叠条目、目标冲突三个可排序表格。"""
+        if not (index_report["duplicates"] or index_report["overlaps"] or index_report["conflicts"]):
+            self.show_success("检查完成", f"{index_report['file_count']} 个数据文件 ({format_byte_size(index_report['total_bytes'])}) 中没有发现重复、重叠或冲突。")
+            return
+        def _describe_entry(entry_index: int) -> str:
+            parsed_entry = DataFileIndex.parse_entry(data_entries[entry_index])
+            return f"#{entry_index + 1} {parsed_entry[0].name} ➔ {parsed_entry[1]}" if parsed_entry else f"#{entry_index + 1}"
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("数据文件重复与重叠检查")
+        dialog_window.geometry("980x600")
+        dialog_window.transient(self.root)
+        ctk.CTkLabel(dialog_window, text=f"📎 {index_report['file_count']} 个数据文件，共 {format_byte_size(index_report['total_bytes'])}；"
+                                         f"重复内容浪费约 {format_byte_size(index_report['duplicate_bytes'])}", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text="目标路径为打包后应用程序内的位置。点击表头可排序。", font=self.font_small).pack(pady=(0, 10), padx=20)
+
+        result_tabview = ctk.CTkTabview(dialog_window, corner_radius=10)
+        result_tabview.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+        duplicates_tab = result_tabview.add(f"♊ 重复内容 ({len(index_report['duplicates'])})")
+        overlaps_tab = result_tabview.add(f"🔁 重叠条目 ({len(index_report['overlaps'])})")
+        conflicts_tab = result_tabview.add(f"⚔️ 目标冲突 ({len(index_report['conflicts'])})")
+        self._create_sortable_treeview(duplicates_tab, [
+            ("wasted", "浪费体积", 100, format_byte_size),
+            ("size", "单个大小", 100, format_byte_size),
+            ("copies", "份数", 60, str),
+            ("destinations", "打包位置", 380, None),
+            ("sources", "源文件", 280, None),
+        ], [(duplicate["wasted_bytes"], duplicate["size"], len(duplicate["destinations"]), " | ".join(duplicate["destinations"]),
+             " | ".join(duplicate["sources"])) for duplicate in index_report["duplicates"]])
+        self._create_sortable_treeview(overlaps_tab, [
+            ("entry_a", "条目", 330, None),
+            ("entry_b", "重叠的条目", 330, None),
+            ("files", "重复复制的文件", 110, str),
+            ("bytes", "重复复制的体积", 120, format_byte_size),
+        ], [(_describe_entry(overlap["entry_a"]), _describe_entry(overlap["entry_b"]), overlap["shared_files"], overlap["shared_bytes"])
+            for overlap in index_report["overlaps"]])
+        self._create_sortable_treeview(conflicts_tab, [
+            ("destination", "目标路径", 320, None),
+            ("sources", "占用该路径的源文件 (后者会覆盖前者)", 580, None),
+        ], [(conflict["destination"], " | ".join(conflict["sources"])) for conflict in index_report["conflicts"]])
+        ctk.CTkButton(dialog_window, text="关闭", command=dialog_window.destroy, font=self.font_button, height=35).pack(pady=(5, 15))
+        dialog_window.after(100, dialog_window.lift)
+
+    def _get_data_entry_filters(self, data_entries: list[str]) -> dict:
+        """返回 {条目: DataFolderFilter}，只包含设置了过滤规则的条目。"""
+        entry_filters = {}
+        for data_entry_str in data_entries:
+            folder_filter = DataFolderFilter.from_config(self.data_entry_filters.get(data_entry_str))
+            if folder_filter is not None:
+                entry_filters[data_entry_str] = folder_filter
+        return entry_filters
+
+    def _expand_data_entries_for_command(self) -> list[str]:
+        """
+        生成传给 --add-data 的参数。设置了过滤规则的文件夹条目会按规则做一次剪枝遍历：
+        内容被完整保留的子目录仍作为整体传入，只有包含被过滤文件的目录才逐个列出文件。
+        """
+        add_data_arguments = []
+        entry_filters = self._get_data_entry_filters(self.add_data_list)
+        for data_entry_str in self.add_data_list:
+            if not data_entry_str:
+                continue
+            parsed_entry = DataFileIndex.parse_entry(data_entry_str)
+            folder_filter = entry_filters.get(data_entry_str)
+            if folder_filter is None or parsed_entry is None or not parsed_entry[0].is_dir():
+                add_data_arguments.append(data_entry_str)
+                continue
+            filtered_result = folder_filter.expand(parsed_entry[0], parsed_entry[1])
+            add_data_arguments.extend(f"{source_str}{os.pathsep}{destination_str}" for source_str, destination_str in filtered_result["add_data"])
+        return add_data_arguments
+
+    def _data_entry_stats_key(self, data_entry_str: str) -> tuple:
+        rules = self.data_entry_filters.get(data_entry_str) or {}
+        return (data_entry_str, tuple(rules.get("include", ())), tuple(rules.get("exclude", ())))
+
+    @staticmethod
+    def _compute_data_entry_stats(data_entry_str: str, folder_filter) -> tuple[bool, int, int] | None:
+        """(后台线程) 统计条目的类型及实际会打包的文件数和总字节数：(是否为文件夹, 文件数, 字节数)；源路径不存在时返回 None。"""
+        parsed_entry = DataFileIndex.parse_entry(data_entry_str)
+        if parsed_entry is None:
+            return None
+        source_path, destination_str = parsed_entry
+        try:
+            if source_path.is_file():
+                return False, 1, source_path.stat().st_size
+            if source_path.is_dir():
+                expanded_result = (folder_filter or DataFolderFilter()).expand(source_path, destination_str)
+                return True, expanded_result["file_count"], expanded_result["total_bytes"]
+        except OSError:
+            pass
+        return None
+
+    def _queue_data_entry_stats(self, data_entry_str: str):
+        """
+        将条目加入后台统计队列 (已缓存或已在队列中的条目会被跳过)。单个工作线程依次处理队列，
+        每完成一个条目就只刷新对应的行，因此网络共享等慢速路径不会阻塞界面。
+        """
+        stats_key = self._data_entry_stats_key(data_entry_str)
+        with self._data_entry_stats_lock:
+            if stats_key in self._data_entry_stats:
+                self._data_entry_stats.move_to_end(stats_key)
+                return
+            if stats_key in self._data_entry_stats_pending_keys:
+                return
+            self._data_entry_stats_pending_keys.add(stats_key)
+            self._data_entry_stats_queue.append((stats_key, data_entry_str, DataFolderFilter.from_config(self.data_entry_filters.get(data_entry_str))))
+            if self._data_entry_stats_thread_running:
+                return
+            self._data_entry_stats_thread_running = True
+        threading.Thread(target=self._process_data_entry_stats_queue, daemon=True).start()
+
+    def _process_data_entry_stats_queue(self):
+        """(后台线程) 处理统计队列，结果写入容量有限的 LRU 缓存。"""
+        while True:
+            with self._data_entry_stats_lock:
+                if not self._data_entry_stats_queue:
+                    self._data_entry_stats_thread_running = False
+                    return
+                stats_key, data_entry_str, folder_filter = self._data_entry_stats_queue.popleft()
+            entry_stats = self._compute_data_entry_stats(data_entry_str, folder_filter)
+            with self._data_entry_stats_lock:
+                self._data_entry_stats_pending_keys.discard(stats_key)
+                self._data_entry_stats[stats_key] = entry_stats
+                cache_capacity = max(self.DATA_ENTRY_STATS_CACHE_SIZE, len(self.add_data_list)) # 不小于列表长度，避免列表中的条目相互淘汰
+                while len(self._data_entry_stats) > cache_capacity:
+                    self._data_entry_stats.popitem(last=False)
+            if self.root.winfo_exists():
+                self.root.after(0, self._update_data_list_rows_for_entry, data_entry_str)
+
+    def edit_data_entry_filters(self, resolved_folder_entries: dict | None = None):
+        """
+        (UI回调) 为数据文件夹条目设置包含/排除 glob 规则，并在后台实时预览过滤后的文件数和大小。
+        条目类型取自统计缓存；尚未统计的条目先在后台线程中判断是否为文件夹 (网络共享等慢速路径不阻塞界面)，完成后再打开对话框。
+
+        Args:
+            resolved_folder_entries (dict, optional): 后台判断的结果 {条目: 是否为文件夹}。
+        """
+        if resolved_folder_entries is None:
+            unresolved_entries = [] # [(条目, 源路径)]
+            for data_entry_str in self.add_data_list:
+                parsed_entry = DataFileIndex.parse_entry(data_entry_str)
+                if parsed_entry is not None and self._data_entry_stats_key(data_entry_str) not in self._data_entry_stats:
+                    unresolved_entries.append((data_entry_str, parsed_entry[0]))
+            if unresolved_entries:
+                self.update_status("🟡", "正在识别数据条目类型...")
+                def _resolve_entry_kinds():
+                    folder_entries = {}
+                    for data_entry_str, source_path in unresolved_entries:
+                        try:
+                            folder_entries[data_entry_str] = source_path.is_dir()
+                        except OSError:
+                            folder_entries[data_entry_str] = False
+                    if self.root.winfo_exists():
+                        self.root.after(0, self.update_status, "🟢", "系统就绪")
+                        self.root.after(0, self.edit_data_entry_filters, folder_entries)
+                threading.Thread(target=_resolve_entry_kinds, daemon=True).start()
+                return
+            resolved_folder_entries = {}
+        entry_labels = {} # {下拉框显示文本: 条目}
+        for entry_index, data_entry_str in enumerate(self.add_data_list):
+            parsed_entry = DataFileIndex.parse_entry(data_entry_str)
+            cached_stats = self._data_entry_stats.get(self._data_entry_stats_key(data_entry_str), "pending")
+            is_folder_entry = cached_stats[0] if cached_stats not in ("pending", None) else resolved_folder_entries.get(data_entry_str, False)
+            if parsed_entry is not None and is_folder_entry:
+                entry_labels[f"#{entry_index + 1} {parsed_entry[0].name} ➔ {parsed_entry[1]}"] = data_entry_str
+        if not entry_labels:
+            self.show_info("没有数据文件夹", "过滤规则只适用于数据文件夹，请先通过“📁 添加文件夹”添加。")
+            return
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("数据文件夹过滤规则")
+        dialog_window.geometry("640x470")
+        dialog_window.transient(self.root)
+        dialog_window.grab_set()
+
+        ctk.CTkLabel(dialog_window, text="规则使用 glob 语法，匹配相对于该文件夹的路径；多个规则用逗号分隔。\n"
+                                         "不含 / 的规则 (如 *.psd、__pycache__) 匹配任意层级的文件名或目录名；排除规则优先。",
+                     font=self.font_small, justify="left").pack(pady=(15, 10), padx=20, anchor="w")
+        selected_label_var = tk.StringVar(value=next(iter(entry_labels)))
+        ctk.CTkOptionMenu(dialog_window, values=list(entry_labels), variable=selected_label_var, font=self.font_default,
+                          command=lambda _: _load_selected_rules()).pack(fill="x", padx=20, pady=(0, 10))
+        ctk.CTkLabel(dialog_window, text="包含规则 (留空表示全部文件):", font=self.font_default_bold).pack(anchor="w", padx=20)
+        include_var = tk.StringVar()
+        ctk.CTkEntry(dialog_window, textvariable=include_var, placeholder_text="例如: *.png, *.json, fonts/*", font=self.font_input_text).pack(fill="x", padx=20, pady=(2, 10))
+        ctk.CTkLabel(dialog_window, text="排除规则:", font=self.font_default_bold).pack(anchor="w", padx=20)
+        exclude_var = tk.StringVar()
+        ctk.CTkEntry(dialog_window, textvariable=exclude_var, placeholder_text="例如: *.psd, __pycache__, *.pyc, .DS_Store, cache", font=self.font_input_text).pack(fill="x", padx=20, pady=(2, 10))
+        preview_label = ctk.CTkLabel(dialog_window, text="", font=self.font_default)
+        preview_label.pack(pady=10, padx=20)
+
+        preview_state = {"after_id": None, "generation": 0}
+        def _schedule_preview(*_):
+            # 输入停止 400ms 后才在后台重新统计，避免每次按键都遍历文件夹
+            if preview_state["after_id"] is not None:
+                dialog_window.after_cancel(preview_state["after_id"])
+            preview_state["after_id"] = dialog_window.after(400, _start_preview)
+        def _start_preview():
+            preview_state["after_id"] = None
+            preview_state["generation"] += 1
+            preview_generation = preview_state["generation"]
+            data_entry_str = entry_labels[selected_label_var.get()]
+            folder_filter = DataFolderFilter(DataFolderFilter.split_patterns(include_var.get()), DataFolderFilter.split_patterns(exclude_var.get()))
+            preview_label.configure(text="⏳ 正在统计...")
+            def _preview_in_thread():
+                unfiltered_stats = self._compute_data_entry_stats(data_entry_str, None)
+                filtered_stats = self._compute_data_entry_stats(data_entry_str, folder_filter)
+                def _show_preview():
+                    if preview_generation != preview_state["generation"] or not dialog_window.winfo_exists():
+                        return # 已有更新的预览请求，丢弃过期结果
+                    if not (unfiltered_stats and filtered_stats):
+                        preview_label.configure(text="⚠️ 无法读取该文件夹。")
+                        return
+                    preview_label.configure(text=f"过滤后: {filtered_stats[1]} 个文件，{format_byte_size(filtered_stats[2])}  "
+                                                 f"(过滤前: {unfiltered_stats[1]} 个文件，{format_byte_size(unfiltered_stats[2])})")
+                if self.root.winfo_exists():
+                    self.root.after(0, _show_preview)
+            threading.Thread(target=_preview_in_thread, daemon=True).start()
+        def _load_selected_rules():
+            rules = self.data_entry_filters.get(entry_labels[selected_label_var.get()]) or {}
+            include_var.set(", ".join(rules.get("include", ())))
+            exclude_var.set(", ".join(rules.get("exclude", ())))
+            _schedule_preview()
+        def _save_rules():
+            data_entry_str = entry_labels[selected_label_var.get()]
+            include_patterns = DataFolderFilter.split_patterns(include_var.get())
+            exclude_patterns = DataFolderFilter.split_patterns(exclude_var.get())
+            if include_patterns or exclude_patterns:
+                self.data_entry_filters[data_entry_str] = {"include": include_patterns, "exclude": exclude_patterns}
+            else:
+                self.data_entry_filters.pop(data_entry_str, None)
+            self._log_to_terminal(f"🎯 已更新数据文件夹过滤规则: {selected_label_var.get()}", "SUCCESS")
+            self._update_data_list_rows_for_entry(data_entry_str)
+            self._queue_data_entry_stats(data_entry_str)
+        include_var.trace_add("write", _schedule_preview)
+        exclude_var.trace_add("write", _schedule_preview)
+        _load_selected_rules()
+
+        bottom_button_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        bottom_button_frame.pack(pady=(10, 15), fill="x", padx=20)
+        bottom_button_frame.grid_columnconfigure((0, 1), weight=1)
+        ctk.CTkButton(bottom_button_frame, text="💾 保存当前条目的规则", command=_save_rules, font=self.font_button, height=35).grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="关闭", command=dialog_window.destroy, font=self.font_button, fg_color=("gray65", "gray40"), hover_color=("gray75", "gray50"), height=35).grid(row=0, column=1, padx=(5, 0), sticky="ew")
+        dialog_window.after(100, dialog_window.lift)
+
     def clear_data_files(self):
         """(UI回调) 清空已添加的所有数据文件和文件夹列表。"""
         # 中文注释: 移除所有已配置的附加数据项。
@@ -1229,63 +7495,110 @@ class UltraModernPyInstallerGUI:
                               "您确定要从列表中移除所有已添加的数据文件和文件夹吗？", 
                               icon='warning', parent=self.root):
             self.add_data_list.clear() # 清空内部列表
-            self.update_data_textbox() # 更新UI显示
+            self.data_entry_filters.clear()
+            self.update_data_list_view() # 更新UI显示
             self._log_to_terminal("🗑️ 数据文件/文件夹列表已成功清空。", "INFO")
             
-    def update_data_textbox(self):
-        """更新高级设置中显示已添加数据文件/文件夹列表的文本框内容。"""
-        # 中文注释: 刷新UI上的列表，显示当前所有配置的附加数据。
-        
-        # 确保UI组件存在且有效
-        if not (hasattr(self, 'data_textbox') and self.data_textbox.winfo_exists()):
-            # 如果组件不存在，可能是在UI尚未完全初始化时调用，或者UI已销毁
-            # 此时可以记录一个调试信息，但不应继续操作UI
-            print("[DEBUG - update_data_textbox]: data_textbox not found or not existing.")
+    def update_data_list_view(self):
+        """
+        将高级设置中的数据文件列表与 self.add_data_list 同步。只插入/删除发生变化的行 (比较首尾相同的部分)，
+        其余行只在序号变化时更新；类型和大小在后台解析 (见 _queue_data_entry_stats)，界面线程不访问文件系统。
+        """
+        if not (hasattr(self, 'data_list_view') and self.data_list_view.winfo_exists()): # “高级设置”选项卡尚未创建，创建时再填充
+            self._refresh_watch_targets()
             return
-
+        new_entries = list(self.add_data_list)
+        old_entries = [data_entry_str for data_entry_str, _ in self._data_list_rows]
+        common_prefix = 0
+        while common_prefix < min(len(old_entries), len(new_entries)) and old_entries[common_prefix] == new_entries[common_prefix]:
+            common_prefix += 1
+        common_suffix = 0
+        while (common_suffix < min(len(old_entries), len(new_entries)) - common_prefix
+               and old_entries[-1 - common_suffix] == new_entries[-1 - common_suffix]):
+            common_suffix += 1
         try:
-            self.data_textbox.configure(state="normal") # 临时设置为可编辑
-            self.data_textbox.delete("1.0", "end")    # 清空现有内容 (从第一行第一列到末尾)
-            
-            if not self.add_data_list: # 如果列表为空
-                self.data_textbox.insert("1.0", "当前没有添加任何数据文件或文件夹...")
+            removed_rows = self._data_list_rows[common_prefix:len(old_entries) - common_suffix]
+            if removed_rows:
+                self.data_list_view.delete(*[row_id for _, row_id in removed_rows])
+            inserted_rows = []
+            for position in range(common_prefix, len(new_entries) - common_suffix):
+                row_id = self.data_list_view.insert("", position, values=self._format_data_list_row(position, new_entries[position]))
+                inserted_rows.append((new_entries[position], row_id))
+            suffix_rows = self._data_list_rows[len(old_entries) - common_suffix:]
+            self._data_list_rows = self._data_list_rows[:common_prefix] + inserted_rows + suffix_rows
+            if len(removed_rows) != len(inserted_rows): # 只有尾部行的序号会改变
+                for position in range(len(new_entries) - common_suffix, len(new_entries)):
+                    self._update_data_list_row(position)
+            for data_entry_str, _ in inserted_rows:
+                self._queue_data_entry_stats(data_entry_str)
+            if new_entries:
+                self.data_list_empty_label.place_forget()
             else:
-                # 遍历列表，格式化并插入每个条目
-                for index, data_item_str in enumerate(self.add_data_list, 1):
-                    try:
-                        source_path_str, destination_in_pkg_str = data_item_str.split(os.pathsep, 1)
-                        source_path_obj = Path(source_path_str)
-                        
-                        # 判断是文件还是文件夹，并设置相应图标
-                        item_type_icon = "📁" if source_path_obj.is_dir() else "📄"
-                        
-                        # 显示源路径的文件名/文件夹名
-                        source_display_name = source_path_obj.name 
-                        
-                        # 格式化显示字符串
-                        display_entry_str = (
-                            f"{index}. {item_type_icon} {source_display_name}\n"
-                            f"   源路径: {source_path_str}\n" # (可选)显示完整源路径以供参考
-                            f"   打包到 (目标相对路径): {destination_in_pkg_str}\n\n"
-                        )
-                        self.data_textbox.insert("end", display_entry_str)
-                    except ValueError: # 如果split失败 (格式不符)
-                        self.data_textbox.insert("end", f"{index}. [格式错误] 无效条目: {data_item_str}\n\n")
-                    except Exception as e_format: # 其他可能的格式化错误
-                         self.data_textbox.insert("end", f"{index}. [显示错误] 处理条目时出错: {data_item_str} ({e_format})\n\n")
+                self.data_list_empty_label.place(relx=0.5, rely=0.5, anchor="center")
         except tk.TclError as e_tcl:
-            print(f"[ERROR - update_data_textbox UI Update]: TclError: {e_tcl}")
-        except Exception as e_update_list:
-            print(f"[ERROR - update_data_textbox UI Update]: Unexpected error: {e_update_list}")
-        finally:
-            if hasattr(self, 'data_textbox') and self.data_textbox.winfo_exists():
-                 self.data_textbox.configure(state="disabled") # 恢复为只读
+            print(f"[ERROR - update_data_list_view UI Update]: TclError: {e_tcl}")
+        self._refresh_watch_targets() # 数据项变化后同步监视目标 (监视模式未开启时无操作)
+
+    def _format_data_list_row(self, position: int, data_entry_str: str) -> tuple:
+        """根据缓存中的类型/大小信息生成一行的显示内容；尚未解析完成时显示占位文本。"""
+        parsed_entry = DataFileIndex.parse_entry(data_entry_str)
+        if parsed_entry is None:
+            return (position + 1, "❓ [格式错误]", data_entry_str, "", "")
+        source_path, destination_str = parsed_entry
+        cached_stats = self._data_entry_stats.get(self._data_entry_stats_key(data_entry_str), "pending")
+        if cached_stats == "pending":
+            self._queue_data_entry_stats(data_entry_str) # 未统计或已被淘汰出缓存 (已在队列中时不会重复加入)
+            type_icon, stats_text = "⏳", "统计中..."
+        elif cached_stats is None:
+            type_icon, stats_text = "⚠️", "源路径不存在"
+        else:
+            type_icon = "📁" if cached_stats[0] else "📄"
+            stats_text = f"{cached_stats[1]} 个文件，{format_byte_size(cached_stats[2])}"
+        entry_rules = self.data_entry_filters.get(data_entry_str) or {}
+        rules_text = ""
+        if entry_rules.get("include") or entry_rules.get("exclude"):
+            rules_text = f"包含 [{', '.join(entry_rules.get('include', ())) or '全部'}] 排除 [{', '.join(entry_rules.get('exclude', ())) or '无'}]"
+        return (position + 1, f"{type_icon} {source_path.name}", destination_str, stats_text, rules_text)
+
+    def _update_data_list_row(self, position: int):
+        """重新渲染指定位置的一行。"""
+        if 0 <= position < len(self._data_list_rows) and self.data_list_view.winfo_exists():
+            data_entry_str, row_id = self._data_list_rows[position]
+            self.data_list_view.item(row_id, values=self._format_data_list_row(position, data_entry_str))
+
+    def _update_data_list_rows_for_entry(self, data_entry_str: str):
+        """(主线程) 某个条目的后台统计完成或规则变化后，只刷新对应的行。"""
+        if not (hasattr(self, 'data_list_view') and self.data_list_view.winfo_exists()):
+            return
+        for position, (row_entry_str, _) in enumerate(self._data_list_rows):
+            if row_entry_str == data_entry_str:
+                self._update_data_list_row(position)
+
+    def remove_selected_data_entries(self):
+        """(UI回调) 从列表中移除选中的数据条目 (只删除对应的行)。"""
+        selected_row_ids = set(self.data_list_view.selection()) if hasattr(self, 'data_list_view') else set()
+        if not selected_row_ids:
+            self.show_info("未选择", "请先在列表中选择要移除的数据条目 (可按住 Ctrl/Shift 多选)。")
+            return
+        removed_entries = [data_entry_str for data_entry_str, row_id in self._data_list_rows if row_id in selected_row_ids]
+        self.data_list_view.delete(*selected_row_ids)
+        self._data_list_rows = [(data_entry_str, row_id) for data_entry_str, row_id in self._data_list_rows if row_id not in selected_row_ids]
+        self.add_data_list = [data_entry_str for data_entry_str, _ in self._data_list_rows]
+        for data_entry_str in removed_entries:
+            if data_entry_str not in self.add_data_list:
+                self.data_entry_filters.pop(data_entry_str, None)
+        for position in range(len(self._data_list_rows)):
+            self._update_data_list_row(position)
+        self.update_data_list_view() # 行已同步，这里只更新空列表提示和监视目标
+        self._log_to_terminal(f"➖ 已移除 {len(removed_entries)} 个数据条目。", "INFO")
 
     # --- 构建相关方法 (增强版：包含预构建检查、日志缓冲、错误提取和UI状态管理) ---
 
-    def _pre_build_checks(self) -> bool:
+    def _pre_build_checks(self, interactive: bool = True) -> bool:
         """
         在开始实际构建操作之前，执行一系列的有效性检查和用户提示。
+        参数:
+            interactive (bool): 是否允许弹出需要用户确认的提示 (监视模式自动重建时为False)。
         返回:
             bool: True 如果所有检查通过或用户选择继续，False 如果检查失败且用户选择中止。
         """
@@ -1330,7 +7643,7 @@ class UltraModernPyInstallerGUI:
                 if lib_name not in current_hidden_imports_set:
                     potential_missing_hidden_imports.append(lib_name)
         
-        if potential_missing_hidden_imports:
+        if potential_missing_hidden_imports and interactive:
             warning_message = (
                 f"检测到您可能添加了包含特定第三方库依赖的Python脚本\n"
                 f"(例如: {', '.join(fn for fn in ['tools.py', 'orchestrator.py'] if fn in added_python_files_as_data) or '自定义脚本'}) "
@@ -1349,39 +7662,257 @@ class UltraModernPyInstallerGUI:
         self._log_to_terminal("✅ 构建前检查通过。", "SUCCESS")
         return True # 所有检查通过或用户选择继续
 
-    def start_build(self):
+    def start_build(self, triggered_by_watch: bool = False):
         """
         开始构建应用程序的入口方法。
         执行预构建检查，设置UI状态，并启动后台构建线程。
+
+        Args:
+            triggered_by_watch (bool): 是否由监视模式自动触发。自动触发的构建为增量构建
+                                       (不使用 --clean)，且预构建检查不弹出确认对话框。
         """
         # 中文注释: 用户点击“开始构建”按钮后调用的方法。
         if self.is_building: # 防止重复点击
             self._log_to_terminal("ℹ️ 当前已有构建任务正在进行中。", "INFO")
             return
+        if self._terminating_builds: # 已取消的构建仍在终止中，避免新旧进程同时写入workpath
+            self._log_to_terminal("ℹ️ 上一次已取消的构建进程仍在终止中，请稍候再试。", "INFO")
+            return
         
         # 执行预构建检查
-        if not self._pre_build_checks():
+        if not self._pre_build_checks(interactive=not triggered_by_watch):
             self._reset_build_button_ui_state() # 如果检查不通过，重置UI状态
             return
             
         # 设置状态为“正在构建”
         self.is_building = True
+        self._build_counter += 1
+        self._active_build_id = self._build_counter
+        self._active_build_work_path = self._resolve_build_paths()["work_path"]
         if hasattr(self, 'build_button') and self.build_button.winfo_exists():
             self.build_button.configure(text="🔄 构建中,请稍候...", state="disabled")
+        if hasattr(self, 'cancel_build_button') and self.cancel_build_button.winfo_exists():
+            self.cancel_build_button.configure(state="normal")
         self.update_status("🟡", "正在构建...") # 更新顶部状态指示器
         
         # 切换到“构建输出”选项卡并清空之前的日志
-        if hasattr(self, 'tabview'): self.tabview.set("📱 构建输出") 
-        if hasattr(self, 'terminal_textbox') and self.terminal_textbox.winfo_exists():
-            self.terminal_textbox.configure(state="normal")
-            self.terminal_textbox.delete("0.0", "end") 
-            self.terminal_textbox.configure(state="disabled")
+        self._select_tab("📱 构建输出")
+        self._clear_terminal_log()
         
         # 创建并启动后台线程来执行实际的PyInstaller构建过程
         # daemon=True 确保当主程序退出时，此线程也会被终止
-        build_process_thread = threading.Thread(target=self._execute_build_process_in_thread, daemon=True) # 方法名更清晰
+        build_process_thread = threading.Thread(target=self._wrap_with_profiler_if_requested(self._execute_build_process_in_thread, "build"),
+                                                args=(self._active_build_id, triggered_by_watch), daemon=True) # 方法名更清晰
         build_process_thread.start()
 
+    def start_matrix_build(self, interpreter_paths: list[str]):
+        """
+        用多个解释器并行构建当前配置 (矩阵构建)。与普通构建共用构建按钮状态、取消逻辑和进度条，
+        但不写入构建历史，也不使用产物仓库 (各解释器的产物不同于单次构建的产物)。
+
+        Args:
+            interpreter_paths (list[str]): 参与构建的解释器路径。
+        """
+        if self.is_building:
+            self._log_to_terminal("ℹ️ 当前已有构建任务正在进行中。", "INFO")
+            return
+        if self._terminating_builds:
+            self._log_to_terminal("ℹ️ 上一次已取消的构建进程仍在终止中，请稍候再试。", "INFO")
+            return
+        if not self._pre_build_checks(interactive=True):
+            self._reset_build_button_ui_state()
+            return
+
+        self.is_building = True
+        self._build_counter += 1
+        self._active_build_id = self._build_counter
+        self._active_build_work_path = self._resolve_build_paths()["work_root"] / "matrix"
+        if hasattr(self, 'build_button') and self.build_button.winfo_exists():
+            self.build_button.configure(text="🔄 矩阵构建中,请稍候...", state="disabled")
+        if hasattr(self, 'cancel_build_button') and self.cancel_build_button.winfo_exists():
+            self.cancel_build_button.configure(state="normal")
+        self.update_status("🟡", "正在矩阵构建...")
+        self._select_tab("📱 构建输出")
+        self._clear_terminal_log()
+        threading.Thread(target=self._wrap_with_profiler_if_requested(self._execute_matrix_build_in_thread, "matrix-build"),
+                         args=(self._active_build_id, list(interpreter_paths)), daemon=True).start()
+
+    @staticmethod
+    def _get_matrix_build_labels(interpreter_infos: dict) -> dict:
+        """为每个解释器生成产物子目录名：py<主版本.次版本>；版本相同时附加虚拟环境目录名，仍重复时附加路径哈希。"""
+        labels_by_path = {interpreter_path: "py" + ".".join(info["version"].split(".")[:2]) for interpreter_path, info in interpreter_infos.items()}
+        label_counts = Counter(labels_by_path.values())
+        for interpreter_path, info in interpreter_infos.items():
+            if label_counts[labels_by_path[interpreter_path]] > 1:
+                environment_name = Path(info["prefix"]).name if info["is_venv"] else info["implementation"].lower()
+                labels_by_path[interpreter_path] = re.sub(r"[^\w.-]", "_", f"{labels_by_path[interpreter_path]}-{environment_name}")
+        label_counts = Counter(labels_by_path.values())
+        for interpreter_path, info in interpreter_infos.items():
+            if label_counts[labels_by_path[interpreter_path]] > 1:
+                labels_by_path[interpreter_path] += "-" + hashlib.sha256(info["interpreter"].encode("utf-8")).hexdigest()[:6]
+        return labels_by_path
+
+    def _execute_matrix_build_in_thread(self, build_id: int, interpreter_paths: list[str]):
+        """
+        (后台线程) 执行矩阵构建：读取各解释器信息 (有缓存)，为每个可用解释器生成独立的 distpath/workpath/specpath，
+        并发运行全部 PyInstaller 进程；日志行以 [标签] 开头，进度条显示各构建进度的平均值，最后汇总结果。
+
+        Args:
+            build_id (int): 本次构建的编号，含义与 _execute_build_process_in_thread 相同。
+            interpreter_paths (list[str]): 参与构建的解释器路径。
+        """
+        matrix_start_time = time.time()
+        try:
+            self._update_progress_ui(0.02, "正在读取解释器信息...")
+            usable_interpreters = {}
+            for interpreter_path, interpreter_info in self.interpreter_registry.describe_many(interpreter_paths).items():
+                if isinstance(interpreter_info, RuntimeError):
+                    self._log_to_terminal(f"⚠️ 跳过解释器 {interpreter_path}: {interpreter_info}", "WARNING")
+                elif not interpreter_info["pyinstaller"]:
+                    self._log_to_terminal(f"⚠️ 跳过解释器 {interpreter_path} (Python {interpreter_info['version']}): 未安装 PyInstaller。", "WARNING")
+                else:
+                    usable_interpreters[interpreter_path] = interpreter_info
+            if not usable_interpreters:
+                self._log_to_terminal("❌ 没有可用于构建的解释器 (需要安装了 PyInstaller 的 Python)。", "ERROR")
+                self.update_status("🔴", "矩阵构建失败")
+                self._update_progress_ui(0, "没有可用的解释器")
+                self.root.after(0, self.show_error, "矩阵构建失败", "列出的解释器均不可用或未安装 PyInstaller。")
+                return
+
+            # 公共参数：去掉命令开头 (pyinstaller 或 解释器 -m PyInstaller) 和各构建需要独立设置的路径参数
+            base_command = self._generate_spec_build_command() if self.build_from_spec.get() else self.generate_command()
+            if not base_command:
+                return
+            base_arguments = []
+            command_arguments = iter(base_command[len(self._get_pyinstaller_command_prefix()):])
+            for command_argument in command_arguments:
+                if command_argument in ("--distpath", "--workpath", "--specpath"):
+                    next(command_arguments, None)
+                elif command_argument != "--noconfirm":
+                    base_arguments.append(command_argument)
+
+            build_paths = self._resolve_build_paths()
+            labels_by_path = self._get_matrix_build_labels(usable_interpreters)
+            matrix_builds = []
+            for interpreter_path, interpreter_info in usable_interpreters.items():
+                build_label = labels_by_path[interpreter_path]
+                build_command = [interpreter_info["executable"] or interpreter_info["interpreter"], "-m", "PyInstaller", "--noconfirm",
+                                 "--distpath", str(build_paths["dist_path"] / "matrix" / build_label),
+                                 "--workpath", str(build_paths["work_root"] / "matrix" / build_label)]
+                if not self.build_from_spec.get(): # 各构建生成的 .spec 互不覆盖
+                    build_command.extend(["--specpath", str(build_paths["work_root"] / "matrix" / build_label)])
+                matrix_builds.append({"label": build_label, "info": interpreter_info, "command": build_command + base_arguments,
+                                      "progress": 0.0, "returncode": None, "duration": 0.0, "summary": None})
+
+            self._log_to_terminal(f"🧮 矩阵构建: {len(matrix_builds)} 个解释器并行构建", "INFO")
+            for matrix_build in matrix_builds:
+                self._log_to_terminal(f"    [{matrix_build['label']}] {' '.join(matrix_build['command'])}", "CMD")
+            self._log_to_terminal("=" * 80, "BUILD")
+
+            progress_lock = threading.Lock()
+            def _run_single_build(matrix_build: dict):
+                """(工作线程) 运行一个解释器的构建，输出行加上标签前缀后写入日志。"""
+                output_parser = PyInstallerOutputParser()
+                build_events = []
+                single_start_time = time.perf_counter()
+                line_prefix = f"[{matrix_build['label']}] "
+                build_process = subprocess.Popen(
+                    matrix_build["command"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0,
+                    env=ProcessOutputReader.child_environment(), cwd=str(build_paths["cwd"]),
+                    creationflags=((subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP) if sys.platform == "win32" else 0),
+                    start_new_session=(sys.platform != "win32")
+                )
+                self._matrix_build_processes[matrix_build["label"]] = build_process
+                if self._active_build_id != build_id:
+                    self._terminate_cancelled_build_process(build_process)
+                    return
+                for output_line_batch in ProcessOutputReader(build_process.stdout).iter_line_batches():
+                    if self._active_build_id != build_id: # 已取消：取消逻辑可能已替换进程字典而没有看到本进程，这里再终止一次
+                        self._terminate_cancelled_build_process(build_process)
+                        return
+                    self._log_to_terminal([line_prefix + output_line.strip() for output_line in output_line_batch], "BUILD")
+                    batch_events = output_parser.parse_batch(output_line_batch)
+                    build_events.extend(batch_events)
+                    batch_progress = next((event.progress for event in reversed(batch_events) if event.progress is not None), None)
+                    if batch_progress is not None:
+                        with progress_lock:
+                            matrix_build["progress"] = batch_progress
+                            overall_progress = sum(build["progress"] for build in matrix_builds) / len(matrix_builds)
+                        self._update_progress_ui(overall_progress, f"矩阵构建: {matrix_build['label']} - {batch_events[-1].message}"[:80])
+                matrix_build["returncode"] = build_process.wait()
+                matrix_build["duration"] = time.perf_counter() - single_start_time
+                matrix_build["summary"] = PyInstallerOutputParser.summarize(build_events)
+                with progress_lock:
+                    matrix_build["progress"] = 1.0
+                if matrix_build["returncode"] == 0:
+                    self._log_to_terminal(f"{line_prefix}✅ 构建成功，耗时 {matrix_build['duration']:.1f} 秒。", "SUCCESS")
+                else:
+                    self._log_to_terminal(f"{line_prefix}❌ 构建失败 (返回代码 {matrix_build['returncode']})，耗时 {matrix_build['duration']:.1f} 秒。", "ERROR")
+
+            def _run_single_build_safely(matrix_build: dict):
+                try:
+                    _run_single_build(matrix_build)
+                except (OSError, subprocess.SubprocessError) as e_single_build: # 例如解释器在读取信息后被删除
+                    matrix_build["returncode"] = -1
+                    self._log_to_terminal(f"❌ [{matrix_build['label']}] 无法运行构建: {e_single_build}", "ERROR")
+
+            with ThreadPoolExecutor(max_workers=len(matrix_builds), thread_name_prefix="matrix-build") as build_executor:
+                list(build_executor.map(_run_single_build_safely, matrix_builds))
+            if self._active_build_id != build_id: # 已取消，取消逻辑已负责更新UI
+                return
+
+            # --- 汇总结果 ---
+            self._log_to_terminal("=" * 80, "BUILD")
+            self._log_to_terminal(f"🧮 矩阵构建结果 (总耗时 {time.time() - matrix_start_time:.1f} 秒):", "INFO")
+            self._log_to_terminal(f"    {'标签':<20} {'Python':<10} {'PyInstaller':<12} {'结果':<8} {'耗时':>8}  {'警告/错误':<10} 输出目录", "INFO")
+            for matrix_build in matrix_builds:
+                build_summary = matrix_build["summary"] or {"warning_count": 0, "error_count": 0}
+                build_result = "成功" if matrix_build["returncode"] == 0 else "失败"
+                self._log_to_terminal(f"    {matrix_build['label']:<20} {matrix_build['info']['version']:<10} {matrix_build['info']['pyinstaller']:<12} "
+                                      f"{build_result:<8} {matrix_build['duration']:>7.1f}s  "
+                                      f"{build_summary['warning_count']}/{build_summary['error_count']:<8} {build_paths['dist_path'] / 'matrix' / matrix_build['label']}",
+                                      "SUCCESS" if matrix_build["returncode"] == 0 else "ERROR")
+            failed_labels = [matrix_build["label"] for matrix_build in matrix_builds if matrix_build["returncode"] != 0]
+            if failed_labels:
+                self._update_progress_ui(1.0, f"矩阵构建完成，{len(failed_labels)} 个失败")
+                self.update_status("🔴", "矩阵构建部分失败")
+                self.root.after(0, self.show_error, "矩阵构建部分失败",
+                                f"以下解释器的构建失败: {', '.join(failed_labels)}\n\n请在“构建输出”中按标签查看对应的日志。")
+            else:
+                self._update_progress_ui(1.0, "矩阵构建成功完成！")
+                self.update_status("🟢", "矩阵构建成功")
+                self.root.after(0, self.show_success, "矩阵构建成功",
+                                f"{len(matrix_builds)} 个解释器的构建均已成功。\n产物位于: {build_paths['dist_path'] / 'matrix'}")
+        except Exception as e_matrix:
+            self._log_to_terminal(f"❌ 矩阵构建时发生错误: {e_matrix}", "ERROR")
+            self.update_status("🔴", "矩阵构建出错")
+            self.root.after(0, self.show_error, "矩阵构建出错", f"矩阵构建时发生错误:\n{e_matrix}")
+        finally:
+            if self._active_build_id == build_id:
+                self._matrix_build_processes = {}
+                self._reset_build_button_ui_state()
+
+    def _wrap_with_profiler_if_requested(self, worker_function, run_label: str):
+        """
+        开启了“剖析下一次扫描/构建”时返回在 RunProfiler 下运行 worker_function 的包装函数，并关闭开关 (只剖析一次)；
+        未开启时原样返回 worker_function，不引入任何开销。
+        """
+        if not self.profile_next_run.get():
+            return worker_function
+        self.profile_next_run.set(False)
+        run_profiler = RunProfiler(self._get_profile_output_dir(), run_label, sample_main_thread=self.profile_sample_main_thread.get(),
+                                   logger_func=self._log_to_terminal)
+        self._log_to_terminal(f"🔬 本次运行 ({run_label}) 将被剖析，结果保存到: {run_profiler.output_dir}", "INFO")
+        return lambda *worker_args: run_profiler.run(worker_function, *worker_args)
+
+    @staticmethod
+    def _get_profile_output_dir() -> Path:
+        """剖析结果目录：日志文件 (pyinstaller_studio_pro_v3_1.log) 旁的 profiles 目录。"""
+        for log_handler in logging.getLogger().handlers:
+            if isinstance(log_handler, logging.FileHandler):
+                return Path(log_handler.baseFilename).parent / "profiles"
+        return Path.cwd() / "profiles"
+
     def _reset_build_button_ui_state(self):
         """辅助方法：重置构建按钮的文本和状态，并将is_building标志设为False。"""
         # 中文注释: 用于在构建完成、失败或取消后恢复UI的构建按钮状态。
@@ -1390,6 +7921,8 @@ class UltraModernPyInstallerGUI:
         # 确保UI组件仍然存在再操作
         if hasattr(self,'build_button') and self.build_button.winfo_exists():
             self.build_button.configure(text="🚀 开始构建应用程序", state="normal")
+        if hasattr(self, 'cancel_build_button') and self.cancel_build_button.winfo_exists():
+            self.cancel_build_button.configure(state="disabled")
         
         # 如果构建未真正开始或已结束，且顶部状态不是明确的成功/失败，则恢复“系统就绪”
         if hasattr(self, 'status_text') and self.status_text.winfo_exists():
@@ -1400,89 +7933,230 @@ class UltraModernPyInstallerGUI:
                 self.update_status("🟢", "系统就绪")
 
 
-    def _execute_build_process_in_thread(self):
+    def cancel_build(self):
+        """
+        (UI回调) 用户点击“取消构建”按钮时调用。
+        确认后立即将UI恢复为就绪状态，并在后台终止 PyInstaller 进程树。
+        """
+        if not self.is_building:
+            return
+        user_choice = messagebox.askyesnocancel(
+            "取消构建",
+            "确定要取消当前正在进行的构建吗？\n\n"
+            "• 是：终止构建，并删除本次未完成构建的临时目录 (workpath)\n"
+            "• 否：仅终止构建，保留临时目录 (下次构建可复用部分缓存)\n"
+            "• 取消：继续构建",
+            icon='warning', parent=self.root)
+        if user_choice is None or not self.is_building: # 用户选择继续，或确认期间构建已自行结束
+            return
+        self._cancel_active_build(cleanup_workpath=bool(user_choice))
+
+    def _cancel_active_build(self, cleanup_workpath: bool = False, on_terminated_callback=None):
+        """
+        取消当前构建：立即复位UI，然后在后台线程中终止进程树 (超时后强制杀死) 并按需清理 workpath。
+
+        Args:
+            cleanup_workpath (bool): 进程终止后是否删除本次构建的 workpath。
+            on_terminated_callback (callable, optional): 进程树终止 (及清理) 完成后在主线程中调用。
+        """
+        build_process = self._build_process
+        remote_build_job = self._remote_build_job
+        if self._remote_build_cancel_event is not None: # 中止正在进行的快照上传
+            self._remote_build_cancel_event.set()
+        matrix_build_processes = list(self._matrix_build_processes.values())
+        work_path_to_clean = self._active_build_work_path if cleanup_workpath else None
+        self._active_build_id = None # 旧的构建线程据此停止处理输出，且不再改动UI
+        self._build_process = None
+        self._matrix_build_processes = {}
+        cancellation_key = object()
+        self._terminating_builds[cancellation_key] = ([build_process] if build_process is not None else []) + matrix_build_processes
+        self._reset_build_button_ui_state()
+        self._update_progress_ui(0, "构建已取消")
+        self.update_status("⏹️", "构建已取消")
+        self._log_to_terminal("⏹️ 构建已取消，正在终止 PyInstaller 进程树...", "WARNING")
+        threading.Thread(
+            target=self._terminate_build_process_in_thread,
+            args=(build_process, work_path_to_clean, on_terminated_callback, remote_build_job, matrix_build_processes, cancellation_key),
+            daemon=True
+        ).start()
+
+    def _terminate_cancelled_build_process(self, build_process):
+        """
+        (构建线程) 构建线程发现自己已被取消时终止其进程树 (重复终止没有影响)，终止期间登记在 _terminating_builds 中，不会开始新的构建。
+        """
+        cancellation_key = object()
+        self._terminating_builds[cancellation_key] = [build_process]
+        try:
+            terminate_process_tree(build_process, timeout_seconds=5.0, logger_func=self._log_to_terminal)
+        finally:
+            self._terminating_builds.pop(cancellation_key, None)
+            if self.root.winfo_exists():
+                self.root.after(0, self._on_build_termination_finished)
+
+    def _terminate_build_process_in_thread(self, build_process, work_path_to_clean: Path | None, on_terminated_callback, remote_build_job=None,
+                                           matrix_build_processes=(), cancellation_key=None):
+        """
+        (后台线程) 终止已取消构建的进程树 (远程构建则通知代理取消任务，矩阵构建则终止全部进程树)，并按需删除其 workpath。
+        完成后从 _terminating_builds 中移除 cancellation_key，此前不会开始新的构建。
+        """
+        try:
+            if remote_build_job is not None:
+                agent_client, job_id = remote_build_job
+                agent_client.cancel_job(job_id)
+                self._log_to_terminal(f"⏹️ 已通知构建代理取消任务 {job_id}。", "INFO")
+            for process_to_terminate in ([build_process] if build_process is not None else []) + list(matrix_build_processes):
+                termination_outcome = terminate_process_tree(process_to_terminate, timeout_seconds=5.0, logger_func=self._log_to_terminal)
+                outcome_text = {"exited": "进程已退出", "terminated": "进程树已终止", "killed": "进程树已被强制结束"}
+                self._log_to_terminal(f"⏹️ {outcome_text.get(termination_outcome, termination_outcome)} (PID {process_to_terminate.pid})。", "INFO")
+            if work_path_to_clean and work_path_to_clean.is_dir():
+                shutil.rmtree(work_path_to_clean, ignore_errors=True)
+                self._log_to_terminal(f"🧹 已删除未完成构建的临时目录: {work_path_to_clean}", "INFO")
+        except Exception as e_terminate:
+            self._log_to_terminal(f"⚠️ 终止构建进程时出错: {e_terminate}", "WARNING")
+        finally:
+            self._terminating_builds.pop(cancellation_key, None)
+            if self.root.winfo_exists():
+                if on_terminated_callback:
+                    self.root.after(0, on_terminated_callback)
+                self.root.after(0, self._on_build_termination_finished)
+
+    def _execute_build_process_in_thread(self, build_id: int, incremental_build: bool = False):
         """
         在单独的后台线程中执行PyInstaller构建命令，并处理其输出和结果。
         此方法不直接操作UI，而是通过 self._log_to_terminal 和 self._update_progress_ui 调度UI更新。
+
+        Args:
+            build_id (int): 本次构建的编号。构建被取消后 self._active_build_id 不再等于它，
+                            此线程随即停止处理输出，也不再改动UI。
+            incremental_build (bool): 是否为增量构建 (监视模式触发，复用上次的构建缓存)。
         """
         # 中文注释: 这是实际执行PyInstaller命令的核心逻辑，运行在后台线程。
         
-        log_buffer_for_error_analysis = [] # 用于存储完整日志，以便在失败时分析具体错误
+        output_parser = PyInstallerOutputParser() # 将PyInstaller输出解析为结构化事件
+        build_events = [] # 本次构建的全部事件，供进度条、错误提示和构建历史使用
+        build_start_time = time.time()
+        pyinstaller_command_list = []
+        warn_analysis_arguments = None # 构建结束、界面复位之后再分析 warn 文件 (见 finally)
         
-        # 内部辅助函数，用于同时记录到UI日志文本框和本地日志缓冲区
-        def _log_and_buffer_build_output(log_line_str):
+        # 内部辅助函数，用于记录到UI日志文本框 (仅用于本程序自身输出的提示行)
+        def _log_build_output(log_line_str):
             self._log_to_terminal(log_line_str.strip(), "BUILD") # 使用特定级别记录构建日志
-            log_buffer_for_error_analysis.append(log_line_str.strip())
 
         try:
-            pyinstaller_command_list = self.generate_command() # 获取根据UI配置生成的命令列表
+            remote_agent_url = self.remote_agent_url.get().strip() if self.use_remote_agent.get() else ""
+            use_isolated_build_env = self.use_isolated_build_env.get() and not remote_agent_url
+            if use_isolated_build_env: # 通常已在打开配置时于后台创建好；仍在创建中时等待其完成
+                self._update_progress_ui(0.02, "正在准备隔离构建环境...")
+                try:
+                    self._ensure_isolated_build_env()
+                except RuntimeError as e_environment:
+                    self._log_to_terminal(f"❌ 隔离构建环境不可用: {e_environment}", "ERROR")
+                    self.update_status("🔴", "构建环境不可用")
+                    self._update_progress_ui(0, "构建环境不可用")
+                    self.root.after(0, self.show_error, "隔离构建环境不可用",
+                                    f"{e_environment}\n\n请检查锁定文件与本地 wheel 目录，或在“高级设置”中关闭隔离构建环境。")
+                    return
+            if remote_agent_url: # 在远程构建代理上构建，代理根据上传的选项生成自己的 .spec
+                pyinstaller_command_list = [f"[远程构建代理 {remote_agent_url}]", "pyinstaller", f"{self._resolve_build_paths()['app_name']}.spec"]
+            elif self.build_from_spec.get(): # 基于规范 .spec 文件构建 (配置未变化时复用现有 .spec)
+                pyinstaller_command_list = self._generate_spec_build_command(incremental=incremental_build)
+            else:
+                pyinstaller_command_list = self.generate_command(incremental=incremental_build) # 获取根据UI配置生成的命令列表
             
-            _log_and_buffer_build_output("🚀 PyInstaller Studio Pro 开始执行构建...")
-            _log_and_buffer_build_output(f"🛠️ 完整执行命令: {' '.join(pyinstaller_command_list)}")
-            _log_and_buffer_build_output("=" * 80) # 日志分隔线
+            _log_build_output("🚀 PyInstaller Studio Pro 开始执行构建...")
+            _log_build_output(f"🛠️ 完整执行命令: {' '.join(pyinstaller_command_list)}")
+            _log_build_output("=" * 80) # 日志分隔线
             
             self._update_progress_ui(0.05, "正在准备PyInstaller环境...") 
+            build_interpreter = str(self._isolated_build_env_python) if use_isolated_build_env else self.python_interpreter.get().strip()
+            if build_interpreter and not remote_agent_url: # 确认所选解释器中安装了 PyInstaller (元数据有缓存，通常无需启动解释器)
+                try:
+                    interpreter_info = self.interpreter_registry.describe(build_interpreter)
+                except RuntimeError as e_interpreter:
+                    interpreter_info = {"pyinstaller": None, "error": str(e_interpreter)}
+                if not interpreter_info["pyinstaller"]:
+                    interpreter_problem = interpreter_info.get("error") or f"解释器 {build_interpreter} 中未安装 PyInstaller。"
+                    self._log_to_terminal(f"❌ {interpreter_problem}", "ERROR")
+                    self.update_status("🔴", "构建解释器不可用")
+                    self._update_progress_ui(0, "构建解释器不可用")
+                    self.root.after(0, self.show_error, "构建解释器不可用",
+                                    f"{interpreter_problem}\n\n请在该环境中安装 PyInstaller (<解释器> -m pip install pyinstaller)，"
+                                    f"或清空“构建用 Python 解释器”以使用 PATH 中的 pyinstaller。")
+                    return
+                self._log_to_terminal(f"🐍 构建用解释器: {interpreter_info['interpreter']} (Python {interpreter_info['version']}，PyInstaller {interpreter_info['pyinstaller']})", "INFO")
+            if self.add_data_list: # 构建前增量复查数据文件 (只重新哈希发生变化的文件)，发现问题仅给出警告
+                try:
+                    self._log_data_file_index_report(self._create_data_file_index().validate(
+                        list(self.add_data_list), self._get_data_entry_filters(self.add_data_list)))
+                except Exception as e_index:
+                    self._log_to_terminal(f"⚠️ 构建前检查数据文件时出错: {e_index}", "WARNING")
             
             # 确定PyInstaller命令的执行工作目录 (通常是主脚本所在的目录)
             script_file_full_path = self.script_path.get()
             command_execution_cwd = str(Path(script_file_full_path).parent) if script_file_full_path else os.getcwd()
 
-            # 启动PyInstaller子进程
-            pyinstaller_process = subprocess.Popen(
-                pyinstaller_command_list, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.STDOUT, # 将标准错误合并到标准输出
-                text=True,                # 以文本模式处理输出
-                universal_newlines=True,  # 确保换行符在各平台一致
-                encoding='utf-8',         # 指定UTF-8编码
-                errors='replace',         # 替换无法解码的字符
-                cwd=command_execution_cwd, # 设置工作目录
-                # 在Windows上不创建额外的命令行窗口
-                creationflags=(subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0) 
-            )
-            
-            # 定义一些用于估算进度的关键词和对应的进度值
-            # 这些是基于典型PyInstaller输出的经验值，可能不完全精确
-            progress_estimation_keywords = {
-                "INFO: PyInstaller:": 0.10, 
-                "INFO: Extending PYTHONPATH": 0.15,
-                "INFO: Analyzing": 0.20,        # 开始分析依赖
-                "INFO: Building PYZ": 0.40,     # 开始构建PYZ压缩包
-                "INFO: Building PKG": 0.60,     # 开始构建PKG包
-                "INFO: Building EXE": 0.75,     # 开始构建EXE
-                "INFO: Appending archive to EXE": 0.90,
-                "INFO: Building EXE from EXE-00.toc completed successfully.": 0.98, # EXE构建完成
-            }
+            build_fingerprint = None
+            if self.use_artifact_store.get() and not remote_agent_url: # 输入与以前某次构建完全相同时直接恢复其产物
+                build_fingerprint = self._compute_build_fingerprint(pyinstaller_command_list)
+                if self._active_build_id != build_id: # 计算指纹 (哈希整个项目) 期间构建已被取消
+                    return
+                if build_fingerprint and self._restore_build_from_artifact_store(build_fingerprint, build_start_time, build_id):
+                    return
 
-            # 实时读取并处理PyInstaller的输出
-            for output_line_from_pyi in pyinstaller_process.stdout:
-                _log_and_buffer_build_output(output_line_from_pyi) # 记录到UI和缓冲区
-                
-                # 根据输出内容估算并更新进度条
-                for keyword, progress_val in progress_estimation_keywords.items():
-                    if keyword in output_line_from_pyi:
-                        # 尝试提取 "INFO: " 后面的部分作为进度条旁边的状态文本
-                        status_text_candidate = output_line_from_pyi.strip()
-                        info_prefix = "INFO: "
-                        if status_text_candidate.startswith(info_prefix):
-                            status_text_candidate = status_text_candidate[len(info_prefix):]
-                        
-                        self._update_progress_ui(progress_val, status_text_candidate)
-            
-            pyinstaller_process.wait() # 等待PyInstaller进程执行完毕
+            if remote_agent_url:
+                build_returncode = self._run_remote_build(remote_agent_url, build_id, build_events, output_parser, incremental_build)
+                if build_returncode is None: # 构建已被取消，取消逻辑已负责更新UI
+                    return
+            else:
+                # 启动PyInstaller子进程
+                pyinstaller_process = subprocess.Popen(
+                    pyinstaller_command_list, 
+                    stdout=subprocess.PIPE, 
+                    stderr=subprocess.STDOUT, # 将标准错误合并到标准输出
+                    bufsize=0,                # 以二进制方式无缓冲读取，由 ProcessOutputReader 分块解码 (UTF-8，无法解码的字符被替换)
+                    env=ProcessOutputReader.child_environment(), # 关闭 PyInstaller (Python) 自身的输出缓冲，进度不再被延迟
+                    cwd=command_execution_cwd, # 设置工作目录
+                    # 在Windows上不创建额外的命令行窗口；使用独立的进程组/会话，以便取消时能结束整个进程树
+                    creationflags=((subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP) if sys.platform == "win32" else 0),
+                    start_new_session=(sys.platform != "win32")
+                )
+                self._build_process = pyinstaller_process # 记录子进程，以便取消构建时终止整个进程树
+                if self._active_build_id != build_id: # 进程启动前构建就已被取消
+                    self._terminate_cancelled_build_process(pyinstaller_process)
+                    return
             
+                # 实时分块读取PyInstaller的输出，每批行一起写入日志并解析为结构化事件
+                for output_line_batch in ProcessOutputReader(pyinstaller_process.stdout).iter_line_batches():
+                    if self._active_build_id != build_id: # 构建已取消：取消逻辑可能没有看到本进程 (例如在记录进程之前取消)，这里再终止一次
+                        self._terminate_cancelled_build_process(pyinstaller_process)
+                        return
+                    self._log_to_terminal([output_line.strip() for output_line in output_line_batch], "BUILD")
+                    self._handle_build_events(output_parser.parse_batch(output_line_batch), build_events)
+
+                build_returncode = pyinstaller_process.wait() # 等待PyInstaller进程执行完毕
+
+                if self._active_build_id != build_id: # 构建已被取消，取消逻辑已负责更新UI
+                    return
+
             # --- 处理构建结果 ---
-            if pyinstaller_process.returncode == 0: # 返回码为0表示成功
+            build_summary = PyInstallerOutputParser.summarize(build_events)
+            if remote_agent_url: # 日志中的路径位于代理上；warn 文件已随产物下载到本地的 workpath
+                build_summary["warn_file"] = None
+            bundle_analysis = self._analyze_bundle_after_build() if build_returncode == 0 else None
+            self._record_build_history(pyinstaller_command_list, build_returncode, build_start_time, build_summary, bundle_analysis)
+            if build_returncode == 0: # 返回码为0表示成功
                 self._update_progress_ui(1.0, "构建成功完成！")
-                _log_and_buffer_build_output("\n" + "=" * 80)
-                _log_and_buffer_build_output("✅ 构建成功完成！")
+                _log_build_output("\n" + "=" * 80)
+                _log_build_output("✅ 构建成功完成！")
                 
                 output_directory_str = self.output_dir.get() or str(Path(command_execution_cwd) / 'dist')
                 app_name_final = self.app_name.get() or Path(script_file_full_path).stem
                 final_output_location = Path(output_directory_str) / app_name_final
                 
-                _log_and_buffer_build_output(f"📁 输出文件应位于 (或其子目录内): {final_output_location.resolve()}")
-                _log_and_buffer_build_output(f"⏰ 构建完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                _log_build_output(f"📁 输出文件应位于 (或其子目录内): {final_output_location.resolve()}")
+                _log_build_output(f"⏰ 构建完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                if build_fingerprint and not incremental_build: # 监视模式的中间产物不入库，以免挤掉有用的产物
+                    self._store_build_artifact(build_fingerprint, pyinstaller_command_list)
                 
                 self.update_status("🟢", "构建成功")
                 if self.root.winfo_exists(): # 确保主窗口存在再弹窗
@@ -1492,23 +8166,12 @@ class UltraModernPyInstallerGUI:
                 current_progress_val = self.progress_bar.get() if hasattr(self,'progress_bar') and self.progress_bar.winfo_exists() else 0.95
                 self._update_progress_ui(current_progress_val, "构建失败") 
                 
-                _log_and_buffer_build_output("\n" + "=" * 80)
-                _log_and_buffer_build_output(f"❌ 构建失败！PyInstaller 返回代码: {pyinstaller_process.returncode}。")
+                _log_build_output("\n" + "=" * 80)
+                _log_build_output(f"❌ 构建失败！PyInstaller 返回代码: {build_returncode}。")
                 self.update_status("🔴", "构建失败")
                 
-                # --- 从日志缓冲区中尝试提取更具体的错误原因 ---
-                extracted_error_cause = "未知错误，请仔细查看上面的完整构建日志。" # 默认错误信息
-                for log_entry_str in reversed(log_buffer_for_error_analysis): # 从后向前查找错误信息
-                    log_entry_lower = log_entry_str.lower() # 转为小写方便匹配
-                    if log_entry_str.startswith("ERROR:") or \
-                       "modulenotfounderror" in log_entry_lower or \
-                       "filenotfounderror" in log_entry_lower or \
-                       "importerror" in log_entry_lower:
-                        extracted_error_cause = log_entry_str # 使用找到的第一个错误行
-                        break 
-                    elif "is not empty. please remove all its contents" in log_entry_lower:
-                        extracted_error_cause = "目标输出目录非空。请手动清空该目录或其子目录后重试。"
-                        break
+                # --- 使用构建事件中的最后一个错误作为主要原因 ---
+                extracted_error_cause = build_summary["error_cause"] or "未知错误，请仔细查看上面的完整构建日志。"
                 
                 if self.root.winfo_exists():
                     self.root.after(0, lambda err_cause=extracted_error_cause: self.show_error(
@@ -1517,6 +8180,9 @@ class UltraModernPyInstallerGUI:
                         f"可能的主要原因:\n{err_cause}\n\n"
                         f"请查看“构建输出”选项卡中的完整日志以获取详细信息。"
                     ))
+
+            # --- 构建后分析 warn 文件 (无论成功或失败)，将缺失模块反馈到隐藏导入/排除模块 ---
+            warn_analysis_arguments = (build_summary.get("warn_file"), build_returncode != 0)
                 
         except FileNotFoundError as e_pyinstaller_not_found: 
             # 特别处理 PyInstaller 命令本身找不到的情况
@@ -1543,15 +8209,385 @@ class UltraModernPyInstallerGUI:
                 )
             
         finally:
-            # 无论构建成功与否，最终都需要重置UI的构建按钮状态
-            self._reset_build_button_ui_state()
+            # 无论构建成功与否，最终都需要重置UI的构建按钮状态 (已取消的构建由取消逻辑负责)
+            if self._active_build_id == build_id:
+                self._build_process = None
+                self._reset_build_button_ui_state()
+                if warn_analysis_arguments is not None: # 分析 (重新构建依赖图) 在单独的线程中进行，不再占用构建状态
+                    threading.Thread(target=self._analyze_warn_file_after_build, args=warn_analysis_arguments, daemon=True).start()
+
+    def _run_remote_build(self, agent_url: str, build_id: int, build_events: list, output_parser: PyInstallerOutputParser,
+                          incremental_build: bool) -> int | None:
+        """
+        (后台线程) 在远程构建代理上构建：准备源码快照，只上传代理上缺失的文件内容，提交任务，
+        把代理流式返回的日志当作本地 PyInstaller 输出处理，最后把产物下载到本地的输出目录。
+
+        Returns:
+            int | None: PyInstaller 在代理上的返回码；构建被取消时返回 None。
+
+        Raises:
+            ConnectionError: 无法与构建代理通信。
+        """
+        cancel_event = threading.Event()
+        self._remote_build_cancel_event = cancel_event
+        if self._active_build_id != build_id: # 在设置取消事件之前已被取消
+            cancel_event.set()
+        remote_build_job = None
+
+        def _cancel_submitted_job():
+            """构建已取消时由本线程通知代理取消任务：取消逻辑可能在任务提交完成之前运行，没有看到该任务。"""
+            try:
+                remote_build_job[0].cancel_job(remote_build_job[1])
+                self._log_to_terminal(f"⏹️ 已通知构建代理取消任务 {remote_build_job[1]}。", "INFO")
+            except (OSError, http.client.HTTPException, ValueError) as e_cancel:
+                self._log_to_terminal(f"⚠️ 通知构建代理取消任务 {remote_build_job[1]} 失败: {e_cancel}", "WARNING")
+
+        try:
+            agent_client = BuildAgentClient(agent_url, self.remote_agent_token.get().strip() or None, logger_func=self._log_to_terminal)
+            agent_info = agent_client.get_info()
+            self._log_to_terminal(f"🛰️ 已连接构建代理 {agent_url}: {agent_info.get('platform')}/{agent_info.get('machine')}，"
+                                  f"Python {agent_info.get('python')}，PyInstaller {agent_info.get('pyinstaller') or '(未安装)'}", "INFO")
+            if agent_info.get("protocol") != BUILD_AGENT_PROTOCOL_VERSION:
+                raise ConnectionError(f"构建代理的协议版本 ({agent_info.get('protocol')}) 与本程序 ({BUILD_AGENT_PROTOCOL_VERSION}) 不一致，请使用相同版本的程序启动代理。")
+            if agent_info.get("platform") != sys.platform:
+                self._log_to_terminal(f"⚠️ 构建代理运行在 {agent_info.get('platform')} 上，产物将是该平台的可执行文件 (PyInstaller 不支持交叉编译)。", "WARNING")
+
+            self._update_progress_ui(0.06, "正在准备源码快照...")
+            build_paths = self._resolve_build_paths()
+            project_root = Path(self.project_root_dir.get() or build_paths["cwd"])
+            snapshot_hash_index = DataFileIndex(self._get_project_cache_dir() / 'snapshot_index.json', logger_func=self._log_to_terminal)
+            source_snapshot = agent_client.prepare_snapshot(self._collect_spec_options(), project_root, snapshot_hash_index)
+            self._log_to_terminal(f"📦 源码快照: {len(source_snapshot['manifest'])} 个文件，共 {format_byte_size(source_snapshot['total_bytes'])} "
+                                  f"(重新哈希 {source_snapshot['hashed_count']} 个)。", "INFO")
+            upload_stats = agent_client.upload_snapshot(source_snapshot, cancel_event)
+            if self._active_build_id != build_id:
+                return None
+            self._log_to_terminal(f"⬆️ 已上传 {upload_stats['uploaded_count']} 个文件内容 ({format_byte_size(upload_stats['uploaded_bytes'])})，"
+                                  f"{upload_stats['reused_count']} 个已在代理上，无需重复上传。", "INFO")
+
+            workspace_id = f"{platform.node()}|{project_root.resolve()}|{build_paths['app_name']}" # 同一项目/应用复用代理上的工作区与构建缓存
+            job_id = agent_client.submit_job(workspace_id, source_snapshot, clean=self.is_clean.get() and not incremental_build)
+            remote_build_job = (agent_client, job_id)
+            self._remote_build_job = remote_build_job
+            if self._active_build_id != build_id:
+                _cancel_submitted_job()
+                return None
+            end_event = None
+            for job_event in agent_client.stream_events(job_id):
+                if self._active_build_id != build_id: # 构建已取消 (取消逻辑也可能已通知代理，重复取消没有影响)
+                    _cancel_submitted_job()
+                    return None
+                if job_event["kind"] == "log":
+                    self._log_to_terminal(job_event["text"], "BUILD")
+                    self._handle_build_event(output_parser.parse_line(job_event["text"]), build_events)
+                elif job_event["kind"] == "end":
+                    end_event = job_event
+            if self._active_build_id != build_id:
+                return None
+            if end_event.get("artifact"):
+                self._update_progress_ui(0.98, "正在下载构建产物...")
+                extracted_outputs = agent_client.download_artifact(job_id, build_paths["dist_path"], build_paths["work_path"], build_paths["app_name"])
+                if extracted_outputs:
+                    self._log_to_terminal(f"⬇️ 已下载构建产物: {', '.join(str(output_path) for output_path in extracted_outputs)}", "INFO")
+        except (OSError, http.client.HTTPException, ValueError) as e_agent: # ConnectionError 是 OSError 的子类
+            raise ConnectionError(f"与构建代理 {agent_url} 通信失败: {e_agent}") from e_agent
+        finally:
+            if self._remote_build_job is remote_build_job: # 不清除更新的构建设置的任务
+                self._remote_build_job = None
+            if self._remote_build_cancel_event is cancel_event:
+                self._remote_build_cancel_event = None
+        return end_event["returncode"] if end_event["returncode"] is not None else 1
+
+    def _handle_build_event(self, build_event: BuildEvent, build_events: list):
+        """
+        (后台线程) 处理构建输出解析出的一个事件：保存事件并在需要时更新进度条。
+
+        Args:
+            build_event (BuildEvent): 新解析出的事件。
+            build_events (list[BuildEvent]): 本次构建的事件列表 (事件会被追加到其中)。
+        """
+        build_events.append(build_event)
+        if build_event.progress is not None:
+            self._update_progress_ui(build_event.progress, build_event.message)
+
+    def _handle_build_events(self, batch_events: list, build_events: list):
+        """(后台线程) 处理同一批输出解析出的事件：全部保存，进度条只按其中最后一个带进度的事件更新一次。"""
+        build_events.extend(batch_events)
+        for build_event in reversed(batch_events):
+            if build_event.progress is not None:
+                self._update_progress_ui(build_event.progress, build_event.message)
+                break
+
+    def _compute_build_fingerprint(self, command_list: list[str]) -> str | None:
+        """
+        (后台线程) 计算本次构建的指纹：命令 + 输入文件内容 (与远程构建的源码快照相同，增量哈希) + 工具链。
+        位于项目内的输出目录和临时构建目录不计入输入。无法计算时返回 None (本次不使用产物仓库)。
+        """
+        try:
+            fingerprint_start_time = time.perf_counter()
+            build_paths = self._resolve_build_paths()
+            project_root = Path(self.project_root_dir.get() or build_paths["cwd"]).resolve()
+            snapshot_hash_index = DataFileIndex(self._get_project_cache_dir() / 'snapshot_index.json', logger_func=self._log_to_terminal)
+            source_snapshot = BuildAgentClient.prepare_snapshot(self._collect_spec_options(), project_root, snapshot_hash_index)
+            output_prefixes = []
+            for output_dir in (build_paths["dist_path"], build_paths["work_root"]):
+                resolved_output_dir = Path(output_dir).resolve()
+                if resolved_output_dir != project_root and resolved_output_dir.is_relative_to(project_root):
+                    output_prefixes.append(resolved_output_dir.relative_to(project_root).as_posix() + "/")
+            input_manifest = {relative_path: content_hash for relative_path, content_hash in source_snapshot["manifest"].items()
+                              if not relative_path.startswith(tuple(output_prefixes))}
+            build_fingerprint = BuildArtifactStore.compute_fingerprint(command_list, input_manifest, BuildArtifactStore.describe_toolchain(command_list))
+        except (OSError, RuntimeError, ValueError, subprocess.SubprocessError) as e_fingerprint:
+            self._log_to_terminal(f"⚠️ 无法计算构建指纹，本次不使用产物仓库: {e_fingerprint}", "WARNING")
+            return None
+        self._log_to_terminal(f"🔑 构建指纹 {build_fingerprint[:12]}: {len(input_manifest)} 个输入文件 (重新哈希 {source_snapshot['hashed_count']} 个)，"
+                              f"耗时 {(time.perf_counter() - fingerprint_start_time) * 1000:.0f} 毫秒。", "DEBUG")
+        return build_fingerprint
+
+    def _collect_build_outputs(self) -> list[Path]:
+        """返回当前配置在输出目录中的全部产物 (onefile 的可执行文件或 onedir 的目录，macOS 窗口模式下另有 .app 包)。"""
+        build_paths = self._resolve_build_paths()
+        output_base = build_paths["dist_path"] / build_paths["app_name"]
+        if self.is_onefile.get():
+            onefile_path = output_base.with_name(output_base.name + ".exe") if sys.platform == "win32" else output_base
+            build_outputs = [onefile_path] if onefile_path.is_file() else []
+        else:
+            build_outputs = [output_base] if output_base.is_dir() else []
+        app_bundle_path = output_base.with_name(output_base.name + ".app")
+        if sys.platform == "darwin" and self.is_windowed.get() and app_bundle_path.is_dir():
+            build_outputs.append(app_bundle_path)
+        return build_outputs
+
+    @staticmethod
+    def _describe_link_methods(link_methods: dict) -> str:
+        method_names = {"reflink": "reflink", "hardlink": "硬链接", "copy": "复制"}
+        return "、".join(f"{method_names[method]} {count} 个" for method, count in link_methods.items() if method in method_names) or "无文件"
+
+    def _restore_build_from_artifact_store(self, build_fingerprint: str, build_start_time: float, build_id: int) -> bool:
+        """
+        (后台线程) 指纹在产物仓库中有对应产物时将其恢复到输出目录并按构建成功更新界面。
+        恢复期间登记在 _terminating_builds 中 (取消后也不会有新的构建同时写入输出目录)；构建已被取消时不恢复、不更新界面。
+
+        Returns:
+            bool: 已恢复 (无需再运行 PyInstaller) 或构建已被取消时返回 True。
+        """
+        if self.artifact_store.lookup(build_fingerprint) is None:
+            self._log_to_terminal(f"🗄️ 产物仓库中没有输入相同的产物 (指纹 {build_fingerprint[:12]})，执行完整构建。", "INFO")
+            return False
+        if self._active_build_id != build_id:
+            return True
+        self._update_progress_ui(0.5, "正在从产物仓库恢复...")
+        restoring_key = object()
+        self._terminating_builds[restoring_key] = []
+        try:
+            restore_result = self.artifact_store.restore(build_fingerprint, self._resolve_build_paths()["dist_path"])
+        except OSError as e_restore:
+            self._log_to_terminal(f"⚠️ 从产物仓库恢复失败，改为完整构建: {e_restore}", "WARNING")
+            return self._active_build_id != build_id
+        finally:
+            self._terminating_builds.pop(restoring_key, None)
+            if self.root.winfo_exists():
+                self.root.after(0, self._on_build_termination_finished)
+        if self._active_build_id != build_id: # 恢复期间构建已被取消，取消逻辑已负责更新UI
+            return True
+        if restore_result is None:
+            return False
+        self._log_to_terminal(f"♻️ 输入与以前的一次构建完全相同，已在 {restore_result['elapsed_seconds'] * 1000:.0f} 毫秒内从产物仓库恢复 "
+                              f"{restore_result['file_count']} 个文件 ({format_byte_size(restore_result['total_bytes'])}，"
+                              f"{self._describe_link_methods(restore_result['link_methods'])})，未运行 PyInstaller。", "SUCCESS")
+        for restored_path in restore_result["outputs"]:
+            self._log_to_terminal(f"📁 产物: {restored_path}", "INFO")
+        self._update_progress_ui(1.0, "已从产物仓库恢复！")
+        self.update_status("🟢", "构建成功 (复用产物)")
+        if self.root.winfo_exists():
+            self.root.after(0, lambda: self.show_success("构建成功", f"输入未变化，已直接复用之前构建的产物 (耗时 {time.time() - build_start_time:.1f} 秒)。\n"
+                                                                    "如需强制重新构建，请关闭“♻️ 复用相同输入的产物”。"))
+        return True
+
+    def _store_build_artifact(self, build_fingerprint: str, command_list: list[str]):
+        """(后台线程) 构建成功后将产物存入产物仓库；构建期间输入发生变化时不入库 (产物可能与指纹不符)。"""
+        try:
+            if self._compute_build_fingerprint(command_list) != build_fingerprint:
+                self._log_to_terminal("🗄️ 构建期间输入文件发生了变化，本次产物不存入产物仓库。", "INFO")
+                return
+            store_start_time = time.perf_counter()
+            stored_entry = self.artifact_store.store(build_fingerprint, self._collect_build_outputs(), {
+                "app_name": self._resolve_build_paths()["app_name"],
+                "onefile": self.is_onefile.get(),
+                "script_path": self.script_path.get(),
+            })
+        except Exception as e_store:
+            self._log_to_terminal(f"⚠️ 保存产物到产物仓库时出错: {e_store}", "WARNING")
+            return
+        if stored_entry:
+            self._log_to_terminal(f"🗄️ 产物已存入产物仓库 (指纹 {stored_entry['fingerprint'][:12]}，{format_byte_size(stored_entry['total_bytes'])}，"
+                                  f"{self._describe_link_methods(stored_entry['link_methods'])}，耗时 {(time.perf_counter() - store_start_time) * 1000:.0f} 毫秒)。"
+                                  "下次输入相同时将直接恢复。", "INFO")
+
+    def _record_build_history(self, command_list: list[str], return_code: int, build_start_time: float, build_summary: dict,
+                              bundle_analysis: dict | None = None):
+        """
+        (后台线程) 将本次构建的摘要追加到构建历史记录中。
+
+        Args:
+            command_list (list[str]): 执行的 PyInstaller 命令。
+            return_code (int): PyInstaller 进程的返回码。
+            build_start_time (float): 构建开始时间 (time.time())。
+            build_summary (dict): PyInstallerOutputParser.summarize() 的返回值。
+            bundle_analysis (dict, optional): BundleSizeAnalyzer.analyze() 的返回值 (仅构建成功时)。
+        """
+        build_paths = self._resolve_build_paths()
+        bundle_fields = {}
+        if bundle_analysis:
+            bundle_fields = {
+                "bundle_total_bytes": bundle_analysis["total_bytes"],
+                "bundle_fingerprint": bundle_analysis["fingerprint"],
+                "bundle_package_sizes": {name: stats["bytes"] for name, stats in bundle_analysis["packages"].items()},
+            }
+        self.build_history_store.append({
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "app_name": build_paths["app_name"],
+            "script_path": self.script_path.get(),
+            "onefile": self.is_onefile.get(),
+            "success": return_code == 0,
+            "return_code": return_code,
+            "duration_seconds": round(time.time() - build_start_time, 3),
+            "command": command_list,
+            "dist_path": str(build_paths["dist_path"]),
+            "work_path": str(build_paths["work_path"]),
+            **build_summary,
+            **bundle_fields,
+        })
+
+    def _locate_build_output(self, dist_path: Path | None = None, onefile: bool | None = None) -> Path | None:
+        """
+        根据当前配置查找构建产物：onedir 为 dist/<应用名> 目录，onefile 为 dist/<应用名>[.exe]，
+        macOS 窗口模式下还可能是 dist/<应用名>.app。
+
+        Args:
+            dist_path (Path, optional): 覆盖配置中的输出目录 (例如临时构建目录中的 dist)。
+            onefile (bool, optional): 覆盖配置中的打包模式。
+
+        Returns:
+            Path | None: 找到的产物路径，不存在时返回 None。
+        """
+        build_paths = self._resolve_build_paths()
+        output_base = (dist_path if dist_path is not None else build_paths["dist_path"]) / build_paths["app_name"]
+        is_onefile = self.is_onefile.get() if onefile is None else onefile
+        candidate_paths = [output_base.with_name(output_base.name + ".exe"), output_base] if is_onefile else [output_base]
+        candidate_paths.append(output_base.with_name(output_base.name + ".app"))
+        for candidate_path in candidate_paths:
+            if candidate_path.exists():
+                return candidate_path
+        return None
+
+    def _find_previous_bundle_record(self, app_name: str, current_fingerprint: list) -> dict | None:
+        """在构建历史中查找与当前产物不同的、最近一次带体积数据的构建记录 (用于体积对比)。"""
+        for history_record in reversed(self.build_history_store.load(app_name=app_name)):
+            if history_record.get("bundle_package_sizes") is not None and history_record.get("bundle_fingerprint") != current_fingerprint:
+                return history_record
+        return None
+
+    def _analyze_bundle_after_build(self) -> dict | None:
+        """
+        (后台线程) 构建成功后分析产物体积，并在日志中列出最大的几个包以及与上次构建相比的变化。
+
+        Returns:
+            dict | None: BundleSizeAnalyzer.analyze() 的返回值；找不到产物或分析失败时为 None。
+        """
+        output_target = self._locate_build_output()
+        if output_target is None:
+            return None
+        try:
+            bundle_analysis = BundleSizeAnalyzer(logger_func=self._log_to_terminal).analyze(output_target)
+        except OSError as e_analyze:
+            self._log_to_terminal(f"⚠️ 分析构建产物体积时出错: {e_analyze}", "WARNING")
+            return None
+        largest_packages = sorted(bundle_analysis["packages"].items(), key=lambda item: item[1]["bytes"], reverse=True)[:5]
+        self._log_to_terminal(f"📊 构建产物总大小: {format_byte_size(bundle_analysis['total_bytes'])}。体积最大的包: " +
+                              ", ".join(f"{name} ({format_byte_size(stats['bytes'])})" for name, stats in largest_packages), "INFO")
+        previous_record = self._find_previous_bundle_record(self._resolve_build_paths()["app_name"], bundle_analysis["fingerprint"])
+        if previous_record:
+            total_change = bundle_analysis["total_bytes"] - previous_record.get("bundle_total_bytes", 0)
+            self._log_to_terminal(f"📊 与上次构建 ({previous_record.get('timestamp', '?')}) 相比: {'+' if total_change >= 0 else '-'}{format_byte_size(abs(total_change))}。"
+                                  "可在“工具箱 → 📊 分析包体积”中查看明细。", "INFO")
+        return bundle_analysis
+
+    def _resolve_build_paths(self) -> dict:
+        """
+        根据当前配置推算 PyInstaller 使用的各个路径 (与 generate_command 中的规则保持一致)。
+
+        Returns:
+            dict: 包含以下键的字典 (值均为 Path，app_name 为 str)：
+                  app_name   - 应用名称 (未设置时为主脚本文件名)
+                  cwd        - 执行 PyInstaller 的工作目录 (主脚本所在目录)
+                  dist_path  - 输出目录 (--distpath)
+                  spec_dir   - .spec 文件所在目录 (--specpath)
+                  work_root  - 临时构建根目录 (--workpath)
+                  work_path  - 本应用实际使用的临时构建目录 (work_root / app_name，warn/xref 文件位于此处)
+        """
+        script_path_str = self.script_path.get()
+        app_name_str = self.app_name.get() or (Path(script_path_str).stem if script_path_str else "")
+        command_cwd = Path(script_path_str).parent if script_path_str else Path.cwd()
+        output_dir_str = self.output_dir.get()
+        if output_dir_str:
+            dist_path = Path(output_dir_str).resolve()
+            spec_dir = dist_path.parent
+            work_root = spec_dir / f"build_{app_name_str}"
+        else: # PyInstaller 默认路径均相对于执行时的工作目录
+            dist_path = command_cwd / 'dist'
+            spec_dir = command_cwd
+            work_root = command_cwd / 'build'
+        return {
+            "app_name": app_name_str,
+            "cwd": command_cwd,
+            "dist_path": dist_path,
+            "spec_dir": spec_dir,
+            "work_root": work_root,
+            "work_path": work_root / app_name_str,
+        }
+
+    def _get_project_cache_dir(self) -> Path:
+        """
+        返回当前项目的缓存目录。按项目根目录 (未设置时为主脚本所在目录) 区分，
+        同一项目下的所有配置 (不同应用名、输出目录) 共用同一个目录，位于用户目录下而不是项目中。
+        """
+        project_root_str = self.project_root_dir.get() or (str(Path(self.script_path.get()).parent) if self.script_path.get() else str(Path.cwd()))
+        project_key = hashlib.sha256(str(Path(project_root_str).resolve()).encode("utf-8")).hexdigest()[:16]
+        return Path.home() / '.pyinstaller_studio_pro_v3_1' / 'analysis_cache' / project_key
+
+    def _get_shared_analysis_cache(self) -> SharedAnalysisCache:
+        """返回当前项目的共享分析缓存 (同一项目的所有配置共用)。"""
+        cache_dir = self._get_project_cache_dir()
+        if self._shared_analysis_cache is None or self._shared_analysis_cache.cache_dir != cache_dir:
+            if self._shared_analysis_cache is not None:
+                self._shared_analysis_cache.flush()
+            self._shared_analysis_cache = SharedAnalysisCache(cache_dir, logger_func=self._log_to_terminal)
+        return self._shared_analysis_cache
+
+    def _get_pyinstaller_command_prefix(self) -> list[str]:
+        """
+        返回当前配置的 PyInstaller 命令开头：隔离构建环境已就绪时使用环境中的 python，
+        指定了构建用解释器时为 [解释器, "-m", "PyInstaller"]，否则为 ["pyinstaller"]。
+        """
+        return InterpreterRegistry.build_command_prefix(self._get_build_interpreter_path())
 
-    def generate_command(self) -> list[str]:
+    def _get_build_interpreter_path(self) -> str | None:
+        """返回本地构建使用的解释器：已就绪的隔离构建环境中的 python，或所选的构建用解释器；都没有时为 None (使用 PATH 中的 pyinstaller)。"""
+        if self.use_isolated_build_env.get() and self._isolated_build_env_python is not None:
+            return str(self._isolated_build_env_python)
+        return self.python_interpreter.get().strip() or None
+
+    def generate_command(self, incremental: bool = False) -> list[str]:
         """
         根据当前UI上的配置，生成 PyInstaller 的命令行参数列表。
         当指定输出目录时，会自动将 workpath (build目录) 和 specpath (spec文件目录)
         设置在输出目录附近，以保持文件结构整洁。
 
+        Args:
+            incremental (bool): 增量构建 (监视模式使用)：忽略“清理缓存”选项以复用上次的分析结果，
+                                并添加 --noconfirm 以免因输出目录非空而中断。
+
         Returns:
             list[str]: PyInstaller 命令及其参数组成的列表。如果关键配置（如主脚本）缺失，可能返回空列表。
         """
@@ -1563,13 +8599,14 @@ class UltraModernPyInstallerGUI:
             self._log_to_terminal("❌ 命令生成失败：未指定主脚本。", "ERROR")
             return []
 
-        command = ['pyinstaller'] # 初始化命令列表
+        command = self._get_pyinstaller_command_prefix() # 初始化命令列表 (pyinstaller 或 解释器 -m PyInstaller)
 
         # --- 基本打包选项 ---
         if self.is_onefile.get(): command.append('--onefile')
         if self.is_windowed.get(): command.append('--noconsole')
         if self.is_debug.get(): command.append('--debug=all')
-        if self.is_clean.get(): command.append('--clean')
+        if self.is_clean.get() and not incremental: command.append('--clean')
+        if incremental: command.append('--noconfirm')
 
         # --- 应用名称和图标 ---
         app_name_str = self.app_name.get()
@@ -1580,14 +8617,11 @@ class UltraModernPyInstallerGUI:
 
         # --- 路径相关选项 ---
         output_dir_user_specified_str = self.output_dir.get() # 用户在UI上指定的“构建输出目录”
-        
-        # 确定 .spec 文件名 (基于应用名或脚本名)
-        # PyInstaller 默认 spec 文件名与 --name 参数一致，若无 --name 则与脚本主文件名一致
-        spec_file_basename = (app_name_str or Path(script_path_str).stem) + ".spec"
+        build_paths = self._resolve_build_paths()
 
         if output_dir_user_specified_str:
             # 用户指定了输出目录
-            dist_path = Path(output_dir_user_specified_str).resolve() # 最终可执行文件/包的输出目录
+            dist_path = build_paths["dist_path"] # 最终可执行文件/包的输出目录
             command.extend(['--distpath', str(dist_path)])
 
             # 将 .spec 文件和 build 目录 (workpath) 放在 distpath 的父目录下，
@@ -1600,14 +8634,11 @@ class UltraModernPyInstallerGUI:
 
             # 确定 specpath (存放 .spec 文件的目录)
             # 我们将其设置为用户指定输出目录的父目录
-            spec_dir = dist_path.parent
-            command.extend(['--specpath', str(spec_dir)])
+            command.extend(['--specpath', str(build_paths["spec_dir"])])
 
             # 确定 workpath (存放 build 临时文件的目录)
-            # 我们将其设置为用户指定输出目录父目录下的一个 'build_[app_name]' 文件夹
-            build_dir_name = f"build_{app_name_str or Path(script_path_str).stem}"
-            work_path = spec_dir / build_dir_name # 与 .spec 文件同级
-            command.extend(['--workpath', str(work_path)])
+            # 我们将其设置为用户指定输出目录父目录下的一个 'build_[app_name]' 文件夹 (与 .spec 文件同级)
+            command.extend(['--workpath', str(build_paths["work_root"])])
         else:
             # 用户未指定输出目录，PyInstaller 将使用默认路径：
             # distpath: ./dist (相对于 spec 文件或当前工作目录)
@@ -1630,14 +8661,17 @@ class UltraModernPyInstallerGUI:
                 if hid_imp: command.extend(['--hidden-import', hid_imp])
 
         # --- 附加数据文件 ---
-        for data_entry_str in self.add_data_list:
-            if data_entry_str: command.extend(['--add-data', data_entry_str])
+        for data_entry_str in self._expand_data_entries_for_command():
+            command.extend(['--add-data', data_entry_str])
 
         # --- UPX 压缩 ---
+        # PyInstaller 没有 --upx 选项 (会被当作 --upx-dir 的缩写而吞掉下一个参数)：未指定目录时它会自动从 PATH 查找 UPX，
+        # 因此关闭开关时需要显式传入 --noupx，否则安装了 UPX 的机器上仍会压缩
         if self.is_upx.get():
             upx_dir_str = self.upx_dir.get()
             if upx_dir_str: command.extend(['--upx-dir', upx_dir_str])
-            else: command.append('--upx')
+        else:
+            command.append('--noupx')
 
         # --- (可选) 项目根目录作为附加搜索路径 ---
         project_root_path_str = self.project_root_dir.get()
@@ -1653,53 +8687,413 @@ class UltraModernPyInstallerGUI:
 
         return command
 
+    def _get_canonical_spec_path(self) -> Path:
+        """返回当前配置对应的规范 .spec 文件路径 (与 PyInstaller 用 --specpath/--name 生成的位置相同)。"""
+        build_paths = self._resolve_build_paths()
+        return build_paths["spec_dir"] / f"{build_paths['app_name']}.spec"
+
+    def _collect_spec_options(self) -> dict:
+        """收集生成 .spec 所需的全部输入 (与 generate_command 使用的配置一一对应)，同时作为 .spec 输入指纹的来源。"""
+        script_path_str = str(Path(self.script_path.get()).resolve())
+        data_pairs = []
+        for data_entry_str in self._expand_data_entries_for_command():
+            source_str, _, destination_str = data_entry_str.partition(os.pathsep)
+            data_pairs.append([source_str, destination_str or "."])
+        icon_path_str = self.icon_path.get()
+        return {
+            "script": script_path_str,
+            "name": self._resolve_build_paths()["app_name"],
+            "onefile": self.is_onefile.get(),
+            "console": not self.is_windowed.get(),
+            "debug": self.is_debug.get(),
+            "upx": self.is_upx.get(),
+            "icon": str(Path(icon_path_str).resolve()) if icon_path_str else None,
+            "pathex": [],
+            "datas": data_pairs,
+            "hiddenimports": [module_name.strip() for module_name in self.hidden_imports.get().split(',') if module_name.strip()],
+            "excludes": [module_name.strip() for module_name in self.exclude_modules.get().split(',') if module_name.strip()],
+            "macos_bundle": sys.platform == "darwin" and self.is_windowed.get(),
+        }
+
+    def _ensure_canonical_spec_file(self) -> Path:
+        """生成或复用当前配置的规范 .spec 文件，并在日志中说明采用的方式。"""
+        spec_file_path = self._get_canonical_spec_path()
+        spec_status, backup_path = SpecFileManager(spec_file_path, logger_func=self._log_to_terminal).ensure(self._collect_spec_options())
+        if spec_status == "created":
+            self._log_to_terminal(f"📝 已为当前配置生成 .spec 文件: {spec_file_path}", "INFO")
+        elif spec_status == "unchanged":
+            self._log_to_terminal(f"📝 配置未变化，复用现有 .spec 文件: {spec_file_path}", "INFO")
+        elif spec_status == "edited":
+            self._log_to_terminal(f"📝 .spec 文件已被手动修改且界面配置未变化，将直接使用修改后的文件: {spec_file_path}", "INFO")
+        else:
+            self._log_to_terminal(f"📝 配置已变化，已重新生成 .spec 文件: {spec_file_path}", "INFO")
+        if backup_path:
+            self._log_to_terminal(f"⚠️ 原 .spec 文件包含手动修改 (或不是由本程序生成)，已备份到: {backup_path}。"
+                                  "如需保留其中的修改，可通过“工具箱 → 📥 从 .spec 导入配置”导回界面后再构建。", "WARNING")
+        return spec_file_path
+
+    def _generate_spec_build_command(self, incremental: bool = False) -> list[str]:
+        """
+        生成基于规范 .spec 文件的构建命令。打包选项都已写在 .spec 中，
+        命令行只保留 PyInstaller 允许与 .spec 一起使用的构建选项 (--clean/--noconfirm/--distpath/--workpath/--upx-dir)。
+
+        Args:
+            incremental (bool): 增量构建 (监视模式使用)，含义与 generate_command 相同。
+
+        Returns:
+            list[str]: PyInstaller 命令及其参数组成的列表。未选择主脚本时返回空列表。
+        """
+        if not self.script_path.get():
+            self.show_error("命令生成错误", "未选择Python主脚本，无法生成PyInstaller命令！")
+            self._log_to_terminal("❌ 命令生成失败：未指定主脚本。", "ERROR")
+            return []
+        spec_file_path = self._ensure_canonical_spec_file()
+        command = self._get_pyinstaller_command_prefix()
+        if self.is_clean.get() and not incremental: command.append('--clean')
+        if incremental: command.append('--noconfirm')
+        if self.output_dir.get():
+            build_paths = self._resolve_build_paths()
+            command.extend(['--distpath', str(build_paths["dist_path"]), '--workpath', str(build_paths["work_root"])])
+        if self.is_upx.get() and self.upx_dir.get():
+            command.extend(['--upx-dir', self.upx_dir.get()])
+        command.append(str(spec_file_path))
+        self._log_to_terminal(f"⚙️ 生成的PyInstaller命令: {' '.join(command)}", "CMD")
+        return command
+
+
+
+    # --- 隔离构建环境 (按锁定文件缓存的干净虚拟环境) ---
+
+    def browse_build_env_lockfile(self):
+        """(UI回调) 选择隔离构建环境使用的 requirements 锁定文件。"""
+        selected_file_path = filedialog.askopenfilename(
+            title="请选择 requirements 锁定文件",
+            filetypes=[("Requirements 文件", "*.txt *.lock *.in"), ("所有文件", "*.*")],
+            initialdir=self.project_root_dir.get() or (str(Path(self.script_path.get()).parent) if self.script_path.get() else None),
+            parent=self.root
+        )
+        if selected_file_path:
+            self.build_env_lockfile.set(selected_file_path)
+            self._prepare_isolated_build_env_in_background()
+
+    def browse_build_env_wheel_dir(self):
+        """(UI回调) 选择隔离构建环境的本地 wheel 目录。"""
+        selected_directory_path = filedialog.askdirectory(title="请选择本地 wheel 目录", parent=self.root)
+        if selected_directory_path:
+            self.build_env_wheel_dir.set(selected_directory_path)
+            self._prepare_isolated_build_env_in_background()
+
+    def _on_isolated_build_env_toggled(self):
+        """(UI回调) 开启隔离构建环境时立即在后台准备环境；关闭时恢复使用构建用解释器。"""
+        if self.use_isolated_build_env.get():
+            self._prepare_isolated_build_env_in_background()
+        else:
+            self._isolated_build_env_python = None
+            self._set_isolated_build_env_status("未启用。")
+
+    def _resolve_isolated_build_env_inputs(self) -> tuple[Path, Path, str]:
+        """
+        确定隔离构建环境的输入：锁定文件、wheel 目录和基础解释器。
+
+        Returns:
+            tuple: (锁定文件, wheel 目录, 基础解释器路径)。
+
+        Raises:
+            RuntimeError: 找不到锁定文件或 wheel 目录。
+        """
+        project_dir = Path(self.project_root_dir.get() or (Path(self.script_path.get()).parent if self.script_path.get() else Path.cwd()))
+        lockfile_path = Path(self.build_env_lockfile.get()) if self.build_env_lockfile.get() else IsolatedBuildEnvironmentStore.find_lockfile(project_dir)
+        if lockfile_path is None or not lockfile_path.is_file():
+            raise RuntimeError(f"未找到锁定文件 (已查找 {project_dir} 中的 {' / '.join(IsolatedBuildEnvironmentStore.LOCKFILE_NAMES)})。" if lockfile_path is None
+                               else f"锁定文件不存在: {lockfile_path}")
+        if self.build_env_wheel_dir.get():
+            wheel_dir = Path(self.build_env_wheel_dir.get())
+        else:
+            wheel_dir = next((lockfile_path.parent / dir_name for dir_name in ("wheelhouse", "wheels") if (lockfile_path.parent / dir_name).is_dir()),
+                             lockfile_path.parent / "wheelhouse")
+        if not wheel_dir.is_dir():
+            raise RuntimeError(f"本地 wheel 目录不存在: {wheel_dir}\n可使用“📥 下载依赖到 wheel 目录”联网准备一次，之后创建环境不再需要网络。")
+        return lockfile_path, wheel_dir, self.python_interpreter.get().strip() or sys.executable
+
+    def _ensure_isolated_build_env(self) -> Path:
+        """
+        (后台线程) 返回当前锁定文件对应的隔离环境中的 python，环境不存在时创建 (已在后台创建中时等待其完成)。
+
+        Raises:
+            RuntimeError: 输入无效或环境创建失败。
+        """
+        lockfile_path, wheel_dir, base_interpreter = self._resolve_isolated_build_env_inputs()
+        base_interpreter_info = self.interpreter_registry.describe(base_interpreter)
+        environment_python_path = self.isolated_env_store.ensure_environment(lockfile_path, base_interpreter_info, wheel_dir)
+        self._isolated_build_env_python = environment_python_path
+        self._set_isolated_build_env_status(f"✅ 环境已就绪: {environment_python_path.parent.parent.name} ({lockfile_path.name}，Python {base_interpreter_info['version']})")
+        return environment_python_path
+
+    def _prepare_isolated_build_env_in_background(self):
+        """启用了隔离构建环境时，在后台线程中预先准备环境 (打开配置、修改锁定文件/wheel 目录时调用)，使其在点击构建前就绪。"""
+        if not self.use_isolated_build_env.get() or not self.script_path.get():
+            return
+        self._isolated_build_env_python = None
+        self._set_isolated_build_env_status("⏳ 正在后台准备隔离构建环境...")
+
+        def _prepare_in_thread():
+            try:
+                self._ensure_isolated_build_env()
+            except RuntimeError as e_environment:
+                self._log_to_terminal(f"⚠️ 隔离构建环境未就绪: {e_environment}", "WARNING")
+                self._set_isolated_build_env_status(f"❌ {str(e_environment).splitlines()[0]}")
+        threading.Thread(target=_prepare_in_thread, daemon=True).start()
+
+    def _set_isolated_build_env_status(self, status_text: str):
+        """更新隔离构建环境的状态文本 (可在任何线程中调用；“高级设置”尚未创建时只保存文本)。"""
+        self._isolated_build_env_status_text = status_text
+        def _apply_status():
+            if hasattr(self, 'isolated_env_status_label') and self.isolated_env_status_label.winfo_exists():
+                self.isolated_env_status_label.configure(text=status_text)
+        if self.root.winfo_exists():
+            self.root.after(0, _apply_status)
+
+    def fill_build_env_wheel_dir(self):
+        """(UI回调) 联网把锁定文件中的依赖和 PyInstaller 下载/构建为 wheel，保存到本地 wheel 目录 (pip wheel)。"""
+        project_dir = Path(self.project_root_dir.get() or (Path(self.script_path.get()).parent if self.script_path.get() else Path.cwd()))
+        lockfile_path = Path(self.build_env_lockfile.get()) if self.build_env_lockfile.get() else IsolatedBuildEnvironmentStore.find_lockfile(project_dir)
+        if lockfile_path is None or not lockfile_path.is_file():
+            self.show_warning("未找到锁定文件", "请先指定锁定文件，或在项目根目录中放置 requirements.lock / requirements.txt。")
+            return
+        wheel_dir = Path(self.build_env_wheel_dir.get()) if self.build_env_wheel_dir.get() else lockfile_path.parent / "wheelhouse"
+        base_interpreter = self.python_interpreter.get().strip() or sys.executable
+        wheel_command = [base_interpreter, "-m", "pip", "wheel", "--disable-pip-version-check", "-w", str(wheel_dir), "-r", str(lockfile_path), "pyinstaller"]
+        self._log_to_terminal(f"📥 正在下载依赖到 wheel 目录: {' '.join(wheel_command)}", "INFO")
+
+        def _fill_in_thread():
+            try:
+                wheel_result = subprocess.run(wheel_command, capture_output=True, text=True, encoding="utf-8", errors="replace", cwd=lockfile_path.parent,
+                                              creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0)
+            except (OSError, subprocess.SubprocessError) as e_wheel:
+                self._log_to_terminal(f"❌ 下载依赖失败: {e_wheel}", "ERROR")
+                return
+            if wheel_result.returncode != 0:
+                self._log_to_terminal(f"❌ 下载依赖失败 (返回代码 {wheel_result.returncode}):\n{(wheel_result.stdout + wheel_result.stderr).strip()[-2000:]}", "ERROR")
+                self.root.after(0, self.show_error, "下载依赖失败", "pip wheel 执行失败，请查看“构建输出”中的日志。")
+                return
+            self._log_to_terminal(f"✅ 已保存 {len(list(wheel_dir.glob('*.whl')))} 个 wheel 到 {wheel_dir}", "SUCCESS")
+            if not self.build_env_wheel_dir.get():
+                self.root.after(0, self.build_env_wheel_dir.set, str(wheel_dir))
+            self.root.after(0, self._prepare_isolated_build_env_in_background)
+        threading.Thread(target=_fill_in_thread, daemon=True).start()
+
+    def clear_isolated_build_envs(self):
+        """(UI回调) 删除全部缓存的隔离构建环境。"""
+        if self.is_building:
+            self.show_warning("正在构建", "构建进行中，请在构建结束后再清空环境缓存。")
+            return
+        if not messagebox.askyesno("确认清空", "确定要删除全部缓存的隔离构建环境吗？\n(下次构建时会重新创建)", parent=self.root):
+            return
+        removed_count = self.isolated_env_store.clear()
+        self._isolated_build_env_python = None
+        self._set_isolated_build_env_status(f"已删除 {removed_count} 个缓存的环境。")
+        self._log_to_terminal(f"🗑️ 已删除 {removed_count} 个缓存的隔离构建环境。", "INFO")
+
+    # --- 监视模式 (源文件/数据文件变更后自动增量重建) ---
+
+    def toggle_watch_mode(self):
+        """(UI回调) 底部“监视模式”开关切换时调用，开启或关闭监视模式。"""
+        if self.is_watch_mode.get():
+            self._start_watch_mode()
+        else:
+            self._stop_watch_mode()
+
+    def _start_watch_mode(self):
+        """校验主脚本后，在后台线程中解析可达源文件并启动文件监视。"""
+        script_file_path_str = self.script_path.get()
+        if not script_file_path_str or not Path(script_file_path_str).is_file():
+            self.show_warning("无法开启监视模式", "请先在“基础配置”中选择一个有效的Python主脚本。")
+            self.is_watch_mode.set(False)
+            return
+        project_root_str = self.project_root_dir.get()
+        project_root_path = Path(project_root_str) if project_root_str and Path(project_root_str).is_dir() else None
+
+        self._log_to_terminal("👀 正在开启监视模式，解析主脚本可达的源文件...", "INFO")
+        self._watch_mode_generation += 1
+        threading.Thread(
+            target=self._initialize_watch_mode_in_thread,
+            args=(Path(script_file_path_str), project_root_path, self._watch_mode_generation),
+            daemon=True
+        ).start()
+
+    def _initialize_watch_mode_in_thread(self, script_file_path: Path, project_root_path: Path | None, watch_generation: int):
+        """(后台线程) 构建入口脚本的依赖图和监视目标，然后在主线程中启动 FileChangeWatcher (见 _activate_file_watcher)。"""
+        try:
+            import_graph = ProjectImportGraph(script_file_path, project_root_path, logger_func=self._log_to_terminal,
+                                              analysis_cache=self._get_shared_analysis_cache()).build()
+            self._shared_analysis_cache.flush()
+            file_watcher = FileChangeWatcher(self._on_watched_files_changed, logger_func=self._log_to_terminal)
+            watched_files, watched_dirs = self._collect_watch_targets(import_graph)
+            if self.root.winfo_exists():
+                self.root.after(0, self._activate_file_watcher, watch_generation, import_graph, file_watcher, watched_files, watched_dirs)
+        except Exception as e_watch:
+            self._log_to_terminal(f"❌ 开启监视模式失败: {e_watch}", "ERROR")
+            import traceback
+            self._log_to_terminal(traceback.format_exc(), "DEBUG")
+            if self.root.winfo_exists():
+                self.root.after(0, lambda: self.is_watch_mode.set(False) if watch_generation == self._watch_mode_generation else None)
+
+    def _activate_file_watcher(self, watch_generation: int, import_graph, file_watcher, watched_files: set, watched_dirs: set):
+        """(主线程) 初始化完成后启动监视；初始化期间监视模式已被关闭 (或又重新开启) 时丢弃这次的结果，不启动监视器。"""
+        if watch_generation != self._watch_mode_generation or not self.is_watch_mode.get():
+            self._log_to_terminal("👀 监视模式在初始化期间已关闭，已放弃本次初始化的结果。", "DEBUG")
+            return
+        self._watch_import_graph = import_graph
+        self._file_watcher = file_watcher
+        file_watcher.set_targets(watched_files, watched_dirs)
+        file_watcher.start()
+        self._log_to_terminal(f"👀 监视模式已开启 (后端: {file_watcher.backend_name})，正在监视 "
+                              f"{len(import_graph.source_files)} 个源文件、{len(watched_dirs)} 个数据文件夹及其他数据文件。"
+                              f"文件保存后将自动执行增量构建。", "SUCCESS")
+        self.update_status("👀", "监视模式")
+
+    def _stop_watch_mode(self):
+        """停止文件监视并清除监视相关状态 (仍在进行的初始化会放弃其结果)。"""
+        self._watch_mode_generation += 1
+        self._watch_rebuild_pending = False
+        if self._file_watcher:
+            self._file_watcher.stop()
+        self._file_watcher = None
+        self._watch_import_graph = None
+        self._log_to_terminal("👀 监视模式已关闭。", "INFO")
+        if not self.is_building:
+            self.update_status("🟢", "系统就绪")
+
+    def _collect_watch_targets(self, import_graph=None) -> tuple[set, set]:
+        """
+        汇总监视模式需要关注的路径：主脚本可达的源文件、数据文件（文件夹递归监视）以及图标。
+
+        Args:
+            import_graph (ProjectImportGraph, optional): 使用的依赖图；为 None 时使用当前监视模式的依赖图。
+
+        Returns:
+            tuple[set, set]: (单独监视的文件集合, 递归监视的目录集合)。
+        """
+        import_graph = import_graph or self._watch_import_graph
+        watched_files = set(import_graph.source_files) if import_graph else set()
+        watched_dirs = set()
+        for data_entry_str in self.add_data_list:
+            source_path_str = data_entry_str.split(os.pathsep, 1)[0]
+            if not source_path_str:
+                continue
+            source_path = Path(source_path_str)
+            if source_path.is_dir():
+                watched_dirs.add(source_path)
+            else:
+                watched_files.add(source_path)
+        icon_path_str = self.icon_path.get()
+        if icon_path_str:
+            watched_files.add(Path(icon_path_str))
+        return watched_files, watched_dirs
+
+    def _refresh_watch_targets(self):
+        """数据项或图标变化后同步监视目标。监视模式未开启时不做任何事。"""
+        if self._file_watcher and self._file_watcher.is_running():
+            self._file_watcher.set_targets(*self._collect_watch_targets())
+
+    def _on_watched_files_changed(self, changed_paths: set):
+        """
+        (监视线程) 防抖后的变更回调。
+        对发生变更的 .py 源文件只重新解析该文件本身，以更新可达源文件集合；然后调度一次重建。
+        """
+        import_graph = self._watch_import_graph
+        if import_graph is None:
+            return
+        graph_changed = False
+        for changed_path in changed_paths:
+            if changed_path in import_graph.source_files and changed_path.suffix.lower() in (".py", ".pyw"):
+                added_files, removed_files = import_graph.refresh_file(changed_path)
+                graph_changed = graph_changed or bool(added_files or removed_files)
+        if graph_changed:
+            self._refresh_watch_targets()
+
+        changed_names = sorted(p.name for p in changed_paths)
+        preview_str = ", ".join(changed_names[:5]) + (f" 等 {len(changed_names)} 个文件" if len(changed_names) > 5 else "")
+        self._log_to_terminal(f"👀 检测到变更: {preview_str}", "INFO")
+        if self.root.winfo_exists():
+            self.root.after(0, self._trigger_watch_rebuild)
+
+    def _trigger_watch_rebuild(self):
+        """
+        (主线程) 监视模式下触发一次增量构建。
+        如果已有构建正在进行，则取消它，待其进程树终止后立即以最新的文件状态重新构建。
+        """
+        if not self.is_watch_mode.get():
+            return
+        if self._terminating_builds: # 不论由谁取消，终止完成后都会再次调用本方法 (见 _on_build_termination_finished)
+            self._watch_rebuild_pending = True
+            return
+        if self.is_building:
+            self._log_to_terminal("⏹️ 构建期间检测到新的变更，正在取消当前构建...", "WARNING")
+            self._watch_rebuild_pending = True
+            self._cancel_active_build(cleanup_workpath=False)
+            return
+        self._watch_rebuild_pending = False
+        self.start_build(triggered_by_watch=True)
 
+    def _on_build_termination_finished(self):
+        """(主线程) 一个已取消构建的进程树终止完成后调用：全部终止完成且期间有待处理的变更时，执行监视模式的重新构建。"""
+        if self._watch_rebuild_pending and not self._terminating_builds:
+            self._trigger_watch_rebuild()
 
     # --- UI界面更新与日志记录辅助方法 (规范化，增加winfo_exists检查以增强稳定性) ---
 
-    def _log_to_terminal(self, text_message: str, message_level: str = "INFO"):
+    def _log_to_terminal(self, text_message: str | list[str], message_level: str = "INFO"):
         """
         安全地向“构建输出”选项卡中的日志文本框追加文本，并根据级别添加简单前缀。
         此方法设计为可在任何线程中调用，它会将UI更新操作调度到主UI线程。
 
         Args:
-            text_message (str): 要记录到日志的文本消息。
+            text_message (str | list[str]): 要记录到日志的文本消息；传入列表时每个元素记录为一行，
+                                            整批只调度一次UI更新、插入一次文本框 (用于大量的构建输出)。
             message_level (str, optional): 消息的级别，用于前缀和可能的未来格式化。
                                          默认为 "INFO"。可选值如 "ERROR", "WARNING", "DEBUG", "SUCCESS"。
         """
         # 中文注释: 统一的日志记录方法，确保在UI线程更新文本框，并添加时间戳和级别指示。
 
         # 检查日志文本框是否存在且有效，如果UI已关闭或组件未创建，则回退到控制台打印
-        if not hasattr(self, 'terminal_textbox') or \
-           not self.terminal_textbox.winfo_exists(): # winfo_exists() 检查组件是否还存在于Tkinter层
+        # (“构建输出”选项卡尚未创建时日志先缓存，创建选项卡时一并写入)
+        if "📱 构建输出" not in getattr(self, '_tab_builders', {}) and \
+           (not hasattr(self, 'terminal_textbox') or not self.terminal_textbox.winfo_exists()): # winfo_exists() 检查组件是否还存在于Tkinter层
             
             # UI回退：如果日志文本框不可用，则将消息打印到标准输出
             timestamp_fallback = datetime.now().strftime('%H:%M:%S')
-            print(f"[{timestamp_fallback} {message_level} - UI_LOG_FALLBACK]: {text_message}")
+            for fallback_message in (text_message if isinstance(text_message, list) else [text_message]):
+                print(f"[{timestamp_fallback} {message_level} - UI_LOG_FALLBACK]: {fallback_message}")
             return
 
         # 准备在UI线程中执行的更新函数
         def _update_terminal_ui():
+            timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3] # 格式: HH:MM:SS.mmm
+            level_prefix_map = {
+                "ERROR":   "❌", "WARNING": "⚠️", "SUCCESS": "✅",
+                "DEBUG":   "🐞", "INFO":    "ℹ️", "CMD":     "⚙️",
+                "BUILD":   "🚀" 
+            }
+            prefix_char = level_prefix_map.get(message_level.upper(), "💬") # 默认为普通消息图标
+            # 带时间戳和级别前缀的日志行
+            line_prefix = f"[{timestamp} {prefix_char} {message_level.upper()}]: "
+            full_log_line = "".join(f"{line_prefix}{message}\n" for message in (text_message if isinstance(text_message, list) else [str(text_message)]))
+            if "📱 构建输出" in self._tab_builders: # 选项卡尚未创建
+                self._deferred_terminal_log.append((full_log_line, message_level))
+                return
+
             # 在实际更新前再次检查组件是否存在，因为after调用是异步的
             if not (hasattr(self, 'terminal_textbox') and self.terminal_textbox.winfo_exists()):
                 return 
 
             try:
                 self.terminal_textbox.configure(state="normal") # 临时设置为可编辑状态
-                
-                timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3] # 格式: HH:MM:SS.mmm
-                level_prefix_map = {
-                    "ERROR":   "❌", "WARNING": "⚠️", "SUCCESS": "✅",
-                    "DEBUG":   "🐞", "INFO":    "ℹ️", "CMD":     "⚙️",
-                    "BUILD":   "🚀" 
-                }
-                prefix_char = level_prefix_map.get(message_level.upper(), "💬") # 默认为普通消息图标
-                
-                # 插入带时间戳和级别前缀的日志行
-                full_log_line = f"[{timestamp} {prefix_char} {message_level.upper()}]: {str(text_message)}\n"
                 self.terminal_textbox.insert("end", full_log_line) 
+                self.log_line_index.append(full_log_line[:-1], message_level)
                 
-                self.terminal_textbox.see("end") # 自动滚动到日志末尾
+                if self._log_search_state["current"] < 0: # 正在查看搜索结果时不自动滚动，清空搜索框后恢复
+                    self.terminal_textbox.see("end") # 自动滚动到日志末尾
             except tk.TclError as e_tcl: # 捕获可能的Tcl错误，例如组件已销毁
                 print(f"[ERROR - _log_to_terminal UI Update]: TclError occurred: {e_tcl}")
             except Exception as e_log_update: # 捕获其他未知错误
@@ -1713,7 +9107,95 @@ class UltraModernPyInstallerGUI:
             self.root.after(0, _update_terminal_ui) 
         else: # 如果根窗口也不存在了，直接控制台打印
             timestamp_fallback = datetime.now().strftime('%H:%M:%S')
-            print(f"[{timestamp_fallback} {message_level.upper()} - ROOT_GONE_LOG]: {text_message}")
+            for fallback_message in (text_message if isinstance(text_message, list) else [text_message]):
+                print(f"[{timestamp_fallback} {message_level.upper()} - ROOT_GONE_LOG]: {fallback_message}")
+
+
+    def _clear_terminal_log(self):
+        """清空日志文本框及其搜索索引，并重置搜索状态。"""
+        if hasattr(self, 'terminal_textbox') and self.terminal_textbox.winfo_exists():
+            self.terminal_textbox.configure(state="normal")
+            self.terminal_textbox.delete("0.0", "end") 
+            self.terminal_textbox.configure(state="disabled")
+        self.log_line_index.clear()
+        self._deferred_terminal_log = []
+        self._log_search_state.update({"query": None, "matches": [], "current": -1, "line_count": 0})
+        if hasattr(self, 'log_search_status_label') and self.log_search_status_label.winfo_exists():
+            self.log_search_status_label.configure(text="")
+
+    def _schedule_log_search(self, event=None):
+        """(输入框按键/选项变化时) 延迟执行搜索，连续输入时只搜索一次。"""
+        if event is not None and event.keysym in ("Return", "Up", "Down", "Left", "Right", "Shift_L", "Shift_R"):
+            return
+        if self._log_search_state["after_id"] is not None:
+            self.root.after_cancel(self._log_search_state["after_id"])
+        self._log_search_state["after_id"] = self.root.after(200, self._run_log_search)
+
+    def _get_log_search_query(self) -> tuple:
+        """返回当前的搜索条件 (搜索内容, 级别集合, 是否正则)。"""
+        return (self.log_search_entry.get(), frozenset(level for level, level_var in self.log_search_level_vars.items() if level_var.get()),
+                self.log_search_use_regex.get())
+
+    def _run_log_search(self):
+        """按当前条件查询日志索引，标记匹配行并定位到可见区域附近的第一个匹配。"""
+        self._log_search_state["after_id"] = None
+        search_text, search_levels, use_regex = query = self._get_log_search_query()
+        self.terminal_textbox.tag_remove("log_search_match", "1.0", "end")
+        self.terminal_textbox.tag_remove("log_search_current", "1.0", "end")
+        self._log_search_state.update({"query": query, "matches": [], "current": -1, "line_count": self.log_line_index.line_count})
+        if not search_text and not search_levels: # 没有搜索条件：恢复自动滚动
+            self.log_search_status_label.configure(text="")
+            self.terminal_textbox.see("end")
+            return
+
+        search_start_time = time.perf_counter()
+        try:
+            matched_line_numbers = self.log_line_index.search(search_text, set(search_levels), use_regex=use_regex)
+        except re.error as e_regex:
+            self.log_search_status_label.configure(text=f"⚠️ 正则无效: {e_regex}")
+            return
+        self._log_search_state["elapsed_ms"] = (time.perf_counter() - search_start_time) * 1000
+        self._log_search_state["matches"] = matched_line_numbers
+        if not matched_line_numbers:
+            self.log_search_status_label.configure(text=f"无匹配 ({self._log_search_state['elapsed_ms']:.0f} ms)")
+            return
+
+        for line_number in matched_line_numbers[:2000]: # 只给前 2000 个匹配加下划线，避免大量标记拖慢文本框
+            self.terminal_textbox.tag_add("log_search_match", f"{line_number + 1}.0", f"{line_number + 1}.end")
+        first_visible_line = int(self.terminal_textbox.index("@0,0").split(".")[0]) - 1
+        self._show_log_match(min(bisect.bisect_left(matched_line_numbers, first_visible_line), len(matched_line_numbers) - 1))
+
+    def _jump_to_log_match(self, direction: int):
+        """
+        跳转到下一个/上一个匹配行 (只移动标记和视图，不修改文本框内容)。
+
+        Args:
+            direction (int): 1 表示下一个，-1 表示上一个。
+        """
+        search_state = self._log_search_state
+        if search_state["after_id"] is not None:
+            self.root.after_cancel(search_state["after_id"])
+            search_state["after_id"] = None
+        if search_state["query"] != self._get_log_search_query() or search_state["line_count"] != self.log_line_index.line_count:
+            current_line_number = search_state["matches"][search_state["current"]] if search_state["current"] >= 0 else None
+            self._run_log_search() # 条件变化或有新日志时重新查询，并尽量从原位置继续
+            if current_line_number is None or not search_state["matches"]:
+                return "break"
+            search_state["current"] = (bisect.bisect_right(search_state["matches"], current_line_number) - 1 if direction > 0
+                                       else bisect.bisect_left(search_state["matches"], current_line_number))
+        if search_state["matches"]:
+            self._show_log_match((search_state["current"] + direction) % len(search_state["matches"]))
+        return "break"
+
+    def _show_log_match(self, match_position: int):
+        """高亮第 match_position 个匹配行并滚动到该行。"""
+        search_state = self._log_search_state
+        search_state["current"] = match_position
+        line_number = search_state["matches"][match_position] + 1
+        self.terminal_textbox.tag_remove("log_search_current", "1.0", "end")
+        self.terminal_textbox.tag_add("log_search_current", f"{line_number}.0", f"{line_number}.end")
+        self.terminal_textbox.see(f"{line_number}.0")
+        self.log_search_status_label.configure(text=f"{match_position + 1}/{len(search_state['matches'])} ({search_state['elapsed_ms']:.0f} ms)")
 
 
     def _update_progress_ui(self, progress_value: float, status_text: str):
@@ -2005,7 +9487,9 @@ class UltraModernPyInstallerGUI:
         self.show_info("依赖检查完成", 
                        "依赖环境检查已完成（增强版）。\n\n"
                        "请仔细查看“构建输出”选项卡中的日志了解详细信息，特别是关于PyInstaller、UPX以及其他可能需要的第三方库的提示。")
-        if hasattr(self, 'tabview'): self.tabview.set("📱 构建输出") # 自动切换到输出标签页
+        self._select_tab("📱 构建输出") # 自动切换到输出标签页
+
+    DEPENDENCY_SCAN_MODES = {"完整扫描": "full", "清单 + 源码核对": "declared", "仅读取清单": "declared_only"} # 界面标签: 扫描方式
 
     def scan_project_for_dependencies(self):
         """
@@ -2033,30 +9517,51 @@ class UltraModernPyInstallerGUI:
 
         # 创建并启动一个新的后台线程来执行耗时的扫描操作，避免GUI卡死
         scan_thread = threading.Thread(
-            target=self._execute_dependency_scan_in_thread, # 指定线程要执行的目标函数
-            args=(Path(project_root_str), current_hidden_imports_list), # 传递参数给目标函数
+            target=self._wrap_with_profiler_if_requested(self._execute_dependency_scan_in_thread, "dependency-scan"), # 指定线程要执行的目标函数
+            args=(Path(project_root_str), current_hidden_imports_list, self.DEPENDENCY_SCAN_MODES.get(self.dependency_scan_mode.get(), "full"),
+                  self.dependency_scan_skip_generated.get()), # 传递参数给目标函数
             daemon=True # 设置为守护线程，这样主程序退出时此线程也会自动结束
         )
         scan_thread.start() # 启动线程
 
-    def _execute_dependency_scan_in_thread(self, project_root_path: Path, current_hidden_imports_list: list[str]):
+    def _execute_dependency_scan_in_thread(self, project_root_path: Path, current_hidden_imports_list: list[str], scan_mode: str = "full",
+                                           skip_generated_files: bool = False):
         """
         在后台线程中执行实际的依赖扫描逻辑。
         此方法不直接操作UI，而是通过 self.root.after() 将UI更新任务调度回主线程。
+        scan_mode 为 "declared" / "declared_only" 时先读取项目的依赖清单 (见 DependencyScanner.scan_declared)；
+        skip_generated_files 为 True 时不解析自动生成的文件。
         """
         try:
             # 创建 DependencyScanner 实例，并将GUI的日志记录方法传递给它
             # 这样扫描器内部的日志也可以输出到GUI的日志区域
+            interpreter_stdlib_modules = interpreter_distribution_modules = None
+            if self.python_interpreter.get().strip(): # 按构建用解释器的标准库判断 (例如 3.9 中没有 tomllib)，声明的依赖按其中已安装的包映射导入名
+                try:
+                    interpreter_info = self.interpreter_registry.describe(self.python_interpreter.get().strip())
+                    interpreter_stdlib_modules, interpreter_distribution_modules = interpreter_info["stdlib_modules"], interpreter_info["distribution_modules"]
+                except RuntimeError as e_interpreter:
+                    self._log_to_terminal(f"⚠️ 无法读取构建用解释器的信息，按当前 Python 的标准库扫描: {e_interpreter}", "WARNING")
             scanner = DependencyScanner(
                 project_root_path,
                 current_hidden_imports_list,
-                logger_func=self._log_to_terminal # 将 self._log_to_terminal 作为日志回调
+                logger_func=self._log_to_terminal, # 将 self._log_to_terminal 作为日志回调
+                analysis_cache=self._get_shared_analysis_cache(), # 与同一项目的其他配置共享解析结果
+                stdlib_module_names=interpreter_stdlib_modules,
+                distribution_import_names=interpreter_distribution_modules,
+                skip_generated_files=skip_generated_files
             )
-            potential_new_dependencies = scanner.scan() # 执行扫描，获取潜在的新依赖项列表
+            declared_report = None
+            if scan_mode == "full":
+                potential_new_dependencies = scanner.scan() # 执行扫描，获取潜在的新依赖项列表
+            else:
+                declared_report = scanner.scan_declared(verify=scan_mode == "declared")
+                potential_new_dependencies = declared_report["potential_dependencies"]
+            self._shared_analysis_cache.flush()
 
             # 扫描完成后，将结果传递回主线程以显示对话框
             if self.root.winfo_exists(): # 确保主窗口仍然存在
-                self.root.after(0, self._show_dependency_scan_results_dialog, potential_new_dependencies)
+                self.root.after(0, self._show_dependency_scan_results_dialog, potential_new_dependencies, scanner.dynamic_import_sites, declared_report)
 
             self._log_to_terminal(f"✅ 依赖项扫描完成。发现 {len(potential_new_dependencies)} 个潜在的新依赖项。", "SUCCESS")
             self.update_status("🟢", "依赖扫描完成")
@@ -2080,13 +9585,25 @@ class UltraModernPyInstallerGUI:
             #     self.root.after(0, lambda: self.tools_scan_button.configure(state="normal"))
             pass # 占位，如果上面有启用按钮的逻辑，这里就不需要了
 
-    def _show_dependency_scan_results_dialog(self, potential_new_deps_list: list[str]):
+    def _show_dependency_scan_results_dialog(self, potential_new_deps_list: list[str], dynamic_import_sites: list[dict] = (), declared_report: dict | None = None):
         """
         在主UI线程中创建并显示包含扫描结果的对话框。
         用户可以在此对话框中选择要添加到“隐藏导入”列表的模块。
+        来自动态导入的模块标注其位置和置信度；无法直接添加的动态导入 (模块名在运行时计算、子模块枚举、入口点) 列在末尾供人工确认。
+        有 declared_report (DependencyScanner.scan_declared 的结果) 时，另外列出“已导入但未声明”的模块和“已声明但未导入”的依赖 (后者可能是动态加载的驱动/插件，可作为隐藏导入添加)。
         """
+        first_site_by_module = {}
+        for import_site in dynamic_import_sites:
+            first_site_by_module.setdefault(import_site["module"], import_site)
+        manual_review_sites = [import_site for import_site in dynamic_import_sites
+                               if not import_site["module"] or import_site["confidence"] == "low" or import_site["kind"] in ("pkgutil", "entry_points")]
+        declared = declared_report["declared"] if declared_report else {}
+        declared_distribution_by_module = {module_name: declared_entry["name"] for declared_entry in declared.values() for module_name in declared_entry["modules"]}
+        used_undeclared_modules = declared_report["used_undeclared"] if declared_report else []
+        declared_unused_modules = {module_name: declared[normalized_name]["name"] for normalized_name in (declared_report["declared_unused"] if declared_report else ())
+                                   for module_name in declared[normalized_name]["modules"] if not module_name.startswith("_") and module_name not in potential_new_deps_list}
         # 如果没有找到新的潜在依赖项，则显示提示信息并直接返回
-        if not potential_new_deps_list:
+        if not potential_new_deps_list and not manual_review_sites and not used_undeclared_modules and not declared_unused_modules:
             self.show_info("扫描结果", "未找到新的潜在外部依赖项。\n\n(已自动排除Python标准库、项目内部模块以及您已在“隐藏导入”列表中声明的模块。)")
             return
 
@@ -2098,7 +9615,8 @@ class UltraModernPyInstallerGUI:
         dialog_window.grab_set() # 使对话框成为模态的，阻止用户与主窗口交互，直到此对话框关闭
 
         # 在对话框顶部添加说明标签
-        ctk.CTkLabel(dialog_window, text="以下是扫描到的潜在外部依赖项：", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text="以下是依赖清单中声明的运行时依赖 (未扫描源码)：" if declared_report and not declared_report["verified"] else "以下是扫描到的潜在外部依赖项：",
+                     font=self.font_default_bold).pack(pady=(15, 5), padx=20)
         ctk.CTkLabel(dialog_window, text="请选择您希望添加到“隐藏导入”列表中的模块。", font=self.font_small).pack(pady=(0, 15), padx=20)
 
         # 创建一个可滚动的Frame，用于容纳可能很长的复选框列表
@@ -2113,16 +9631,43 @@ class UltraModernPyInstallerGUI:
             tk_bool_var = tk.BooleanVar(value=False) # 默认情况下，复选框是不选中的
             selected_module_vars[dep_name] = tk_bool_var # 将模块名和布尔变量存入字典
 
+            dynamic_site = first_site_by_module.get(dep_name)
+            checkbox_text = dep_name # 复选框旁边显示的文本（模块名；动态导入附带位置和置信度，只读取清单时附带发行包名）
+            if dynamic_site is not None:
+                checkbox_text = f"{dep_name}    [动态导入 · {DYNAMIC_IMPORT_CONFIDENCE_LABELS[dynamic_site['confidence']]} · {dynamic_site['file']}:{dynamic_site['line']}]"
+            elif declared_report and not declared_report["verified"] and dep_name in declared_distribution_by_module:
+                checkbox_text = f"{dep_name}    [{declared_distribution_by_module[dep_name]}]"
             # 创建CTkCheckBox控件
             ctk.CTkCheckBox(
                 scrollable_checkbox_frame,
-                text=dep_name, # 复选框旁边显示的文本（模块名）
+                text=checkbox_text,
                 variable=tk_bool_var, # 将复选框的选中状态与布尔变量绑定
                 font=self.font_default, # 使用预定义的字体
                 checkbox_width=20, checkbox_height=20, # 可以调整复选框本身的大小
                 corner_radius=3 # 复选框的圆角
             ).pack(anchor="w", padx=15, pady=4) # pack到可滚动Frame中，左对齐，并设置内外边距
 
+        if manual_review_sites: # 需要人工确认的动态导入：模块名不确定，或需要收集整个包 (--collect-submodules) / 包元数据 (--copy-metadata)
+            ctk.CTkLabel(scrollable_checkbox_frame, text="需要人工确认的动态导入:", font=self.font_default_bold).pack(anchor="w", padx=15, pady=(12, 4))
+            review_text = "\n".join(f"{import_site['file']}:{import_site['line']}  [{DYNAMIC_IMPORT_CONFIDENCE_LABELS[import_site['confidence']]}] {import_site['detail']}"
+                                    for import_site in manual_review_sites[:100])
+            ctk.CTkLabel(scrollable_checkbox_frame, text=review_text, font=self.font_small, justify="left", anchor="w",
+                         text_color=("gray40", "gray60"), wraplength=480).pack(anchor="w", padx=15, pady=(0, 6))
+
+        if declared_unused_modules: # 已声明但源码中没有导入：数据库驱动、插件等常按名称动态加载，PyInstaller 同样找不到
+            ctk.CTkLabel(scrollable_checkbox_frame, text="已声明但源码中未导入 (若由程序动态加载，请添加为隐藏导入):",
+                         font=self.font_default_bold).pack(anchor="w", padx=15, pady=(12, 4))
+            for module_name, distribution_name in sorted(declared_unused_modules.items()):
+                tk_bool_var = tk.BooleanVar(value=False)
+                selected_module_vars[module_name] = tk_bool_var
+                ctk.CTkCheckBox(scrollable_checkbox_frame, text=f"{module_name}    [{distribution_name}]", variable=tk_bool_var, font=self.font_default,
+                                checkbox_width=20, checkbox_height=20, corner_radius=3).pack(anchor="w", padx=15, pady=4)
+
+        if used_undeclared_modules: # 已导入但没有声明：开发环境中恰好装着，隔离构建环境或新机器上会缺失
+            ctk.CTkLabel(scrollable_checkbox_frame, text="已导入但未在依赖清单中声明:", font=self.font_default_bold).pack(anchor="w", padx=15, pady=(12, 4))
+            ctk.CTkLabel(scrollable_checkbox_frame, text=", ".join(used_undeclared_modules) + "\n(请将它们加入依赖清单，否则隔离构建环境中不会安装这些包。)",
+                         font=self.font_small, justify="left", anchor="w", text_color=("gray40", "gray60"), wraplength=480).pack(anchor="w", padx=15, pady=(0, 6))
+
         def _add_selected_dependencies_to_hidden_imports_list():
             """
             内部辅助函数，当用户点击“添加选中项”按钮时被调用。
@@ -2190,6 +9735,722 @@ class UltraModernPyInstallerGUI:
         dialog_window.after(100, dialog_window.lift) # 提升窗口层级
         dialog_window.after(150, dialog_window.focus_set) # 设置焦点
 
+    def analyze_bundle_size(self):
+        """
+        (工具箱功能) 分析当前配置对应的构建产物体积，并在可排序的表格中显示结果。
+        """
+        if not self.script_path.get():
+            self.show_warning("操作无效", "请先选择主脚本并完成一次构建。")
+            return
+        output_target = self._locate_build_output()
+        if output_target is None:
+            self.show_warning("未找到构建产物", "未在输出目录中找到构建产物。\n请先成功完成一次构建。")
+            return
+        self._log_to_terminal(f"📊 正在分析构建产物体积: {output_target}", "INFO")
+        self.update_status("🟡", "分析包体积...")
+        threading.Thread(target=self._analyze_bundle_size_in_thread, args=(output_target,), daemon=True).start()
+
+    def _analyze_bundle_size_in_thread(self, output_target: Path):
+        """(后台线程) 执行体积分析并查找用于对比的上次构建记录，然后在主线程中显示结果。"""
+        try:
+            bundle_analysis = BundleSizeAnalyzer(logger_func=self._log_to_terminal).analyze(output_target)
+            previous_record = self._find_previous_bundle_record(self._resolve_build_paths()["app_name"], bundle_analysis["fingerprint"])
+        except Exception as e_analyze:
+            self._log_to_terminal(f"❌ 分析构建产物体积失败: {e_analyze}", "ERROR")
+            self.update_status("🔴", "包体积分析失败")
+            return
+        self._log_to_terminal(f"✅ 体积分析完成: 共 {len(bundle_analysis['packages'])} 个顶层包/文件，{len(bundle_analysis['binaries'])} 个二进制文件。", "SUCCESS")
+        self.update_status("🟢", "包体积分析完成")
+        if self.root.winfo_exists():
+            self.root.after(0, self._show_bundle_size_dialog, bundle_analysis, previous_record)
+
+    def _create_sortable_treeview(self, parent_widget, column_specs: list[tuple], rows: list[tuple]) -> ttk.Treeview:
+        """
+        创建一个点击表头即可排序的表格 (ttk.Treeview)。排序基于原始值而不是格式化后的文本。
+
+        Args:
+            parent_widget: 父容器。
+            column_specs (list[tuple]): 每列的 (列ID, 表头文本, 宽度, 格式化函数或None)。
+            rows (list[tuple]): 每行的原始值，顺序与 column_specs 一致。
+
+        Returns:
+            ttk.Treeview: 创建好的表格。
+        """
+        table_frame = ctk.CTkFrame(parent_widget, fg_color="transparent")
+        table_frame.pack(fill="both", expand=True)
+        column_ids = [spec[0] for spec in column_specs]
+        tree_view = ttk.Treeview(table_frame, columns=column_ids, show="headings", selectmode="browse")
+        vertical_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree_view.yview)
+        tree_view.configure(yscrollcommand=vertical_scrollbar.set)
+        vertical_scrollbar.pack(side="right", fill="y")
+        tree_view.pack(side="left", fill="both", expand=True)
+
+        raw_values_by_item = {}
+        for row_values in rows:
+            display_values = [formatter(value) if formatter else value for value, (_, _, _, formatter) in zip(row_values, column_specs)]
+            raw_values_by_item[tree_view.insert("", "end", values=display_values)] = row_values
+
+        sort_state = {"column": None, "descending": False}
+        def _sort_by_column(column_index: int):
+            # 再次点击同一列时切换升序/降序；首次点击按降序 (体积类数据通常最关心最大值)
+            descending = not sort_state["descending"] if sort_state["column"] == column_index else True
+            sort_state.update(column=column_index, descending=descending)
+            def _sort_key(item_id):
+                raw_value = raw_values_by_item[item_id][column_index]
+                if isinstance(raw_value, str):
+                    return (1, raw_value.lower())
+                return (0, raw_value if raw_value is not None else float("-inf"))
+            for position, item_id in enumerate(sorted(raw_values_by_item, key=_sort_key, reverse=descending)):
+                tree_view.move(item_id, "", position)
+
+        for column_index, (column_id, heading_text, column_width, formatter) in enumerate(column_specs):
+            tree_view.heading(column_id, text=heading_text, command=lambda index=column_index: _sort_by_column(index))
+            tree_view.column(column_id, width=column_width, anchor="w" if formatter is None else "e")
+        return tree_view
+
+    def _show_bundle_size_dialog(self, bundle_analysis: dict, previous_record: dict | None):
+        """
+        在主UI线程中显示体积分析结果：按顶层包和按二进制文件两个可排序表格，并与上次构建对比。
+        """
+        total_bytes = bundle_analysis["total_bytes"] or 1
+        previous_sizes = previous_record.get("bundle_package_sizes", {}) if previous_record else {}
+        size_changes = BundleSizeAnalyzer.diff_package_sizes({name: stats["bytes"] for name, stats in bundle_analysis["packages"].items()}, previous_sizes) if previous_record else {}
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("构建产物体积分析")
+        dialog_window.geometry("980x680")
+        dialog_window.transient(self.root)
+
+        mode_text = "单文件 (onefile)" if bundle_analysis["mode"] == "onefile" else "目录 (onedir)"
+        ctk.CTkLabel(dialog_window, text=f"📦 {bundle_analysis['target']}  |  {mode_text}  |  总大小 {format_byte_size(bundle_analysis['total_bytes'])}", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        if previous_record:
+            total_change = bundle_analysis["total_bytes"] - previous_record.get("bundle_total_bytes", 0)
+            comparison_text = f"与 {previous_record.get('timestamp', '上次构建')} 的构建相比: {'+' if total_change >= 0 else '-'}{format_byte_size(abs(total_change))}，{len(size_changes)} 个包的体积发生变化"
+        else:
+            comparison_text = "构建历史中没有可对比的上次构建记录。"
+        ctk.CTkLabel(dialog_window, text=comparison_text + "  (点击表头可排序)", font=self.font_small).pack(pady=(0, 10), padx=20)
+
+        def _format_change(change_bytes):
+            if change_bytes is None:
+                return "新增" if previous_record else ""
+            return f"{'+' if change_bytes > 0 else '-' if change_bytes < 0 else ''}{format_byte_size(abs(change_bytes))}" if change_bytes else "—"
+
+        result_tabview = ctk.CTkTabview(dialog_window, corner_radius=10)
+        result_tabview.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+        packages_tab = result_tabview.add("📦 按顶层包")
+        binaries_tab = result_tabview.add("⚙️ 二进制文件")
+
+        package_rows = []
+        for package_name, package_stats in bundle_analysis["packages"].items():
+            package_change = size_changes.get(package_name, 0) if package_name in previous_sizes else None # None: 新增的包或无可对比记录
+            package_rows.append((package_name, package_stats["category"], package_stats["bytes"], package_stats["uncompressed_bytes"],
+                                 package_stats["bytes"] / total_bytes, package_stats["entries"], package_change))
+        package_rows.sort(key=lambda row: row[2], reverse=True)
+        self._create_sortable_treeview(packages_tab, [
+            ("package", "顶层包 / 文件", 260, None),
+            ("category", "类别", 90, None),
+            ("bytes", "占用大小", 110, format_byte_size),
+            ("uncompressed", "解压后大小", 110, format_byte_size),
+            ("share", "占比", 80, lambda share: f"{share:.1%}"),
+            ("entries", "条目数", 70, str),
+            ("change", "较上次变化", 110, _format_change),
+        ], package_rows)
+
+        binary_rows = [(binary["name"], binary["package"], binary["bytes"], binary["uncompressed_bytes"], binary["bytes"] / total_bytes)
+                       for binary in bundle_analysis["binaries"]]
+        self._create_sortable_treeview(binaries_tab, [
+            ("name", "二进制文件", 420, None),
+            ("package", "所属包", 160, None),
+            ("bytes", "占用大小", 110, format_byte_size),
+            ("uncompressed", "解压后大小", 110, format_byte_size),
+            ("share", "占比", 80, lambda share: f"{share:.1%}"),
+        ], binary_rows)
+
+        removed_packages = [name for name in previous_sizes if name not in bundle_analysis["packages"]]
+        if removed_packages:
+            ctk.CTkLabel(dialog_window, text=f"较上次构建移除的包: {', '.join(sorted(removed_packages)[:15])}{' ...' if len(removed_packages) > 15 else ''}",
+                         font=self.font_small, wraplength=900).pack(pady=(0, 5), padx=20)
+        ctk.CTkButton(dialog_window, text="关闭", command=dialog_window.destroy, font=self.font_button, height=35).pack(pady=(5, 15))
+        dialog_window.after(100, dialog_window.lift)
+
+    def recommend_exclude_modules(self):
+        """
+        (工具箱功能) 根据上次构建的产物和入口脚本的可达导入图，推荐可以排除的模块。
+        """
+        if not self.script_path.get():
+            self.show_warning("操作无效", "请先选择主脚本并完成一次构建。")
+            return
+        output_target = self._locate_build_output()
+        if output_target is None:
+            self.show_warning("未找到构建产物", "推荐排除模块需要比较实际收集的模块。\n请先成功完成一次构建。")
+            return
+        self._log_to_terminal("🪶 正在分析可排除的模块 (解析入口脚本的可达导入图)...", "INFO")
+        self.update_status("🟡", "分析可排除模块...")
+        threading.Thread(target=self._recommend_exclude_modules_in_thread, args=(output_target,), daemon=True).start()
+
+    def _recommend_exclude_modules_in_thread(self, output_target: Path):
+        """(后台线程) 统计已收集的模块并计算排除建议，然后在主线程中显示结果对话框。"""
+        try:
+            bundle_analysis = BundleSizeAnalyzer(logger_func=self._log_to_terminal).analyze(output_target)
+            project_root_str = self.project_root_dir.get()
+            advisor = ExcludeModuleAdvisor(
+                Path(self.script_path.get()), Path(project_root_str) if project_root_str else None,
+                extra_required_modules=[item.strip() for item in self.hidden_imports.get().split(',') if item.strip()],
+                logger_func=self._log_to_terminal, analysis_cache=self._get_shared_analysis_cache())
+            recommendations = advisor.recommend(
+                bundle_analysis["modules"], {name: stats["bytes"] for name, stats in bundle_analysis["packages"].items()},
+                existing_excluded_modules=[item.strip() for item in self.exclude_modules.get().split(',') if item.strip()])
+            self._shared_analysis_cache.flush()
+        except Exception as e_recommend:
+            self._log_to_terminal(f"❌ 分析可排除模块失败: {e_recommend}", "ERROR")
+            self.update_status("🔴", "排除模块分析失败")
+            return
+        total_saving_bytes = sum(item["bytes_saved"] for item in recommendations)
+        self._log_to_terminal(f"🪶 找到 {len(recommendations)} 个排除建议，合计可节省约 {format_byte_size(total_saving_bytes)}。", "SUCCESS")
+        self.update_status("🟢", "排除模块分析完成")
+        if self.root.winfo_exists():
+            self.root.after(0, self._show_exclude_recommendations_dialog, recommendations, bundle_analysis["total_bytes"])
+
+    def _show_exclude_recommendations_dialog(self, recommendations: list[dict], baseline_total_bytes: int):
+        """
+        在主UI线程中显示排除建议。高置信度的建议默认勾选；选中项可以先在后台试构建验证，再添加到“排除模块”。
+        """
+        if not recommendations:
+            self.show_info("排除模块推荐", "没有找到可以安全排除且能明显减小体积的模块。")
+            return
+        confidence_text = {"high": "高", "medium": "中", "low": "低"}
+        reason_text = {"known": "常见的非必需模块，未被必需导入引用", "optional": "仅在 try/except ImportError 或 TYPE_CHECKING 中导入",
+                       "unreferenced": "没有静态导入引用 (可能由 hook 或动态导入引入)"}
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("排除模块推荐")
+        dialog_window.geometry("720x650")
+        dialog_window.transient(self.root)
+        dialog_window.grab_set()
+
+        ctk.CTkLabel(dialog_window, text=f"共 {len(recommendations)} 条建议，按可节省的体积排序：", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text="置信度为“中/低”的模块建议先试构建验证，并在排除后实际运行一次应用程序。", font=self.font_small).pack(pady=(0, 10), padx=20)
+
+        scrollable_frame = ctk.CTkScrollableFrame(dialog_window, width=660, height=420)
+        scrollable_frame.pack(pady=10, padx=20, fill="both", expand=True)
+        selected_module_vars = {}
+        for recommendation in recommendations:
+            tk_bool_var = tk.BooleanVar(value=recommendation["confidence"] == "high")
+            selected_module_vars[recommendation["module"]] = tk_bool_var
+            ctk.CTkCheckBox(
+                scrollable_frame,
+                text=f"{recommendation['module']}  —  可节省 {format_byte_size(recommendation['bytes_saved'])} ({recommendation['module_count']} 个模块)  [置信度: {confidence_text[recommendation['confidence']]}]",
+                variable=tk_bool_var, font=self.font_default, checkbox_width=20, checkbox_height=20, corner_radius=3
+            ).pack(anchor="w", padx=15, pady=(4, 0))
+            ctk.CTkLabel(scrollable_frame, text=reason_text[recommendation["reason"]], font=self.font_small, text_color="gray").pack(anchor="w", padx=45)
+
+        def _get_selected_modules() -> list[str]:
+            chosen_modules = [module_name for module_name, tk_var in selected_module_vars.items() if tk_var.get()]
+            if not chosen_modules:
+                messagebox.showinfo("未选择", "您没有选择任何模块。", parent=dialog_window)
+            return chosen_modules
+
+        def _add_selected_to_excludes():
+            chosen_modules = _get_selected_modules()
+            if chosen_modules:
+                added_count = self._merge_modules_into_list_var(self.exclude_modules, chosen_modules)
+                self._log_to_terminal(f"➕ 已将 {added_count} 个模块添加到“排除模块”列表。", "SUCCESS")
+                dialog_window.destroy()
+
+        def _trial_build_selected():
+            chosen_modules = _get_selected_modules()
+            if not chosen_modules:
+                return
+            if self._trial_build_process is not None:
+                messagebox.showinfo("试构建进行中", "已有一个试构建正在后台运行，请等待其完成。", parent=dialog_window)
+                return
+            dialog_window.destroy()
+            self._log_to_terminal(f"🧪 开始后台试构建，验证排除: {', '.join(chosen_modules)}", "INFO")
+            threading.Thread(target=self._run_exclusion_trial_build_in_thread, args=(chosen_modules, baseline_total_bytes), daemon=True).start()
+
+        bottom_button_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        bottom_button_frame.pack(pady=(10, 15), fill="x", padx=20)
+        bottom_button_frame.grid_columnconfigure((0, 1, 2), weight=1)
+        ctk.CTkButton(bottom_button_frame, text="🧪 试构建验证选中项", command=_trial_build_selected, font=self.font_button, height=35).grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="🚫 直接添加到排除模块", command=_add_selected_to_excludes, font=self.font_button, height=35).grid(row=0, column=1, padx=5, sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="关闭", command=dialog_window.destroy, font=self.font_button, fg_color=("gray65", "gray40"), hover_color=("gray75", "gray50"), height=35).grid(row=0, column=2, padx=(5, 0), sticky="ew")
+        dialog_window.after(100, dialog_window.lift)
+        dialog_window.after(150, dialog_window.focus_set)
+
+    def _run_isolated_build(self, extra_arguments: list[str], isolated_root_dir: Path, log_label: str) -> tuple[int, list]:
+        """
+        (后台线程) 以当前配置加上附加参数，在临时目录中进行一次独立构建，不影响正式的输出目录和 workpath。
+        运行中的进程记录在 self._trial_build_process 中，以便关闭程序时一并结束。
+
+        Args:
+            extra_arguments (list[str]): 追加到生成命令末尾的参数 (后出现的参数会覆盖前面的同名设置)。
+            isolated_root_dir (Path): 临时构建根目录，产物位于其中的 dist 子目录。
+            log_label (str): 日志前缀，例如 "试构建"。
+
+        Returns:
+            tuple[int, list]: (PyInstaller 返回代码, 解析出的 BuildEvent 列表)。
+        """
+        isolated_command = self.generate_command(incremental=True) + list(extra_arguments)
+        # 后出现的路径参数会覆盖前面的设置，使构建完全隔离在临时目录中
+        isolated_command.extend(['--distpath', str(isolated_root_dir / 'dist'), '--workpath', str(isolated_root_dir / 'build'),
+                                 '--specpath', str(isolated_root_dir), '--noconfirm'])
+        isolated_process = subprocess.Popen(
+            isolated_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace',
+            cwd=str(self._resolve_build_paths()["cwd"]),
+            creationflags=((subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP) if sys.platform == "win32" else 0),
+            start_new_session=(sys.platform != "win32"))
+        self._trial_build_process = isolated_process
+        output_parser = PyInstallerOutputParser()
+        isolated_events = []
+        try:
+            for output_line in isolated_process.stdout:
+                isolated_event = output_parser.parse_line(output_line)
+                isolated_events.append(isolated_event)
+                if isolated_event.kind in (BuildEvent.PHASE_START, BuildEvent.ERROR):
+                    self._log_to_terminal(f"🧪 [{log_label}] {isolated_event.message}", "ERROR" if isolated_event.kind == BuildEvent.ERROR else "DEBUG")
+            isolated_process.wait()
+        finally:
+            self._trial_build_process = None
+        return isolated_process.returncode, isolated_events
+
+    def _run_exclusion_trial_build_in_thread(self, modules_to_exclude: list[str], baseline_total_bytes: int):
+        """
+        (后台线程) 在临时目录中以附加的 --exclude-module 进行一次独立的试构建，不影响正式的输出目录和 workpath。
+        试构建成功后比较产物体积，并检查 warn 文件中被排除的模块是否被项目代码以模块级导入引用。
+
+        Args:
+            modules_to_exclude (list[str]): 要验证的排除模块。
+            baseline_total_bytes (int): 当前产物的总大小 (用于计算实际节省的体积)。
+        """
+        trial_root_dir = Path(tempfile.mkdtemp(prefix="pyi_studio_trial_"))
+        try:
+            trial_return_code, trial_events = self._run_isolated_build(
+                [arg for module_name in modules_to_exclude for arg in ('--exclude-module', module_name)], trial_root_dir, "试构建")
+            if trial_return_code != 0:
+                failure_cause = PyInstallerOutputParser.summarize(trial_events)["error_cause"] or f"返回代码 {trial_return_code}"
+                self._log_to_terminal(f"❌ 试构建失败，排除这些模块不安全: {failure_cause}", "ERROR")
+                if self.root.winfo_exists():
+                    self.root.after(0, lambda: self.show_warning("试构建失败", f"排除所选模块后构建失败，建议不要排除它们。\n\n原因:\n{failure_cause}"))
+                return
+
+            app_name = self._resolve_build_paths()["app_name"]
+            trial_outputs = [path for path in (trial_root_dir / 'dist').iterdir()] if (trial_root_dir / 'dist').is_dir() else []
+            trial_total_bytes = BundleSizeAnalyzer(logger_func=self._log_to_terminal).analyze(trial_outputs[0])["total_bytes"] if trial_outputs else baseline_total_bytes
+            risky_modules = []
+            trial_warn_file = trial_root_dir / 'build' / app_name / f"warn-{app_name}.txt"
+            if trial_warn_file.is_file():
+                project_root_str = self.project_root_dir.get()
+                project_module_names = ProjectImportGraph(Path(self.script_path.get()), Path(project_root_str) if project_root_str else None,
+                                                          logger_func=self._log_to_terminal,
+                                                          analysis_cache=self._get_shared_analysis_cache()).build().module_names()
+                for warn_report in WarnFileAnalyzer(trial_warn_file, logger_func=self._log_to_terminal,
+                                                    interpreter_path=self._get_build_interpreter_path()).analyze(project_module_names):
+                    if warn_report["status"] == "excluded" and warn_report["classification"] == "excluded" and warn_report["project_importers"]:
+                        risky_modules.append(warn_report["module"])
+            saved_bytes = baseline_total_bytes - trial_total_bytes
+            self._log_to_terminal(f"🧪 试构建成功: 产物 {format_byte_size(trial_total_bytes)}，较当前产物节省 {format_byte_size(saved_bytes)}。", "SUCCESS")
+            if risky_modules:
+                self._log_to_terminal(f"⚠️ 以下被排除的模块仍被项目代码直接导入: {', '.join(risky_modules)}", "WARNING")
+            if self.root.winfo_exists():
+                self.root.after(0, self._confirm_apply_trial_exclusions, modules_to_exclude, saved_bytes, risky_modules)
+        except Exception as e_trial:
+            self._log_to_terminal(f"❌ 试构建过程中出错: {e_trial}", "ERROR")
+        finally:
+            self._trial_build_process = None
+            shutil.rmtree(trial_root_dir, ignore_errors=True)
+
+    def _confirm_apply_trial_exclusions(self, modules_to_exclude: list[str], saved_bytes: int, risky_modules: list[str]):
+        """(主线程) 试构建成功后询问是否将验证过的模块添加到“排除模块”。"""
+        risk_note = f"\n\n⚠️ 注意: {', '.join(risky_modules)} 仍被项目代码直接导入，排除后运行时可能出错。" if risky_modules else ""
+        if messagebox.askyesno("试构建成功",
+                               f"排除 {len(modules_to_exclude)} 个模块后构建成功，产物体积减少 {format_byte_size(saved_bytes)}。{risk_note}\n\n"
+                               "是否将这些模块添加到“排除模块”列表？(建议之后实际运行一次应用程序进行确认)", parent=self.root):
+            added_count = self._merge_modules_into_list_var(self.exclude_modules, modules_to_exclude)
+            self._log_to_terminal(f"➕ 已将 {added_count} 个经试构建验证的模块添加到“排除模块”列表。", "SUCCESS")
+
+    def benchmark_startup_time(self):
+        """
+        (工具箱功能) 配置并运行启动耗时基准测试。可只测试当前产物，也可在临时目录中构建其余的
+        onefile/onedir × UPX 开/关变体后逐一测试，结果追加到构建历史旁的 startup_benchmarks.jsonl。
+        """
+        if not self.script_path.get():
+            self.show_warning("操作无效", "请先选择主脚本并完成一次构建。")
+            return
+        if self._startup_benchmark_cancel_event is not None:
+            self.show_info("基准测试进行中", "已有一个启动耗时基准测试正在后台运行，请等待其完成。")
+            return
+        output_target = self._locate_build_output()
+        if output_target is None:
+            self.show_warning("未找到构建产物", "未在输出目录中找到构建产物。\n请先成功完成一次构建。")
+            return
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("启动耗时基准测试")
+        dialog_window.geometry("560x520")
+        dialog_window.transient(self.root)
+        dialog_window.grab_set()
+
+        ctk.CTkLabel(dialog_window, text=f"📦 {output_target}", font=self.font_default_bold, wraplength=500).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text="程序必须能在启动后自行退出，耗时从启动进程开始计算到进程退出为止。", font=self.font_small, wraplength=500).pack(pady=(0, 10), padx=20)
+
+        settings_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        settings_frame.pack(fill="x", padx=20)
+        settings_frame.grid_columnconfigure(1, weight=1)
+        cold_runs_var = tk.StringVar(value="3")
+        warm_runs_var = tk.StringVar(value="10")
+        timeout_var = tk.StringVar(value="60")
+        exit_argument_var = tk.StringVar(value="--version")
+        for row_index, (label_text, tk_var) in enumerate((("冷启动次数:", cold_runs_var), ("热启动次数:", warm_runs_var), ("单次超时 (秒):", timeout_var))):
+            ctk.CTkLabel(settings_frame, text=label_text, font=self.font_default).grid(row=row_index, column=0, sticky="w", pady=4)
+            ctk.CTkEntry(settings_frame, textvariable=tk_var, width=100, font=self.font_input_text).grid(row=row_index, column=1, sticky="w", padx=(10, 0), pady=4)
+
+        trigger_labels = {"环境变量": "env", "命令行参数": "argument", "自然退出": "none"}
+        exit_trigger_var = tk.StringVar(value="环境变量")
+        ctk.CTkLabel(settings_frame, text="退出触发方式:", font=self.font_default).grid(row=3, column=0, sticky="w", pady=(10, 4))
+        ctk.CTkSegmentedButton(settings_frame, values=list(trigger_labels), variable=exit_trigger_var, font=self.font_default).grid(row=3, column=1, sticky="w", padx=(10, 0), pady=(10, 4))
+        ctk.CTkLabel(settings_frame, text=f"环境变量模式会设置 {StartupBenchmark.EXIT_TRIGGER_ENV_VAR}=1，请在程序入口检测到它后立即退出。",
+                     font=self.font_small, text_color="gray", wraplength=480, justify="left").grid(row=4, column=0, columnspan=2, sticky="w")
+        ctk.CTkLabel(settings_frame, text="命令行参数:", font=self.font_default).grid(row=5, column=0, sticky="w", pady=4)
+        ctk.CTkEntry(settings_frame, textvariable=exit_argument_var, width=200, font=self.font_input_text).grid(row=5, column=1, sticky="w", padx=(10, 0), pady=4)
+
+        compare_variants_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(dialog_window, text="对比构建变体 (在临时目录中构建 onefile/onedir × UPX 开/关 后逐一测试)", variable=compare_variants_var,
+                        font=self.font_default, checkbox_width=20, checkbox_height=20, corner_radius=3).pack(anchor="w", padx=20, pady=(15, 0))
+
+        def _start_benchmark():
+            try:
+                benchmark_settings = {
+                    "cold_runs": max(0, int(cold_runs_var.get())),
+                    "warm_runs": max(0, int(warm_runs_var.get())),
+                    "timeout_seconds": max(1.0, float(timeout_var.get())),
+                    "exit_trigger": trigger_labels[exit_trigger_var.get()],
+                    "exit_argument": exit_argument_var.get().strip(),
+                    "compare_variants": compare_variants_var.get(),
+                }
+            except ValueError:
+                messagebox.showerror("输入无效", "运行次数和超时时间必须是数字。", parent=dialog_window)
+                return
+            if benchmark_settings["cold_runs"] + benchmark_settings["warm_runs"] == 0:
+                messagebox.showerror("输入无效", "冷启动和热启动次数不能都为 0。", parent=dialog_window)
+                return
+            dialog_window.destroy()
+            self._startup_benchmark_cancel_event = threading.Event()
+            self._log_to_terminal("⏱️ 开始启动耗时基准测试...", "INFO")
+            self.update_status("🟡", "启动耗时基准测试...")
+            threading.Thread(target=self._run_startup_benchmark_in_thread, args=(benchmark_settings,), daemon=True).start()
+
+        bottom_button_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        bottom_button_frame.pack(pady=(20, 15), fill="x", padx=20)
+        bottom_button_frame.grid_columnconfigure((0, 1), weight=1)
+        ctk.CTkButton(bottom_button_frame, text="▶️ 开始测试", command=_start_benchmark, font=self.font_button, height=35).grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="取消", command=dialog_window.destroy, font=self.font_button, fg_color=("gray65", "gray40"), hover_color=("gray75", "gray50"), height=35).grid(row=0, column=1, padx=(5, 0), sticky="ew")
+        dialog_window.after(100, dialog_window.lift)
+        dialog_window.after(150, dialog_window.focus_set)
+
+    @staticmethod
+    def _locate_benchmark_executable(output_target: Path, app_name: str) -> Path | None:
+        """由构建产物路径得到实际要启动的可执行文件：onefile 为产物本身，onedir 为目录中的主程序，macOS .app 为 Contents/MacOS 中的主程序。"""
+        if output_target.is_file():
+            return output_target
+        executable_dir = output_target / "Contents" / "MacOS" if output_target.suffix == ".app" else output_target
+        for candidate_name in (app_name + ".exe", app_name):
+            if (executable_dir / candidate_name).is_file():
+                return executable_dir / candidate_name
+        return None
+
+    def _run_startup_benchmark_in_thread(self, benchmark_settings: dict):
+        """
+        (后台线程) 测试当前产物；若需要对比变体，则依次在临时目录中构建其余变体并测试。
+        每个变体的结果都会追加到 startup_benchmark_store，最后在主线程中显示对比表格。
+        """
+        app_name = self._resolve_build_paths()["app_name"]
+        current_variant = (self.is_onefile.get(), self.is_upx.get())
+        variants_to_measure = [current_variant]
+        if benchmark_settings["compare_variants"]:
+            upx_available = shutil.which("upx", path=self.upx_dir.get() or None) is not None
+            for variant in ((True, False), (True, True), (False, False), (False, True)):
+                if variant == current_variant:
+                    continue
+                if variant[1] and not upx_available:
+                    self._log_to_terminal(f"ℹ️ 未找到 UPX，跳过变体 {self._describe_benchmark_variant(*variant)}。", "INFO")
+                    continue
+                variants_to_measure.append(variant)
+
+        session_records = []
+        try:
+            for is_onefile, is_upx in variants_to_measure:
+                if self._startup_benchmark_cancel_event.is_set():
+                    break
+                variant_label = self._describe_benchmark_variant(is_onefile, is_upx)
+                variant_root_dir = None
+                try:
+                    if (is_onefile, is_upx) == current_variant:
+                        output_target = self._locate_build_output()
+                    else:
+                        variant_root_dir = Path(tempfile.mkdtemp(prefix="pyi_studio_bench_"))
+                        self._log_to_terminal(f"🧪 正在构建变体 {variant_label} ...", "INFO")
+                        variant_arguments = ['--onefile' if is_onefile else '--onedir']
+                        variant_arguments += (['--upx-dir', self.upx_dir.get()] if self.upx_dir.get() else []) if is_upx else ['--noupx']
+                        return_code, variant_events = self._run_isolated_build(variant_arguments, variant_root_dir, f"基准变体 {variant_label}")
+                        if return_code != 0:
+                            failure_cause = PyInstallerOutputParser.summarize(variant_events)["error_cause"] or f"返回代码 {return_code}"
+                            self._log_to_terminal(f"❌ 变体 {variant_label} 构建失败，跳过: {failure_cause}", "ERROR")
+                            continue
+                        output_target = self._locate_build_output(dist_path=variant_root_dir / 'dist', onefile=is_onefile)
+                    executable_path = self._locate_benchmark_executable(output_target, app_name) if output_target else None
+                    if executable_path is None:
+                        self._log_to_terminal(f"⚠️ 未找到变体 {variant_label} 的可执行文件，跳过。", "WARNING")
+                        continue
+                    self._log_to_terminal(f"⏱️ 正在测试 {variant_label}: {executable_path}", "INFO")
+                    benchmark_result = StartupBenchmark(
+                        executable_path, cold_runs=benchmark_settings["cold_runs"], warm_runs=benchmark_settings["warm_runs"],
+                        exit_trigger=benchmark_settings["exit_trigger"], exit_argument=benchmark_settings["exit_argument"],
+                        timeout_seconds=benchmark_settings["timeout_seconds"], logger_func=self._log_to_terminal
+                    ).run(self._startup_benchmark_cancel_event)
+                    output_bytes = output_target.stat().st_size if output_target.is_file() else sum(
+                        path.stat().st_size for path in output_target.rglob("*") if path.is_file())
+                    benchmark_record = {
+                        "timestamp": datetime.now().isoformat(timespec='seconds'),
+                        "app_name": app_name,
+                        "variant": variant_label,
+                        "onefile": is_onefile,
+                        "upx": is_upx,
+                        "output_bytes": output_bytes,
+                        **benchmark_result,
+                    }
+                    self.startup_benchmark_store.append(benchmark_record)
+                    session_records.append(benchmark_record)
+                    warm_p50, cold_p50 = benchmark_result["warm"]["p50"], benchmark_result["cold"]["p50"]
+                    self._log_to_terminal(f"⏱️ {variant_label}: 冷启动 p50 {self._format_benchmark_seconds(cold_p50)}，"
+                                          f"热启动 p50 {self._format_benchmark_seconds(warm_p50)}，失败 {benchmark_result['failures']} 次。", "SUCCESS")
+                finally:
+                    if variant_root_dir is not None:
+                        shutil.rmtree(variant_root_dir, ignore_errors=True)
+        except Exception as e_benchmark:
+            self._log_to_terminal(f"❌ 启动耗时基准测试出错: {e_benchmark}", "ERROR")
+            self.update_status("🔴", "启动耗时基准测试失败")
+            return
+        finally:
+            self._startup_benchmark_cancel_event = None
+
+        self.update_status("🟢", "启动耗时基准测试完成")
+        # 本次未测到的变体使用历史中最近一次的结果，便于一起对比
+        measured_labels = {record["variant"] for record in session_records}
+        history_records = []
+        for history_record in reversed(self.startup_benchmark_store.load(app_name=app_name)):
+            if history_record.get("variant") not in measured_labels:
+                measured_labels.add(history_record.get("variant"))
+                history_records.append(history_record)
+        if self.root.winfo_exists():
+            self.root.after(0, self._show_startup_benchmark_dialog, session_records, history_records)
+
+    @staticmethod
+    def _describe_benchmark_variant(is_onefile: bool, is_upx: bool) -> str:
+        return f"{'onefile' if is_onefile else 'onedir'} / UPX {'开' if is_upx else '关'}"
+
+    @staticmethod
+    def _format_benchmark_seconds(seconds: float | None) -> str:
+        return "—" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+    def _show_startup_benchmark_dialog(self, session_records: list[dict], history_records: list[dict]):
+        """
+        在主UI线程中显示启动耗时对比表格：本次测试的变体以及历史中其他变体最近一次的结果。
+        """
+        if not session_records and not history_records:
+            self.show_warning("没有结果", "没有获得任何基准测试结果，请查看日志了解原因。")
+            return
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("启动耗时基准测试结果")
+        dialog_window.geometry("1040x480")
+        dialog_window.transient(self.root)
+
+        all_records = [(record, "本次") for record in session_records] + [(record, record.get("timestamp", "历史")) for record in history_records]
+        ranked_records = [record for record, _ in all_records if record["warm"]["p50"] is not None or record["cold"]["p50"] is not None]
+        if ranked_records:
+            fastest_record = min(ranked_records, key=lambda record: record["warm"]["p50"] if record["warm"]["p50"] is not None else record["cold"]["p50"])
+            summary_text = f"🏁 热启动最快的变体: {fastest_record['variant']}"
+        else:
+            summary_text = "所有运行均失败或超时，请检查退出触发方式。"
+        ctk.CTkLabel(dialog_window, text=summary_text, font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        eviction_note = "" if all(record.get("cache_eviction") for record, _ in all_records) else "  当前平台无法逐出页缓存，冷启动仅第一次运行准确。"
+        ctk.CTkLabel(dialog_window, text="单位为毫秒，点击表头可排序。" + eviction_note, font=self.font_small).pack(pady=(0, 10), padx=20)
+
+        table_container = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        table_container.pack(fill="both", expand=True, padx=20, pady=(0, 10))
+        benchmark_rows = [(record["variant"], record["cold"]["p50"], record["cold"]["p90"], record["warm"]["p50"], record["warm"]["p90"],
+                           record["warm"]["p95"], record.get("output_bytes", 0), record.get("failures", 0), source_text)
+                          for record, source_text in all_records]
+        self._create_sortable_treeview(table_container, [
+            ("variant", "变体", 170, None),
+            ("cold_p50", "冷启动 p50", 95, self._format_benchmark_seconds),
+            ("cold_p90", "冷启动 p90", 95, self._format_benchmark_seconds),
+            ("warm_p50", "热启动 p50", 95, self._format_benchmark_seconds),
+            ("warm_p90", "热启动 p90", 95, self._format_benchmark_seconds),
+            ("warm_p95", "热启动 p95", 95, self._format_benchmark_seconds),
+            ("size", "产物大小", 100, format_byte_size),
+            ("failures", "失败", 60, str),
+            ("source", "来源", 160, None),
+        ], benchmark_rows)
+        ctk.CTkButton(dialog_window, text="关闭", command=dialog_window.destroy, font=self.font_button, height=35).pack(pady=(5, 15))
+        dialog_window.after(100, dialog_window.lift)
+
+    def analyze_build_warnings(self):
+        """
+        (工具箱功能) 分析最近一次构建在 workpath 中生成的 warn-<name>.txt，并显示分析结果对话框。
+        """
+        if not self.script_path.get():
+            self.show_warning("操作无效", "请先选择主脚本并完成一次构建。")
+            return
+        build_paths = self._resolve_build_paths()
+        warn_file_path = build_paths["work_path"] / f"warn-{build_paths['app_name']}.txt"
+        if not warn_file_path.is_file():
+            self.show_warning("未找到 warn 文件", f"未找到 PyInstaller 的 warn 文件:\n{warn_file_path}\n\n请先完成一次构建 (成功或失败均可)。")
+            return
+        self._log_to_terminal(f"🔎 正在分析 warn 文件: {warn_file_path}", "INFO")
+        self.update_status("🟡", "分析缺失模块...")
+        threading.Thread(target=self._analyze_warn_file_in_thread, args=(warn_file_path, True), daemon=True).start()
+
+    def _analyze_warn_file_after_build(self, warn_file_str: str | None, build_failed: bool):
+        """
+        (后台线程) 构建结束后自动分析 warn 文件。构建失败且存在可操作的缺失模块时直接弹出分析对话框，
+        构建成功时只在日志中给出提示，避免每次构建都打断用户。
+
+        Args:
+            warn_file_str (str, optional): 构建事件中解析出的 warn 文件路径；为空时按当前配置推算。
+            build_failed (bool): 本次构建是否失败。
+        """
+        if warn_file_str:
+            warn_file_path = Path(warn_file_str)
+        else:
+            build_paths = self._resolve_build_paths()
+            warn_file_path = build_paths["work_path"] / f"warn-{build_paths['app_name']}.txt"
+        if warn_file_path.is_file():
+            self._analyze_warn_file_in_thread(warn_file_path, show_dialog=build_failed, triggered_by_build=True)
+
+    def _analyze_warn_file_in_thread(self, warn_file_path: Path, show_dialog: bool, triggered_by_build: bool = False):
+        """
+        (后台线程) 流式分析 warn 文件，并与入口脚本可达的项目源文件的导入交叉比对。
+
+        Args:
+            warn_file_path (Path): warn 文件路径。
+            show_dialog (bool): 是否弹出分析结果对话框。
+            triggered_by_build (bool): 是否为构建结束后的自动分析；此时只有存在隐藏导入/安装建议才弹出对话框。
+        """
+        try:
+            project_root_str = self.project_root_dir.get()
+            import_graph = ProjectImportGraph(Path(self.script_path.get()), Path(project_root_str) if project_root_str else None,
+                                              logger_func=self._log_to_terminal, analysis_cache=self._get_shared_analysis_cache()).build()
+            self._shared_analysis_cache.flush()
+            reports = WarnFileAnalyzer(warn_file_path, logger_func=self._log_to_terminal, interpreter_path=self._get_build_interpreter_path()).analyze(
+                project_module_names=import_graph.module_names(),
+                project_imported_modules=import_graph.external_modules,
+                existing_hidden_imports=[item.strip() for item in self.hidden_imports.get().split(',') if item.strip()],
+                existing_excluded_modules=[item.strip() for item in self.exclude_modules.get().split(',') if item.strip()],
+            )
+        except Exception as e_analyze:
+            self._log_to_terminal(f"⚠️ 分析 warn 文件时出错: {e_analyze}", "WARNING")
+            self.update_status("🔴", "缺失模块分析失败")
+            return
+
+        self._last_warn_analysis_reports = reports
+        suggestion_counts = {suggestion: sum(r["suggestion"] == suggestion for r in reports) for suggestion in ("hidden_import", "install", "exclude")}
+        self._log_to_terminal(
+            f"🔎 warn 文件分析完成: 共 {len(reports)} 个缺失模块，其中真实缺失 {sum(r['classification'] == 'real' for r in reports)} 个，"
+            f"项目直接引用 {sum(r['referenced_by_project'] for r in reports)} 个。"
+            f"建议添加隐藏导入 {suggestion_counts['hidden_import']} 个，需要安装 {suggestion_counts['install']} 个，可排除 {suggestion_counts['exclude']} 个。", "INFO")
+        for report in reports:
+            if report["suggestion"] in ("hidden_import", "install"):
+                action_text = "建议添加到隐藏导入" if report["suggestion"] == "hidden_import" else "当前环境中未安装，请先安装"
+                self._log_to_terminal(f"   • {report['module']} ({report['classification']}, 被 {', '.join(report['importers'][:3])} 导入) → {action_text}", "WARNING")
+        self.update_status("🟢", "缺失模块分析完成")
+
+        has_import_suggestions = suggestion_counts["hidden_import"] or suggestion_counts["install"]
+        if show_dialog and (has_import_suggestions or not triggered_by_build) and self.root.winfo_exists():
+            self.root.after(0, self._show_warn_analysis_dialog, reports)
+        elif suggestion_counts["hidden_import"]:
+            self._log_to_terminal("💡 可在“工具箱 → 🔎 分析缺失模块”中一键添加上述隐藏导入。", "INFO")
+
+    def _merge_modules_into_list_var(self, list_var: tk.StringVar, module_names: list[str]) -> int:
+        """
+        将模块名合并到逗号分隔的列表变量 (隐藏导入/排除模块) 中，自动去重并排序。
+
+        Returns:
+            int: 实际新增的模块数量。
+        """
+        current_modules = {item.strip() for item in list_var.get().split(',') if item.strip()}
+        new_modules = [name for name in dict.fromkeys(module_names) if name not in current_modules]
+        if new_modules:
+            list_var.set(", ".join(sorted(current_modules | set(new_modules))))
+        return len(new_modules)
+
+    def _show_warn_analysis_dialog(self, reports: list[dict]):
+        """
+        在主UI线程中显示 warn 文件分析结果。建议添加为隐藏导入的模块默认勾选，
+        用户可以一键应用全部建议，或将勾选的模块添加到隐藏导入/排除模块。
+        """
+        actionable_reports = [report for report in reports if report["suggestion"]]
+        if not actionable_reports:
+            self.show_info("缺失模块分析", f"warn 文件中共有 {len(reports)} 条记录，均为平台相关、已排除或已配置的模块，无需处理。")
+            return
+
+        classification_text = {"real": "真实缺失", "delayed": "函数内导入", "conditional": "条件导入", "optional": "可选导入", "platform": "平台相关"}
+        suggestion_text = {"hidden_import": "建议: 添加隐藏导入", "install": "建议: 安装该模块", "exclude": "建议: 排除"}
+        max_rows_displayed = 300 # 大型项目的 warn 文件可能有上千条，只显示最重要的部分
+
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("缺失模块分析结果")
+        dialog_window.geometry("720x650")
+        dialog_window.transient(self.root)
+        dialog_window.grab_set()
+
+        ctk.CTkLabel(dialog_window, text=f"PyInstaller 报告了 {len(reports)} 个缺失模块，其中 {len(actionable_reports)} 个可以处理：", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text="项目直接引用的模块排在最前；“真实缺失”表示存在未被 if/try 保护的模块级导入。", font=self.font_small).pack(pady=(0, 10), padx=20)
+
+        scrollable_report_frame = ctk.CTkScrollableFrame(dialog_window, width=660, height=420)
+        scrollable_report_frame.pack(pady=10, padx=20, fill="both", expand=True)
+
+        selected_module_vars = {}
+        for report in actionable_reports[:max_rows_displayed]:
+            tk_bool_var = tk.BooleanVar(value=report["suggestion"] == "hidden_import")
+            selected_module_vars[report["module"]] = tk_bool_var
+            project_mark = "📌 " if report["referenced_by_project"] else ""
+            ctk.CTkCheckBox(
+                scrollable_report_frame,
+                text=f"{project_mark}{report['module']}  [{classification_text.get(report['classification'], report['classification'])}]  {suggestion_text[report['suggestion']]}",
+                variable=tk_bool_var, font=self.font_default, checkbox_width=20, checkbox_height=20, corner_radius=3
+            ).pack(anchor="w", padx=15, pady=(4, 0))
+            importers_preview = ", ".join(report["importers"][:4]) + (" ..." if len(report["importers"]) > 4 else "")
+            ctk.CTkLabel(scrollable_report_frame, text=f"被导入于: {importers_preview}", font=self.font_small, text_color="gray").pack(anchor="w", padx=45)
+        if len(actionable_reports) > max_rows_displayed:
+            ctk.CTkLabel(scrollable_report_frame, text=f"... 另有 {len(actionable_reports) - max_rows_displayed} 条未显示 (“一键应用建议”仍会处理它们)", font=self.font_small).pack(anchor="w", padx=15, pady=6)
+
+        def _add_selected_modules(list_var: tk.StringVar, list_display_name: str):
+            chosen_modules = [module_name for module_name, tk_var in selected_module_vars.items() if tk_var.get()]
+            if not chosen_modules:
+                messagebox.showinfo("未选择", "您没有选择任何模块。", parent=dialog_window)
+                return
+            added_count = self._merge_modules_into_list_var(list_var, chosen_modules)
+            for module_name in chosen_modules:
+                selected_module_vars[module_name].set(False)
+            self._log_to_terminal(f"➕ 已将 {added_count} 个模块添加到“{list_display_name}”列表。", "SUCCESS")
+
+        def _apply_all_suggestions():
+            hidden_added = self._merge_modules_into_list_var(self.hidden_imports, [r["module"] for r in actionable_reports if r["suggestion"] == "hidden_import"])
+            excluded_added = self._merge_modules_into_list_var(self.exclude_modules, [r["module"] for r in actionable_reports if r["suggestion"] == "exclude"])
+            self._log_to_terminal(f"✨ 已应用 warn 文件分析建议: 新增隐藏导入 {hidden_added} 个，新增排除模块 {excluded_added} 个。", "SUCCESS")
+            dialog_window.destroy()
+
+        bottom_button_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        bottom_button_frame.pack(pady=(10, 15), fill="x", padx=20)
+        bottom_button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        ctk.CTkButton(bottom_button_frame, text="✨ 一键应用建议", command=_apply_all_suggestions, font=self.font_button, height=35).grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="➕ 选中项→隐藏导入", command=lambda: _add_selected_modules(self.hidden_imports, "隐藏导入"), font=self.font_button, height=35).grid(row=0, column=1, padx=5, sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="🚫 选中项→排除模块", command=lambda: _add_selected_modules(self.exclude_modules, "排除模块"), font=self.font_button, height=35).grid(row=0, column=2, padx=5, sticky="ew")
+        ctk.CTkButton(bottom_button_frame, text="关闭", command=dialog_window.destroy, font=self.font_button, fg_color=("gray65", "gray40"), hover_color=("gray75", "gray50"), height=35).grid(row=0, column=3, padx=(5, 0), sticky="ew")
+
+        dialog_window.after(100, dialog_window.lift)
+        dialog_window.after(150, dialog_window.focus_set)
+
     def open_spec_file(self):
         """(工具箱) 在系统默认文本编辑器中打开当前项目生成的.spec文件。"""
         # 中文注释: 方便高级用户直接编辑PyInstaller的配置文件。
@@ -2199,10 +10460,13 @@ class UltraModernPyInstallerGUI:
             self.show_warning("操作无效", "请先选择一个主脚本。\n.spec 文件通常在第一次成功构建后，与主脚本在同一目录生成。")
             return
 
-        # .spec 文件名通常与主脚本名（如果未指定应用名）或 --name 参数指定的应用名相同
-        app_name_for_spec_file = self.app_name.get() if self.app_name.get() else Path(current_script_path_str).stem
-        # .spec 文件通常生成在主脚本所在的目录
-        spec_file_full_path = Path(current_script_path_str).parent / f"{app_name_for_spec_file}.spec"
+        # .spec 文件位于 --specpath 目录 (指定输出目录时为其父目录，否则为主脚本所在目录)，文件名为应用名
+        spec_file_full_path = self._get_canonical_spec_path()
+        if not spec_file_full_path.exists() and self.build_from_spec.get() and Path(current_script_path_str).is_file():
+            try: # 基于 .spec 构建时可以直接根据当前配置生成，无需先构建一次
+                self._ensure_canonical_spec_file()
+            except OSError as e_generate_spec:
+                self._log_to_terminal(f"   ⚠️ 生成 .spec 文件失败: {e_generate_spec}", "WARNING")
 
         if spec_file_full_path.exists() and spec_file_full_path.is_file():
             try:
@@ -2226,6 +10490,328 @@ class UltraModernPyInstallerGUI:
                               "请确保您已为当前选择的主脚本和应用名称成功执行过至少一次构建操作，"
                               "PyInstaller 通常在此时生成 .spec 文件。")
 
+    def import_spec_file(self):
+        """(工具箱) 解析已有 .spec 文件 (不执行)，将 Analysis(...) 与 EXE(...) 中的参数导回界面配置。"""
+        canonical_spec_dir = self._get_canonical_spec_path().parent if self.script_path.get() else None
+        spec_path_str = filedialog.askopenfilename(
+            title="选择要导入的 .spec 文件",
+            initialdir=str(canonical_spec_dir) if canonical_spec_dir and canonical_spec_dir.is_dir() else None,
+            filetypes=[("PyInstaller Spec 文件", "*.spec"), ("所有文件", "*.*")],
+            parent=self.root
+        )
+        if not spec_path_str:
+            return
+        try:
+            spec_settings = SpecFileManager(Path(spec_path_str), logger_func=self._log_to_terminal).parse()
+        except (OSError, ValueError, SyntaxError) as e_spec:
+            self._log_to_terminal(f"❌ 解析 .spec 文件失败: {e_spec}", "ERROR")
+            self.show_error("导入失败", f"无法解析 .spec 文件:\n{spec_path_str}\n\n{e_spec}")
+            return
+        self._apply_spec_settings(Path(spec_path_str), spec_settings)
+
+    def _apply_spec_settings(self, spec_file_path: Path, spec_settings: dict):
+        """将 SpecFileManager.parse() 的结果应用到界面配置。.spec 中的相对路径相对于 .spec 文件所在目录 (与 PyInstaller 一致)。"""
+        spec_dir = spec_file_path.resolve().parent
+        def _resolve_spec_path(path_str: str) -> str:
+            spec_relative_path = Path(os.path.expanduser(path_str))
+            return os.path.normpath(str(spec_relative_path if spec_relative_path.is_absolute() else spec_dir / spec_relative_path))
+
+        ignored_notes = [] # 界面无法表示、因而未导入的内容
+        scripts = [script_str for script_str in spec_settings["scripts"] if isinstance(script_str, str)]
+        if scripts:
+            self.script_path.set(_resolve_spec_path(scripts[0]))
+            if len(scripts) > 1:
+                ignored_notes.append(f"多个入口脚本 (仅导入了第一个): {', '.join(scripts[1:])}")
+        if isinstance(spec_settings["name"], str) and spec_settings["name"]:
+            self.app_name.set(spec_settings["name"])
+        if spec_settings["onefile"] is not None:
+            self.is_onefile.set(spec_settings["onefile"])
+        if spec_settings["console"] is not None:
+            self.is_windowed.set(not spec_settings["console"])
+        if spec_settings["debug"] is not None:
+            self.is_debug.set(bool(spec_settings["debug"]))
+        if spec_settings["upx"] is not None:
+            self.is_upx.set(bool(spec_settings["upx"]))
+        if isinstance(spec_settings["icon"], str) and spec_settings["icon"] != "NONE":
+            self.icon_path.set(_resolve_spec_path(spec_settings["icon"]))
+        self.hidden_imports.set(", ".join(module_name for module_name in spec_settings["hiddenimports"] if isinstance(module_name, str)))
+        self.exclude_modules.set(", ".join(module_name for module_name in spec_settings["excludes"] if isinstance(module_name, str)))
+        if spec_settings["pathex"]:
+            ignored_notes.append(f"pathex (界面不支持): {', '.join(map(str, spec_settings['pathex']))}")
+
+        imported_data_entries = []
+        for data_pair in spec_settings["datas"]:
+            if isinstance(data_pair, (list, tuple)) and len(data_pair) == 2 and all(isinstance(part, str) for part in data_pair):
+                imported_data_entries.append(f"{_resolve_spec_path(data_pair[0])}{os.pathsep}{data_pair[1]}")
+            else:
+                ignored_notes.append(f"datas 中无法识别的条目: {data_pair!r}")
+        self.add_data_list = imported_data_entries
+        self.data_entry_filters = {entry: rules for entry, rules in self.data_entry_filters.items() if entry in imported_data_entries}
+        self.update_data_list_view()
+
+        for argument_name, expressions in spec_settings["unsupported"].items():
+            ignored_notes.extend(f"{argument_name} 中的非字面量表达式: {expression}" for expression in expressions)
+        self._log_to_terminal(f"📥 已从 {spec_file_path.name} 导入配置: 入口脚本 {self.script_path.get() or '(未指定)'}，"
+                              f"{len(imported_data_entries)} 个数据条目，{len(spec_settings['hiddenimports'])} 个隐藏导入，"
+                              f"{len(spec_settings['excludes'])} 个排除模块。", "SUCCESS")
+        for ignored_note in ignored_notes:
+            self._log_to_terminal(f"⚠️ 未导入: {ignored_note}", "WARNING")
+        if ignored_notes:
+            self.show_warning("导入完成 (部分内容未导入)",
+                              f"已从 {spec_file_path.name} 导入配置。以下内容无法在界面中表示，未导入:\n\n" + "\n".join(ignored_notes[:15]) +
+                              (f"\n... 另有 {len(ignored_notes) - 15} 项，详见日志" if len(ignored_notes) > 15 else ""))
+        else:
+            self.show_success("导入完成", f"已从 {spec_file_path.name} 导入全部配置。")
+
+    def open_matrix_build_dialog(self):
+        """(工具箱) 编辑矩阵构建使用的解释器列表 (显示缓存的版本信息)，并开始矩阵构建。"""
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("多解释器矩阵构建")
+        dialog_window.geometry("900x560")
+        dialog_window.transient(self.root)
+        ctk.CTkLabel(dialog_window, text="🧮 用多个 Python 解释器/虚拟环境同时构建当前配置", font=self.font_default_bold).pack(pady=(15, 5), padx=20, anchor="w")
+        ctk.CTkLabel(dialog_window, text="每行一个解释器路径。各解释器的构建并行运行，使用各自独立的临时构建目录 (workpath)，"
+                                         "产物分别输出到 <输出目录>/matrix/<标签>/ (标签如 py3.9、py3.12)。\n"
+                                         "解释器的版本、PyInstaller 版本和标准库列表会被缓存，环境未变化时无需重新启动解释器读取。",
+                     font=self.font_small, justify="left", wraplength=860).pack(pady=(0, 8), padx=20, anchor="w")
+        interpreters_textbox = ctk.CTkTextbox(dialog_window, height=110, font=self.font_input_text)
+        interpreters_textbox.pack(fill="x", padx=20)
+        initial_interpreters = self.matrix_interpreters or ([self.python_interpreter.get().strip()] if self.python_interpreter.get().strip() else [])
+        interpreters_textbox.insert("1.0", "\n".join(initial_interpreters))
+        table_container = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        table_container.pack(fill="both", expand=True, padx=20, pady=(10, 0))
+        status_label = ctk.CTkLabel(dialog_window, text="", font=self.font_small, justify="left")
+        status_label.pack(fill="x", padx=20, pady=(5, 0))
+
+        def _get_listed_interpreters() -> list[str]:
+            listed_interpreters = []
+            for line_text in interpreters_textbox.get("1.0", "end").splitlines():
+                if line_text.strip() and line_text.strip() not in listed_interpreters:
+                    listed_interpreters.append(line_text.strip())
+            return listed_interpreters
+
+        def _show_interpreter_table(interpreter_results: dict, elapsed_seconds: float):
+            if not dialog_window.winfo_exists():
+                return
+            for child_widget in table_container.winfo_children():
+                child_widget.destroy()
+            rows = []
+            for interpreter_path, interpreter_info in interpreter_results.items():
+                if isinstance(interpreter_info, RuntimeError):
+                    rows.append((interpreter_path, "❌ 不可用", "", "", str(interpreter_info)[:80]))
+                else:
+                    rows.append((interpreter_path, interpreter_info["version"], interpreter_info["pyinstaller"] or "❌ 未安装",
+                                 "是" if interpreter_info["is_venv"] else "否", "缓存" if interpreter_info["from_cache"] else "已探测"))
+            self._create_sortable_treeview(table_container, [
+                ("interpreter", "解释器", 380, None),
+                ("python", "Python", 90, None),
+                ("pyinstaller", "PyInstaller", 110, None),
+                ("venv", "虚拟环境", 80, None),
+                ("source", "信息来源", 160, None),
+            ], rows)
+            usable_count = sum(1 for info in interpreter_results.values() if not isinstance(info, RuntimeError) and info["pyinstaller"])
+            status_label.configure(text=f"{usable_count}/{len(interpreter_results)} 个解释器可用于构建 (读取信息耗时 {elapsed_seconds * 1000:.0f} 毫秒)。")
+
+        def _refresh_interpreter_info(interpreter_paths: list[str]):
+            status_label.configure(text="正在读取解释器信息...")
+            def _describe_in_thread():
+                describe_start_time = time.perf_counter()
+                interpreter_results = self.interpreter_registry.describe_many(interpreter_paths)
+                if dialog_window.winfo_exists():
+                    dialog_window.after(0, _show_interpreter_table, interpreter_results, time.perf_counter() - describe_start_time)
+            threading.Thread(target=_describe_in_thread, daemon=True).start()
+
+        def _discover_interpreters():
+            project_dirs = [Path(path_str) for path_str in {self.project_root_dir.get(), str(Path(self.script_path.get()).parent) if self.script_path.get() else ""} if path_str]
+            status_label.configure(text="正在查找解释器...")
+            def _discover_in_thread():
+                describe_start_time = time.perf_counter()
+                interpreter_results = self.interpreter_registry.describe_many(InterpreterRegistry.discover_candidates(project_dirs))
+                usable_results = {path: info for path, info in interpreter_results.items() if not isinstance(info, RuntimeError)}
+                def _apply_discovered():
+                    if not dialog_window.winfo_exists():
+                        return
+                    listed_interpreters = _get_listed_interpreters()
+                    listed_normalized = {InterpreterRegistry.normalize_path(path) for path in listed_interpreters}
+                    for interpreter_path, interpreter_info in usable_results.items():
+                        if interpreter_info["pyinstaller"] and interpreter_info["interpreter"] not in listed_normalized:
+                            listed_interpreters.append(interpreter_path)
+                    interpreters_textbox.delete("1.0", "end")
+                    interpreters_textbox.insert("1.0", "\n".join(listed_interpreters))
+                    _show_interpreter_table(usable_results, time.perf_counter() - describe_start_time)
+                dialog_window.after(0, _apply_discovered)
+            threading.Thread(target=_discover_in_thread, daemon=True).start()
+
+        def _start_and_close():
+            listed_interpreters = _get_listed_interpreters()
+            if not listed_interpreters:
+                messagebox.showwarning("未指定解释器", "请至少列出一个解释器 (每行一个路径)。", parent=dialog_window)
+                return
+            self.matrix_interpreters = listed_interpreters
+            dialog_window.destroy()
+            self.start_matrix_build(listed_interpreters)
+
+        buttons_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        buttons_frame.pack(pady=(10, 15))
+        ctk.CTkButton(buttons_frame, text="🔍 查找解释器", command=_discover_interpreters, font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="🔄 读取信息", command=lambda: _refresh_interpreter_info(_get_listed_interpreters()), font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="🚀 开始矩阵构建", command=_start_and_close, font=self.font_button,
+                      fg_color=("#FF6B35", "#E65100"), hover_color=("#FF8C42", "#F57C00")).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="取消", command=dialog_window.destroy, font=self.font_button,
+                      fg_color="gray50", hover_color="gray40").pack(side="left", padx=5)
+        if initial_interpreters:
+            _refresh_interpreter_info(initial_interpreters)
+        dialog_window.after(100, dialog_window.lift)
+
+    def manage_artifact_store(self):
+        """(工具箱) 查看产物仓库中的产物，恢复选中的产物到当前输出目录，或删除/清空。"""
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("产物仓库")
+        dialog_window.geometry("920x520")
+        dialog_window.transient(self.root)
+        summary_label = ctk.CTkLabel(dialog_window, text="", font=self.font_default_bold, justify="left")
+        summary_label.pack(pady=(15, 5), padx=20, anchor="w")
+        ctk.CTkLabel(dialog_window, text="构建成功后产物按构建指纹 (命令 + 输入文件内容 + 工具链) 存入仓库；输入相同的构建直接恢复产物而不运行 PyInstaller。\n"
+                                         "恢复选中的产物会替换当前输出目录中的同名产物 (例如切换分支后快速回到之前的版本)。",
+                     font=self.font_small, justify="left", wraplength=880).pack(pady=(0, 10), padx=20, anchor="w")
+        table_container = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        table_container.pack(fill="both", expand=True, padx=20)
+        table_state = {"tree_view": None, "entries_by_label": {}}
+
+        def _format_timestamp(timestamp: float) -> str:
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+        def _refresh_table():
+            for child_widget in table_container.winfo_children():
+                child_widget.destroy()
+            store_entries = self.artifact_store.entries()
+            table_state["entries_by_label"] = {entry["fingerprint"][:16]: entry for entry in store_entries}
+            summary_label.configure(text=f"🗄️ 共 {len(store_entries)} 个产物，占用 {format_byte_size(sum(entry['total_bytes'] for entry in store_entries))} "
+                                         f"(上限 {self.artifact_store.max_entries} 个 / {format_byte_size(self.artifact_store.max_bytes)})")
+            table_state["tree_view"] = self._create_sortable_treeview(table_container, [
+                ("app_name", "应用名", 160, None),
+                ("mode", "打包模式", 90, None),
+                ("created", "构建时间", 160, _format_timestamp),
+                ("last_used", "最后使用", 160, _format_timestamp),
+                ("size", "大小", 100, format_byte_size),
+                ("fingerprint", "指纹", 160, None),
+            ], [(entry.get("app_name", "?"), "onefile" if entry.get("onefile") else "onedir", entry["created"], entry["last_used"],
+                 entry["total_bytes"], entry["fingerprint"][:16]) for entry in store_entries])
+
+        def _get_selected_entry() -> dict | None:
+            selected_items = table_state["tree_view"].selection()
+            if not selected_items:
+                self.show_info("未选择产物", "请先在表格中选择一个产物。")
+                return None
+            return table_state["entries_by_label"].get(table_state["tree_view"].item(selected_items[0], "values")[-1])
+
+        def _restore_selected():
+            selected_entry = _get_selected_entry()
+            if selected_entry is None:
+                return
+            if self.is_building:
+                self.show_warning("正在构建", "构建进行中，请等待构建结束后再恢复产物。")
+                return
+            dist_path = self._resolve_build_paths()["dist_path"]
+            def _restore_in_thread():
+                try:
+                    restore_result = self.artifact_store.restore(selected_entry["fingerprint"], dist_path)
+                except OSError as e_restore:
+                    self._log_to_terminal(f"❌ 恢复产物失败: {e_restore}", "ERROR")
+                    self.root.after(0, self.show_error, "恢复失败", f"恢复产物时出错:\n{e_restore}")
+                    return
+                if restore_result is None:
+                    self.root.after(0, self.show_warning, "恢复失败", "该产物的文件已被修改或缺失，已从仓库中移除。")
+                else:
+                    self._log_to_terminal(f"♻️ 已在 {restore_result['elapsed_seconds'] * 1000:.0f} 毫秒内将产物 {selected_entry['fingerprint'][:12]} 恢复到 {dist_path} "
+                                          f"({restore_result['file_count']} 个文件，{self._describe_link_methods(restore_result['link_methods'])})。", "SUCCESS")
+                    self.root.after(0, self.show_success, "恢复完成", "产物已恢复到输出目录:\n" + "\n".join(str(path) for path in restore_result["outputs"]))
+                if dialog_window.winfo_exists():
+                    dialog_window.after(0, _refresh_table)
+            threading.Thread(target=_restore_in_thread, daemon=True).start()
+
+        def _remove_selected():
+            selected_entry = _get_selected_entry()
+            if selected_entry is not None:
+                self.artifact_store.remove(selected_entry["fingerprint"])
+                self._log_to_terminal(f"🗑️ 已从产物仓库删除产物 {selected_entry['fingerprint'][:12]}。", "INFO")
+                _refresh_table()
+
+        def _clear_store():
+            if messagebox.askyesno("确认清空", "确定要删除产物仓库中的全部产物吗？\n(输出目录中的产物不受影响)", parent=dialog_window):
+                removed_count = self.artifact_store.remove()
+                self._log_to_terminal(f"🧹 已清空产物仓库 (删除 {removed_count} 个产物)。", "INFO")
+                _refresh_table()
+
+        buttons_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        buttons_frame.pack(pady=(10, 15))
+        ctk.CTkButton(buttons_frame, text="♻️ 恢复到输出目录", command=_restore_selected, font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="🗑️ 删除选中", command=_remove_selected, font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="🧹 清空仓库", command=_clear_store, font=self.font_button,
+                      fg_color="gray50", hover_color="gray40").pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="关闭", command=dialog_window.destroy, font=self.font_button).pack(side="left", padx=5)
+        _refresh_table()
+        dialog_window.after(100, dialog_window.lift)
+
+    def configure_remote_build_agent(self):
+        """(工具箱) 设置远程构建代理的地址和令牌、测试连接，并切换是否在代理上构建。"""
+        dialog_window = ctk.CTkToplevel(self.root)
+        dialog_window.title("远程构建代理")
+        dialog_window.geometry("640x420")
+        dialog_window.transient(self.root)
+        ctk.CTkLabel(dialog_window, text="🛰️ 在另一台 (更快的) 机器上运行构建", font=self.font_default_bold).pack(pady=(15, 5), padx=20)
+        ctk.CTkLabel(dialog_window, text=f"在构建机上运行:  python {Path(__file__).name} --build-agent --host 0.0.0.0 --port {BuildAgentServer.DEFAULT_PORT} --token <令牌>\n"
+                                         "源码按内容哈希上传，只发送发生变化的文件；构建日志实时返回，产物下载到本机的输出目录。\n"
+                                         "也可以在本机用默认参数启动代理 (只监听 127.0.0.1) 进行测试。",
+                     font=self.font_small, justify="left", wraplength=600).pack(pady=(0, 10), padx=20)
+
+        form_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        form_frame.pack(fill="x", padx=20)
+        form_frame.grid_columnconfigure(1, weight=1)
+        ctk.CTkLabel(form_frame, text="代理地址:", font=self.font_default).grid(row=0, column=0, sticky="w", pady=5)
+        agent_url_entry = ctk.CTkEntry(form_frame, placeholder_text=f"http://127.0.0.1:{BuildAgentServer.DEFAULT_PORT}", font=self.font_default)
+        agent_url_entry.grid(row=0, column=1, sticky="ew", padx=(10, 0), pady=5)
+        agent_url_entry.insert(0, self.remote_agent_url.get())
+        ctk.CTkLabel(form_frame, text="令牌:", font=self.font_default).grid(row=1, column=0, sticky="w", pady=5)
+        agent_token_entry = ctk.CTkEntry(form_frame, show="*", placeholder_text="(可选，也可通过环境变量 PYI_STUDIO_AGENT_TOKEN 设置)", font=self.font_default)
+        agent_token_entry.grid(row=1, column=1, sticky="ew", padx=(10, 0), pady=5)
+        agent_token_entry.insert(0, self.remote_agent_token.get())
+        use_agent_var = tk.BooleanVar(value=self.use_remote_agent.get())
+        ctk.CTkSwitch(dialog_window, text="使用远程构建代理进行构建", variable=use_agent_var, font=self.font_switch).pack(anchor="w", padx=20, pady=(10, 5))
+        connection_status_label = ctk.CTkLabel(dialog_window, text="", font=self.font_small, justify="left", wraplength=600)
+        connection_status_label.pack(fill="x", padx=20, pady=5)
+
+        def _test_connection():
+            agent_url_str, agent_token_str = agent_url_entry.get().strip(), agent_token_entry.get().strip()
+            connection_status_label.configure(text="正在连接...")
+            def _test_in_thread():
+                try:
+                    agent_info = BuildAgentClient(agent_url_str, agent_token_str or None, timeout_seconds=10.0).get_info()
+                    status_text = (f"✅ 连接成功: {agent_info.get('platform')}/{agent_info.get('machine')}，Python {agent_info.get('python')}，"
+                                   f"PyInstaller {agent_info.get('pyinstaller') or '(未安装)'}")
+                    if agent_info.get("platform") != sys.platform:
+                        status_text += f"\n⚠️ 代理平台与本机 ({sys.platform}) 不同，产物只能在 {agent_info.get('platform')} 上运行。"
+                except (OSError, http.client.HTTPException, ValueError) as e_connect:
+                    status_text = f"❌ 连接失败: {e_connect}"
+                if dialog_window.winfo_exists():
+                    dialog_window.after(0, lambda: connection_status_label.winfo_exists() and connection_status_label.configure(text=status_text))
+            threading.Thread(target=_test_in_thread, daemon=True).start()
+
+        def _save_and_close():
+            self.remote_agent_url.set(agent_url_entry.get().strip())
+            self.remote_agent_token.set(agent_token_entry.get().strip())
+            self.use_remote_agent.set(use_agent_var.get() and bool(self.remote_agent_url.get()))
+            self._log_to_terminal(f"🛰️ 远程构建代理: {'已启用 (' + self.remote_agent_url.get() + ')' if self.use_remote_agent.get() else '未启用，在本机构建'}", "INFO")
+            dialog_window.destroy()
+
+        buttons_frame = ctk.CTkFrame(dialog_window, fg_color="transparent")
+        buttons_frame.pack(pady=(10, 15))
+        ctk.CTkButton(buttons_frame, text="🔌 测试连接", command=_test_connection, font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="保存", command=_save_and_close, font=self.font_button).pack(side="left", padx=5)
+        ctk.CTkButton(buttons_frame, text="取消", command=dialog_window.destroy, font=self.font_button,
+                      fg_color="gray50", hover_color="gray40").pack(side="left", padx=5)
+        dialog_window.after(100, dialog_window.lift)
+
     def open_docs(self):
         """(工具箱) 在默认网页浏览器中打开PyInstaller官方文档网站。"""
         # 中文注释: 提供快速访问官方文档的入口。
@@ -2311,10 +10897,20 @@ class UltraModernPyInstallerGUI:
             'is_debug': self.is_debug.get(), 
             'is_clean': self.is_clean.get(),
             'is_upx': self.is_upx.get(), 
+            'build_from_spec': self.build_from_spec.get(),
+            'use_remote_agent': self.use_remote_agent.get(),
+            'remote_agent_url': self.remote_agent_url.get(),
+            'use_artifact_store': self.use_artifact_store.get(),
+            'python_interpreter': self.python_interpreter.get(),
+            'matrix_interpreters': list(self.matrix_interpreters),
+            'use_isolated_build_env': self.use_isolated_build_env.get(),
+            'build_env_lockfile': self.build_env_lockfile.get(),
+            'build_env_wheel_dir': self.build_env_wheel_dir.get(),
             'exclude_modules': self.exclude_modules.get(),
             'hidden_imports': self.hidden_imports.get(), 
             'upx_dir': self.upx_dir.get(),
-            'add_data_list': self.add_data_list # 直接保存列表
+            'add_data_list': self.add_data_list, # 直接保存列表
+            'data_entry_filters': {entry: rules for entry, rules in self.data_entry_filters.items() if entry in self.add_data_list},
         }
 
     def _apply_config_data_from_loaded_file(self, loaded_config_data): # 方法名更清晰
@@ -2338,6 +10934,16 @@ class UltraModernPyInstallerGUI:
         self.is_debug.set(bool(loaded_config_data.get('is_debug', False)))
         self.is_clean.set(bool(loaded_config_data.get('is_clean', True)))
         self.is_upx.set(bool(loaded_config_data.get('is_upx', False)))
+        self.build_from_spec.set(bool(loaded_config_data.get('build_from_spec', True)))
+        self.use_remote_agent.set(bool(loaded_config_data.get('use_remote_agent', False)))
+        self.remote_agent_url.set(loaded_config_data.get('remote_agent_url', ''))
+        self.use_artifact_store.set(bool(loaded_config_data.get('use_artifact_store', True)))
+        self.python_interpreter.set(loaded_config_data.get('python_interpreter', ''))
+        loaded_matrix_interpreters = loaded_config_data.get('matrix_interpreters', [])
+        self.matrix_interpreters = [str(path) for path in loaded_matrix_interpreters] if isinstance(loaded_matrix_interpreters, list) else []
+        self.use_isolated_build_env.set(bool(loaded_config_data.get('use_isolated_build_env', False)))
+        self.build_env_lockfile.set(loaded_config_data.get('build_env_lockfile', ''))
+        self.build_env_wheel_dir.set(loaded_config_data.get('build_env_wheel_dir', ''))
         
         self.exclude_modules.set(loaded_config_data.get('exclude_modules', ''))
         self.hidden_imports.set(loaded_config_data.get('hidden_imports', ''))
@@ -2350,8 +10956,12 @@ class UltraModernPyInstallerGUI:
         else:
             self.add_data_list = [] # 如果格式不对，则重置为空列表
             self._log_to_terminal("⚠️ 配置文件中的 'add_data_list' 格式不正确，已重置。")
+        loaded_data_filters = loaded_config_data.get('data_entry_filters', {})
+        self.data_entry_filters = loaded_data_filters if isinstance(loaded_data_filters, dict) else {}
             
-        self.update_data_textbox() # 更新UI上数据文件列表的显示
+        self.update_data_list_view() # 更新UI上数据文件列表的显示
+        self._isolated_build_env_python = None # 上一个配置的环境不再适用
+        self._prepare_isolated_build_env_in_background() # 打开配置时就在后台准备隔离构建环境，点击构建时通常已就绪
 
     def save_config(self, show_success_message_box=False): 
         """
@@ -2481,10 +11091,15 @@ class UltraModernPyInstallerGUI:
                 'is_debug': False, 
                 'is_clean': True,
                 'is_upx': False, 
+                'build_from_spec': True,
+                'use_remote_agent': False,
+                'remote_agent_url': '',
+                'use_artifact_store': True,
                 'exclude_modules': '', 
                 'hidden_imports': '', 
                 'upx_dir': '',
-                'add_data_list': []
+                'add_data_list': [],
+                'data_entry_filters': {}
             }
             self._apply_config_data_from_loaded_file(default_configuration_values) # 应用这些默认值
             
@@ -2524,6 +11139,18 @@ class UltraModernPyInstallerGUI:
     def on_closing(self): # 确保 on_closing 方法在 run 方法之前定义
         # ... (您的 on_closing 实现) ...
         self.status_animation_on = False; self.save_config(show_success_message_box=False) 
+        if self._file_watcher: self._file_watcher.stop()
+        # 关闭窗口时同步终止仍在运行的构建进程树，避免遗留孤儿 PyInstaller 进程
+        if self._startup_benchmark_cancel_event is not None: self._startup_benchmark_cancel_event.set()
+        if self._shared_analysis_cache is not None: self._shared_analysis_cache.flush()
+        if self._remote_build_job is not None: # 尽力通知构建代理取消仍在运行的远程任务
+            try: self._remote_build_job[0].cancel_job(self._remote_build_job[1])
+            except (OSError, http.client.HTTPException): pass
+        terminating_processes = [process for processes in list(self._terminating_builds.values()) for process in processes]
+        for leftover_process in (self._build_process, self._trial_build_process, *terminating_processes, *self._matrix_build_processes.values()):
+            if leftover_process is not None:
+                self._active_build_id = None
+                terminate_process_tree(leftover_process, timeout_seconds=3.0, logger_func=self._log_to_terminal)
         if self.root.winfo_exists(): self.root.destroy()
 
     def run(self):
@@ -2568,8 +11195,17 @@ class UltraModernPyInstallerGUI:
         # 启动Tkinter的主事件循环
         # 程序将在此处暂停，等待用户交互和事件发生
         self._log_to_terminal("ℹ️ 应用程序图形界面已准备就绪，正在启动主事件循环...", "INFO")
+        self.root.after_idle(self._report_time_to_interactive) # 首次绘制等空闲任务之后执行
         self.root.mainloop()
 
+    def _report_time_to_interactive(self):
+        """(主线程，主循环首次空闲时) 记录从创建主窗口到界面可交互的耗时。"""
+        self.root.update_idletasks() # 处理完剩余的布局/绘制任务，此后即可响应输入
+        interactive_perf_counter = time.perf_counter()
+        eager_tabs_note = "，全部选项卡已在启动时创建" if os.environ.get("PYINSTALLER_STUDIO_EAGER_TABS") == "1" else ""
+        self._log_to_terminal(f"⏱️ 启动耗时: 界面可交互 {(interactive_perf_counter - self._startup_perf_counter) * 1000:.0f} 毫秒 "
+                              f"(其中创建界面组件 {(self._widgets_created_perf_counter - self._startup_perf_counter) * 1000:.0f} 毫秒{eager_tabs_note})。", "INFO")
+
 
 
 # --- 主程序入口与依赖检查 ---
@@ -2688,7 +11324,17 @@ def _main_install_pyinstaller_if_needed():
         return False # 检查出错，保守处理为未安装
 
 def main():
-    """主函数：初始化日志、检查依赖并启动应用程序GUI。"""
+    """
+    主函数：初始化日志、检查依赖并启动应用程序GUI
+    (带 --build-agent 参数时以无界面构建代理方式运行，带 --benchmark-scanner 参数时运行依赖扫描器基准测试，
+    带 --benchmark-output-reader 参数时对比构建输出的读取方式)。
+    """
+    if "--build-agent" in sys.argv[1:]:
+        sys.exit(run_build_agent(sys.argv[1:]))
+    if "--benchmark-scanner" in sys.argv[1:]:
+        sys.exit(run_scanner_benchmark(sys.argv[1:]))
+    if "--benchmark-output-reader" in sys.argv[1:]:
+        sys.exit(run_output_reader_benchmark(sys.argv[1:]))
     import logging # <--- 在这里或更早导入 logging 模块
     
     # 配置根日志记录器